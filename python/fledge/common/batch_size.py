@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+"""Adaptive sizing of the batches written to storage or sent north
+
+The latency of each batch is measured and the batch size is moved toward a latency target, within bounds:
+
+  - the size shrinks in proportion when the smoothed latency is above the target, by half at most
+  - the size grows by a quarter when a full batch is below the target, a batch that is not full shows that the
+    data rate, not the batch size, is the limit
+  - a growth that lowers the throughput is undone and the size is not grown back for a while, so that the size
+    settles where the throughput peaks
+"""
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_SMOOTHING = 0.3
+""" Weight of the last batch in the smoothed latency and throughput """
+
+_GROWTH = 1.25
+_GROW_BELOW = 0.8
+""" A full batch grows the size when the latency is below this fraction of the target """
+
+_THROUGHPUT_LOSS = 0.9
+""" A growth giving less than this fraction of the throughput before it is undone """
+
+_HOLD_BATCHES = 100
+""" Number of batches a size undone is not grown back to """
+
+
+class AdaptiveBatchSize(object):
+    """Batch size following the latency of the batches
+
+    Attributes:
+        size: number of items of the next batch
+        increases: number of times the size has grown, since last read by decisions()
+        decreases: number of times the size has shrunk, since last read by decisions()
+    """
+
+    def __init__(self, size, minimum, maximum, target_latency):
+        """
+        Args:
+            size: initial batch size
+            minimum: smallest batch size
+            maximum: largest batch size
+            target_latency: seconds a batch should take
+        """
+        if minimum < 1 or maximum < minimum:
+            raise ValueError('Batch size bounds must be 1 <= minimum <= maximum')
+        if target_latency <= 0:
+            raise ValueError('Target latency must be greater than 0')
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.size = min(max(size, minimum), maximum)
+        self.increases = 0
+        self.decreases = 0
+        self._latency = None
+        self._throughput = None
+        # size and throughput before the last growth, to undo it if the throughput drops
+        self._grown_from = None
+        # size not to grow to, and the number of batches before it is forgotten
+        self._ceiling = None
+        self._hold = 0
+
+    def record(self, count, latency):
+        """Records a batch, returns the size of the next batch
+
+        Args:
+            count: number of items of the batch
+            latency: seconds the batch took
+        """
+        if count <= 0:
+            return self.size
+        latency = max(latency, 1e-6)
+        throughput = count / latency
+        if self._latency is None:
+            self._latency = latency
+            self._throughput = throughput
+        else:
+            self._latency += _SMOOTHING * (latency - self._latency)
+            self._throughput += _SMOOTHING * (throughput - self._throughput)
+        if self._hold:
+            self._hold -= 1
+            if not self._hold:
+                self._ceiling = None
+
+        size = self.size
+        if self._latency > self.target_latency:
+            size = max(self.minimum, int(size * max(0.5, self.target_latency / self._latency)))
+            self._ceiling = None
+            self._hold = 0
+        elif count >= self.size and self._latency < self.target_latency * _GROW_BELOW:
+            if self._grown_from is not None and self._throughput < self._grown_from[1] * _THROUGHPUT_LOSS:
+                # The last growth lowered the throughput
+                self._ceiling = self.size
+                self._hold = _HOLD_BATCHES
+                size = self._grown_from[0]
+            else:
+                size = min(self.maximum, int(size * _GROWTH) + 1)
+                if self._ceiling is not None and size >= self._ceiling:
+                    size = self.size
+
+        if size != self.size:
+            self._grown_from = (self.size, self._throughput) if size > self.size else None
+            if size > self.size:
+                self.increases += 1
+            else:
+                self.decreases += 1
+            self.size = size
+            # The next batches are measured at the new size
+            self._latency = None
+        return self.size
+
+    def decisions(self):
+        """Returns the (increases, decreases) of the size since the last call"""
+        decisions = self.increases, self.decreases
+        self.increases = self.decreases = 0
+        return decisions
@@ -45,67 +45,150 @@ RESERVED_CATG = ['South', 'North', 'General', 'Advanced', 'Utilities', 'rest_api
 
 
 class ConfigurationCache(object):
-    """Configuration Cache Manager"""
+    """Configuration Cache Manager
 
-    def __init__(self, size=30):
+    Least recently used categories are kept at the start of the ordered cache and evicted first
+    """
+
+    def __init__(self, size=30, max_bytes=0, ttl=0):
         """
-        cache: value stored in dictionary as per category_name
+        cache: value stored in dictionary as per category_name, ordered from least to most recently used
         max_cache_size: Hold the recently requested categories in the cache. Default cache size is 30
+        max_cache_bytes: Upper bound of the estimated JSON size of the cached categories, 0 for no bound
+        ttl: Seconds after which a cached category is read again from the storage layer, 0 to never expire
         hit: number of times an item is read from the cache
         miss: number of times an item was not found in the cache and a read of the storage layer was required
+        evictions: number of categories removed to keep the cache within its size
+        expirations: number of categories removed because they were older than ttl
         """
-        self.cache = {}
-        self.max_cache_size = size
+        self._cache = collections.OrderedDict()
+        self._max_cache_size = size
+        self._max_cache_bytes = max_bytes
+        self.ttl = ttl
+        self.bytes = 0
         self.hit = 0
         self.miss = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @cache.setter
+    def cache(self, value):
+        self._cache = collections.OrderedDict(value)
+        self.bytes = sum(entry.get('size', 0) for entry in self._cache.values())
+
+    @property
+    def max_cache_size(self):
+        return self._max_cache_size
+
+    @max_cache_size.setter
+    def max_cache_size(self, value):
+        self._max_cache_size = value
+        self._evict()
+
+    @property
+    def max_cache_bytes(self):
+        return self._max_cache_bytes
+
+    @max_cache_bytes.setter
+    def max_cache_bytes(self, value):
+        self._max_cache_bytes = value
+        if value:
+            for entry in self._cache.values():
+                if 'size' not in entry:
+                    entry['size'] = self._estimate_size(entry)
+                    self.bytes += entry['size']
+        self._evict()
 
     def __contains__(self, category_name):
         """Returns True or False depending on whether or not the key is in the cache
         and update the hit and data_accessed"""
-        if category_name in self.cache:
-            try:
-                current_hit = self.cache[category_name]['hit']
-            except KeyError:
-                current_hit = 0
-
-            self.hit += 1
-            self.cache[category_name].update({'date_accessed': datetime.datetime.now(), 'hit': current_hit + 1})
-            return True
+        entry = self._cache.get(category_name)
+        if entry is not None:
+            now = datetime.datetime.now()
+            if self.ttl and 'date_updated' in entry and \
+                    (now - entry['date_updated']).total_seconds() > self.ttl:
+                self._pop(category_name)
+                self.expirations += 1
+            else:
+                self.hit += 1
+                entry.update({'date_accessed': now, 'hit': entry.get('hit', 0) + 1})
+                self._cache.move_to_end(category_name)
+                return True
         self.miss += 1
         return False
 
     def update(self, category_name, category_description, category_val, display_name=None):
-        """Update the cache dictionary and remove the oldest item"""
-        if category_name not in self.cache and len(self.cache) >= self.max_cache_size:
-            self.remove_oldest()
+        """Update the cache dictionary and remove the least recently used items"""
         display_name = category_name if display_name is None else display_name
-        self.cache[category_name] = {'date_accessed': datetime.datetime.now(), 'description': category_description,
-                                     'value': category_val, 'displayName': display_name}
-        _logger.debug("Updated Configuration Cache %s", self.cache)
+        now = datetime.datetime.now()
+        entry = {'date_accessed': now, 'date_updated': now, 'description': category_description,
+                 'value': category_val, 'displayName': display_name}
+        if self._max_cache_bytes:
+            entry['size'] = self._estimate_size(entry)
+        previous = self._cache.get(category_name)
+        if previous is not None:
+            entry['hit'] = previous.get('hit', 0)
+            self.bytes -= previous.get('size', 0)
+        self._cache[category_name] = entry
+        self._cache.move_to_end(category_name)
+        self.bytes += entry.get('size', 0)
+        self._evict(keep=category_name)
+        _logger.debug("Updated Configuration Cache %s", category_name)
+
+    def resize(self, category_name):
+        """Estimate again the size of an entry changed in place and remove the least recently used items"""
+        entry = self._cache.get(category_name)
+        if entry is None or not self._max_cache_bytes:
+            return
+        size = self._estimate_size(entry)
+        self.bytes += size - entry.get('size', 0)
+        entry['size'] = size
+        self._evict(keep=category_name)
 
     def remove_oldest(self):
-        """Remove the entry that has the oldest accessed date"""
-        oldest_entry = None
-        for category_name in self.cache:
-            if oldest_entry is None:
-                oldest_entry = category_name
-            elif self.cache[category_name].get('date_accessed') and self.cache[oldest_entry].get('date_accessed') \
-                    and self.cache[category_name]['date_accessed'] < self.cache[oldest_entry]['date_accessed']:
-                oldest_entry = category_name
-        if oldest_entry:
-            self.cache.pop(oldest_entry)
+        """Remove the least recently used entry"""
+        if self._cache:
+            self._pop(next(iter(self._cache)))
 
     def remove(self, key):
         """Remove the entry with given key name"""
-        for category_name in self.cache:
-            if key == category_name:
-                self.cache.pop(key)
-                break
+        if key in self._cache:
+            self._pop(key)
+
+    def stats(self):
+        """Return the size and the counters of the cache"""
+        return {"size": len(self._cache), "maxSize": self._max_cache_size, "bytes": self.bytes,
+                "maxBytes": self._max_cache_bytes, "ttl": self.ttl, "hit": self.hit, "miss": self.miss,
+                "evictions": self.evictions, "expirations": self.expirations}
 
     @property
     def size(self):
         """Return the size of the cache"""
-        return len(self.cache)
+        return len(self._cache)
+
+    def _pop(self, key):
+        self.bytes -= self._cache.pop(key).get('size', 0)
+
+    def _evict(self, keep=None):
+        """Remove the least recently used entries until the cache fits its size, apart from the keep entry"""
+        while self._cache and (len(self._cache) > self._max_cache_size or
+                               (self._max_cache_bytes and self.bytes > self._max_cache_bytes)):
+            oldest = next(iter(self._cache))
+            if oldest == keep:
+                break
+            self._pop(oldest)
+            self.evictions += 1
+
+    @staticmethod
+    def _estimate_size(entry):
+        try:
+            return len(json.dumps(entry['value'])) + len(entry['description'] or '') + len(entry['displayName'])
+        except (TypeError, ValueError):
+            return 0
 
 
 class ConfigurationManagerSingleton(object):
@@ -743,18 +826,40 @@ class ConfigurationManager(ConfigurationManagerSingleton):
         # If nothing found then return False
         return False, None, None, None
 
-    async def _read_all_category_names(self):
+    async def _read_all_categories(self):
         # SELECT configuration.key, configuration.description, configuration.value, configuration.display_name, configuration.ts FROM configuration
         payload = PayloadBuilder().SELECT("key", "description", "value", "display_name", "ts") \
             .ALIAS("return", ("ts", 'timestamp')) \
             .FORMAT("return", ("ts", "YYYY-MM-DD HH24:MI:SS.MS")).payload()
         results = await self._storage.query_tbl_with_payload('configuration', payload)
+        return results['rows']
 
+    async def _read_all_category_names(self):
         category_info = []
-        for row in results['rows']:
+        for row in await self._read_all_categories():
             category_info.append((row['key'], row['description'], row["display_name"]))
         return category_info
 
+    async def warm_cache(self):
+        """Fill the cache with the categories until it is full, so that the first reads after startup
+        do not hit the storage layer
+
+        Return Values:
+        number of categories added to the cache
+        """
+        cache = self._cacheManager
+        warmed = 0
+        for row in await self._read_all_categories():
+            if cache.size >= cache.max_cache_size or (cache.max_cache_bytes and cache.bytes >= cache.max_cache_bytes):
+                break
+            if row['key'] in cache.cache:
+                continue
+            cache.update(row['key'], row['description'], self._handle_script_type(row['key'], row['value']),
+                         row['display_name'])
+            warmed += 1
+        _logger.debug("Warmed the configuration cache with %s categories", warmed)
+        return warmed
+
     async def _read_category(self, cat_name):
         # SELECT configuration.key, configuration.description, configuration.value, configuration.display_name, configuration.ts FROM configuration
         payload = PayloadBuilder().SELECT("key", "description", "value", "display_name", "ts") \
@@ -993,6 +1098,7 @@ class ConfigurationManager(ConfigurationManagerSingleton):
                     else:
                         self._cacheManager.cache[category_name]['value'].update(
                             {item_name: cat_value[item_name]['value']})
+            self._cacheManager.resize(category_name)
 
             # Configuration Change audit entry
             audit = AuditLogger(self._storage)
@@ -1045,14 +1151,7 @@ class ConfigurationManager(ConfigurationManagerSingleton):
             response = result['response']
             # Re-read category from DB
             new_category_val_db = await self._read_category_val(category_name)
-            if category_name in self._cacheManager.cache:
-                self._cacheManager.cache[category_name]['description'] = category_description
-                self._cacheManager.cache[category_name]['value'] = new_category_val_db
-                self._cacheManager.cache[category_name]['displayName'] = display_name
-            else:
-                self._cacheManager.cache.update({category_name: {"description": category_description,
-                                                                 "value": new_category_val_db,
-                                                                 "displayName": display_name}})
+            self._cacheManager.update(category_name, category_description, new_category_val_db, display_name)
         except KeyError:
             raise ValueError(result['message'])
         except StorageServerError as ex:
@@ -1261,6 +1360,7 @@ class ConfigurationManager(ConfigurationManagerSingleton):
                         self._cacheManager.cache[category_name]['value'][item_name]["file"] = script_file_path
                 else:
                     self._cacheManager.cache[category_name]['value'].update({item_name: cat_item['value']})
+                self._cacheManager.resize(category_name)
         except Exception as ex:
             if 'Forbidden' not in str(ex):
                 _logger.exception(
@@ -1362,6 +1462,7 @@ class ConfigurationManager(ConfigurationManagerSingleton):
                         optional_entry_name]
                 else:
                     self._cacheManager.cache[category_name]['value'].update({item_name: cat_item[optional_entry_name]})
+                self._cacheManager.resize(category_name)
         except:
             _logger.exception(
                 'Unable to set optional %s entry based on category_name %s and item_name %s and value_item_entry %s',
@@ -2162,6 +2263,10 @@ class ConfigurationManager(ConfigurationManagerSingleton):
         if cat_name == 'CONFIGURATION':
             if 'cacheSize' in cat_value:
                 self._cacheManager.max_cache_size = int(cat_value['cacheSize']['value'])
+            if 'cacheMaxBytes' in cat_value:
+                self._cacheManager.max_cache_bytes = int(cat_value['cacheMaxBytes']['value'])
+            if 'cacheTTL' in cat_value:
+                self._cacheManager.ttl = int(cat_value['cacheTTL']['value'])
         elif cat_name == 'firewall':
             from fledge.services.core.firewall import Firewall
             Firewall.IPAddresses.save(data=cat_value)
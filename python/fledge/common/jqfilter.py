@@ -5,8 +5,14 @@
 # FLEDGE_END
 
 """ A simple implementation using the jq product to apply a transformation to the JSON document
+
+The jq programs are compiled once and kept in a least recently used cache keyed by the filter text, as the same
+filter is usually applied to every block of readings.
 """
 
+import collections
+import threading
+
 import pyjq
 
 from fledge.common.logger import FLCoreLogger
@@ -16,6 +22,9 @@ __copyright__ = "Copyright (c) 2017 OSI Soft, LLC"
 __license__ = "Apache 2.0"
 __version__ = "${VERSION}"
 
+_MAX_COMPILED_FILTERS = 32
+""" Maximum number of compiled jq programs kept """
+
 
 class JQFilter:
     """JQFilter class to use the jq product.
@@ -23,10 +32,46 @@ class JQFilter:
     This class uses pyjq (https://pypi.python.org/pypi/jq) which contains Python bindings for jq
     """
 
+    _compiled = collections.OrderedDict()
+    """ Filter text -> compiled jq program, the least recently used first """
+
+    _compiled_lock = threading.Lock()
+
     def __init__(self):
         """Initialise the JQFilter"""
         self._logger = FLCoreLogger().get_logger("JQFilter")
 
+    @classmethod
+    def compile(cls, filter_string):
+        """ Returns the compiled jq program of the filter, compiling it on first use
+        Raises:
+            ValueError: If filter is not a proper JQ filter
+        """
+        with cls._compiled_lock:
+            try:
+                program = cls._compiled[filter_string]
+                cls._compiled.move_to_end(filter_string)
+                return program
+            except KeyError:
+                pass
+        program = pyjq.compile(filter_string)
+        with cls._compiled_lock:
+            cls._compiled[filter_string] = program
+            while len(cls._compiled) > _MAX_COMPILED_FILTERS:
+                cls._compiled.popitem(last=False)
+        return program
+
+    @classmethod
+    def invalidate(cls, filter_string=None):
+        """ Removes the compiled program of a filter, or of all the filters if filter_string is None,
+        e.g. when the filter configuration has changed
+        """
+        with cls._compiled_lock:
+            if filter_string is None:
+                cls._compiled.clear()
+            else:
+                cls._compiled.pop(filter_string, None)
+
     def transform(self, reading_block, filter_string):
         """
         Args:
@@ -43,7 +88,7 @@ class JQFilter:
 
         """
         try:
-            return pyjq.all(filter_string, reading_block)
+            return self.compile(filter_string).all(reading_block)
         except TypeError as ex:
             self._logger.error(ex, "Invalid JSON passed during jq transform.")
             raise
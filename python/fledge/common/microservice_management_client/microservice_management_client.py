@@ -4,13 +4,17 @@
 # See: http://fledge-iot.readthedocs.io/
 # FLEDGE_END
 
+import asyncio
 import http.client
 import json
 import urllib.parse
 import logging
 
+import aiohttp
+
 from fledge.common import logger
 from fledge.common.microservice_management_client import exceptions as client_exceptions
+from fledge.common.pooled_session import PooledSession
 
 __author__ = "Ashwin Gopalakrishnan"
 __copyright__ = "Copyright (c) 2017 OSIsoft, LLC"
@@ -19,6 +23,24 @@ __version__ = "${VERSION}"
 
 _logger = logger.setup(__name__, level=logging.INFO)
 
+DEFAULT_TIMEOUT = 30.0
+""" Seconds a request to the core management API may take """
+
+DEFAULT_RETRIES = 2
+""" Number of times a request is retried after a connection failure or a timeout """
+
+DEFAULT_POOL_SIZE = 4
+""" Maximum number of simultaneous connections an async client keeps open to the core """
+
+DEFAULT_POOL_IDLE_TIMEOUT = 30.0
+""" Seconds an idle keep-alive connection is kept in the pool before it is closed """
+
+_RETRY_DELAY = 0.5
+""" Seconds before the first retry, doubled at every retry """
+
+_RETRYABLE_STATUS = (502, 503, 504)
+""" Status codes of a GET request that are retried """
+
 
 class MicroserviceManagementClient(object):
     _management_client_conn = None
@@ -420,4 +442,197 @@ class MicroserviceManagementClient(object):
         res = r.read().decode()
         self._management_client_conn.close()
         response = json.loads(res)
-        return response
\ No newline at end of file
+        return response
+
+
+class AsyncMicroserviceManagementClient(object):
+    """ Asynchronous MicroserviceManagementClient, for the callers running in an event loop
+
+    The methods are the coroutine versions of the MicroserviceManagementClient ones, with the same arguments, results
+    and errors. The requests share a pool of keep-alive connections and each one is bounded by a timeout. A request
+    failing to connect, or timing out if it is a GET, is retried with an increasing delay. Identical GET requests
+    made while one is in flight share its response.
+    """
+
+    def __init__(self, microservice_management_host, microservice_management_port, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, pool_size=DEFAULT_POOL_SIZE, pool_idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT):
+        self.hostname = microservice_management_host
+        self.port = microservice_management_port
+        self._timeout = float(timeout)
+        self._retries = int(retries)
+        self._pool_size = int(pool_size)
+        self._pool_idle_timeout = float(pool_idle_timeout)
+        self._pool = PooledSession(self._new_session)
+        # url -> future of the (status, reason, body) of the GET request in flight
+        self._in_flight = {}
+
+    def _new_session(self):
+        """ Creates the keep-alive session backing the connection pool of this client """
+        connector = aiohttp.TCPConnector(limit=self._pool_size, keepalive_timeout=self._pool_idle_timeout)
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self._timeout))
+
+    async def close(self):
+        """ Closes the connection pool; a later request transparently opens a new one """
+        await self._pool.close()
+
+    async def _send(self, method, url, body=None):
+        """ Sends a request, retrying it if it could not be completed
+
+        A request other than a GET is retried only when the connection could not be established, as it may have
+        been processed by the core otherwise.
+
+        :return: (status, reason, body) of the response
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self._pool.acquire() as session:
+                    async with session.request(method, 'http://{}:{}{}'.format(
+                            self.hostname, self.port, url), data=body) as resp:
+                        res = await resp.text()
+                        if not (method == 'GET' and resp.status in _RETRYABLE_STATUS and attempt < self._retries):
+                            return resp.status, resp.reason, res
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as ex:
+                if attempt >= self._retries or not (method == 'GET' or isinstance(ex, aiohttp.ClientConnectorError)):
+                    _logger.error("%s %s failed: %s", method, url, str(ex) or type(ex).__name__)
+                    raise
+            attempt += 1
+            await asyncio.sleep(_RETRY_DELAY * 2 ** (attempt - 1))
+
+    async def _request(self, method, url, body=None, accepted=()):
+        """ Sends a request and returns its JSON response
+
+        :param accepted: error status codes returning a response rather than raising an error
+        :raise MicroserviceManagementClientError: for a client or a server error
+        """
+        if method == 'GET':
+            future = self._in_flight.get(url)
+            if future is None:
+                future = self._in_flight[url] = asyncio.ensure_future(self._send(method, url))
+                future.add_done_callback(
+                    lambda done: self._in_flight.pop(url) if self._in_flight.get(url) is done else None)
+            # A caller cancelled does not cancel the request for the others
+            status, reason, res = await asyncio.shield(future)
+        else:
+            status, reason, res = await self._send(method, url, body)
+        if status not in accepted:
+            if status in range(400, 500):
+                _logger.error("For URL: %s, Client error code: %d, Reason: %s", url, status, reason)
+                raise client_exceptions.MicroserviceManagementClientError(status=status, reason=reason)
+            if status in range(500, 600):
+                _logger.error("For URL: %s, Server error code: %d, Reason: %s", url, status, reason)
+                raise client_exceptions.MicroserviceManagementClientError(status=status, reason=reason)
+        # Parsed for each caller, the responses of coalesced requests are not shared objects
+        return json.loads(res)
+
+    async def register_service(self, service_registration_payload):
+        response = await self._request('POST', '/fledge/service', json.dumps(service_registration_payload))
+        try:
+            response["id"]
+        except (KeyError, Exception) as ex:
+            _logger.exception(ex, "Could not register the microservice, From request {}".format(
+                json.dumps(service_registration_payload)))
+            raise
+        return response
+
+    async def unregister_service(self, microservice_id):
+        response = await self._request('DELETE', '/fledge/service/{}'.format(microservice_id))
+        try:
+            response["id"]
+        except (KeyError, Exception) as ex:
+            _logger.exception(ex, "Could not unregister the microservice having UUID {}".format(microservice_id))
+            raise
+        return response
+
+    async def register_interest(self, category, microservice_id):
+        payload = json.dumps({"category": category, "service": microservice_id}, sort_keys=True)
+        response = await self._request('POST', '/fledge/interest', payload)
+        try:
+            response["id"]
+        except (KeyError, Exception) as ex:
+            _logger.exception(ex, "Could not register interest, for request payload {}".format(payload))
+            raise
+        return response
+
+    async def unregister_interest(self, registered_interest_id):
+        response = await self._request('DELETE', '/fledge/interest/{}'.format(registered_interest_id))
+        try:
+            response["id"]
+        except (KeyError, Exception) as ex:
+            _logger.exception(ex, "Could not unregister interest for {}".format(registered_interest_id))
+            raise
+        return response
+
+    async def get_services(self, service_name=None, service_type=None):
+        url = '/fledge/service'
+        delimeter = '?'
+        if service_name:
+            url = '{}{}name={}'.format(url, delimeter, urllib.parse.quote(service_name))
+            delimeter = '&'
+        if service_type:
+            url = '{}{}type={}'.format(url, delimeter, service_type)
+        response = await self._request('GET', url)
+        try:
+            response["services"]
+        except (KeyError, Exception) as ex:
+            _logger.exception(ex, "Could not find the microservice for requested url {}".format(url))
+            raise
+        return response
+
+    async def get_configuration_category(self, category_name=None):
+        url = '/fledge/service/category'
+        if category_name:
+            url = "{}/{}".format(url, urllib.parse.quote(category_name))
+        return await self._request('GET', url)
+
+    async def get_configuration_item(self, category_name, config_item):
+        url = "/fledge/service/category/{}/{}".format(urllib.parse.quote(category_name),
+                                                      urllib.parse.quote(config_item))
+        return await self._request('GET', url)
+
+    async def create_configuration_category(self, category_data):
+        data = json.loads(category_data)
+        if 'keep_original_items' in data:
+            keep_original_item = 'true' if data['keep_original_items'] is True else 'false'
+            url = '/fledge/service/category?keep_original_items={}'.format(keep_original_item)
+            del data['keep_original_items']
+        else:
+            url = '/fledge/service/category'
+        return await self._request('POST', url, json.dumps(data))
+
+    async def create_child_category(self, parent, children):
+        url = '/fledge/service/category/{}/children'.format(urllib.parse.quote(parent))
+        return await self._request('POST', url, json.dumps({"children": children}))
+
+    async def update_configuration_item(self, category_name, config_item, category_data):
+        url = "/fledge/service/category/{}/{}".format(urllib.parse.quote(category_name),
+                                                      urllib.parse.quote(config_item))
+        return await self._request('PUT', url, category_data)
+
+    async def delete_configuration_item(self, category_name, config_item):
+        url = "/fledge/service/category/{}/{}/value".format(urllib.parse.quote(category_name),
+                                                            urllib.parse.quote(config_item))
+        return await self._request('DELETE', url)
+
+    async def ping_service(self):
+        return await self._request('GET', '/fledge/service/ping')
+
+    async def update_service_for_acl_change_security(self, acl, reason):
+        assert reason in ["attachACL", "detachACL", "reloadACL", "updateACL"]
+        payload = {
+            "reason": reason,
+            "argument": acl
+        }
+        return await self._request('PUT', '/fledge/security', json.dumps(payload))
+
+    async def get_asset_tracker_events(self):
+        return await self._request('GET', '/fledge/track')
+
+    async def create_asset_tracker_event(self, asset_event):
+        return await self._request('POST', '/fledge/track', json.dumps(asset_event))
+
+    async def get_alert_by_key(self, key):
+        return await self._request('GET', "/fledge/alert/{}".format(key), accepted=(404,))
+
+    async def add_alert(self, params):
+        return await self._request('POST', '/fledge/alert', json.dumps(params), accepted=(400,))
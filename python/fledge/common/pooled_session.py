@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+"""Keep-alive aiohttp session shared by the requests of a client
+
+An aiohttp session can only be used from the event loop it was created in. The session is therefore created on the
+first request and created again when it has been closed or when a request is made from another event loop.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+class PooledSession(object):
+    """Session of a client, with the number of its requests in flight
+
+    Attributes:
+        in_flight: number of requests holding the session, either using a connection or waiting for one
+    """
+
+    def __init__(self, factory):
+        """
+        Args:
+            factory: callable returning a new aiohttp.ClientSession, called from the event loop of the requests
+        """
+        self._factory = factory
+        self._session = None
+        self._loop = None
+        self.in_flight = 0
+
+    @property
+    def closed(self):
+        return self._session is None or self._session.closed
+
+    def get(self):
+        """Returns the session of the running event loop, creating it if needed"""
+        loop = asyncio.get_running_loop()
+        if self.closed or self._loop is not loop:
+            self._session = self._factory()
+            self._loop = loop
+        return self._session
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Yields the session for one request, counted in flight until the request is done"""
+        session = self.get()
+        self.in_flight += 1
+        try:
+            yield session
+        finally:
+            self.in_flight -= 1
+
+    async def close(self):
+        """Closes the session; a later request transparently opens a new one"""
+        session, self._session, self._loop = self._session, None, None
+        if session is not None and not session.closed:
+            await session.close()
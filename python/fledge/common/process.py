@@ -11,7 +11,8 @@ import argparse
 import time
 from fledge.common.storage_client.storage_client import StorageClientAsync, ReadingsStorageClientAsync
 from fledge.common import logger
-from fledge.common.microservice_management_client.microservice_management_client import MicroserviceManagementClient
+from fledge.common.microservice_management_client.microservice_management_client import \
+    MicroserviceManagementClient, AsyncMicroserviceManagementClient
 
 __author__ = "Ashwin Gopalakrishnan, Amarendra K Sinha"
 __copyright__ = "Copyright (c) 2017 OSIsoft, LLC"
@@ -56,6 +57,9 @@ class FledgeProcess(ABC):
     _core_microservice_management_client = None
     """ MicroserviceManagementClient instance """
 
+    _core_microservice_management_client_async = None
+    """ AsyncMicroserviceManagementClient instance, for the calls made from the event loop """
+
     _readings_storage_async = None
     """ fledge.common.storage_client.storage_client.ReadingsStorageClientAsync """
 
@@ -105,6 +109,8 @@ class FledgeProcess(ABC):
 
         self._core_microservice_management_client = MicroserviceManagementClient(self._core_management_host,
                                                                                  self._core_management_port)
+        self._core_microservice_management_client_async = AsyncMicroserviceManagementClient(
+            self._core_management_host, self._core_management_port)
 
         self._readings_storage_async = ReadingsStorageClientAsync(self._core_management_host,
                                                                   self._core_management_port)
@@ -115,6 +121,13 @@ class FledgeProcess(ABC):
     def run(self):
         pass
 
+    async def close(self):
+        """ Closes the sessions of the storage and core management clients, to be awaited when the process ends """
+        for client in (self._storage_async, self._readings_storage_async,
+                       self._core_microservice_management_client_async):
+            if client is not None:
+                await client.close()
+
     def get_services_from_core(self, name=None, _type=None):
         return self._core_microservice_management_client.get_services(name, _type)
 
@@ -4,7 +4,10 @@
 # See: http://fledge-iot.readthedocs.io/
 # FLEDGE_END
 
+import asyncio
+import datetime
 import json
+import time
 from fledge.common.logger import FLCoreLogger
 from fledge.common.storage_client.payload_builder import PayloadBuilder
 from fledge.common.storage_client.storage_client import StorageClientAsync
@@ -17,6 +20,37 @@ __version__ = "${VERSION}"
 
 _logger = FLCoreLogger().get_logger(__name__)
 
+_FLUSH_INTERVAL = 5
+""" Seconds between two writes of the accumulated statistics """
+
+_FLUSH_THRESHOLD = 1000
+""" Number of increments accumulated that causes a write before the interval has elapsed """
+
+ROLLUP_TABLE = "statistics_history_rollup"
+""" Table of the statistics history summed by buckets of time """
+
+ROLLUP_RESOLUTIONS = (60, 3600, 86400)
+""" Widths, in seconds, of the buckets of the statistics history rollups, finest first """
+
+
+def rollup_bucket(timestamp, resolution):
+    """ Start, in seconds since the epoch, of the rollup bucket of resolution seconds holding timestamp
+
+    The buckets follow the local time, as the statistics history timestamps do, a day bucket starts at the local
+    midnight. resolution must divide a day.
+    """
+    local = datetime.datetime.fromtimestamp(timestamp)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = (local - midnight).total_seconds()
+    start = midnight + datetime.timedelta(seconds=elapsed // resolution * resolution)
+    # The hour repeated when the clocks go back has a bucket of each occurrence
+    return int(start.replace(fold=local.fold).timestamp())
+
+
+def rollup_history_ts(bucket):
+    """ Statistics history timestamp of the start of a rollup bucket, in the local time """
+    return datetime.datetime.fromtimestamp(bucket).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
 
 async def create_statistics(storage=None):
     stat = Statistics(storage)
@@ -28,6 +62,10 @@ class Statistics(object):
     """ Statistics interface of the API to gather the available statistics counters,
         calculate the deltas from the previous run of the process and write the deltas
         to a statistics record.
+
+        The increments given to add are accumulated in memory, shared by all the users of the process, and
+        written to storage as a single bulk update by flush, which is called every flush interval, or sooner
+        once the flush threshold is reached, between start and stop.
     """
 
     _shared_state = {}
@@ -37,12 +75,26 @@ class Statistics(object):
     _registered_keys = None
     """ Set of keys already in the storage tables """
 
+    _pending = None
+    """ Increments of each key not yet written to storage """
+
+    _pending_count = 0
+    """ Number of increments accumulated since the last write """
+
+    _flush_task = None
+    _flush_due = None
+
+    flush_interval = _FLUSH_INTERVAL
+    flush_threshold = _FLUSH_THRESHOLD
+
     def __init__(self, storage=None):
         self.__dict__ = self._shared_state
         if self._storage is None:
             if not isinstance(storage, StorageClientAsync):
                 raise TypeError('Must be a valid Async Storage object')
             self._storage = storage
+        if self._pending is None:
+            self._pending = {}
 
     async def _init(self):
         if self._registered_keys is None:
@@ -60,6 +112,9 @@ class Statistics(object):
         if not isinstance(stat_list, dict):
             raise TypeError('stat_list must be a dict')
 
+        stat_list = {k: v for k, v in stat_list.items() if v != 0}
+        if not stat_list:
+            return
         try:
             payload = {"updates": []}
             for k, v in stat_list.items():
@@ -104,13 +159,24 @@ class Statistics(object):
     async def add_update(self, sensor_stat_dict):
         """UPDATE the value column of a statistics based on key, if key is not present, ADD the new key
 
+        The keys already registered are updated together by a single bulk update, the others one at a time so
+        that a key not in storage raises KeyError.
+
         Args:
             sensor_stat_dict: Dictionary containing the key value of Asset name and value increment
 
         Returns:
             None
         """
+        registered = self._registered_keys if self._registered_keys is not None else set()
+        known = {key: value for key, value in sensor_stat_dict.items() if key in registered}
+        if len(known) > 1:
+            await self.update_bulk(known)
+        else:
+            known = {}
         for key, value_increment in sensor_stat_dict.items():
+            if key in known:
+                continue
             # Try updating the statistics value for given key
             try:
                 payload = PayloadBuilder() \
@@ -138,7 +204,7 @@ class Statistics(object):
         try:
             payload = PayloadBuilder().INSERT(key=key, description=description, value=0, previous_value=0).payload()
             await self._storage.insert_into_tbl("statistics", payload)
-            self._registered_keys.append(key)
+            self._registered_keys.add(key)
         except Exception as ex:
             """ The error may be because the key has been created in another process, reload keys """
             await self._load_keys()
@@ -147,11 +213,91 @@ class Statistics(object):
                 raise
 
     async def _load_keys(self):
-        self._registered_keys = []
+        self._registered_keys = set()
         try:
             payload = PayloadBuilder().SELECT("key").payload()
             results = await self._storage.query_tbl_with_payload('statistics', payload)
             for row in results['rows']:
-                self._registered_keys.append(row['key'])
+                self._registered_keys.add(row['key'])
         except Exception as ex:
             _logger.exception(ex, 'Failed to retrieve statistics keys')
+
+    def add(self, key, value_increment):
+        """ Accumulates an increment of a registered statistics key, written to storage by the next flush
+
+        Args:
+            key: statistics key value (required)
+            value_increment: amount to increment the value by
+
+        Returns:
+            None
+        """
+        if not isinstance(key, str):
+            raise TypeError('key must be a string')
+
+        if not isinstance(value_increment, int):
+            raise ValueError('value must be an integer')
+
+        self._pending[key] = self._pending.get(key, 0) + value_increment
+        self._pending_count += 1
+        if self._pending_count >= self.flush_threshold and self._flush_due is not None:
+            self._flush_due.set()
+
+    async def flush(self):
+        """ Writes the accumulated increments by a single bulk update
+
+        The increments are kept for the next flush if the update fails.
+        """
+        if not self._pending:
+            return
+        pending = self._pending
+        self._pending = {}
+        self._pending_count = 0
+        try:
+            await self.update_bulk(pending)
+        except BaseException:
+            for key, value in pending.items():
+                self._pending[key] = self._pending.get(key, 0) + value
+            raise
+
+    def start(self, interval=None, threshold=None):
+        """ Starts flushing the accumulated increments every interval seconds, or once threshold increments
+        have been accumulated
+
+        Args:
+            interval: seconds between two flushes, flush_interval if None
+            threshold: number of increments that causes an early flush, flush_threshold if None
+        """
+        if interval is not None:
+            self.flush_interval = interval
+        if threshold is not None:
+            self.flush_threshold = threshold
+        if self._flush_task is None:
+            self._flush_due = asyncio.Event()
+            self._flush_task = asyncio.ensure_future(self._flush_periodically())
+
+    async def stop(self):
+        """ Stops the periodic flush and writes what has been accumulated """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+            self._flush_due = None
+        await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            started = time.time()
+            try:
+                await asyncio.wait_for(self._flush_due.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_due.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # Already logged by update_bulk, the increments are written by the next flush
+                await asyncio.sleep(max(0.0, self.flush_interval - (time.time() - started)))
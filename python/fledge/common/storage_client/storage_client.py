@@ -17,14 +17,30 @@ import http.client
 import json
 import time
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
 
 from fledge.common import logger
+from fledge.common.pooled_session import PooledSession
 from fledge.common.service_record import ServiceRecord
 from fledge.common.storage_client.exceptions import *
 from fledge.common.storage_client.utils import Utils
 
 _LOGGER = logger.setup(__name__)
 
+DEFAULT_POOL_SIZE = 10
+""" Maximum number of simultaneous connections a client keeps open to the storage service """
+
+DEFAULT_POOL_IDLE_TIMEOUT = 30.0
+""" Seconds an idle keep-alive connection is kept in the pool before it is closed """
+
+
+def _encode(payload, error_message):
+    """ Serialize a request payload once, python objects and bytes skip the JSON re-parse of str payloads """
+    try:
+        return Utils.encode_payload(payload)
+    except TypeError:
+        raise TypeError(error_message)
+
 
 class AbstractStorage(ABC):
     """ abstract class for storage client """
@@ -49,7 +65,13 @@ class AbstractStorage(ABC):
 
 
 class StorageClientAsync(AbstractStorage):
-    def __init__(self, core_management_host, core_management_port, svc=None):
+    def __init__(self, core_management_host, core_management_port, svc=None, pool_size=DEFAULT_POOL_SIZE,
+                 pool_idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT):
+        self._pool_size = int(pool_size)
+        self._pool_idle_timeout = float(pool_idle_timeout)
+        self._pool = PooledSession(self._new_session)
+        self._pool_counters = {"requests": 0, "created": 0, "reused": 0, "waits": 0, "wait_time": 0.0,
+                               "max_wait_time": 0.0}
         try:
             if svc:
                 self.service = svc
@@ -120,13 +142,64 @@ class StorageClientAsync(AbstractStorage):
     def disconnect(self):
         pass
 
+    def _new_session(self):
+        """ Create the keep-alive session backing the connection pool of this client """
+
+        async def on_create(session, ctx, params):
+            self._pool_counters["created"] += 1
+
+        async def on_reuse(session, ctx, params):
+            self._pool_counters["reused"] += 1
+
+        async def on_queued_start(session, ctx, params):
+            ctx.queued_at = time.monotonic()
+
+        async def on_queued_end(session, ctx, params):
+            waited = time.monotonic() - ctx.queued_at
+            self._pool_counters["waits"] += 1
+            self._pool_counters["wait_time"] += waited
+            if waited > self._pool_counters["max_wait_time"]:
+                self._pool_counters["max_wait_time"] = waited
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_create)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        trace_config.on_connection_queued_start.append(on_queued_start)
+        trace_config.on_connection_queued_end.append(on_queued_end)
+        connector = aiohttp.TCPConnector(limit=self._pool_size, keepalive_timeout=self._pool_idle_timeout)
+        return aiohttp.ClientSession(connector=connector, trace_configs=[trace_config])
+
+    @asynccontextmanager
+    async def _pooled_session(self):
+        """ Yield the pooled session, (re)creating it if it is closed or bound to another event loop """
+        self._pool_counters["requests"] += 1
+        async with self._pool.acquire() as session:
+            yield session
+
+    async def close(self):
+        """ Close the connection pool; a later request transparently opens a new one """
+        await self._pool.close()
+
+    def pool_stats(self):
+        """ Connection pool statistics of this client
+
+        :return: dict with the configured size and idle timeout, the requests in flight and the connections they
+            use, the number of requests, connections created and reused, and the time spent waiting for a free
+            connection
+        """
+        in_flight = self._pool.in_flight
+        stats = dict(self._pool_counters)
+        stats.update({"size": self._pool_size, "idle_timeout": self._pool_idle_timeout,
+                      "in_flight": in_flight, "in_use": min(in_flight, self._pool_size)})
+        return stats
+
     # FIXME: As per JIRA-615 strict=false at python side (interim solution)
     # fix is required at storage layer (error message with escape sequence using a single quote)
     async def insert_into_tbl(self, tbl_name, data):
         """ insert json payload into given table
 
         :param tbl_name:
-        :param data: JSON payload
+        :param data: JSON payload, as a python dict/list, pre-encoded JSON bytes or a JSON str
         :return:
 
         :Example:
@@ -145,13 +218,12 @@ class StorageClientAsync(AbstractStorage):
         if not data:
             raise ValueError("Data to insert is missing")
 
-        if not Utils.is_json(data):
-            raise TypeError("Provided data to insert must be a valid JSON")
+        body = _encode(data, "Provided data to insert must be a valid JSON")
 
         post_url = '/storage/table/{tbl_name}'.format(tbl_name=tbl_name)
         url = 'http://' + self.base_url + post_url
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, data=data) as resp:
+        async with self._pooled_session() as session:
+            async with session.post(url, data=body) as resp:
                 status_code = resp.status
                 jdoc = await resp.json()
                 if status_code not in range(200, 209):
@@ -165,7 +237,7 @@ class StorageClientAsync(AbstractStorage):
         """ update json payload for specified condition into given table
 
         :param tbl_name:
-        :param data: JSON payload
+        :param data: JSON payload, as a python dict/list, pre-encoded JSON bytes or a JSON str
         :return:
 
         :Example:
@@ -188,14 +260,13 @@ class StorageClientAsync(AbstractStorage):
         if not data:
             raise ValueError("Data to update is missing")
 
-        if not Utils.is_json(data):
-            raise TypeError("Provided data to update must be a valid JSON")
+        body = _encode(data, "Provided data to update must be a valid JSON")
 
         put_url = '/storage/table/{tbl_name}'.format(tbl_name=tbl_name)
 
         url = 'http://' + self.base_url + put_url
-        async with aiohttp.ClientSession() as session:
-            async with session.put(url, data=data) as resp:
+        async with self._pooled_session() as session:
+            async with session.put(url, data=body) as resp:
                 status_code = resp.status
                 jdoc = await resp.json()
                 if status_code not in range(200, 209):
@@ -209,7 +280,7 @@ class StorageClientAsync(AbstractStorage):
         """ Delete for specified condition from given table
 
         :param tbl_name:
-        :param condition: JSON payload
+        :param condition: JSON payload, as a python dict/list, pre-encoded JSON bytes or a JSON str
         :return:
 
         :Example:
@@ -227,12 +298,11 @@ class StorageClientAsync(AbstractStorage):
 
         del_url = '/storage/table/{tbl_name}'.format(tbl_name=tbl_name)
 
-        if condition and (not Utils.is_json(condition)):
-            raise TypeError("condition payload must be a valid JSON")
+        body = _encode(condition, "condition payload must be a valid JSON") if condition else condition
 
         url = 'http://' + self.base_url + del_url
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(url, data=condition) as resp:
+        async with self._pooled_session() as session:
+            async with session.delete(url, data=body) as resp:
                 status_code = resp.status
                 jdoc = await resp.json()
                 if status_code not in range(200, 209):
@@ -262,7 +332,7 @@ class StorageClientAsync(AbstractStorage):
             get_url += '?{}'.format(query)
 
         url = 'http://' + self.base_url + get_url
-        async with aiohttp.ClientSession() as session:
+        async with self._pooled_session() as session:
             async with session.get(url) as resp:
                 status_code = resp.status
                 jdoc = await resp.json()
@@ -277,7 +347,7 @@ class StorageClientAsync(AbstractStorage):
         """ Complex SELECT query for the specified table with a payload
 
         :param tbl_name:
-        :param query_payload: payload in valid JSON format
+        :param query_payload: payload as a python dict/list, pre-encoded JSON bytes or a JSON str
         :return:
 
         :Example:
@@ -295,15 +365,14 @@ class StorageClientAsync(AbstractStorage):
         if not query_payload:
             raise ValueError("Query payload is missing")
 
-        if not Utils.is_json(query_payload):
-            raise TypeError("Query payload must be a valid JSON")
+        body = _encode(query_payload, "Query payload must be a valid JSON")
 
         put_url = '/storage/table/{tbl_name}/query'.format(tbl_name=tbl_name)
 
         url = 'http://' + self.base_url + put_url
 
-        async with aiohttp.ClientSession() as session:
-            async with session.put(url, data=query_payload) as resp:
+        async with self._pooled_session() as session:
+            async with session.put(url, data=body) as resp:
                 status_code = resp.status
                 jdoc = await resp.json()
                 if status_code not in range(200, 209):
@@ -326,7 +395,7 @@ class StorageClientAsync(AbstractStorage):
         data = {"id": str(int(time.time()))}
 
         url = 'http://' + self.base_url + post_url
-        async with aiohttp.ClientSession() as session:
+        async with self._pooled_session() as session:
             async with session.post(url, data=json.dumps(data)) as resp:
                 status_code = resp.status
                 jdoc = await resp.text()
@@ -349,7 +418,7 @@ class StorageClientAsync(AbstractStorage):
         put_url = '/storage/table/{tbl_name}/snapshot/{id}'.format(tbl_name=tbl_name, id=snapshot_id)
 
         url = 'http://' + self.base_url + put_url
-        async with aiohttp.ClientSession() as session:
+        async with self._pooled_session() as session:
             async with session.put(url) as resp:
                 status_code = resp.status
                 jdoc = await resp.text()
@@ -372,7 +441,7 @@ class StorageClientAsync(AbstractStorage):
         delete_url = '/storage/table/{tbl_name}/snapshot/{id}'.format(tbl_name=tbl_name, id=snapshot_id)
 
         url = 'http://' + self.base_url + delete_url
-        async with aiohttp.ClientSession() as session:
+        async with self._pooled_session() as session:
             async with session.delete(url) as resp:
                 status_code = resp.status
                 jdoc = await resp.text()
@@ -394,7 +463,7 @@ class StorageClientAsync(AbstractStorage):
         get_url = '/storage/table/{tbl_name}/snapshot'.format(tbl_name=tbl_name)
 
         url = 'http://' + self.base_url + get_url
-        async with aiohttp.ClientSession() as session:
+        async with self._pooled_session() as session:
             async with session.get(url) as resp:
                 status_code = resp.status
                 jdoc = await resp.text()
@@ -409,13 +478,15 @@ class ReadingsStorageClientAsync(StorageClientAsync):
     """ Readings table operations """
     _base_url = ""
 
-    def __init__(self, core_mgt_host, core_mgt_port, svc=None):
-        super().__init__(core_management_host=core_mgt_host, core_management_port=core_mgt_port, svc=svc)
+    def __init__(self, core_mgt_host, core_mgt_port, svc=None, pool_size=DEFAULT_POOL_SIZE,
+                 pool_idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT):
+        super().__init__(core_management_host=core_mgt_host, core_management_port=core_mgt_port, svc=svc,
+                         pool_size=pool_size, pool_idle_timeout=pool_idle_timeout)
         self.__class__._base_url = self.base_url
 
     async def append(self, readings):
         """
-        :param readings:
+        :param readings: readings payload, as a python dict, pre-encoded JSON bytes or a JSON str
         :return:
 
         :Example:
@@ -441,12 +512,11 @@ class ReadingsStorageClientAsync(StorageClientAsync):
         if not readings:
             raise ValueError("Readings payload is missing")
 
-        if not Utils.is_json(readings):
-            raise TypeError("Readings payload must be a valid JSON")
+        body = _encode(readings, "Readings payload must be a valid JSON")
 
         url = 'http://' + self._base_url + '/storage/reading'
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, data=readings) as resp:
+        async with self._pooled_session() as session:
+            async with session.post(url, data=body) as resp:
                 status_code = resp.status
                 jdoc = await resp.json()
                 if status_code not in range(200, 209):
@@ -480,7 +550,7 @@ class ReadingsStorageClientAsync(StorageClientAsync):
 
         get_url = '/storage/reading?id={}&count={}'.format(reading_id, count)
         url = 'http://' + self._base_url + get_url
-        async with aiohttp.ClientSession() as session:
+        async with self._pooled_session() as session:
             async with session.get(url) as resp:
                 status_code = resp.status
                 jdoc = await resp.json()
@@ -494,7 +564,7 @@ class ReadingsStorageClientAsync(StorageClientAsync):
     async def query(self, query_payload):
         """
 
-        :param query_payload:
+        :param query_payload: payload as a python dict/list, pre-encoded JSON bytes or a JSON str
         :return:
         :Example:
             curl -X PUT http://0.0.0.0:8080/storage/reading/query -d @payload.json
@@ -512,12 +582,11 @@ class ReadingsStorageClientAsync(StorageClientAsync):
         if not query_payload:
             raise ValueError("Query payload is missing")
 
-        if not Utils.is_json(query_payload):
-            raise TypeError("Query payload must be a valid JSON")
+        body = _encode(query_payload, "Query payload must be a valid JSON")
 
         url = 'http://' + self._base_url + '/storage/reading/query'
-        async with aiohttp.ClientSession() as session:
-            async with session.put(url, data=query_payload) as resp:
+        async with self._pooled_session() as session:
+            async with session.put(url, data=body) as resp:
                 status_code = resp.status
                 jdoc = await resp.json()
                 if status_code not in range(200, 209):
@@ -585,7 +654,7 @@ class ReadingsStorageClientAsync(StorageClientAsync):
             put_url = '/storage/reading/purge?asset={}'.format(urllib.parse.quote(asset))
 
         url = 'http://' + self._base_url + put_url
-        async with aiohttp.ClientSession() as session:
+        async with self._pooled_session() as session:
             async with session.put(url, data=None) as resp:
                 status_code = resp.status
                 try:
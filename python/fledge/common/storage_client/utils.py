@@ -17,9 +17,25 @@ __version__ = "${VERSION}"
 
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_dumps(obj):
+    return json.dumps(obj).encode()
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
 
 class Utils(object):
 
+    # Encoder used to serialize python payloads, returns bytes; orjson is preferred when it is installed
+    json_encoder = staticmethod(_orjson_dumps if orjson is not None else _json_dumps)
+
     @staticmethod
     def is_json(payload):
         try:
@@ -27,3 +43,34 @@ class Utils(object):
         except (TypeError, ValueError):  # JSONDecodeError is a subclass of ValueError
             return False
         return True
+
+    @classmethod
+    def set_json_encoder(cls, encoder):
+        """ Plug a different encoder for python payloads; it must accept a python object and return bytes or str.
+        None restores the default one """
+        if encoder is None:
+            encoder = _orjson_dumps if orjson is not None else _json_dumps
+        cls.json_encoder = staticmethod(encoder)
+
+    @classmethod
+    def encode_payload(cls, payload):
+        """ Get the request body for a storage payload, serializing it at most once
+
+        :param payload: a python dict or list, encoded exactly once with the configured encoder;
+                        bytes, trusted to be pre-encoded JSON and sent as is;
+                        or a JSON str, which is validated first as it may come from outside
+        :return: the encoded payload
+        :raises TypeError: if the payload is neither valid JSON nor serializable
+        """
+        if isinstance(payload, (bytes, bytearray)):
+            return payload
+        if isinstance(payload, str):
+            if not cls.is_json(payload):
+                raise TypeError("payload is not a valid JSON")
+            return payload
+        if isinstance(payload, (dict, list)):
+            try:
+                return cls.json_encoder(payload)
+            except (TypeError, ValueError) as ex:
+                raise TypeError("payload is not JSON serializable: {}".format(ex))
+        raise TypeError("payload must be a dict, list, JSON str or bytes")
@@ -512,6 +512,8 @@ class BackupProcess(FledgeProcess):
             raise exceptions.RestoreFailed(_message)
         else:
             self.shutdown()
+        finally:
+            asyncio.get_event_loop().run_until_complete(self.close())
 
 
 if __name__ == "__main__":
@@ -44,6 +44,7 @@ Exit code :
 
 """
 
+import asyncio
 import time
 import sys
 import os
@@ -933,6 +934,8 @@ class RestoreProcess(FledgeProcess):
             raise exceptions.RestoreFailed(_message)
         else:
             self.shutdown()
+        finally:
+            asyncio.get_event_loop().run_until_complete(self.close())
 
 
 if __name__ == "__main__":
@@ -479,6 +479,7 @@ async def update_me(request):
                 payload = PayloadBuilder().SET(real_name=real_name.strip()).WHERE(['id', '=', user_id]).payload()
                 message = "Something went wrong."
                 result = await storage_client.update_tbl("users", payload)
+                User.Objects.invalidate_user(user_id)
                 if result['response'] == 'updated':
                     # TODO: FOGL-1226 At the moment only real name can update
                     message = "Real name has been updated successfully!"
@@ -668,6 +669,7 @@ async def enable_user(request):
                     raise User.DoesNotExist
                 payload = PayloadBuilder().SET(enabled=user_data['enabled']).WHERE(['id', '=', user_id]).payload()
                 result = await storage_client.update_tbl("users", payload)
+                User.Objects.invalidate_user(user_id)
                 # Remove ott token for this enabled/disabled user.
                 __remove_ott_for_user(user_id)
                 if result['response'] == 'updated':
@@ -753,6 +755,7 @@ async def _unblock_user(user_id, storage_client):
     # Clear the failed_attempts so that maximum allowed attempts can be used correctly
     payload = PayloadBuilder().SET(block_until=None, failed_attempts=0).WHERE(['id', '=', user_id]).payload()
     result = await storage_client.update_tbl("users", payload)
+    User.Objects.invalidate_user(user_id)
     return result
 
 @has_permission("admin")
@@ -25,6 +25,9 @@ Supports a number of REST API:
     - Return a time series (min, max and average) for the specified asset and
       sensor averages over seconds, minutes or hours. The selection of seconds, minutes
       or hours is done via the group query parameter
+  http://<address>/fledge/asset/{asset_code}/{reading}/downsample
+    - Return at most a given number of sensor readings for the specified asset and sensor, chosen to keep
+      the shape of the series over a time range of any length
 
   All but the /fledge/asset API call take a set of optional query parameters
     limit=x     Return the first x rows only
@@ -35,17 +38,27 @@ Supports a number of REST API:
 
   Note: seconds, minutes and hours can not be combined in a URL. If they are then only seconds
   will have an effect.
+  Note: /fledge/asset/{asset_code}, /fledge/asset/{asset_code}/{reading} and /fledge/asset/{asset_code}/bucket/{size}
+  stream their JSON array with chunked transfer encoding, reading the rows from storage a page at a time, if
+  stream=true is given or if more rows than a page may be returned
   Note: if datetime units are supplied then limit will not respect i.e mutually exclusive
 """
+import asyncio
+import copy
+import math
 import time
 import datetime
 import json
+from collections import OrderedDict
 
 from aiohttp import web
 
 from fledge.common.logger import FLCoreLogger
 from fledge.common.storage_client.payload_builder import PayloadBuilder
 from fledge.services.core import connect
+from fledge.services.core.asset_counts import AssetReadingCounts
+from fledge.services.core.asset_structure import AssetStructureCatalog
+from fledge.services.core.downsample import DOWNSAMPLERS
 
 _logger = FLCoreLogger().get_logger(__name__)
 
@@ -61,6 +74,20 @@ __DEFAULT_OFFSET = 0
 DATAPOINT_TYPES = ['__DPIMAGE', '__DATABUFFER']
 IMAGE_PLACEHOLDER = "Data removed for brevity"
 
+# Storage aggregate operation and alias of the datapoint summaries
+_SUMMARY_AGGREGATES = (("min", "min"), ("max", "max"), ("avg", "average"))
+# Maximum number of datapoints summarised by a single storage query
+_MAX_SUMMARY_DATAPOINTS = 50
+
+# Number of rows read from storage at a time by the streamed responses
+_STREAM_PAGE_SIZE = 10000
+# Number of points returned by the downsample endpoint by default and at most
+_DEFAULT_DOWNSAMPLE_POINTS = 500
+_MAX_DOWNSAMPLE_POINTS = 10000
+
+_asset_structure_catalog = None
+_asset_reading_counts = None
+
 
 def setup(app):
     """ Add the routes for the API endpoints supported by the data browser """
@@ -76,6 +103,7 @@ def setup(app):
     app.router.add_route('GET', '/fledge/asset/{asset_code}/bucket/{bucket_size}', asset_datapoints_with_bucket_size)
     app.router.add_route('GET', '/fledge/asset/{asset_code}/{reading}/bucket/{bucket_size}',
                          asset_readings_with_bucket_size)
+    app.router.add_route('GET', '/fledge/asset/{asset_code}/{reading}/downsample', asset_reading_downsample)
     app.router.add_route('GET', '/fledge/structure/asset', asset_structure)
     # The developer Purge by Asset name API entry points
     app.router.add_route('DELETE', '/fledge/asset', asset_purge_all)
@@ -132,25 +160,162 @@ def is_image_excluded(request: web.Request) -> bool:
     return True
 
 
+def _replace_images(row, request):
+    """ Replaces the image type datapoint values of a row, as asked by the images request query param """
+    for item_name, item_val in row.items():
+        if isinstance(item_val, dict):
+            for item_name2, item_val2 in item_val.items():
+                if isinstance(item_val2, str) and item_val2.startswith(tuple(DATAPOINT_TYPES)):
+                    item_val[item_name2] = IMAGE_PLACEHOLDER if is_image_excluded(request) else item_val2
+        elif item_name != 'timestamp':
+            if isinstance(item_val, str) and item_val.startswith(tuple(DATAPOINT_TYPES)):
+                row[item_name] = IMAGE_PLACEHOLDER if is_image_excluded(request) else item_val
+    return row
+
+
+def is_stream_requested(request: web.Request, rows=None) -> bool:
+    """ streamed response
+    Args:
+        request: stream request query param
+        rows: maximum number of rows of the response, None if not bounded
+    Returns:
+        True for stream=true or if more than a page of rows may be returned
+    """
+    if str(request.query.get('stream', '')).lower() == 'true':
+        return True
+    return rows is not None and rows > _STREAM_PAGE_SIZE
+
+
+async def _stream_json_array(request: web.Request, pages) -> web.StreamResponse:
+    """ Writes the rows of the pages as a JSON array, with chunked transfer encoding, so that only a page of
+    rows is held at a time
+
+    The first page is read before the response is started so that an error still gives an error response.
+    A later error ends the response with an incomplete JSON array.
+
+    Args:
+        request: the request
+        pages: async iterator of lists of rows
+    Returns:
+        the response, already written
+    """
+    try:
+        rows = await pages.__anext__()
+    except StopAsyncIteration:
+        rows = []
+    response = web.StreamResponse()
+    response.content_type = 'application/json'
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+    await response.write(b'[')
+    separator = b''
+    try:
+        while True:
+            if rows:
+                await response.write(separator + ', '.join([json.dumps(row) for row in rows]).encode())
+                separator = b', '
+            try:
+                rows = await pages.__anext__()
+            except StopAsyncIteration:
+                break
+    except Exception as ex:
+        _logger.error(ex, "Failed to stream the response of {}.".format(request.path))
+        return response
+    await response.write(b']')
+    await response.write_eof()
+    return response
+
+
+async def _stream_readings(request: web.Request, payload, error_message) -> web.StreamResponse:
+    """ Streams the rows of a readings query, see _readings_pages
+
+    Args:
+        request: the request
+        payload: chain payload dict with the sort on user_ts and optional limit and skip
+        error_message: logged on error
+    """
+    # Bad images request query param, before anything is sent
+    is_image_excluded(request)
+    try:
+        _readings = connect.get_readings_async()
+        return await _stream_json_array(request, _readings_pages(_readings, payload, request))
+    except KeyError as err:
+        # Storage error message
+        msg = err.args[0]
+        raise web.HTTPBadRequest(reason=msg, body=json.dumps({"message": msg}))
+    except Exception as exc:
+        msg = str(exc)
+        _logger.error(exc, error_message)
+        raise web.HTTPInternalServerError(reason=msg, body=json.dumps({"message": msg}))
+
+
+async def _readings_pages(readings, payload, request):
+    """ Pages of the rows of a readings query sorted on user_ts, aliased timestamp
+
+    The next page starts at the timestamp of the last row of the previous one, skipping the rows with that timestamp
+    already read, so that the storage does not skip over all the rows already read.
+
+    Args:
+        readings: readings storage client
+        payload: chain payload dict with the sort on user_ts and optional limit and skip
+        request: the request, for the images request query param
+    """
+    base = copy.deepcopy(payload)
+    limit = base.pop('limit', None)
+    skip = base.pop('skip', 0)
+    condition = '<=' if base['sort']['direction'] == 'desc' else '>='
+    last_ts = None
+    sent = 0
+    while limit is None or sent < limit:
+        page = copy.deepcopy(base)
+        if last_ts is not None:
+            page = PayloadBuilder(page).AND_WHERE(['user_ts', condition, last_ts]).chain_payload()
+        count = _STREAM_PAGE_SIZE if limit is None else min(_STREAM_PAGE_SIZE, limit - sent)
+        page = PayloadBuilder(page).LIMIT(count).chain_payload()
+        if skip:
+            page = PayloadBuilder(page).SKIP(skip).chain_payload()
+        results = await readings.query(PayloadBuilder(page).payload())
+        if 'rows' not in results:
+            raise KeyError(results.get('message', 'rows'))
+        rows = results['rows']
+        if not rows:
+            return
+        yield [_replace_images(row, request) for row in rows]
+        sent += len(rows)
+        if len(rows) < count:
+            return
+        timestamp = rows[-1]['timestamp']
+        same_timestamp = 0
+        for row in reversed(rows):
+            if row['timestamp'] != timestamp:
+                break
+            same_timestamp += 1
+        skip = skip + same_timestamp if timestamp == last_ts else same_timestamp
+        last_ts = timestamp
+
+
 async def asset_counts(request):
     """ Browse all the assets for which we have recorded readings and
     return a readings count.
 
+    The counts are maintained incrementally by AssetReadingCounts, only the readings appended or purged since
+    the last request are counted.
+
     Returns:
            json result on basis of SELECT asset_code, count(*) FROM readings GROUP BY asset_code;
 
     :Example:
             curl -sX GET http://localhost:8081/fledge/asset
     """
-    payload = PayloadBuilder().AGGREGATE(["count", "*"]).ALIAS("aggregate", ("*", "count", "count")) \
-        .GROUP_BY("asset_code").payload()
-    _readings = connect.get_readings_async()
-    results = await _readings.query(payload)
     try:
-        response = results['rows']
-        asset_json = [{"count": r['count'], "assetCode": r['asset_code']} for r in response]
-    except KeyError:
-        msg = results['message']
+        _readings = connect.get_readings_async()
+        reading_counts = _get_asset_reading_counts()
+        await reading_counts.refresh(_readings)
+        assets = reading_counts.assets()
+        asset_json = [{"count": assets[code][0], "assetCode": code} for code in sorted(assets)]
+    except KeyError as err:
+        # Storage error message
+        msg = err.args[0]
         raise web.HTTPBadRequest(reason=msg, body=json.dumps({"message": msg}))
     except Exception as exc:
         msg = str(exc)
@@ -245,17 +410,17 @@ async def asset(request):
         if _order not in ('asc', 'desc'):
             msg = "order must be asc or desc"
             raise web.HTTPBadRequest(reason=msg, body=json.dumps({"message": msg}))
-    payload = PayloadBuilder(_and_where).ORDER_BY(["user_ts", _order]).payload()
+    _sorted = PayloadBuilder(_and_where).ORDER_BY(["user_ts", _order]).chain_payload()
+    payload = PayloadBuilder(_sorted).payload()
+    # Readings of additional assets are grouped by asset code, they can not be streamed
+    if 'additional' not in request.query and is_stream_requested(request, _sorted.get('limit')):
+        return await _stream_readings(request, _sorted, "Failed to get {} asset.".format(asset_code))
     try:
         _readings = connect.get_readings_async()
         results = await _readings.query(payload)
         rows = results['rows']
-        for index, data in enumerate(rows):
-            for item_name, item_val in data.items():
-                if isinstance(item_val, dict):
-                    for item_name2, item_val2 in item_val.items():
-                        if isinstance(item_val2, str) and item_val2.startswith(tuple(DATAPOINT_TYPES)):
-                            data[item_name][item_name2] = IMAGE_PLACEHOLDER if is_image_excluded(request) else item_val2
+        for data in rows:
+            _replace_images(data, request)
         # Group the readings value by asset_code in case of additional multiple assets
         if 'additional' in request.query:
             response_by_asset_code = {}
@@ -353,16 +518,17 @@ async def asset_reading(request):
     else:
         # Add the order by and limit, offset clause
         _and_where = prepare_limit_skip_payload(request, _where)
-    payload = PayloadBuilder(_and_where).ORDER_BY(["user_ts", "desc"]).payload()
+    _sorted = PayloadBuilder(_and_where).ORDER_BY(["user_ts", "desc"]).chain_payload()
+    payload = PayloadBuilder(_sorted).payload()
+    if is_stream_requested(request, _sorted.get('limit')):
+        return await _stream_readings(request, _sorted, "Failed to get {} asset for {} reading.".format(
+            asset_code, reading))
     try:
         _readings = connect.get_readings_async()
         results = await _readings.query(payload)
         rows = results['rows']
-        for index, data in enumerate(rows):
-            for item_name, item_val in data.items():
-                if item_name != 'timestamp':
-                    if isinstance(item_val, str) and item_val.startswith(tuple(DATAPOINT_TYPES)):
-                        data[item_name] = IMAGE_PLACEHOLDER if is_image_excluded(request) else item_val
+        for data in rows:
+            _replace_images(data, request)
         response = rows
     except KeyError:
         msg = results['message']
@@ -403,10 +569,8 @@ async def asset_all_readings_summary(request):
         if not results['rows']:
             raise KeyError("{} asset_code not found".format(asset_code))
 
-        # TODO: FOGL-1768 when support available from storage layer then avoid multiple calls
         # Find keys in readings
         reading_keys = list(results['rows'][-1]['reading'].keys())
-        rows = []
         _where = PayloadBuilder().WHERE(["asset_code", "=", asset_code]).chain_payload()
         if 'previous' in request.query and (
                 'seconds' in request.query or 'minutes' in request.query or 'hours' in request.query):
@@ -420,16 +584,8 @@ async def asset_all_readings_summary(request):
             # Add limit, offset clause
             _and_where = prepare_limit_skip_payload(request, _where)
 
-        for reading in reading_keys:
-            _aggregate = PayloadBuilder(_and_where).AGGREGATE(["min", ["reading", reading]],
-                                                              ["max", ["reading", reading]],
-                                                              ["avg", ["reading", reading]]) \
-                .ALIAS('aggregate', ('reading', 'min', 'min'),
-                       ('reading', 'max', 'max'),
-                       ('reading', 'avg', 'average')).chain_payload()
-            payload = PayloadBuilder(_aggregate).payload()
-            results = await _readings.query(payload)
-            rows.append({reading: results['rows'][0]})
+        summary = await _datapoints_summary(_readings, reading_keys, _and_where)
+        rows = [{reading: summary[reading]} for reading in reading_keys]
         for index, data in enumerate(rows):
             for item_name, item_val in data.items():
                 if isinstance(item_val, dict):
@@ -486,25 +642,17 @@ async def asset_summary(request):
         if not results['rows']:
             raise ValueError('{} asset code not found'.format(asset_code))
 
-        # TODO: FOGL-1768 when support available from storage layer then avoid multiple calls
         reading_keys = list(results['rows'][-1]['reading'].keys())
         if reading not in reading_keys:
             raise ValueError('{} reading key is not found'.format(reading))
-        _aggregate = PayloadBuilder().AGGREGATE(["min", ["reading", reading]], ["max", ["reading", reading]],
-                                                ["avg", ["reading", reading]]) \
-            .ALIAS('aggregate', ('reading', 'min', 'min'), ('reading', 'max', 'max'),
-                   ('reading', 'avg', 'average')).chain_payload()
-        _where = PayloadBuilder(_aggregate).WHERE(["asset_code", "=", asset_code]).chain_payload()
+        _where = PayloadBuilder().WHERE(["asset_code", "=", asset_code]).chain_payload()
         _and_where = where_clause(request, _where)
-        payload = PayloadBuilder(_and_where).payload()
-        results = await _readings.query(payload)
-        # for aggregates, so there can only ever be one row
-        response = results['rows'][0]
+        response = (await _datapoints_summary(_readings, [reading], _and_where))[reading]
         for item_name, item_val in response.items():
             if isinstance(item_val, str) and item_val.startswith(tuple(DATAPOINT_TYPES)):
                 response[item_name] = IMAGE_PLACEHOLDER if is_image_excluded(request) else item_val
-    except KeyError:
-        msg = results['message']
+    except KeyError as err:
+        msg = results['message'] if 'message' in results else err.args[0]
         raise web.HTTPBadRequest(reason=msg, body=json.dumps({"message": msg}))
     except ValueError as err:
         msg = str(err)
@@ -576,10 +724,7 @@ async def asset_averages(request):
         else:
             raise web.HTTPBadRequest(reason="{} is not a valid group".format(_group))
 
-    _aggregate = PayloadBuilder().AGGREGATE(["min", ["reading", reading]], ["max", ["reading", reading]],
-                                            ["avg", ["reading", reading]]) \
-        .ALIAS('aggregate', ('reading', 'min', 'min'), ('reading', 'max', 'max'),
-               ('reading', 'avg', 'average')).chain_payload()
+    _aggregate = _datapoints_aggregate([reading])
     _where = PayloadBuilder(_aggregate).WHERE(["asset_code", "=", asset_code]).chain_payload()
 
     if 'previous' in request.query and (
@@ -619,6 +764,58 @@ async def asset_averages(request):
         return web.json_response(response)
 
 
+def _datapoints_aggregate(datapoints):
+    """ Aggregate clause for the min, max and average of the given datapoints
+
+    Args:
+        datapoints: list of datapoint names
+    Returns:
+        chain payload dict, the results are aliased min, max and average for a single datapoint,
+        else min_<index>, max_<index> and average_<index> with the index of the datapoint in the list
+    """
+    aggregate = []
+    for index, datapoint in enumerate(datapoints):
+        for operation, alias in _SUMMARY_AGGREGATES:
+            aggregate.append(OrderedDict([("operation", operation),
+                                          ("json", {"column": "reading", "properties": datapoint}),
+                                          ("alias", alias if len(datapoints) == 1 else "{}_{}".format(alias, index))]))
+    return OrderedDict([("aggregate", aggregate)])
+
+
+async def _datapoints_summary(readings, datapoints, where):
+    """ min, max and average of each of the datapoints over the readings selected by the where clause
+
+    The datapoints are summarised together, by one storage query per _MAX_SUMMARY_DATAPOINTS datapoints, with
+    the queries running concurrently.
+
+    Args:
+        readings: readings storage client
+        datapoints: list of datapoint names
+        where: chain payload dict with the where, limit and skip clauses
+    Returns:
+        dict of {datapoint: {"min": .., "max": .., "average": ..}}
+    """
+    chunks = [datapoints[i:i + _MAX_SUMMARY_DATAPOINTS] for i in range(0, len(datapoints), _MAX_SUMMARY_DATAPOINTS)]
+    payloads = []
+    for chunk in chunks:
+        _payload = _datapoints_aggregate(chunk)
+        _payload.update(where)
+        payloads.append(PayloadBuilder(_payload).payload())
+    results = await asyncio.gather(*[readings.query(payload) for payload in payloads])
+    summary = {}
+    for chunk, result in zip(chunks, results):
+        if 'rows' not in result:
+            raise KeyError(result.get('message', 'rows'))
+        # for aggregates, so there can only ever be one row
+        row = result['rows'][0]
+        if len(chunk) == 1:
+            summary[chunk[0]] = row
+            continue
+        for index, datapoint in enumerate(chunk):
+            summary[datapoint] = {alias: row.get("{}_{}".format(alias, index)) for _, alias in _SUMMARY_AGGREGATES}
+    return summary
+
+
 def where_clause(request, where):
     val = 0
     try:
@@ -751,6 +948,10 @@ async def asset_datapoints_with_bucket_size(request: web.Request) -> web.Respons
             start_date = datetime.datetime.fromtimestamp(start, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
             stop_date = datetime.datetime.fromtimestamp(start + length, datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
 
+        if is_stream_requested(request, int(float(length / float(bucket_size)))):
+            return await _stream_json_array(request, _bucket_pages(
+                _readings, asset_code_list, start, length, bucket_size, start_date, stop_date))
+
         # Prepare payload
         _aggregate = PayloadBuilder().AGGREGATE(["all"]).chain_payload()
         _and_where = PayloadBuilder(_aggregate).WHERE(["asset_code", "in", asset_code_list]).AND_WHERE([
@@ -777,6 +978,47 @@ async def asset_datapoints_with_bucket_size(request: web.Request) -> web.Respons
         return web.json_response(response)
 
 
+async def _bucket_pages(readings, asset_code_list, start, length, bucket_size, start_date, stop_date):
+    """ Pages of the time buckets of the assets from start for length seconds, newest first as in the single query,
+    bucket_size being given as in the request
+
+    Each page covers the time range of at most _STREAM_PAGE_SIZE buckets, split on multiples of
+    the bucket size since the epoch, as the storage buckets are.
+    """
+    dt_format = "%Y-%m-%d %H:%M:%S.%f"
+    span = float(bucket_size) * _STREAM_PAGE_SIZE
+    limit = int(float(length / float(bucket_size)))
+    upper = start + length
+    sent = 0
+    while upper > start and sent < limit:
+        lower = (math.ceil(upper / span) - 1) * span
+        _aggregate = PayloadBuilder().AGGREGATE(["all"]).chain_payload()
+        if lower <= start:
+            _where = PayloadBuilder(_aggregate).WHERE(["asset_code", "in", asset_code_list]).AND_WHERE(
+                ["user_ts", ">=", str(start_date)]).chain_payload()
+        else:
+            lower_date = datetime.datetime.fromtimestamp(lower, datetime.timezone.utc).strftime(dt_format)
+            _where = PayloadBuilder(_aggregate).WHERE(["asset_code", "in", asset_code_list]).AND_WHERE(
+                ["user_ts", ">=", lower_date]).chain_payload()
+        if upper == start + length:
+            _where = PayloadBuilder(_where).AND_WHERE(["user_ts", "<=", str(stop_date)]).chain_payload()
+        else:
+            upper_date = datetime.datetime.fromtimestamp(upper, datetime.timezone.utc).strftime(dt_format)
+            _where = PayloadBuilder(_where).AND_WHERE(["user_ts", "<", upper_date]).chain_payload()
+        _bucket = PayloadBuilder(_where).TIMEBUCKET('user_ts', bucket_size,
+                                                    'YYYY-MM-DD HH24:MI:SS', 'timestamp').chain_payload()
+        count = min(_STREAM_PAGE_SIZE, limit - sent)
+        payload = PayloadBuilder(_bucket).LIMIT(count).payload()
+        results = await readings.query(payload)
+        if 'rows' not in results:
+            raise KeyError(results.get('message', 'rows'))
+        rows = results['rows'][:count]
+        if rows:
+            yield rows
+        sent += len(rows)
+        upper = lower
+
+
 async def asset_readings_with_bucket_size(request: web.Request) -> web.Response:
     """ Retrieve readings for a single asset between two points in time.
         These points are defined as a relative value in seconds back in time from the current time and a number of seconds worth of data.
@@ -857,9 +1099,87 @@ async def asset_readings_with_bucket_size(request: web.Request) -> web.Response:
         return web.json_response(response)
 
 
+async def asset_reading_downsample(request: web.Request) -> web.Response:
+    """ Retrieve a bounded number of readings of a single asset datapoint between two points in time, chosen
+        to keep the shape of the series however many readings there are in the time range.
+        The readings are aggregated by storage into time buckets, holding the minimum and maximum reading of the
+        bucket, and the points are chosen among them, so that the work done is bounded by the points asked for.
+        The timestamps returned are those of the time buckets, as for the bucket endpoint.
+
+        If start is not given then the start point is now - length, start is in seconds since the epoch.
+        If length is not given then length is 60 seconds.
+        If points is not given then at most 500 readings are returned.
+        method is either lttb (Largest-Triangle-Three-Buckets over twice as many time buckets as points, the
+        default) or minmax (minimum and maximum reading of points / 2 time buckets).
+
+       :Example:
+               curl -sX GET http://localhost:8081/fledge/asset/{asset_code}/{reading}/downsample
+               curl -sX GET "http://localhost:8081/fledge/asset/{asset_code}/{reading}/downsample?length=604800&points=1000"
+               curl -sX GET "http://localhost:8081/fledge/asset/{asset_code}/{reading}/downsample?start=<start point>&length=<length>&method=minmax"
+       """
+    asset_code = request.match_info.get('asset_code', '')
+    reading = request.match_info.get('reading', '')
+    results = {}
+    try:
+        points = _DEFAULT_DOWNSAMPLE_POINTS
+        if 'points' in request.query and request.query['points'] != '':
+            points = int(request.query['points'])
+            if not 4 <= points <= _MAX_DOWNSAMPLE_POINTS:
+                raise ValueError('points must be an integer between 4 and {}'.format(_MAX_DOWNSAMPLE_POINTS))
+        method = request.query.get('method', 'lttb')
+        if method not in DOWNSAMPLERS:
+            raise ValueError('method must be one of {}'.format(', '.join(sorted(DOWNSAMPLERS))))
+        length = 60
+        if 'length' in request.query and request.query['length'] != '':
+            length = int(request.query['length'])
+            if length <= 0:
+                raise ValueError('length must be a positive integer')
+        start = datetime.datetime.now().timestamp() - length
+        if 'start' in request.query and request.query['start'] != '':
+            try:
+                start = float(request.query['start'])
+                datetime.datetime.fromtimestamp(start)
+            except Exception as e:
+                raise ValueError('Invalid value for start. Error: {}'.format(str(e)))
+        dt_format = '%Y-%m-%d %H:%M:%S.%f'
+        start_date = datetime.datetime.fromtimestamp(start, datetime.timezone.utc).strftime(dt_format)
+        stop_date = datetime.datetime.fromtimestamp(start + length, datetime.timezone.utc).strftime(dt_format)
+
+        downsampler = DOWNSAMPLERS[method](points)
+        # Storage aggregates the readings into time buckets, the rows read are bounded by the points asked for
+        bucket_size = round(length / downsampler.buckets, 6)
+        _aggregate = PayloadBuilder().AGGREGATE(["min", ["reading", reading]], ["max", ["reading", reading]]) \
+            .ALIAS('aggregate', ('reading', 'min', 'min'), ('reading', 'max', 'max')).chain_payload()
+        _where = PayloadBuilder(_aggregate).WHERE(["asset_code", "=", asset_code]).AND_WHERE(
+            ["user_ts", ">=", start_date], ["user_ts", "<=", stop_date]).chain_payload()
+        _bucket = PayloadBuilder(_where).TIMEBUCKET('user_ts', str(bucket_size), 'YYYY-MM-DD HH24:MI:SS',
+                                                    'timestamp').chain_payload()
+        # The buckets are aligned on multiples of the bucket size, the time range may overlap one more
+        payload = PayloadBuilder(_bucket).LIMIT(downsampler.buckets + 1).payload()
+        _readings = connect.get_readings_async()
+        results = await _readings.query(payload)
+        response = [{"timestamp": timestamp, reading: value}
+                    for _, value, timestamp in downsampler.result(results['rows'])]
+    except KeyError:
+        msg = results['message']
+        raise web.HTTPBadRequest(reason=msg, body=json.dumps({"message": msg}))
+    except (TypeError, ValueError) as err:
+        msg = str(err)
+        raise web.HTTPBadRequest(reason=msg, body=json.dumps({"message": msg}))
+    except Exception as ex:
+        msg = str(ex)
+        _logger.error(ex, "Failed to downsample {} readings of {} asset.".format(reading, asset_code))
+        raise web.HTTPInternalServerError(reason=msg, body=json.dumps({"message": msg}))
+    else:
+        return web.json_response(response)
+
+
 async def asset_structure(request):
     """ Browse all the assets for which we have recorded readings and
-    return the asset structure
+    return the asset structure, i.e. the datapoint types and the metadata of the latest reading of each asset
+
+    The structure is served from the asset structure catalog, which a background task brings up to date with the
+    readings appended every few seconds.
 
     Returns:
            json result showing the asset structure
@@ -889,34 +1209,8 @@ async def asset_structure(request):
               }
             }
     """
-    results = {}
     try:
-        payload = PayloadBuilder().ORDER_BY(["asset_code"]).payload()
-        _readings = connect.get_readings_async()
-        results = await _readings.query(payload)
-        rows = results['rows']
-        asset_json = {}
-        for row in rows:
-            code = row['asset_code']
-            datapoint = {}
-            metadata = {}
-            for name, value in row['reading'].items():
-                if type(value) == str:
-                    if value == "True" or value == "False":
-                        datapoint[name] = "boolean"
-                    else:
-                        metadata[name] = value
-                elif type(value) == int:
-                    datapoint[name] = "integer"
-                elif type(value) == float:
-                    datapoint[name] = "float"
-            if len(metadata) > 0:
-                asset_json[code] = {'datapoint': datapoint, 'metadata': metadata}
-            else:
-                asset_json[code] = {'datapoint': datapoint}
-    except KeyError:
-        msg = results['message']
-        raise web.HTTPBadRequest(reason=msg, body=json.dumps({"message": msg}))
+        asset_json = start_asset_structure_catalog().structure()
     except Exception as ex:
         msg = str(ex)
         _logger.error(ex, "Failed to get assets structure.")
@@ -924,6 +1218,36 @@ async def asset_structure(request):
     else:
         return web.json_response(asset_json)
 
+
+def _get_asset_reading_counts():
+    global _asset_reading_counts
+    if _asset_reading_counts is None:
+        _asset_reading_counts = AssetReadingCounts()
+    return _asset_reading_counts
+
+
+def _get_asset_structure_catalog():
+    global _asset_structure_catalog
+    if _asset_structure_catalog is None:
+        _asset_structure_catalog = AssetStructureCatalog()
+    return _asset_structure_catalog
+
+
+def start_asset_structure_catalog():
+    """ Starts keeping the asset structure catalog up to date in the background, if not done yet
+
+    Returns:
+        the AssetStructureCatalog
+    """
+    catalog = _get_asset_structure_catalog()
+    catalog.start(connect.get_readings_async(), _get_asset_reading_counts())
+    return catalog
+
+
+async def stop_asset_structure_catalog():
+    if _asset_structure_catalog is not None:
+        await _asset_structure_catalog.stop()
+
 # The following two routines are not really browsing data but this is probably a logical
 # place to put them as they share the same URL stem
 
@@ -950,6 +1274,8 @@ async def asset_purge_all(request):
         results = await _readings.purge(asset="")
 
         if 'purged' in results:
+            _get_asset_structure_catalog().remove()
+            _get_asset_reading_counts().remove()
             end_time = time.strftime('%Y-%m-%d %H:%M:%S.%s', time.localtime(time.time()))
             await _audit.information('PURGE',
                                      {
@@ -990,6 +1316,8 @@ async def asset_purge(request):
         results = await _readings.purge(asset=asset_code)
 
         if 'purged' in results:
+            _get_asset_structure_catalog().remove(asset_code)
+            _get_asset_reading_counts().remove(asset_code)
             end_time = time.strftime('%Y-%m-%d %H:%M:%S.%s', time.localtime(time.time()))
             await _audit.information('PURGE',
                                      {
@@ -1017,14 +1345,14 @@ async def asset_timespan(request):
             curl -sX GET http://localhost:8081/fledge/asset/timespan
     """
     try:
-        payload = PayloadBuilder().AGGREGATE(["min", "user_ts"], ["max", "user_ts"]).GROUP_BY("asset_code") \
-                .ALIAS('aggregate', ('user_ts', 'min', 'oldest'), ('user_ts', 'max', 'newest')).payload()
-        # Call storage service
         _readings = connect.get_readings_async()
-        results = await _readings.query(payload)
-        response = results['rows']
+        reading_counts = _get_asset_reading_counts()
+        await reading_counts.refresh(_readings)
+        assets = reading_counts.assets()
+        response = [{"asset_code": code, "oldest": assets[code][1], "newest": assets[code][2]}
+                    for code in sorted(assets)]
     except (KeyError, IndexError) as err:
-        msg = str(err)
+        msg = err.args[0] if err.args else str(err)
         raise web.HTTPNotFound(reason=msg, body=json.dumps({"message": msg}))
     except (TypeError, ValueError) as err:
         msg = str(err)
@@ -1047,15 +1375,15 @@ async def asset_reading_timespan(request):
     """
     try:
         asset_code = request.match_info.get('asset_code', '')
-        payload = PayloadBuilder().WHERE(
-            ["asset_code", "=", asset_code]).AGGREGATE(["min", "user_ts"], ["max", "user_ts"]).ALIAS(
-            'aggregate', ('user_ts', 'min', 'oldest'), ('user_ts', 'max', 'newest')).payload()
-        # Call storage service
         _readings = connect.get_readings_async()
-        results = await _readings.query(payload)
-        response = results['rows'][0]
+        reading_counts = _get_asset_reading_counts()
+        await reading_counts.refresh(_readings)
+        assets = reading_counts.assets()
+        if asset_code not in assets:
+            raise KeyError("{} asset code not found".format(asset_code))
+        response = {"oldest": assets[asset_code][1], "newest": assets[asset_code][2]}
     except (KeyError, IndexError) as err:
-        msg = str(err)
+        msg = err.args[0] if err.args else str(err)
         raise web.HTTPNotFound(reason=msg, body=json.dumps({"message": msg}))
     except (TypeError, ValueError) as err:
         msg = str(err)
@@ -35,6 +35,7 @@ _help = """
     | GET POST       | /fledge/category/{category_name}/children                  |
     | DELETE         | /fledge/category/{category_name}/children/{child_category} |
     | DELETE         | /fledge/category/{category_name}/parent                    |
+    | GET            | /fledge/configuration/cache                                |
     --------------------------------------------------------------------------------
 """
 
@@ -46,6 +47,21 @@ _logger = FLCoreLogger().get_logger(__name__)
 #################################
 
 
+async def get_cache_statistics(request):
+    """
+    Args:
+         request:
+
+    Returns:
+            the size and the hit, miss and eviction counters of the configuration cache
+
+    :Example:
+            curl -sX GET http://localhost:8081/fledge/configuration/cache
+    """
+    cf_mgr = ConfigurationManager(connect.get_storage_async())
+    return web.json_response(cf_mgr._cacheManager.stats())
+
+
 async def get_categories(request):
     """
     Args:
@@ -415,6 +431,7 @@ async def add_configuration_item(request):
         # update cache with new config item
         if category_name in cf_mgr._cacheManager.cache:
             cf_mgr._cacheManager.cache[category_name]['value'].update({new_config_item: data})
+            cf_mgr._cacheManager.resize(category_name)
 
         # logged audit new config item for category
         audit = AuditLogger(storage_client)
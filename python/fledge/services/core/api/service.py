@@ -44,6 +44,7 @@ _help = """
     | GET POST            | /fledge/service                                      |
     | GET                 | /fledge/service/available                            |
     | GET                 | /fledge/service/installed                            |
+    | GET                 | /fledge/service/monitor                              |
     | PUT                 | /fledge/service/{type}/{name}/update                 |
     | DELETE              | /fledge/service/{service_name}                       |
     | POST                | /fledge/service/{service_name}/otp                   |
@@ -124,6 +125,23 @@ async def get_health(request):
         return web.json_response(response)
 
 
+async def get_monitor_statistics(request):
+    """
+    Args:
+        request:
+
+    Returns:
+            latency metrics of the last service monitoring round and the ping round trip time histograms of the services
+
+    :Example:
+            curl -sX GET http://localhost:8081/fledge/service/monitor
+    """
+    if server.Server.service_monitor is None:
+        msg = "Service monitor is not running"
+        raise web.HTTPServiceUnavailable(reason=msg, body=json.dumps({"message": msg}))
+    return web.json_response(server.Server.service_monitor.get_statistics())
+
+
 async def delete_service(request):
     """ Delete an existing service
 
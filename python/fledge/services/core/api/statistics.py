@@ -4,8 +4,10 @@
 # See: http://fledge-iot.readthedocs.io/
 # FLEDGE_END
 import datetime
+import time
 from aiohttp import web
 
+from fledge.common import statistics
 from fledge.common.storage_client.payload_builder import PayloadBuilder
 from fledge.services.core import connect
 from fledge.services.core.scheduler.scheduler import Scheduler
@@ -26,6 +28,11 @@ _help = """
 
 _logger = FLCoreLogger().get_logger(__name__)
 
+_rates_cache = {}
+""" (periods, statistics) -> (expiry time, rates), a new statistics history row is written once an interval """
+
+_RATES_CACHE_SIZE = 100
+
 
 #################################
 #  Statistics
@@ -61,6 +68,11 @@ async def get_statistics_history(request):
             curl -X GET http://localhost:8081/fledge/statistics/history?limit=1
             curl -X GET http://localhost:8081/fledge/statistics/history?key=READINGS
             curl -X GET http://localhost:8081/fledge/statistics/history?key=READINGS,PURGED,UNSENT&minutes=60
+            curl -X GET http://localhost:8081/fledge/statistics/history?key=READINGS&days=30&resolution=86400
+
+    With a resolution, in seconds, the statistics are read from the coarsest rollup whose buckets are no wider
+    than the resolution, the interval is then the width of the buckets. The collector interval is used if there
+    is no such rollup.
     """
     storage_client = connect.get_storage_async()
     # To find the interval in secs from stats collector schedule
@@ -104,6 +116,17 @@ async def get_statistics_history(request):
     except ValueError:
         raise web.HTTPBadRequest(reason="Time unit must be a positive integer")
 
+    if 'resolution' in request.query and request.query['resolution'] != '':
+        try:
+            resolution = int(request.query['resolution'])
+            if resolution <= 0:
+                raise ValueError
+        except ValueError:
+            raise web.HTTPBadRequest(reason="Resolution must be a positive integer")
+        rollups = [r for r in statistics.ROLLUP_RESOLUTIONS if interval_in_secs < r <= resolution]
+        if rollups:
+            return await _get_statistics_history_rollup(request, storage_client, rollups[-1], val)
+
     if 'limit' in request.query and request.query['limit'] != '':
         try:
             limit = int(request.query['limit'])
@@ -154,6 +177,55 @@ async def get_statistics_history(request):
     return web.json_response({"interval": interval_in_secs, 'statistics': results})
 
 
+async def _get_statistics_history_rollup(request, storage_client, resolution, seconds):
+    """ Statistics history summed by buckets of resolution seconds, the latest buckets first
+
+    The buckets follow the local time and their history_ts is the local time of their start, as the history_ts of
+    the statistics history.
+
+    Args:
+        request: with the key and limit request params, as for the statistics history
+        storage_client: storage client
+        resolution: width of the buckets of the rollup, in seconds
+        seconds: time range, in seconds back from now, 0 for all
+    """
+    payload = PayloadBuilder().SELECT(("bucket", "key", "value")).WHERE(['resolution', '=', resolution]).ORDER_BY(
+        ['bucket', 'desc']).chain_payload()
+    keys = None
+    if 'key' in request.query:
+        keys = list(filter(None, request.query['key'].split(',')))
+        payload = PayloadBuilder(payload).AND_WHERE(['key', 'in', keys]).chain_payload()
+    if seconds > 0:
+        since = statistics.rollup_bucket(time.time() - seconds, resolution)
+        payload = PayloadBuilder(payload).AND_WHERE(['bucket', '>=', since]).chain_payload()
+    if 'limit' in request.query and request.query['limit'] != '':
+        try:
+            limit = int(request.query['limit'])
+            if limit < 0:
+                raise ValueError
+        except ValueError:
+            raise web.HTTPBadRequest(reason="Limit must be a positive integer")
+        if keys is not None:
+            key_count = len(keys)
+        else:
+            count_payload = PayloadBuilder().AGGREGATE(["count", "*"]).payload()
+            result = await storage_client.query_tbl_with_payload("statistics", count_payload)
+            key_count = result['rows'][0]['count_*']
+        # A bucket has a row of each key
+        payload = PayloadBuilder(payload).LIMIT(limit * key_count).chain_payload()
+    result = await storage_client.query_tbl_with_payload(statistics.ROLLUP_TABLE, PayloadBuilder(payload).payload())
+    results = []
+    by_bucket = {}
+    for row in result['rows']:
+        bucket = int(row['bucket'])
+        entry = by_bucket.get(bucket)
+        if entry is None:
+            entry = by_bucket[bucket] = {'history_ts': statistics.rollup_history_ts(bucket)}
+            results.append(entry)
+        entry[row['key']] = row['value']
+    return web.json_response({"interval": resolution, 'statistics': results})
+
+
 async def get_statistics_rate(request: web.Request) -> web.Response:
     """To retrieve the statistics rates and will be calculated by formula:
         (sum(value) / ((60 * period) / stats_collector_interval))
@@ -168,6 +240,9 @@ async def get_statistics_rate(request: web.Request) -> web.Response:
       :Example:
           curl -sX GET "http://localhost:8081/fledge/statistics/rate?periods=5&statistics=READINGS"
           curl -sX GET "http://localhost:8081/fledge/statistics/rate?periods=1,5,15&statistics=SINUSOID,FASTSINUSOID"
+
+      The statistics collector writes one history row per statistic at once, so the latest rows of all the
+      statistics for the longest period are read by a single query. The rates are kept for a collector interval.
       """
     params = request.query
     if 'periods' not in params:
@@ -192,6 +267,10 @@ async def get_statistics_rate(request: web.Request) -> web.Response:
 
     stats = params['statistics']
     stat_split_list = list(filter(None, [x for x in stats.split(',')]))
+    cache_key = (tuple(period_split_list), tuple(stat_split_list))
+    cached = _rates_cache.get(cache_key)
+    if cached is not None and cached[0] > time.time():
+        return web.json_response({"rates": cached[1]})
     storage_client = connect.get_storage_async()
     # To find the interval in secs from stats collector schedule
     scheduler_payload = PayloadBuilder().SELECT("schedule_interval").WHERE(
@@ -204,25 +283,32 @@ async def get_statistics_rate(request: web.Request) -> web.Response:
                                               seconds=interval_dt.second).total_seconds()
     else:
         raise web.HTTPNotFound(reason="No stats collector schedule found")
-    resp = []
-    for x, y in [(x, y) for x in period_split_list for y in stat_split_list]:
-        # Get value column as per given key along with history_ts column order by
-        _payload = PayloadBuilder().SELECT("value").WHERE(['key', '=', y]).ORDER_BY(["history_ts", "desc"]
-                                                                                    ).chain_payload()
-        # LIMIT set to ((60 * period) / stats_collector_interval))
-        calculated_formula = int((60 * int(x) / int(interval_in_secs)))
-        stats_rate_payload = PayloadBuilder(_payload).LIMIT(calculated_formula).payload()
-        result = await storage_client.query_tbl_with_payload("statistics_history", stats_rate_payload)
-        temp_dict = {y: {x: 0}}
-        if result['rows']:
-            row_sum = 0
-            values = [r['value'] for r in result['rows']]
-            for v in values:
-                row_sum += v
-            temp_dict = {y: {x: row_sum / int(x)}}
-        resp.append(temp_dict)
+    # Number of history rows of each period, ((60 * period) / stats_collector_interval))
+    period_rows = {x: int((60 * int(x) / int(interval_in_secs))) for x in period_split_list}
+    max_rows = max(period_rows.values())
+    keys = list(dict.fromkeys(stat_split_list))
+    values = {y: [] for y in keys}
+    if max_rows > 0:
+        # Latest values of all the keys, a collector run writes a row of each key with the same history_ts
+        _payload = PayloadBuilder().SELECT("key", "value").WHERE(['key', 'in', keys]).ORDER_BY(
+            ["history_ts", "desc"]).LIMIT(max_rows * len(keys)).payload()
+        result = await storage_client.query_tbl_with_payload("statistics_history", _payload)
+        for r in result['rows']:
+            key_values = values.get(r['key'])
+            if key_values is not None and len(key_values) < max_rows:
+                key_values.append(r['value'])
     rate_dict = {}
-    for d in resp:
-        for k, v in d.items():
-            rate_dict[k] = {**rate_dict[k], **v} if k in rate_dict else v
+    for y in keys:
+        # Running sums of the latest values, the sum of the latest n values is sums[n]
+        sums = [0]
+        for v in values[y]:
+            sums.append(sums[-1] + v)
+        rates = {}
+        for x in period_split_list:
+            n = min(period_rows[x], len(values[y]))
+            rates[x] = sums[n] / int(x) if n else 0
+        rate_dict[y] = rates
+    if len(_rates_cache) >= _RATES_CACHE_SIZE:
+        _rates_cache.clear()
+    _rates_cache[cache_key] = (time.time() + interval_in_secs, rate_dict)
     return web.json_response({"rates": rate_dict})
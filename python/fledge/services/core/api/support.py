@@ -4,8 +4,8 @@
 # See: http://fledge-iot.readthedocs.io/
 # FLEDGE_END
 
+import asyncio
 import os
-import subprocess
 import json
 import datetime
 
@@ -18,6 +18,7 @@ from fledge.common.common import _FLEDGE_ROOT, _FLEDGE_DATA
 from fledge.common.logger import FLCoreLogger
 from fledge.common.web.middleware import has_permission
 from fledge.services.core.support import SupportBuilder
+from fledge.services.core.syslog_index import SyslogIndex
 
 
 __author__ = "Ashish Jabble"
@@ -28,27 +29,10 @@ __version__ = "${VERSION}"
 _logger = FLCoreLogger().get_logger(__name__)
 
 _SYSLOG_FILE = '/var/log/messages' if utils.is_redhat_based() else '/var/log/syslog'
-_SCRIPTS_DIR = "{}/scripts".format(_FLEDGE_ROOT)
 __DEFAULT_LIMIT = 20
 __DEFAULT_OFFSET = 0
 __DEFAULT_LOG_SOURCE = 'Fledge'
-
-# Debug and above
-__GET_SYSLOG_CMD_TEMPLATE = "grep -a -E '({})\[' {} | head -n {} | tail -n {}"
-__GET_SYSLOG_TOTAL_MATCHED_LINES = "grep -a -c -E '({})\[' {}"
-__GET_SYSLOG_TEMPLATE_WITH_NON_TOTALS = "grep -a -E '({})\[' {} | head -n -{} | tail -n {}"
-# Info and above
-__GET_SYSLOG_CMD_WITH_INFO_TEMPLATE = "grep -a -E '({})\[.*].* (INFO|WARNING|ERROR|FATAL)' {} | head -n {} | tail -n {}"
-__GET_SYSLOG_INFO_MATCHED_LINES = "grep -a -c -E '({})\[.*].* (INFO|WARNING|ERROR|FATAL)' {}"
-__GET_SYSLOG_INFO_TEMPLATE_WITH_NON_TOTALS = "grep -a -E '({})\[.*].* (INFO|WARNING|ERROR|FATAL)' {} | head -n -{} | tail -n {}"
-# Error and above
-__GET_SYSLOG_CMD_WITH_ERROR_TEMPLATE = "grep -a -E '({})\[.*].* (ERROR|FATAL)' {} | head -n {} | tail -n {}"
-__GET_SYSLOG_ERROR_MATCHED_LINES = "grep -a -c -E '({})\[.*].* (ERROR|FATAL)' {}"
-__GET_SYSLOG_ERROR_TEMPLATE_WITH_NON_TOTALS = "grep -a -E '({})\[.*].* (ERROR|FATAL)' {} | head -n -{} | tail -n {}"
-# Warning and above
-__GET_SYSLOG_CMD_WITH_WARNING_TEMPLATE = "grep -a -E '({})\[.*].* (WARNING|ERROR|FATAL)' {} | head -n {} | tail -n {}"
-__GET_SYSLOG_WARNING_MATCHED_LINES = "grep -a -c -E '({})\[.*].* (WARNING|ERROR|FATAL)' {}"
-__GET_SYSLOG_WARNING_TEMPLATE_WITH_NON_TOTALS = "grep -a -E '({})\[.*].* (WARNING|ERROR|FATAL)' {} | head -n -{} | tail -n {}"
+_syslog_index = None
 
 _help = """
     ------------------------------------------------------------------------------
@@ -157,35 +141,19 @@ async def get_syslog_entries(request):
         # source
         source = urllib.parse.unquote(request.query['source']) if 'source' in request.query and request.query[
             'source'] != '' else __DEFAULT_LOG_SOURCE
-        if source.lower() in ['fledge', 'storage']:
-            source = source.lower()
-            valid_source = {'fledge': "Fledge.*", 'storage': 'Fledge Storage'}
+        if source.lower() == 'fledge':
+            sources = None
+        elif source.lower() == 'storage':
+            sources = ['Fledge Storage']
         else:
-            valid_source = {source: "Fledge {}".format(source)}
-
-        # Get filtered lines
-        template = __GET_SYSLOG_CMD_TEMPLATE
-        lines = __GET_SYSLOG_TOTAL_MATCHED_LINES
+            sources = ["Fledge {}".format(name) for name in source.split('|')]
 
-        levels = ""
         level = "debug"
         if 'level' in request.query and request.query['level'] != '':
             level = request.query['level'].lower()
             supported_level = ['info', 'warning', 'error', 'debug']
             if level not in supported_level:
                 raise ValueError('{} is invalid level. Supported levels are {}'.format(level, supported_level))
-            if level == 'info':
-                template = __GET_SYSLOG_CMD_WITH_INFO_TEMPLATE
-                lines = __GET_SYSLOG_INFO_MATCHED_LINES
-                levels = "(INFO|WARNING|ERROR|FATAL)"
-            elif level == 'warning':
-                template = __GET_SYSLOG_CMD_WITH_WARNING_TEMPLATE
-                lines = __GET_SYSLOG_WARNING_MATCHED_LINES
-                levels = "(WARNING|ERROR|FATAL)"
-            elif level == 'error':
-                template = __GET_SYSLOG_CMD_WITH_ERROR_TEMPLATE
-                lines = __GET_SYSLOG_ERROR_MATCHED_LINES
-                levels = "(ERROR|FATAL)"
         # keyword
         keyword = ''
         if 'keyword' in request.query and request.query['keyword'] != '':
@@ -196,29 +164,18 @@ async def get_syslog_entries(request):
             'nontotals'] != '' else "false"
         if non_totals not in ("true", "false"):
             raise ValueError('nontotals must either be in True or False.')
-        if non_totals != "true":
-            # Get total lines
-            cmd = lines.format(valid_source[source], _SYSLOG_FILE)
-            t = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE).stdout.readlines()
-            total_lines = int(t[0].decode())
-            response['count'] = total_lines
-            cmd = template.format(valid_source[source], _SYSLOG_FILE, total_lines - offset, limit)
-        else:
-            script_path = os.path.join(_SCRIPTS_DIR, "common", "get_logs.sh")
-            # cmd = non_total_template.format(valid_source[source], _SYSLOG_FILE, offset, limit)
-            pattern = '({})\[.*\].*{}:'.format(valid_source[source], levels)
-            cmd = '{} -offset {} -limit {} -pattern \'{}\' -logfile {} -source \'{}\' -level {}'.format(
-                script_path, offset, limit, pattern, _SYSLOG_FILE, source, level)
-            if len(keyword):
-                cmd += ' -keyword \'{}\''.format(keyword)
-            _logger.debug('********* non_totals={}: new shell command: {}'.format(non_totals, cmd))
 
         t1 = datetime.datetime.now()
-        rv = subprocess.Popen([cmd], shell=True, stdout=subprocess.PIPE).stdout.readlines()
+        # Reading the syslog file is blocking, hence done in a thread
+        loop = asyncio.get_event_loop()
+        logs, total_lines = await loop.run_in_executor(
+            None, lambda: _get_syslog_index().query(sources=sources, level=level, offset=offset, limit=limit,
+                                                    keyword=keyword, count=non_totals != "true"))
         t2 = datetime.datetime.now()
-        rv_str = [b.decode() for b in rv]  # Since "rv" contains return value in bytes, convert it to string
-        _logger.debug('********* Time taken for grep/tail/head subprocess: {} msec'.format((t2 - t1).total_seconds()*1000))
-        response['logs'] = rv_str
+        _logger.debug('********* Time taken for syslog query: {} msec'.format((t2 - t1).total_seconds()*1000))
+        if non_totals != "true":
+            response['count'] = total_lines
+        response['logs'] = logs
     except ValueError as err:
         msg = str(err)
         raise web.HTTPBadRequest(body=json.dumps({"message": msg}), reason=msg)
@@ -230,6 +187,13 @@ async def get_syslog_entries(request):
     return web.json_response(response)
 
 
+def _get_syslog_index():
+    global _syslog_index
+    if _syslog_index is None or _syslog_index.path != _SYSLOG_FILE:
+        _syslog_index = SyslogIndex(_SYSLOG_FILE)
+    return _syslog_index
+
+
 def _get_support_dir():
     if _FLEDGE_DATA:
         support_dir = os.path.expanduser(_FLEDGE_DATA + '/support')
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+"""Per asset reading counts and timespans of the readings buffer, maintained incrementally
+
+The readings are counted by segments of consecutive reading ids. Each refresh counts only the readings appended since
+the previous one, by a grouped aggregate over their id range. The purge removes the oldest readings, i.e. the lowest
+ids, so when the lowest id of the buffer has moved on the segments now fully purged are dropped and only the segment
+purged in part is counted again. The counts are saved to the data directory so that a restart does not count the
+whole buffer again.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from fledge.common.common import _FLEDGE_ROOT, _FLEDGE_DATA
+from fledge.common.logger import FLCoreLogger
+from fledge.common.storage_client.payload_builder import PayloadBuilder
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_logger = FLCoreLogger().get_logger(__name__)
+
+_SEGMENT_SIZE = 100000
+_SAVE_INTERVAL = 60
+_COUNTS_FILE = "asset_counts.json"
+
+
+def _default_path():
+    data_dir = _FLEDGE_DATA if _FLEDGE_DATA else _FLEDGE_ROOT + '/data'
+    return os.path.expanduser(data_dir + '/' + _COUNTS_FILE)
+
+
+class AssetReadingCounts(object):
+    """Count, oldest and newest user_ts of the readings of each asset in the readings buffer"""
+
+    def __init__(self, path=None, segment_size=_SEGMENT_SIZE):
+        self.path = _default_path() if path is None else path
+        self._segment_size = segment_size
+        self._lock = None
+        # segment number -> {asset code: [count, oldest, newest]}, segment n holds the ids from
+        # n * segment_size + 1 to (n + 1) * segment_size
+        self._segments = {}
+        # highest id counted and lowest id in the buffer when last refreshed
+        self._last_id = 0
+        self._min_id = 0
+        self._loaded = False
+        self._saved_at = 0
+
+    def _segment_range(self, segment):
+        return segment * self._segment_size + 1, (segment + 1) * self._segment_size
+
+    def _segment(self, reading_id):
+        return (reading_id - 1) // self._segment_size
+
+    @staticmethod
+    def _merge(counts, code, count, oldest, newest):
+        try:
+            total = counts[code]
+        except KeyError:
+            counts[code] = [count, oldest, newest]
+            return
+        total[0] += count
+        if oldest < total[1]:
+            total[1] = oldest
+        if newest > total[2]:
+            total[2] = newest
+
+    def assets(self):
+        """Returns {asset code: [count, oldest, newest]} summed over the segments"""
+        totals = {}
+        for counts in self._segments.values():
+            for code, (count, oldest, newest) in counts.items():
+                self._merge(totals, code, count, oldest, newest)
+        return totals
+
+    def remove(self, asset_code=None):
+        """Removes the counts of an asset, all the assets if asset_code is None, after a purge by asset"""
+        if not self._loaded:
+            self.load()
+        if asset_code is None:
+            self._segments = {}
+        else:
+            for counts in self._segments.values():
+                counts.pop(asset_code, None)
+        self.save()
+
+    def load(self):
+        self._loaded = True
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            if saved['segment_size'] != self._segment_size:
+                return
+            self._segments = {int(segment): counts for segment, counts in saved['segments'].items()}
+            self._last_id = int(saved['last_id'])
+            self._min_id = int(saved['min_id'])
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError, AttributeError) as ex:
+            _logger.warning("Ignoring invalid asset counts {}: {}".format(self.path, str(ex)))
+            self._segments = {}
+            self._last_id = self._min_id = 0
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'segment_size': self._segment_size, 'last_id': self._last_id, 'min_id': self._min_id,
+                           'segments': self._segments}, f)
+            os.replace(tmp_path, self.path)
+            self._saved_at = time.time()
+        except OSError as ex:
+            _logger.warning("Failed to save asset counts {}: {}".format(self.path, str(ex)))
+
+    async def refresh(self, readings):
+        """Counts the readings appended and accounts for the readings purged since the last refresh
+
+        Args:
+            readings: ReadingsStorageClientAsync
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._loaded:
+                self.load()
+            min_id, max_id = await self._id_range(readings)
+            changed = False
+            if max_id < self._last_id or (min_id is not None and min_id < self._min_id):
+                # The buffer ids have started again, e.g. after a storage reset
+                self._segments = {}
+                self._last_id = 0
+                changed = True
+            if min_id is None:
+                # Empty buffer
+                if self._segments:
+                    self._segments = {}
+                    changed = True
+            else:
+                if min_id > self._min_id and self._last_id:
+                    await self._purged(readings, min_id)
+                    changed = True
+                self._min_id = min_id
+                if max_id > self._last_id:
+                    await self._appended(readings, max(self._last_id, min_id - 1), max_id)
+                    self._last_id = max_id
+                    changed = True
+            if changed and time.time() - self._saved_at >= _SAVE_INTERVAL:
+                self.save()
+
+    async def _purged(self, readings, min_id):
+        """Drops the segments purged and counts again the segment purged in part"""
+        first = self._segment(min_id)
+        for segment in [s for s in self._segments if s < first]:
+            del self._segments[segment]
+        start, end = self._segment_range(first)
+        if min_id > start and first in self._segments:
+            self._segments[first] = await self._count(readings, min_id - 1, min(end, self._last_id))
+
+    async def _appended(self, readings, after_id, max_id):
+        """Counts the readings with id greater than after_id up to max_id, segment by segment"""
+        segment = self._segment(after_id + 1)
+        while True:
+            start, end = self._segment_range(segment)
+            upper = min(end, max_id)
+            counts = self._segments.setdefault(segment, {})
+            for code, (count, oldest, newest) in (await self._count(readings, after_id, upper)).items():
+                self._merge(counts, code, count, oldest, newest)
+            if not counts:
+                del self._segments[segment]
+            if upper == max_id:
+                return
+            after_id = upper
+            segment += 1
+
+    @staticmethod
+    async def _count(readings, after_id, upper_id):
+        """Returns {asset code: [count, oldest, newest]} of the readings with after_id < id <= upper_id"""
+        payload = PayloadBuilder().AGGREGATE(["count", "*"], ["min", "user_ts"], ["max", "user_ts"]).ALIAS(
+            'aggregate', ('*', 'count', 'count'), ('user_ts', 'min', 'oldest'), ('user_ts', 'max', 'newest')).WHERE(
+            ["id", ">", after_id]).AND_WHERE(["id", "<=", upper_id]).GROUP_BY("asset_code").payload()
+        results = await readings.query(payload)
+        if 'rows' not in results:
+            raise KeyError(results.get('message', 'rows'))
+        return {row['asset_code']: [int(row['count']), row['oldest'], row['newest']] for row in results['rows']}
+
+    @staticmethod
+    async def _id_range(readings):
+        """Returns the lowest and highest reading ids in the buffer, (None, 0) if it is empty"""
+        payload = PayloadBuilder().AGGREGATE(["min", "id"], ["max", "id"]).ALIAS(
+            'aggregate', ('id', 'min', 'min_id'), ('id', 'max', 'max_id')).payload()
+        results = await readings.query(payload)
+        if 'rows' not in results:
+            raise KeyError(results.get('message', 'rows'))
+        row = results['rows'][0] if results['rows'] else {}
+        if row.get('min_id') is None or row.get('max_id') is None:
+            return None, 0
+        return int(row['min_id']), int(row['max_id'])
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+"""Persistent catalog of the structure of the assets held in the readings buffer
+
+For every asset the catalog keeps the type of each datapoint and the metadata (string values) of its latest reading.
+It is brought up to date by reading only the readings appended since the last update, in id order and in batches,
+and is saved to the data directory with the id reached, so that a restart does not scan the buffer again. The assets
+purged from the buffer are dropped by retain().
+
+The catalog is kept up to date by a background task, see start(), so that serving it only reads memory.
+"""
+
+import asyncio
+import json
+import os
+
+from fledge.common.common import _FLEDGE_ROOT, _FLEDGE_DATA
+from fledge.common.logger import FLCoreLogger
+from fledge.common.storage_client.payload_builder import PayloadBuilder
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_logger = FLCoreLogger().get_logger(__name__)
+
+_BATCH_SIZE = 10000
+_CATALOG_FILE = "asset_structure.json"
+_REFRESH_INTERVAL = 10
+""" Seconds between two refreshes of the catalog by the background task """
+
+
+def _default_path():
+    data_dir = _FLEDGE_DATA if _FLEDGE_DATA else _FLEDGE_ROOT + '/data'
+    return os.path.expanduser(data_dir + '/' + _CATALOG_FILE)
+
+
+class AssetStructureCatalog(object):
+    """Datapoint types and metadata of the latest reading of each asset, updated incrementally from the readings
+    buffer"""
+
+    def __init__(self, path=None, batch_size=_BATCH_SIZE):
+        self.path = _default_path() if path is None else path
+        self._batch_size = batch_size
+        self._lock = None
+        # asset code -> {"datapoint": {name: type}, "metadata": {name: value}}
+        self._assets = {}
+        # id of the last reading merged into the catalog
+        self._last_id = 0
+        # last_id when the catalog was last saved
+        self._saved_id = 0
+        self._loaded = False
+        self._task = None
+
+    @staticmethod
+    def _value_type(value):
+        """Returns ("datapoint", type name) or ("metadata", value), None for unsupported values"""
+        if type(value) == str:
+            if value == "True" or value == "False":
+                return "datapoint", "boolean"
+            return "metadata", value
+        elif type(value) == int:
+            return "datapoint", "integer"
+        elif type(value) == float:
+            return "datapoint", "float"
+        return None
+
+    def add_reading(self, asset_code, reading):
+        """Sets the structure of an asset to the structure of a reading newer than the ones already added
+
+        Returns:
+            True if the datapoints of the asset or their types have changed, a change of metadata value alone is
+            not worth saving the catalog
+        """
+        structure = {'datapoint': {}, 'metadata': {}}
+        for name, value in reading.items():
+            kind = self._value_type(value)
+            if kind is None:
+                continue
+            section, entry = kind
+            structure[section][name] = entry
+        previous = self._assets.get(asset_code)
+        self._assets[asset_code] = structure
+        return previous is None or previous['datapoint'] != structure['datapoint'] or \
+            previous['metadata'].keys() != structure['metadata'].keys()
+
+    def retain(self, asset_codes):
+        """Drops the assets not in asset_codes, i.e. the assets purged from the readings buffer"""
+        if not self._loaded:
+            self.load()
+        purged = [code for code in self._assets if code not in asset_codes]
+        for code in purged:
+            del self._assets[code]
+        if purged:
+            self.save()
+
+    def remove(self, asset_code=None):
+        """Removes an asset from the catalog, all the assets if asset_code is None"""
+        if not self._loaded:
+            self.load()
+        if asset_code is None:
+            self._assets = {}
+        else:
+            self._assets.pop(asset_code, None)
+        self.save()
+
+    def structure(self):
+        """Returns the structure of the assets as served by GET /fledge/structure/asset"""
+        if not self._loaded:
+            self.load()
+        result = {}
+        for code in sorted(self._assets):
+            structure = self._assets[code]
+            if structure['metadata']:
+                result[code] = {'datapoint': dict(structure['datapoint']), 'metadata': dict(structure['metadata'])}
+            else:
+                result[code] = {'datapoint': dict(structure['datapoint'])}
+        return result
+
+    def load(self):
+        self._loaded = True
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            self._assets = saved['assets']
+            self._last_id = int(saved['last_id'])
+            self._saved_id = self._last_id
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as ex:
+            _logger.warning("Ignoring invalid asset structure catalog {}: {}".format(self.path, str(ex)))
+            self._assets = {}
+            self._last_id = 0
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'last_id': self._last_id, 'assets': self._assets}, f)
+            os.replace(tmp_path, self.path)
+            self._saved_id = self._last_id
+        except OSError as ex:
+            _logger.warning("Failed to save asset structure catalog {}: {}".format(self.path, str(ex)))
+
+    async def refresh(self, readings):
+        """Adds the readings appended to the buffer since the last refresh
+
+        Args:
+            readings: ReadingsStorageClientAsync
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._loaded:
+                self.load()
+            changed, last_id = await self._merge_from(readings, self._last_id)
+            if last_id == self._last_id and last_id and await self._max_id(readings) < last_id:
+                # The buffer ids have started again, e.g. after a storage reset
+                changed, last_id = await self._merge_from(readings, 0)
+                changed = True
+            self._last_id = last_id
+            if changed or last_id - self._saved_id >= self._batch_size:
+                self.save()
+
+    def start(self, readings, reading_counts, interval=_REFRESH_INTERVAL):
+        """Starts the background task refreshing the catalog, if it is not running
+
+        Args:
+            readings: ReadingsStorageClientAsync
+            reading_counts: AssetReadingCounts, tells the assets still in the buffer
+            interval: seconds between two refreshes
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run(readings, reading_counts, interval))
+
+    async def stop(self):
+        """Stops the background task"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self, readings, reading_counts, interval):
+        while True:
+            try:
+                await self.refresh(readings)
+                await reading_counts.refresh(readings)
+                self.retain(reading_counts.assets())
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                _logger.warning("Failed to refresh the asset structure catalog: {}".format(str(ex)))
+            await asyncio.sleep(interval)
+
+    async def _merge_from(self, readings, last_id):
+        """Merges the readings with id greater than last_id, returns (changed, id of the last reading merged)"""
+        changed = False
+        while True:
+            payload = PayloadBuilder().SELECT("id", "asset_code", "reading").WHERE(
+                ["id", ">", last_id]).ORDER_BY(["id", "asc"]).LIMIT(self._batch_size).payload()
+            results = await readings.query(payload)
+            if 'rows' not in results:
+                raise KeyError(results.get('message', 'rows'))
+            rows = results['rows']
+            for row in rows:
+                if self.add_reading(row['asset_code'], row['reading']):
+                    changed = True
+            if rows:
+                last_id = rows[-1]['id']
+            if len(rows) < self._batch_size:
+                return changed, last_id
+
+    @staticmethod
+    async def _max_id(readings):
+        payload = PayloadBuilder().AGGREGATE(["max", "id"]).ALIAS('aggregate', ('id', 'max', 'max_id')).payload()
+        results = await readings.query(payload)
+        max_id = results['rows'][0]['max_id'] if results['rows'] else None
+        return 0 if max_id is None else int(max_id)
@@ -4,6 +4,10 @@
 # See: http://fledge-iot.readthedocs.io/
 # FLEDGE_END
 
+import asyncio
+import copy
+import json
+
 from fledge.common.configuration_manager import ConfigurationManager
 from fledge.common.logger import FLCoreLogger
 from fledge.common.storage_client.payload_builder import PayloadBuilder
@@ -17,8 +21,16 @@ __version__ = "${VERSION}"
 
 _logger = FLCoreLogger().get_logger(__name__)
 
+_MAX_INSERT_BATCH = 500
+""" Maximum number of asset tracker records inserted by a single storage call """
+
 
 class AssetTracker(object):
+    """ Registers the asset tracker records not yet in the storage
+
+    The records already in storage are indexed by a hashable key, the records registered while an insert is in
+    progress are queued and inserted together by the next bulk insert.
+    """
 
     _storage = None
     """Storage client async"""
@@ -27,7 +39,15 @@ class AssetTracker(object):
     """Fledge service name"""
 
     _registered_asset_records = None
-    """Set of rows for asset_tracker already in the storage tables"""
+    """List of rows for asset_tracker already in the storage tables"""
+
+    _registered_asset_keys = None
+    """Set of the keys of the rows for asset_tracker already in the storage tables"""
+
+    _pending = None
+    """Records waiting to be inserted, key -> (record, future of the insert)"""
+
+    _insert_task = None
 
     def __init__(self, storage=None):
         if self._storage is None:
@@ -40,14 +60,28 @@ class AssetTracker(object):
         """ Fetch all asset_tracker records from database """
 
         self._registered_asset_records = []
+        self._registered_asset_keys = set()
         try:
             payload = PayloadBuilder().SELECT("asset", "event", "service", "plugin", "data").payload()
             results = await self._storage.query_tbl_with_payload('asset_tracker', payload)
             for row in results['rows']:
                 self._registered_asset_records.append(row)
+                self._registered_asset_keys.add(self._record_key(row))
         except Exception as ex:
             _logger.exception(ex, 'Failed to retrieve asset records')
 
+    @staticmethod
+    def _record_key(record):
+        """ Hashable key of an asset tracker record, the data being compared as JSON """
+        data = record.get("data")
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                pass
+        return (record["asset"], record["event"], record["service"], record["plugin"],
+                json.dumps(data, sort_keys=True))
+
     async def add_asset_record(self, *,  asset, event, service, plugin, jsondata = {}):
         """
         Args:
@@ -58,7 +92,10 @@ class AssetTracker(object):
         """
         # If (asset + event + service + plugin) row combination exists in _find_registered_asset_record then return
         d = {"asset": asset, "event": event, "service": service, "plugin": plugin, "data":jsondata}
-        if d in self._registered_asset_records:
+        if self._registered_asset_keys is None:
+            self._registered_asset_keys = {self._record_key(r) for r in self._registered_asset_records}
+        key = self._record_key(d)
+        if key in self._registered_asset_keys:
             return {}
 
         # The name of the Fledge this entry has come from.
@@ -69,19 +106,91 @@ class AssetTracker(object):
             svc_config = await cfg_manager.get_category_item(category_name='service', item_name='name')
             self.fledge_svc_name = svc_config['value']
 
+        if self._pending is None:
+            self._pending = {}
+        if key in self._pending:
+            # Already being registered
+            await asyncio.shield(self._pending[key][1])
+            return {}
+        future = asyncio.get_event_loop().create_future()
+        self._pending[key] = (d, future)
+        if self._insert_task is None:
+            self._insert_task = asyncio.ensure_future(self._insert_pending())
+        await asyncio.shield(future)
+        result = copy.deepcopy(d)
+        result.update({"fledge": self.fledge_svc_name})
+        return result
+
+    async def _insert_pending(self):
+        """ Inserts the queued records, those queued while inserting are inserted by the next bulk insert
+
+        If the insert is cancelled, the records not registered yet fail so that no caller waits for them forever.
+        """
+        pending = []
         try:
-            payload = PayloadBuilder().INSERT(asset=asset, event=event, service=service, plugin=plugin, fledge=self.fledge_svc_name, data=jsondata).payload()
-
-            result = await self._storage.insert_into_tbl('asset_tracker', payload)
-            response = result['response']
-            self._registered_asset_records.append(d)
-        except KeyError:
-            raise ValueError(result['message'])
-        except StorageServerError as ex:
-            err_response = ex.error
-            raise ValueError(err_response)
-        else:
-            import copy
-            result = copy.deepcopy(d)
-            result.update({"fledge": self.fledge_svc_name})
-            return result
+            # Lets the records registered concurrently join the first insert
+            await asyncio.sleep(0)
+            while self._pending:
+                pending = list(self._pending.items())[:_MAX_INSERT_BATCH]
+                for key, _ in pending:
+                    del self._pending[key]
+                await self._insert(pending)
+        finally:
+            self._insert_task = None
+            unresolved = pending + list(self._pending.items())
+            self._pending = {}
+            for _, (_, future) in unresolved:
+                if not future.done():
+                    future.set_exception(RuntimeError('Asset tracker record insert was cancelled'))
+
+    async def _insert(self, pending):
+        """ Inserts the records by a single bulk insert, one at a time if the storage rejects it so that each one
+        gets its error
+
+        A bulk insert giving no response may have been applied in part, it fails all its records rather than being
+        done again.
+
+        Args:
+            pending: list of (key, (record, future))
+        """
+        if len(pending) > 1:
+            rows = [dict(d, fledge=self.fledge_svc_name) for _, (d, _) in pending]
+            try:
+                result = await self._storage.insert_into_tbl('asset_tracker', json.dumps({"inserts": rows}))
+                if 'response' not in result:
+                    raise ValueError(result.get('message', result))
+                for key, (d, future) in pending:
+                    self._registered(key, d, future)
+                return
+            except StorageServerError:
+                pass
+            except Exception as ex:
+                for _, (_, future) in pending:
+                    if not future.done():
+                        future.set_exception(ex)
+                return
+        for key, (d, future) in pending:
+            try:
+                payload = PayloadBuilder().INSERT(asset=d["asset"], event=d["event"], service=d["service"],
+                                                  plugin=d["plugin"], fledge=self.fledge_svc_name,
+                                                  data=d["data"]).payload()
+                result = await self._storage.insert_into_tbl('asset_tracker', payload)
+                response = result['response']
+                self._registered(key, d, future)
+            except KeyError:
+                error = ValueError(result['message'])
+            except StorageServerError as ex:
+                err_response = ex.error
+                error = ValueError(err_response)
+            except Exception as ex:
+                error = ex
+            else:
+                continue
+            if not future.done():
+                future.set_exception(error)
+
+    def _registered(self, key, d, future):
+        self._registered_asset_records.append(d)
+        self._registered_asset_keys.add(key)
+        if not future.done():
+            future.set_result(None)
@@ -15,14 +15,34 @@ __version__ = "${VERSION}"
 
 _logger = FLCoreLogger().get_logger(__name__)
 
+# Clients are shared per storage service endpoint so that every caller reuses the same connection pool
+_clients = {}
+
+
+def _get_client(client_class, **kwargs):
+    services = ServiceRegistry.get(name="Fledge Storage")
+    storage_svc = services[0]
+    key = (client_class, storage_svc._address, storage_svc._port)
+    client = _clients.get(key)
+    if client is None:
+        client = client_class(svc=storage_svc, **kwargs)
+        _clients[key] = client
+    return client
+
+
+async def close_clients():
+    """ Close the connection pools of all the shared storage clients """
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.close()
+
 
 # TODO: Needs refactoring or better way to allow global discovery in core process
 def get_storage_async():
     """ Storage Object """
     try:
-        services = ServiceRegistry.get(name="Fledge Storage")
-        storage_svc = services[0]
-        _storage = StorageClientAsync(core_management_host=None, core_management_port=None, svc=storage_svc)
+        _storage = _get_client(StorageClientAsync, core_management_host=None, core_management_port=None)
     except Exception as ex:
         _logger.error(ex)
         raise
@@ -33,9 +53,7 @@ def get_storage_async():
 def get_readings_async():
     """ Storage Object """
     try:
-        services = ServiceRegistry.get(name="Fledge Storage")
-        storage_svc = services[0]
-        _readings = ReadingsStorageClientAsync(core_mgt_host=None, core_mgt_port=None, svc=storage_svc)
+        _readings = _get_client(ReadingsStorageClientAsync, core_mgt_host=None, core_mgt_port=None)
     except Exception as ex:
         _logger.error(ex)
         raise
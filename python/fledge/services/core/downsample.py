@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+"""Shape preserving downsampling of a time series to a bounded number of points
+
+The readings of the time range are aggregated by the storage layer into time buckets holding the minimum and the
+maximum value of their readings, so that the number of rows read and the work done here depend on the number of
+points asked for, not on the number of readings. Two algorithms are supported:
+
+  lttb      Largest-Triangle-Three-Buckets over the minimum and maximum of twice as many time buckets as points,
+            keeps the visual shape of the series
+  minmax    minimum and maximum of each time bucket, keeps every peak of the series
+"""
+
+import datetime
+from abc import ABC, abstractmethod
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+class Downsampler(ABC):
+    """Base class of the downsamplers, fed with the time bucket rows of the storage layer
+
+    A bucket row is {"timestamp": bucket timestamp, "min": value, "max": value}, a point is a tuple
+    (seconds since the epoch, value, timestamp as given)
+    """
+
+    def __init__(self, points):
+        self._max_points = points
+
+    @property
+    @abstractmethod
+    def buckets(self):
+        """Number of time buckets the time range is to be aggregated into"""
+
+    @staticmethod
+    def _epoch(timestamp):
+        """Seconds of a 'YYYY-MM-DD HH:MM:SS[.ffffff]' timestamp, to order and space the points"""
+        seconds = datetime.datetime.fromisoformat(timestamp[:19]).timestamp()
+        fraction = timestamp[20:]
+        return seconds + float('0.' + fraction) if fraction else seconds
+
+    def series(self, rows):
+        """Returns the minimum and maximum points of the bucket rows, in timestamp order, the buckets with a non
+        numeric minimum or maximum are ignored"""
+        points = []
+        for row in sorted(rows, key=lambda r: r['timestamp']):
+            low = row.get('min')
+            high = row.get('max')
+            if type(low) not in (int, float) or type(high) not in (int, float):
+                continue
+            timestamp = row['timestamp']
+            t = self._epoch(timestamp)
+            points.append((t, low, timestamp))
+            if high != low:
+                points.append((t, high, timestamp))
+        return points
+
+    def result(self, rows):
+        """Returns the points kept from the bucket rows, in timestamp order"""
+        points = self.series(rows)
+        return points if len(points) <= self._max_points else self._downsample(points)
+
+    @abstractmethod
+    def _downsample(self, points):
+        pass
+
+
+class MinMaxDownsampler(Downsampler):
+    """Keeps the minimum and maximum point of each bucket, at most points in all"""
+
+    @property
+    def buckets(self):
+        # The storage layer may return one more bucket than the time range holds, as its buckets are aligned
+        return max(1, (self._max_points - 2) // 2)
+
+    def _downsample(self, points):
+        return points[:self._max_points]
+
+
+class LTTBDownsampler(Downsampler):
+    """Largest-Triangle-Three-Buckets, keeps the first and last point and one point per group of points
+
+    The point of a group is the one forming the largest triangle with the point kept for the previous group and
+    the average of the next group.
+    """
+
+    @property
+    def buckets(self):
+        return 2 * self._max_points
+
+    def _downsample(self, points):
+        threshold = self._max_points
+        every = (len(points) - 2) / (threshold - 2)
+        kept = [points[0]]
+        for i in range(threshold - 2):
+            start = int(i * every) + 1
+            end = int((i + 1) * every) + 1
+            following = points[end:min(int((i + 2) * every) + 1, len(points))]
+            c_t = sum(p[0] for p in following) / len(following)
+            c_v = sum(p[1] for p in following) / len(following)
+            a_t, a_v = kept[-1][0], kept[-1][1]
+            selected = max(points[start:end],
+                           key=lambda p: abs((a_t - c_t) * (p[1] - a_v) - (a_t - p[0]) * (c_v - a_v)))
+            kept.append(selected)
+        kept.append(points[-1])
+        return kept
+
+
+DOWNSAMPLERS = {'lttb': LTTBDownsampler, 'minmax': MinMaxDownsampler}
+"""Downsampler class by method name"""
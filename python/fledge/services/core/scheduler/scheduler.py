@@ -9,6 +9,8 @@
 import asyncio
 import collections
 import datetime
+import functools
+import heapq
 import logging
 import math
 import time
@@ -85,18 +87,43 @@ class Scheduler(object):
     # in _ScheduleExecution.
 
     class _ScheduleExecution(object):
-        """Tracks information about schedules"""
+        """Tracks information about schedules
 
-        __slots__ = ['next_start_time', 'task_processes', 'start_now']
+        on_change is called whenever next_start_time or start_now change, so that the scheduler
+        reconsiders the schedule without scanning all of them
+        """
 
-        def __init__(self):
-            self.next_start_time = None
+        __slots__ = ['_next_start_time', 'task_processes', '_start_now', '_on_change']
+
+        def __init__(self, on_change=None):
+            self._on_change = on_change
+            self._next_start_time = None
             """When to next start a task for the schedule"""
             self.task_processes = dict()
             """dict of task id to _TaskProcess"""
-            self.start_now = False
+            self._start_now = False
             """True when a task is queued to start via :meth:`start_task`"""
 
+        @property
+        def next_start_time(self):
+            return self._next_start_time
+
+        @next_start_time.setter
+        def next_start_time(self, value):
+            self._next_start_time = value
+            if self._on_change is not None:
+                self._on_change()
+
+        @property
+        def start_now(self):
+            return self._start_now
+
+        @start_now.setter
+        def start_now(self, value):
+            self._start_now = value
+            if self._on_change is not None:
+                self._on_change()
+
     # Constant class attributes
     _DEFAULT_MAX_RUNNING_TASKS = 50
     """Maximum number of running tasks allowed at any given time"""
@@ -164,6 +191,13 @@ class Scheduler(object):
         """Dictionary of schedules.id to _ScheduleRow"""
         self._schedule_executions = dict()
         """Dictionary of schedules.id to _ScheduleExecution"""
+        self._schedule_queue = []
+        """Heap of (next_start_time, schedules.id) entries. An entry is stale, and skipped, when it no longer
+        matches the next_start_time of the schedule execution"""
+        self._queued_start_times = dict()
+        """Dictionary of schedules.id to the next_start_time of its latest entry in _schedule_queue"""
+        self._schedules_to_check = set()
+        """schedules.id whose execution changed since :meth:`_check_schedules` last ran"""
         self._task_processes = dict()
         """Dictionary of tasks.id to _TaskProcess"""
         self._check_processes_pending = False
@@ -259,6 +293,9 @@ class Scheduler(object):
         elif schedule.exclusive:
             self._schedule_next_task(schedule)
 
+        # A task queued while this one was running may start now
+        self._schedules_to_check.add(schedule.id)
+
         if schedule.type != Schedule.Type.STARTUP:
             if exit_code < 0 and task_process.cancel_requested:
                 state = Task.State.CANCELED
@@ -434,77 +471,146 @@ class Scheduler(object):
                     time.time() - self._last_task_purge_time) >= self._PURGE_TASKS_FREQUENCY_SECONDS):
             self._purge_tasks_task = asyncio.ensure_future(self.purge_tasks())
 
+    def _new_schedule_execution(self, schedule_id):
+        """Creates and registers the execution of a schedule"""
+        schedule_execution = self._ScheduleExecution(
+            on_change=functools.partial(self._schedules_to_check.add, schedule_id))
+        self._schedule_executions[schedule_id] = schedule_execution
+        self._schedules_to_check.add(schedule_id)
+        return schedule_execution
+
+    def _queue_schedule(self, schedule_id, next_start_time):
+        """Pushes the next start time of a schedule in the heap, unless it is already there"""
+        if next_start_time and self._queued_start_times.get(schedule_id) != next_start_time:
+            self._queued_start_times[schedule_id] = next_start_time
+            heapq.heappush(self._schedule_queue, (next_start_time, schedule_id))
+            # Drop the stale entries when they outnumber the live ones
+            if len(self._schedule_queue) > 2 * len(self._queued_start_times) + 64:
+                self._schedule_queue = [(t, sid) for sid, t in self._queued_start_times.items()]
+                heapq.heapify(self._schedule_queue)
+
+    def _pop_due_schedule(self, now):
+        """Pops the id of a schedule whose next start time is due, or returns None"""
+        queue = self._schedule_queue
+        while queue and queue[0][0] <= now:
+            next_start_time, schedule_id = heapq.heappop(queue)
+            if self._queued_start_times.get(schedule_id) != next_start_time:
+                continue
+            del self._queued_start_times[schedule_id]
+            schedule_execution = self._schedule_executions.get(schedule_id)
+            if schedule_execution is not None and schedule_execution.next_start_time == next_start_time:
+                return schedule_id
+        return None
+
+    def _earliest_start_time(self):
+        """Returns the earliest next start time in the heap, dropping the stale entries on top"""
+        queue = self._schedule_queue
+        while queue:
+            next_start_time, schedule_id = queue[0]
+            schedule_execution = self._schedule_executions.get(schedule_id)
+            if self._queued_start_times.get(schedule_id) == next_start_time and schedule_execution is not None \
+                    and schedule_execution.next_start_time == next_start_time:
+                return next_start_time
+            heapq.heappop(queue)
+            if self._queued_start_times.get(schedule_id) == next_start_time:
+                del self._queued_start_times[schedule_id]
+        return None
+
     async def _check_schedules(self):
-        """Starts tasks according to schedules based on the current time"""
-        earliest_start_time = None
+        """Starts tasks according to schedules based on the current time
 
-        # Can not iterate over _schedule_executions - it can change mid-iteration
-        for schedule_id in list(self._schedule_executions.keys()):
-            if self._paused or len(self._task_processes) >= self._max_running_tasks:
-                return None
+        Only the schedules that changed since the last call, and the ones popped from the heap
+        because their next start time is due, are considered.
+        """
+        now = self.current_time if self.current_time else time.time()
+        checked = set()
+        # Schedules changed again, by another coroutine, after being checked in this call
+        changed_again = set()
+        try:
+            while True:
+                if self._paused or len(self._task_processes) >= self._max_running_tasks:
+                    return None
 
-            schedule_execution = self._schedule_executions[schedule_id]
+                if self._schedules_to_check:
+                    schedule_id = self._schedules_to_check.pop()
+                else:
+                    schedule_id = self._pop_due_schedule(now)
+                    if schedule_id is None:
+                        break
+                if schedule_id in checked:
+                    changed_again.add(schedule_id)
+                    continue
+                checked.add(schedule_id)
 
-            try:
-                schedule = self._schedules[schedule_id]
-            except KeyError:
-                # The schedule has been deleted
-                if not schedule_execution.task_processes:
-                    del self._schedule_executions[schedule_id]
-                continue
+                next_start_time = await self._check_schedule(schedule_id, now)
+                self._queue_schedule(schedule_id, next_start_time)
+        finally:
+            self._schedules_to_check |= changed_again
 
-            if schedule.enabled is False:
-                continue
+        return self._earliest_start_time()
 
-            if schedule.exclusive and schedule_execution.task_processes:
-                continue
+    async def _check_schedule(self, schedule_id, now):
+        """Starts a task for a schedule if it is time to, returns when the schedule must be checked next"""
+        schedule_execution = self._schedule_executions.get(schedule_id)
+        if schedule_execution is None:
+            return None
 
-            # next_start_time is None when repeat is None until the
-            # task completes, at which time schedule_execution is removed
-            next_start_time = schedule_execution.next_start_time
-            if not next_start_time and not schedule_execution.start_now:
-                if not schedule_execution.task_processes:
-                    del self._schedule_executions[schedule_id]
-                continue
+        try:
+            schedule = self._schedules[schedule_id]
+        except KeyError:
+            # The schedule has been deleted
+            if not schedule_execution.task_processes:
+                del self._schedule_executions[schedule_id]
+            return None
 
-            if next_start_time and not schedule_execution.start_now:
-                now = self.current_time if self.current_time else time.time()
-                right_time = now >= next_start_time
-            else:
-                right_time = False
-
-            if right_time or schedule_execution.start_now:
-                # Start a task
-
-                if not right_time:
-                    # Manual start - don't change next_start_time
-                    pass
-                elif schedule.exclusive:
-                    # Exclusive tasks won't start again until they terminate
-                    # Or the schedule doesn't repeat
-                    next_start_time = None
-                else:
-                    # _schedule_next_task alters next_start_time
-                    self._schedule_next_task(schedule)
-                    next_start_time = schedule_execution.next_start_time
+        # A disabled schedule, or an exclusive one with a running task, is checked again
+        # when it is enabled or when the task completes
+        if schedule.enabled is False:
+            return None
 
-                await self._start_task(schedule)
+        if schedule.exclusive and schedule_execution.task_processes:
+            return None
+
+        # next_start_time is None when repeat is None until the
+        # task completes, at which time schedule_execution is removed
+        next_start_time = schedule_execution.next_start_time
+        if not next_start_time and not schedule_execution.start_now:
+            if not schedule_execution.task_processes:
+                del self._schedule_executions[schedule_id]
+            return None
+
+        if next_start_time and not schedule_execution.start_now:
+            right_time = now >= next_start_time
+        else:
+            right_time = False
+
+        if right_time or schedule_execution.start_now:
+            # Start a task
+
+            if not right_time:
+                # Manual start - don't change next_start_time
+                pass
+            elif schedule.exclusive:
+                # Exclusive tasks won't start again until they terminate
+                # Or the schedule doesn't repeat
+                next_start_time = None
+            else:
+                # _schedule_next_task alters next_start_time
+                self._schedule_next_task(schedule)
+                next_start_time = schedule_execution.next_start_time
 
-                # Queued manual execution is ignored when it was
-                # already time to run the task. The task doesn't
-                # start twice even when nonexclusive.
-                # The choice to put this after "await" above was
-                # deliberate. The above "await" could have allowed
-                # queue_task() to run. The following line
-                # will undo that because, after all, the task started.
-                schedule_execution.start_now = False
+            await self._start_task(schedule)
 
-            # Keep track of the earliest next_start_time
-            if next_start_time and (earliest_start_time is None or
-                                            earliest_start_time > next_start_time):
-                earliest_start_time = next_start_time
+            # Queued manual execution is ignored when it was
+            # already time to run the task. The task doesn't
+            # start twice even when nonexclusive.
+            # The choice to put this after "await" above was
+            # deliberate. The above "await" could have allowed
+            # queue_task() to run. The following line
+            # will undo that because, after all, the task started.
+            schedule_execution.start_now = False
 
-        return earliest_start_time
+        return next_start_time
 
     async def _scheduler_loop(self):
         """Main loop for the scheduler"""
@@ -657,8 +763,7 @@ class Scheduler(object):
         try:
             schedule_execution = self._schedule_executions[schedule.id]
         except KeyError:
-            schedule_execution = self._ScheduleExecution()
-            self._schedule_executions[schedule.id] = schedule_execution
+            schedule_execution = self._new_schedule_execution(schedule.id)
 
         if schedule.type == Schedule.Type.INTERVAL:
             advance_seconds = schedule.repeat_seconds
@@ -943,6 +1048,9 @@ class Scheduler(object):
                 raise TimeoutError("Timeout Error: Could not stop scheduler as {} tasks are pending".format(task_count))
 
         self._schedule_executions = None
+        self._schedule_queue.clear()
+        self._queued_start_times.clear()
+        self._schedules_to_check.clear()
         self._task_processes = None
         self._schedules = None
         self._process_scripts = None
@@ -1161,6 +1269,7 @@ class Scheduler(object):
             process_name=schedule.process_name)
 
         self._schedules[schedule.schedule_id] = schedule_row
+        self._schedules_to_check.add(schedule.schedule_id)
 
         # Add process to self._process_scripts if not present.
         try:
@@ -1270,6 +1379,7 @@ class Scheduler(object):
         # Disable Schedule - update the schedule in memory
         prev_schedule_row = self._schedules[schedule_id]
         self._schedules[schedule_id] = self._schedules[schedule_id]._replace(enabled=False)
+        self._schedules_to_check.add(schedule_id)
 
         # Update database
         update_payload = PayloadBuilder().SET(enabled='f').WHERE(['id', '=', str(schedule_id)]).payload()
@@ -1433,8 +1543,7 @@ class Scheduler(object):
         try:
             schedule_execution = self._schedule_executions[schedule_id]
         except KeyError:
-            schedule_execution = self._ScheduleExecution()
-            self._schedule_executions[schedule_row.id] = schedule_execution
+            schedule_execution = self._new_schedule_execution(schedule_row.id)
 
         if start_now:
             schedule_execution.start_now = True
@@ -1466,6 +1575,7 @@ class Scheduler(object):
             raise ScheduleNotFoundError(schedule_id)
 
         del self._schedules[schedule_id]
+        self._schedules_to_check.add(schedule_id)
 
         # TODO: Inspect race conditions with _set_first
         delete_payload = PayloadBuilder() \
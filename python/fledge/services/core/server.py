@@ -32,6 +32,7 @@ from fledge.common.storage_client.storage_client import StorageClientAsync
 from fledge.common.storage_client.storage_client import ReadingsStorageClientAsync
 from fledge.common.web import middleware
 
+from fledge.services.core import connect
 from fledge.services.core import routes as admin_routes
 from fledge.services.core.api import configuration as conf_api
 from fledge.services.common.microservice_management import routes as management_routes
@@ -48,6 +49,7 @@ from fledge.services.core.user_model import User
 from fledge.common.storage_client import payload_builder
 from fledge.services.core.asset_tracker.asset_tracker import AssetTracker
 from fledge.services.core.api import asset_tracker as asset_tracker_api
+from fledge.services.core.api import browser as asset_browser
 from fledge.common.web.ssl_wrapper import SSLVerifier
 from fledge.services.core.api import exceptions as api_exception
 from fledge.services.core.api.control_service import acl_management as acl_management
@@ -311,10 +313,26 @@ class Server:
             'description': 'To control the caching size of Core Configuration Manager',
             'type': 'integer',
             'displayName': 'Cache Size',
-            'default': '30',
+            'default': '100',
             'order': '1',
             'minimum': '1',
             'maximum': '1000'
+        },
+        'cacheMaxBytes': {
+            'description': 'Upper bound of the size in bytes of the cached categories, 0 for no bound',
+            'type': 'integer',
+            'displayName': 'Cache Max Bytes',
+            'default': '0',
+            'order': '2',
+            'minimum': '0'
+        },
+        'cacheTTL': {
+            'description': 'Time in seconds after which a cached category is read again, 0 to never expire',
+            'type': 'integer',
+            'displayName': 'Cache TTL (In seconds)',
+            'default': '0',
+            'order': '3',
+            'minimum': '0'
         }
     }
 
@@ -664,6 +682,9 @@ class Server:
                     default_cache_size))
                 cache_size = default_cache_size
             cls._configuration_manager._cacheManager.max_cache_size = cache_size
+            cls._configuration_manager._cacheManager.max_cache_bytes = int(config['cacheMaxBytes']['value'])
+            cls._configuration_manager._cacheManager.ttl = int(config['cacheTTL']['value'])
+            await cls._configuration_manager.warm_cache()
         except Exception as ex:
             _logger.exception(ex)
             raise
@@ -1054,6 +1075,9 @@ class Server:
                 # Start asset tracker
                 loop.run_until_complete(cls._start_asset_tracker())
 
+                # Keep the asset structure catalog up to date in the background
+                loop.call_soon(asset_browser.start_asset_structure_catalog)
+
                 # Start Alert Manager
                 loop.run_until_complete(cls._get_alerts())
 
@@ -1138,11 +1162,19 @@ class Server:
             # stop the REST api (exposed on service port)
             await cls.stop_rest_server()
 
+            await asset_browser.stop_asset_structure_catalog()
+
             # Must write the audit log entry before we stop the storage service
             cls._audit = AuditLogger(cls._storage_client_async)
             audit_msg = {"message": "Exited from safe mode"} if cls.running_in_safe_mode else None
             await cls._audit.information('FSTOP', audit_msg)
 
+            # write the token expiries refreshed since the last flush
+            await User.Objects.flush_token_expiry()
+
+            # release the storage connection pools before the storage service goes away
+            await cls._close_storage_clients()
+
             # stop storage
             await cls.stop_storage()
 
@@ -1154,6 +1186,13 @@ class Server:
         except Exception:
             raise
 
+    @classmethod
+    async def _close_storage_clients(cls):
+        await connect.close_clients()
+        for client in (cls._storage_client_async, cls._readings_client_async):
+            if client is not None:
+                await client.close()
+
     @classmethod
     async def stop_rest_server(cls):
         # Delete all user tokens
@@ -7,6 +7,8 @@
 """Fledge Monitor module"""
 
 import asyncio
+import bisect
+import time
 import aiohttp
 import json
 from fledge.common import logger
@@ -36,6 +38,12 @@ class Monitor(object):
     _DEFAULT_RESTART_FAILED = "auto"
     """Restart failed microservice - manual/auto"""
 
+    _DEFAULT_MAX_CONCURRENT_PINGS = 10
+    """Maximum number of micro-services pinged at the same time"""
+
+    _RTT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+    """Upper bounds (in milliseconds) of the ping round trip time histogram buckets"""
+
     _logger = None
 
     def __init__(self):
@@ -51,6 +59,18 @@ class Monitor(object):
         """Number of max attempts for finding a heartbeat of service"""
         self._restart_failed = None  # type: str
         """Restart failed microservice - manual/auto"""
+        self._max_concurrent_pings = self._DEFAULT_MAX_CONCURRENT_PINGS  # type: int
+        """Maximum number of micro-services pinged at the same time"""
+        self._ping_slots = None  # type: asyncio.Semaphore
+        """Bounds the number of pings in progress"""
+        self._session = None  # type: aiohttp.ClientSession
+        """Client session shared by all the pings"""
+        self._ping_histograms = {}
+        """Dictionary of service name to its ping round trip time histogram"""
+        self._last_round = None
+        """Latency metrics of the last monitoring round"""
+        self._max_round_duration = 0.0
+        """Longest monitoring round (in milliseconds)"""
 
         self.restarted_services = []
         self._acl_handler = None
@@ -69,6 +89,8 @@ class Monitor(object):
             round_cnt += 1
             self._logger.debug("Starting next round#{} of service monitoring, sleep/i:{} ping/t:{} max/a:{}".format(
                 round_cnt, self._sleep_interval, self._ping_timeout, self._max_attempts))
+            round_start = time.monotonic()
+            probes = []
             for service_record in ServiceRegistry.all():
                 if service_record._id not in check_count:
                     check_count.update({service_record._id: 1})
@@ -95,53 +117,127 @@ class Monitor(object):
                          asyncio.ensure_future(self.restart_service(service_record))
                      continue
 
-                try:
-                    url = "{}://{}:{}/fledge/service/ping".format(
-                        service_record._protocol, service_record._address, service_record._management_port)
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(url, timeout=self._ping_timeout) as resp:
-                            text = await resp.text()
-                            res = json.loads(text)
-                            if res["uptime"] is None:
-                                raise ValueError('res.uptime is None')
-                except (asyncio.TimeoutError, aiohttp.client_exceptions.ServerTimeoutError) as ex:
-                    service_record._status = ServiceRecord.Status.Unresponsive
-                    check_count[service_record._id] += 1
-                    self._logger.info("ServerTimeoutError: %s, %s", str(ex), service_record.__repr__())
-                except aiohttp.client_exceptions.ClientConnectorError as ex:
-                    service_record._status = ServiceRecord.Status.Unresponsive
-                    check_count[service_record._id] += 1
-                    self._logger.info("ClientConnectorError: %s, %s", str(ex), service_record.__repr__())
-                except ValueError as ex:
-                    service_record._status = ServiceRecord.Status.Unresponsive
-                    check_count[service_record._id] += 1
-                    self._logger.info("Invalid response: %s, %s", str(ex), service_record.__repr__())
-                except Exception as ex:
-                    service_record._status = ServiceRecord.Status.Unresponsive
-                    check_count[service_record._id] += 1
-                    self._logger.info("Exception occurred: %s, %s", str(ex), service_record.__repr__())
-                else:
-                    service_record._status = ServiceRecord.Status.Running
-
-                    self._logger.debug("Resolving pending notification for ACL change "
-                                       "for service {} ".format(service_record._name))
-                    if not self._acl_handler:
-                        self._acl_handler = ACLManager(connect.get_storage_async())
-                    await self._acl_handler.\
-                        resolve_pending_notification_for_acl_change(service_record._name)
-
-                    check_count[service_record._id] = 1
-
-                if check_count[service_record._id] > self._max_attempts:
-                    ServiceRegistry.mark_as_failed(service_record._id)
-                    check_count[service_record._id] = 0
-                    try:
-                        audit = AuditLogger(connect.get_storage_async())
-                        await audit.failure('SRVFL', {'name':service_record._name})
-                    except Exception as ex:
-                        self._logger.info("Failed to audit service failure %s", str(ex))
+                probes.append(self._check_service(service_record, check_count))
+
+            # Probe all services together so that a hung service does not delay the detection of the others
+            results = await asyncio.gather(*probes)
+            self._record_round(round_cnt, round_start, results)
+            self._drop_ping_histograms()
             await self._sleep(self._sleep_interval)
 
+    def _get_session(self):
+        """Returns the client session shared by all the pings"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self._max_concurrent_pings)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def _check_service(self, service_record, check_count):
+        """Pings a service and updates its status
+
+        Returns:
+            True when the service responded
+        """
+        if self._ping_slots is None:
+            self._ping_slots = asyncio.Semaphore(self._max_concurrent_pings)
+        async with self._ping_slots:
+            ping_start = time.monotonic()
+            is_alive = await self._ping_service(service_record)
+            self._record_ping(service_record._name, time.monotonic() - ping_start)
+
+        if is_alive:
+            service_record._status = ServiceRecord.Status.Running
+
+            self._logger.debug("Resolving pending notification for ACL change "
+                               "for service {} ".format(service_record._name))
+            if not self._acl_handler:
+                self._acl_handler = ACLManager(connect.get_storage_async())
+            await self._acl_handler.\
+                resolve_pending_notification_for_acl_change(service_record._name)
+
+            check_count[service_record._id] = 1
+        else:
+            service_record._status = ServiceRecord.Status.Unresponsive
+            check_count[service_record._id] += 1
+
+        if check_count[service_record._id] > self._max_attempts:
+            ServiceRegistry.mark_as_failed(service_record._id)
+            check_count[service_record._id] = 0
+            try:
+                audit = AuditLogger(connect.get_storage_async())
+                await audit.failure('SRVFL', {'name':service_record._name})
+            except Exception as ex:
+                self._logger.info("Failed to audit service failure %s", str(ex))
+        return is_alive
+
+    async def _ping_service(self, service_record):
+        """Returns True when the service answers its ping within the ping timeout"""
+        try:
+            url = "{}://{}:{}/fledge/service/ping".format(
+                service_record._protocol, service_record._address, service_record._management_port)
+            async with self._get_session().get(url, timeout=self._ping_timeout) as resp:
+                text = await resp.text()
+                res = json.loads(text)
+                if res["uptime"] is None:
+                    raise ValueError('res.uptime is None')
+        except (asyncio.TimeoutError, aiohttp.client_exceptions.ServerTimeoutError) as ex:
+            self._logger.info("ServerTimeoutError: %s, %s", str(ex), service_record.__repr__())
+        except aiohttp.client_exceptions.ClientConnectorError as ex:
+            self._logger.info("ClientConnectorError: %s, %s", str(ex), service_record.__repr__())
+        except ValueError as ex:
+            self._logger.info("Invalid response: %s, %s", str(ex), service_record.__repr__())
+        except Exception as ex:
+            self._logger.info("Exception occurred: %s, %s", str(ex), service_record.__repr__())
+        else:
+            return True
+        return False
+
+    def _record_ping(self, name, rtt):
+        """Adds the round trip time, in seconds, of a ping to the histogram of the service"""
+        try:
+            histogram = self._ping_histograms[name]
+        except KeyError:
+            histogram = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0,
+                         "buckets": [0] * (len(self._RTT_BUCKETS) + 1)}
+            self._ping_histograms[name] = histogram
+        rtt_ms = rtt * 1000
+        histogram["count"] += 1
+        histogram["total"] += rtt_ms
+        histogram["last"] = rtt_ms
+        histogram["max"] = max(histogram["max"], rtt_ms)
+        histogram["buckets"][bisect.bisect_left(self._RTT_BUCKETS, rtt_ms)] += 1
+
+    def _drop_ping_histograms(self):
+        """Drops the histograms of the services no longer registered, or shut down"""
+        registered = {s._name for s in ServiceRegistry.all() if s._status != ServiceRecord.Status.Shutdown}
+        for name in [name for name in self._ping_histograms if name not in registered]:
+            del self._ping_histograms[name]
+
+    def _record_round(self, round_cnt, round_start, results):
+        """Keeps the latency metrics of a monitoring round"""
+        duration = (time.monotonic() - round_start) * 1000
+        self._last_round = {"round": round_cnt, "services": len(results),
+                            "unresponsive": results.count(False), "duration": round(duration, 3)}
+        self._max_round_duration = max(self._max_round_duration, duration)
+        self._logger.debug("Round#{} of service monitoring pinged {} services in {:.3f} ms, {} unresponsive".format(
+            round_cnt, len(results), duration, self._last_round["unresponsive"]))
+
+    def get_statistics(self):
+        """Returns the latency metrics of the last monitoring round and the ping round trip time
+        histograms of the services, all times are in milliseconds"""
+        le = [str(b) for b in self._RTT_BUCKETS] + ["+Inf"]
+        services = {}
+        for name, histogram in self._ping_histograms.items():
+            services[name] = {"count": histogram["count"],
+                              "average": round(histogram["total"] / histogram["count"], 3),
+                              "max": round(histogram["max"], 3),
+                              "last": round(histogram["last"], 3),
+                              "histogram": dict(zip(le, histogram["buckets"]))}
+        return {"maxConcurrentPings": self._max_concurrent_pings,
+                "lastRound": self._last_round,
+                "maxRoundDuration": round(self._max_round_duration, 3),
+                "services": services}
+
     async def _read_config(self):
         """Reads configuration"""
         default_config = {
@@ -173,6 +269,13 @@ class Monitor(object):
                 'options': ['auto', 'manual'],
                 "default": self._DEFAULT_RESTART_FAILED,
                 "displayName": "Restart Failed"
+            },
+            "max_concurrent_pings": {
+                "description": "Maximum number of micro-services pinged at the same time",
+                "type": "integer",
+                "default": str(self._DEFAULT_MAX_CONCURRENT_PINGS),
+                "displayName": "Max Concurrent Pings",
+                "minimum": "1"
             }
         }
 
@@ -186,6 +289,7 @@ class Monitor(object):
         self._ping_timeout = int(config['ping_timeout']['value'])
         self._max_attempts = int(config['max_attempts']['value'])
         self._restart_failed = config['restart_failed']['value']
+        self._max_concurrent_pings = int(config['max_concurrent_pings']['value'])
 
     async def restart_service(self, service_record):
         from fledge.services.core import server  # To avoid cyclic import as server also imports monitor
@@ -228,3 +332,6 @@ class Monitor(object):
             self._monitor_loop_task.cancel()
         except asyncio.CancelledError:
             pass
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
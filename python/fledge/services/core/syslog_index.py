@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+"""Incremental index of the Fledge lines of the syslog file
+
+The file is read once, then only the bytes appended since the previous query are indexed. For every Fledge
+source (program name as logged, e.g. "Fledge", "Fledge Storage", "Fledge <service name>") and level, the index keeps
+the byte offsets of its most recent lines, so that a page of the most recent matching lines is served by seeking
+to them. Older lines are forgotten, a query does not return them nor count them. A rotated or truncated file is
+indexed again from the start.
+
+The file is indexed a chunk at a time, each chunk being added to the index under a short lock, so that the queries
+being served are not held up by a long indexing.
+"""
+
+import array
+import heapq
+import os
+import re
+import threading
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+LEVELS = ('debug', 'info', 'warning', 'error')
+"""Supported levels, a query for a level returns the lines of that level and above"""
+
+_LEVEL_RANK = {b'DEBUG': 0, b'INFO': 1, b'WARNING': 2, b'ERROR': 3, b'FATAL': 3}
+_LINE_RE = re.compile(rb' (Fledge[^\[\n]*)\[\d+\]:? *(?:(DEBUG|INFO|WARNING|ERROR|FATAL):)?')
+_READ_CHUNK_SIZE = 1024 * 1024
+
+MAX_LINES = 100000
+"""Default number of most recent lines indexed for each source and level"""
+
+
+class SyslogIndex(object):
+    """Byte offsets of the most recent Fledge lines of a syslog file by source and level"""
+
+    def __init__(self, path, max_lines=MAX_LINES):
+        """
+        Args:
+            path: syslog file
+            max_lines: number of most recent lines indexed for each source and level
+        """
+        self.path = path
+        self.max_lines = max_lines
+        # Held while indexing, so that the file is indexed by one thread at a time
+        self._refresh_lock = threading.Lock()
+        # Held while the index is changed or read
+        self._lock = threading.Lock()
+        self._inode = None
+        self._position = 0
+        # source name -> list of array of line offsets, indexed by level rank
+        self._offsets = {}
+
+    def refresh(self):
+        """Indexes the lines appended to the file since the last refresh"""
+        with self._refresh_lock:
+            self._refresh()
+
+    def _refresh(self):
+        stat = os.stat(self.path)
+        if stat.st_ino != self._inode or stat.st_size < self._position:
+            # First read, rotated or truncated
+            with self._lock:
+                self._inode = stat.st_ino
+                self._position = 0
+                self._offsets = {}
+        if stat.st_size == self._position:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._position)
+            pending = b''
+            while True:
+                chunk = f.read(_READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                data = pending + chunk
+                last_newline = data.rfind(b'\n')
+                if last_newline == -1:
+                    pending = data
+                    continue
+                found = self._index_lines(data, last_newline + 1)
+                with self._lock:
+                    self._add(found)
+                    self._position += last_newline + 1
+                pending = data[last_newline + 1:]
+        # A partly written last line is indexed by the next refresh
+
+    def _index_lines(self, data, end):
+        """Returns the offsets of the Fledge lines of data[:end], source name -> list of arrays indexed by rank"""
+        found = {}
+        start = 0
+        base = self._position
+        while start < end:
+            line_end = data.index(b'\n', start)
+            match = _LINE_RE.search(data, start, line_end)
+            if match is not None:
+                source = match.group(1).decode('utf-8', 'replace')
+                rank = _LEVEL_RANK[match.group(2)] if match.group(2) else 0
+                try:
+                    by_rank = found[source]
+                except KeyError:
+                    by_rank = found[source] = [array.array('Q') for _ in LEVELS]
+                by_rank[rank].append(base + start)
+            start = line_end + 1
+        return found
+
+    def _add(self, found):
+        """Adds offsets found by _index_lines, forgetting the oldest ones beyond max_lines"""
+        for source, found_by_rank in found.items():
+            by_rank = self._offsets.get(source)
+            if by_rank is None:
+                by_rank = self._offsets[source] = [array.array('Q') for _ in LEVELS]
+            for offsets, new_offsets in zip(by_rank, found_by_rank):
+                offsets.extend(new_offsets)
+                # Trimmed once twice as long, so that the oldest offsets are not moved at every chunk
+                if len(offsets) > 2 * self.max_lines:
+                    del offsets[:len(offsets) - self.max_lines]
+
+    def sources(self):
+        with self._lock:
+            return sorted(self._offsets)
+
+    def query(self, sources=None, level='debug', offset=0, limit=20, keyword=None, count=True):
+        """Returns the matching lines, skipping the offset most recent ones, in file order
+
+        Args:
+            sources: source names as logged, None for all the Fledge sources
+            level: lowest level of the lines, one of LEVELS
+            offset: number of most recent matching lines to skip
+            limit: maximum number of lines to return
+            keyword: only lines containing this text
+            count: include the total number of matching lines still indexed in the result
+
+        Returns:
+            (lines, total) where total is None when count is False
+        """
+        min_rank = LEVELS.index(level)
+        self.refresh()
+        with self._lock:
+            if sources is None:
+                sources = list(self._offsets)
+            offset_lists = [by_rank[rank] for source in sources if source in self._offsets
+                            for by_rank in (self._offsets[source],) for rank in range(min_rank, len(LEVELS))]
+            offset_lists = [o for o in offset_lists if len(o)]
+            total = sum(len(o) for o in offset_lists)
+            # Copied, as a later refresh may trim them; a page needs only the most recent offsets of each list
+            needed = None if keyword else offset + limit
+            offset_lists = [o[max(len(o) - needed, 0):] if needed is not None else o[:] for o in offset_lists]
+        with open(self.path, 'rb') as f:
+            if not keyword:
+                recent = self._most_recent(offset_lists)
+                page = [next(recent, None) for _ in range(offset + limit)]
+                lines = [self._read_line(f, o) for o in page[offset:] if o is not None]
+            else:
+                needle = keyword.encode('utf-8')
+                lines = []
+                total = 0
+                for o in self._most_recent(offset_lists):
+                    line = self._read_line(f, o, decode=False)
+                    if needle not in line:
+                        continue
+                    if offset <= total < offset + limit:
+                        lines.append(line.decode('utf-8', 'replace'))
+                    total += 1
+                    if not count and total >= offset + limit:
+                        break
+        if not count:
+            total = None
+        lines.reverse()
+        return lines, total
+
+    @staticmethod
+    def _most_recent(offset_lists):
+        """Offsets of the lines from the most recent one"""
+        return heapq.merge(*[reversed(o) for o in offset_lists], reverse=True)
+
+    @staticmethod
+    def _read_line(f, offset, decode=True):
+        f.seek(offset)
+        line = f.readline()
+        return line.decode('utf-8', 'replace') if decode else line
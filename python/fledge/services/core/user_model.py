@@ -5,6 +5,7 @@
 # FLEDGE_END
 
 """Fledge user entity class with CRUD operations to Storage layer"""
+import asyncio
 import json
 import uuid
 import hashlib
@@ -32,6 +33,7 @@ ERROR_MSG = 'Something went wrong'
 USED_PASSWORD_HISTORY_COUNT = 3
 HASH_PWD_ALGORITHM = 'SHA512'
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+TOKEN_EXPIRY_FLUSH_INTERVAL = 10  # seconds between the batched writes of the refreshed token expiries
 _logger = FLCoreLogger().get_logger(__name__)
 
 
@@ -78,6 +80,60 @@ class User:
 
     class Objects:
 
+        _tokens = {}
+        """ verified token -> {"uid": user id, "expiry": token expiry datetime} """
+        _users = {}
+        """ user id -> enabled user row as returned by filter """
+        _expiry_refresh_pending = set()
+        """ tokens whose refreshed expiry is not yet written to storage """
+        _expiry_flush_task = None
+
+        @classmethod
+        def invalidate_token(cls, token):
+            cls._tokens.pop(token, None)
+            cls._expiry_refresh_pending.discard(token)
+
+        @classmethod
+        def invalidate_user(cls, user_id):
+            """ forget the cached user row, e.g. after its role or enabled state changed """
+            cls._users.pop(int(user_id), None)
+
+        @classmethod
+        def invalidate_user_tokens(cls, user_id):
+            for token, entry in list(cls._tokens.items()):
+                if int(entry["uid"]) == int(user_id):
+                    cls.invalidate_token(token)
+
+        @classmethod
+        def clear_cache(cls):
+            cls._tokens.clear()
+            cls._users.clear()
+            cls._expiry_refresh_pending.clear()
+
+        @classmethod
+        async def flush_token_expiry(cls):
+            """ write the refreshed expiry of the tokens used since the last flush with a single update """
+            if not cls._expiry_refresh_pending:
+                return
+            tokens = list(cls._expiry_refresh_pending)
+            cls._expiry_refresh_pending.clear()
+            exp = datetime.now() + timedelta(seconds=JWT_EXP_DELTA_SECONDS)
+            storage_client = connect.get_storage_async()
+            payload = PayloadBuilder().SET(token_expiration=str(exp)).WHERE(['token', 'in', tokens]
+                                                                            ).MODIFIER(["allowzero"]).payload()
+            try:
+                await storage_client.update_tbl("user_logins", payload)
+            except Exception as ex:
+                # keep the tokens for the next flush
+                cls._expiry_refresh_pending.update(t for t in tokens if t in cls._tokens)
+                _logger.error(ex, "Failed to refresh the expiry of {} tokens.".format(len(tokens)))
+
+        @classmethod
+        async def _flush_token_expiry_later(cls):
+            await asyncio.sleep(TOKEN_EXPIRY_FLUSH_INTERVAL)
+            cls._expiry_flush_task = None
+            await cls.flush_token_expiry()
+
         @classmethod
         async def get_roles(cls):
             storage_client = connect.get_storage_async()
@@ -160,6 +216,7 @@ class User:
                 payload = PayloadBuilder().SET(enabled="f").WHERE(['id', '=', user_id]).AND_WHERE(
                     ['enabled', '=', 't']).payload()
                 result = await storage_client.update_tbl("users", payload)
+                cls.invalidate_user(user_id)
                 # USRDL audit trail entry
                 audit = AuditLogger(storage_client)
                 await audit.information(
@@ -221,6 +278,7 @@ class User:
                 payload = PayloadBuilder().SET(**new_kwargs).WHERE(['id', '=', user_id]).AND_WHERE(
                     ['enabled', '=', 't']).payload()
                 result = await storage_client.update_tbl("users", payload)
+                cls.invalidate_user(user_id)
                 if result['rows_affected']:
                     # FIXME: FOGL-1226 active session delete only in case of role_id and password updation
                     if 'password' in user_data or 'role_id' in user_data:
@@ -289,6 +347,11 @@ class User:
 
         @classmethod
         async def get(cls, uid=None, username=None):
+            if uid is not None and username is None:
+                try:
+                    return cls._users[int(uid)]
+                except (KeyError, TypeError, ValueError):
+                    pass
             users = await cls.filter(uid=uid, username=username)
             if len(users) == 0:
                 msg = ''
@@ -300,12 +363,21 @@ class User:
                     msg = "User with id:<{}> and name:<{}> does not exist".format(uid, username)
 
                 raise User.DoesNotExist(msg)
+            if uid is not None and username is None:
+                cls._users[int(uid)] = users[0]
             return users[0]
 
         @classmethod
         async def refresh_token_expiry(cls, token):
-            storage_client = connect.get_storage_async()
             exp = datetime.now() + timedelta(seconds=JWT_EXP_DELTA_SECONDS)
+            if token in cls._tokens:
+                # coalesce the writes of the tokens in use, these are done every TOKEN_EXPIRY_FLUSH_INTERVAL
+                cls._tokens[token]["expiry"] = exp
+                cls._expiry_refresh_pending.add(token)
+                if cls._expiry_flush_task is None:
+                    cls._expiry_flush_task = asyncio.ensure_future(cls._flush_token_expiry_later())
+                return
+            storage_client = connect.get_storage_async()
             """ MODIFIER with allowzero is passed in payload so that storage returns rows_affected 0 in any case """
             payload = PayloadBuilder().SET(token_expiration=str(exp)).WHERE(['token', '=', token]
                                                                             ).MODIFIER(["allowzero"]).payload()
@@ -319,6 +391,15 @@ class User:
             :param token:
             :return:
             """
+            try:
+                cached = cls._tokens[token]
+            except KeyError:
+                pass
+            else:
+                if cached["expiry"] > datetime.now():
+                    return cached["uid"]
+                cls.invalidate_token(token)
+
             storage_client = connect.get_storage_async()
             payload = PayloadBuilder().SELECT("token_expiration") \
                 .ALIAS("return", ("token_expiration", 'token_expiration')) \
@@ -340,6 +421,7 @@ class User:
             # as we want to refresh token on each successful request
             # and extend it to keep session alive
             user_payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM], options={'verify_exp': False})
+            cls._tokens[token] = {"uid": user_payload["uid"], "expiry": datetime.strptime(token_expiry, DATE_FORMAT)}
             return user_payload["uid"]
 
         @classmethod
@@ -531,6 +613,7 @@ class User:
                 if not ex.error["retryable"]:
                     pass
                 raise ValueError(ERROR_MSG)
+            cls.invalidate_user_tokens(user_id)
             # Remove user session on basis of user id
             await User.Sessions.remove(data={"uid": user_id})
             return res
@@ -545,6 +628,7 @@ class User:
                 if not ex.error["retryable"]:
                     pass
                 raise ValueError(ERROR_MSG)
+            cls.invalidate_token(token)
             # Remove user session on basis of token
             await User.Sessions.remove(data={"token": token})
             return res
@@ -553,6 +637,8 @@ class User:
         async def delete_all_user_tokens(cls):
             storage_client = connect.get_storage_async()
             await storage_client.delete_from_tbl("user_logins")
+            cls._tokens.clear()
+            cls._expiry_refresh_pending.clear()
             # Clear all user sessions
             await User.Sessions.clear()
 
@@ -14,6 +14,7 @@ import json
 
 from fledge.common import logger
 from fledge.common import statistics
+from fledge.common.batch_size import AdaptiveBatchSize
 from fledge.common.storage_client.exceptions import StorageServerError
 
 __author__ = "Terris Linenbach, Amarendra K Sinha"
@@ -102,10 +103,37 @@ class Ingest(object):
     _max_readings_insert_batch_reconnect_wait_seconds = 10
     """The maximum number of seconds to wait before reconnecting to storage when inserting readings"""
 
+    _readings_insert_batch_size_adaptive = False
+    """Adapt the batch size to the insert latency, between the minimum and maximum batch sizes"""
+
+    _readings_insert_batch_size_min = 64
+    """Minimum number of readings in a batch of inserts when the batch size is adaptive"""
+
+    _readings_insert_batch_size_max = 4096
+    """Maximum number of readings in a batch of inserts when the batch size is adaptive"""
+
+    _readings_insert_latency_target_seconds = 0.5
+    """Number of seconds an insert should take when the batch size is adaptive"""
+
     # Configuration (end)
 
-    _payload_events = []
-    """The list of unique reading payload for asset tracker"""
+    _batch_size = None  # type: AdaptiveBatchSize
+    """Adapts _readings_insert_batch_size to the insert latency, None when the batch size is static"""
+
+    _batch_size_stats_keys = None  # type: tuple
+    """Statistics keys counting the increases and decreases of the batch size"""
+
+    _asset_tracker_keys = set()
+    """(asset, event, service, plugin) keys already known to the asset tracker"""
+
+    _asset_tracker_queue = []
+    """Asset tracker events waiting to be registered with the core"""
+
+    _asset_tracker_queue_not_empty = None  # type: asyncio.Event
+    """Fired when asset tracker events are queued"""
+
+    _asset_tracker_task = None  # type: asyncio.Task
+    """asyncio task for :meth:`_register_asset_tracker_events`"""
 
     stats = None
     """Statistics class instance"""
@@ -158,6 +186,30 @@ class Ingest(object):
                 "type": "integer",
                 "default": str(cls._max_readings_insert_batch_reconnect_wait_seconds)
             },
+            "readings_insert_batch_size_adaptive": {
+                "description": "Adapt the number of readings in a batch of inserts to the insert latency",
+                "displayName": "Adaptive Batch Size",
+                "type": "boolean",
+                "default": str(cls._readings_insert_batch_size_adaptive).lower()
+            },
+            "readings_insert_batch_size_min": {
+                "description": "Minimum number of readings in a batch of inserts when the batch size is adaptive",
+                "displayName": "Minimum Adaptive Batch Size",
+                "type": "integer",
+                "default": str(cls._readings_insert_batch_size_min)
+            },
+            "readings_insert_batch_size_max": {
+                "description": "Maximum number of readings in a batch of inserts when the batch size is adaptive",
+                "displayName": "Maximum Adaptive Batch Size",
+                "type": "integer",
+                "default": str(cls._readings_insert_batch_size_max)
+            },
+            "readings_insert_latency_target_seconds": {
+                "description": "Number of seconds an insert should take when the batch size is adaptive",
+                "displayName": "Insert Latency Target",
+                "type": "float",
+                "default": str(cls._readings_insert_latency_target_seconds)
+            },
         }
 
         # Create configuration category and any new keys within it
@@ -167,17 +219,18 @@ class Ingest(object):
             "value": default_config,
             "keep_original_items": True
         })
-        cls._parent_service._core_microservice_management_client.create_configuration_category(config_payload)
+        client = cls._parent_service._core_microservice_management_client_async
+        await client.create_configuration_category(config_payload)
 
         # Check and warn if pipeline exists in South service
         if 'filter' in cls._parent_service.config:
             _LOGGER.warning('South Service [%s] does not support the use of a filter pipeline.', cls._parent_service._name)
 
         # Read configuration
-        config = cls._parent_service._core_microservice_management_client.get_configuration_category(category_name=category)
+        config = await client.get_configuration_category(category_name=category)
 
         # Create child category
-        cls._parent_service._core_microservice_management_client.create_child_category(parent=cls._parent_service._name, children=[category])
+        await client.create_child_category(parent=cls._parent_service._name, children=[category])
 
         cls._readings_buffer_size = int(config['readings_buffer_size']['value'])
         cls._max_concurrent_readings_inserts = int(config['max_concurrent_readings_inserts']
@@ -191,8 +244,15 @@ class Ingest(object):
             ['value'])
         cls._max_readings_insert_batch_reconnect_wait_seconds = int(
             config['max_readings_insert_batch_reconnect_wait_seconds']['value'])
+        if 'readings_insert_batch_size_adaptive' in config:
+            cls._readings_insert_batch_size_adaptive = \
+                config['readings_insert_batch_size_adaptive']['value'].lower() == 'true'
+            cls._readings_insert_batch_size_min = int(config['readings_insert_batch_size_min']['value'])
+            cls._readings_insert_batch_size_max = int(config['readings_insert_batch_size_max']['value'])
+            cls._readings_insert_latency_target_seconds = float(
+                config['readings_insert_latency_target_seconds']['value'])
 
-        cls._payload_events = []
+        cls._asset_tracker_keys = set()
 
     @classmethod
     async def start(cls, parent):
@@ -225,6 +285,18 @@ class Ingest(object):
                             'to %s', cls._readings_buffer_size,
                             cls._readings_list_size * cls._max_concurrent_readings_inserts)
 
+        cls._batch_size = None
+        if cls._readings_insert_batch_size_adaptive:
+            # A batch cannot be larger than a readings list
+            maximum = min(cls._readings_insert_batch_size_max, cls._readings_list_size)
+            try:
+                cls._batch_size = AdaptiveBatchSize(cls._readings_insert_batch_size,
+                                                    min(cls._readings_insert_batch_size_min, maximum), maximum,
+                                                    cls._readings_insert_latency_target_seconds)
+                cls._readings_insert_batch_size = cls._batch_size.size
+            except ValueError as ex:
+                _LOGGER.warning('The batch size is not adaptive: %s', str(ex))
+
         cls._last_insert_time = 0
         cls._insert_readings_wait_tasks = []
         cls._readings_list_batch_size_reached = []
@@ -240,7 +312,10 @@ class Ingest(object):
         cls._insert_readings_task = asyncio.ensure_future(cls._insert_readings())
         cls._readings_lists_not_full = asyncio.Event()
 
-        cls._payload_events = cls._parent_service._core_microservice_management_client.get_asset_tracker_events()['track']
+        tracked = await cls._parent_service._core_microservice_management_client_async.get_asset_tracker_events()
+        cls._asset_tracker_keys = {(e['asset'], e['event'], e['service'], e['plugin']) for e in tracked['track']}
+        cls._asset_tracker_queue = []
+        cls._asset_tracker_queue_not_empty = asyncio.Event()
 
         cls.stats = await statistics.create_statistics(cls.storage_async)
 
@@ -249,8 +324,19 @@ class Ingest(object):
         await cls.stats.register('DISCARDED', 'Readings discarded at the input side by Fledge, i.e. '
                                               'discarded before being placed in the buffer. This may be due to some '
                                               'error in the readings themselves.')
+        if cls._batch_size is not None:
+            name = cls._parent_service._name.upper()
+            cls._batch_size_stats_keys = ('{}_BATCH_INCREASED'.format(name), '{}_BATCH_DECREASED'.format(name))
+            await cls.stats.register(cls._batch_size_stats_keys[0],
+                                     'Number of times the readings insert batch size has been increased')
+            await cls.stats.register(cls._batch_size_stats_keys[1],
+                                     'Number of times the readings insert batch size has been decreased')
+
+        # The statistics written after each insert are accumulated and flushed periodically
+        cls.stats.start()
 
         cls._stop = False
+        cls._asset_tracker_task = asyncio.ensure_future(cls._register_asset_tracker_events())
         cls._started = True
 
     @classmethod
@@ -275,6 +361,20 @@ class Ingest(object):
         except Exception:
             _LOGGER.exception('An exception was raised by Ingest._insert_readings')
 
+        if cls._asset_tracker_task is not None:
+            cls._asset_tracker_queue_not_empty.set()
+            try:
+                await cls._asset_tracker_task
+            except Exception:
+                _LOGGER.exception('An exception was raised by Ingest._register_asset_tracker_events')
+            cls._asset_tracker_task = None
+            cls._asset_tracker_queue_not_empty = None
+
+        try:
+            await cls.stats.stop()
+        except Exception:
+            _LOGGER.exception('An exception was raised by writing the statistics')
+
         cls._insert_readings_wait_tasks = None
         cls._insert_readings_tasks = None
         cls._readings_lists = None
@@ -357,14 +457,17 @@ class Ingest(object):
             while True:
                 try:
                     batch_size = len(readings_list)
-                    payload = json.dumps({"readings": readings_list[:batch_size]})
-                    # insert_start_time = time.time()
+                    # Handed over as a python object, the storage client encodes it once without re-parsing
+                    payload = {"readings": readings_list[:batch_size]}
                     # _LOGGER.debug('Begin insert: Queue index: %s Batch size: %s', list_index, batch_size)
                     try:
+                        insert_start_time = time.time()
                         await cls.readings_storage_async.append(payload)
-                        # insert_end_time = time.time()
                         # _LOGGER.debug('Inserted %s records in time %s', batch_size, insert_end_time - insert_start_time)
                         cls._readings_stats += batch_size
+                        if cls._batch_size is not None:
+                            cls._readings_insert_batch_size = cls._batch_size.record(
+                                batch_size, time.time() - insert_start_time)
                     except StorageServerError as ex:
                         err_response = ex.error
                         # if key error in next, it will be automatically in parent except block
@@ -403,36 +506,70 @@ class Ingest(object):
 
         _LOGGER.info('Insert readings loop stopped')
 
+    @classmethod
+    async def _register_asset_tracker_events(cls):
+        """Registers queued asset tracker events with the core
+
+        All the events queued since the last wakeup are sent together by the async management client, so that
+        registering them never stalls the event loop.
+        """
+        while True:
+            if not cls._asset_tracker_queue:
+                if cls._stop:
+                    break
+                cls._asset_tracker_queue_not_empty.clear()
+                await cls._asset_tracker_queue_not_empty.wait()
+                continue
+            batch = cls._asset_tracker_queue
+            cls._asset_tracker_queue = []
+            failed = await cls._create_asset_tracker_events(batch)
+            # Forget the failed keys so that the next reading of these assets queues them again
+            cls._asset_tracker_keys.difference_update(failed)
+
+    @classmethod
+    async def _create_asset_tracker_events(cls, keys):
+        """Sends a batch of asset tracker events to the core, returns the keys that could not be registered"""
+        client = cls._parent_service._core_microservice_management_client_async
+        results = await asyncio.gather(*[client.create_asset_tracker_event(
+            {"asset": asset, "event": event, "service": service, "plugin": plugin})
+            for asset, event, service, plugin in keys], return_exceptions=True)
+        failed = []
+        for key, result in zip(keys, results):
+            if isinstance(result, Exception):
+                _LOGGER.error('Failed to register asset tracker event for asset %s: %s', key[0], str(result))
+                failed.append(key)
+        return failed
+
     @classmethod
     async def _write_statistics(cls):
-        """Periodically commits collected readings statistics"""
+        """Moves the collected readings statistics to the statistics accumulator, that writes them periodically"""
 
-        updates = {}
+        """ Register the statistics keys as this may be the first time the key has come into existence """
+        sensor_readings = cls._sensor_stats.copy()
+        try:
+            for key in sensor_readings:
+                description = 'Readings received by Fledge since startup for sensor {}'.format(key)
+                await cls.stats.register(key, description)
+        except Exception as ex:
+            _LOGGER.exception(ex, 'An error occurred while writing sensor statistics')
+            return
 
         readings = cls._readings_stats
         cls._readings_stats -= readings
-        updates.update({'READINGS': readings})
+        cls.stats.add('READINGS', readings)
 
         discarded_readings = cls._discarded_readings_stats
         cls._discarded_readings_stats -= discarded_readings
-        updates.update({'DISCARDED': discarded_readings})
+        cls.stats.add('DISCARDED', discarded_readings)
 
-        """ Register the statistics keys as this may be the first time the key has come into existence """
-        sensor_readings = cls._sensor_stats.copy()
         for key in sensor_readings:
-            description = 'Readings received by Fledge since startup for sensor {}'.format(key)
-            await cls.stats.register(key, description)
             cls._sensor_stats[key] -= sensor_readings[key]
-            updates.update({key: sensor_readings[key]})
+            cls.stats.add(key, sensor_readings[key])
 
-        try:
-            await cls.stats.update_bulk(updates)
-        except Exception as ex:
-            cls._readings_stats += readings
-            cls._discarded_readings_stats += discarded_readings
-            for key in sensor_readings:
-                cls._sensor_stats[key] += sensor_readings[key]
-            _LOGGER.exception(ex, 'An error occurred while writing sensor statistics')
+        if cls._batch_size is not None:
+            increases, decreases = cls._batch_size.decisions()
+            cls.stats.add(cls._batch_size_stats_keys[0], increases)
+            cls.stats.add(cls._batch_size_stats_keys[1], decreases)
 
     @classmethod
     def is_available(cls) -> bool:
@@ -458,6 +595,45 @@ class Ingest(object):
         _LOGGER.warning('The ingest service is unavailable %s', list_index)
         return False
 
+    @classmethod
+    def _validate_reading(cls, asset, timestamp, readings):
+        """Checks the values of a reading and returns its readings dictionary
+
+        Raises:
+            ValueError, TypeError:
+                An invalid value was provided
+        """
+        if asset is None:
+            raise ValueError('asset can not be None')
+
+        if not isinstance(asset, str):
+            raise TypeError('asset must be a string')
+
+        if timestamp is None:
+            raise ValueError('timestamp can not be None')
+
+        # if not isinstance(timestamp, datetime.datetime):
+        #     # validate
+        #     timestamp = dateutil.parser.parse(timestamp)
+
+        if readings is None:
+            readings = dict()
+        elif not isinstance(readings, dict):
+            # Postgres allows values like 5 be converted to JSON
+            # Downstream processors can not handle this
+            raise TypeError('readings must be a dictionary')
+        return readings
+
+    @classmethod
+    def _track_asset(cls, asset):
+        """Queues the asset tracker event of an asset the first time it is seen"""
+        key = (asset, "Ingest", cls._parent_service._name, cls._parent_service._plugin_info['config']['plugin']['default'])
+        if key not in cls._asset_tracker_keys:
+            cls._asset_tracker_keys.add(key)
+            cls._asset_tracker_queue.append(key)
+            if cls._asset_tracker_queue_not_empty is not None:
+                cls._asset_tracker_queue_not_empty.set()
+
     @classmethod
     async def add_readings(cls, asset: str, timestamp: Union[str, datetime.datetime],
                            readings: dict = None) -> None:
@@ -487,25 +663,7 @@ class Ingest(object):
             # cls._logger = logger.setup(__name__, destination=logger.CONSOLE, level=logging.DEBUG)
 
         try:
-            if asset is None:
-                raise ValueError('asset can not be None')
-
-            if not isinstance(asset, str):
-                raise TypeError('asset must be a string')
-
-            if timestamp is None:
-                raise ValueError('timestamp can not be None')
-
-            # if not isinstance(timestamp, datetime.datetime):
-            #     # validate
-            #     timestamp = dateutil.parser.parse(timestamp)
-
-            if readings is None:
-                readings = dict()
-            elif not isinstance(readings, dict):
-                # Postgres allows values like 5 be converted to JSON
-                # Downstream processors can not handle this
-                raise TypeError('readings must be a dictionary')
+            readings = cls._validate_reading(asset, timestamp, readings)
         except Exception:
             cls.increment_discarded_readings()
             raise
@@ -532,12 +690,8 @@ class Ingest(object):
         else:
             cls._sensor_stats[asset.upper()] = 1
 
-        # asset tracker checking
-        payload = {"asset": asset, "event": "Ingest", "service": cls._parent_service._name,
-                   "plugin": cls._parent_service._plugin_info['config']['plugin']['default']}
-        if payload not in cls._payload_events:
-            cls._parent_service._core_microservice_management_client.create_asset_tracker_event(payload)
-            cls._payload_events.append(payload)
+        # asset tracker checking, new assets are registered in the background
+        cls._track_asset(asset)
 
         # _LOGGER.debug('Add readings list index: %s size: %s', cls._current_readings_list_index, list_size)
 
@@ -558,3 +712,91 @@ class Ingest(object):
                     # _LOGGER.debug('Change Ingest Queue: from #%s (len %s) to #%s', cls._current_readings_list_index,
                     #               len(cls._readings_lists[list_index]), list_index)
                     break
+
+    @classmethod
+    async def add_readings_batch(cls, readings: List[dict]) -> dict:
+        """Adds a list of asset readings records to Fledge
+
+        The whole list is validated and appended to the readings lists in chunks, statistics and asset
+        tracking are accounted once per batch. Invalid readings, and the readings that do not fit in the
+        buffer, are discarded and counted instead of raising.
+
+        Args:
+            readings: A list of readings records, each a dictionary with asset, timestamp and readings
+
+        Returns:
+            A dictionary with the number of accepted and discarded readings
+
+        Raises:
+            RuntimeError:
+                The server has not been started
+        """
+        if cls._stop:
+            _LOGGER.warning('The South Service is stopping')
+            return {"accepted": 0, "discarded": 0}
+
+        if not cls._started:
+            raise RuntimeError('The South Service was not started')
+
+        valid = []
+        discarded = 0
+        error = None
+        for reading in readings:
+            try:
+                asset = reading['asset']
+                values = cls._validate_reading(asset, reading['timestamp'], reading.get('readings'))
+            except (KeyError, TypeError, ValueError, AttributeError) as ex:
+                discarded += 1
+                error = ex
+                continue
+            valid.append({'asset_code': asset, 'reading': values, 'user_ts': reading['timestamp']})
+        if error is not None:
+            _LOGGER.warning('Discarded %s invalid readings, last error: %s', discarded, str(error))
+
+        accepted = 0
+        while accepted < len(valid):
+            # If an empty slot is not available, discard the remaining readings
+            if not cls.is_available():
+                break
+
+            list_index = cls._current_readings_list_index
+            readings_list = cls._readings_lists[list_index]
+
+            # Fill the current list up to the batch size, so that the next lists are used concurrently,
+            # and only past that up to the list size
+            limit = cls._readings_list_size
+            if cls._max_concurrent_readings_inserts > 1 and len(readings_list) < cls._readings_insert_batch_size:
+                limit = cls._readings_insert_batch_size
+            chunk = valid[accepted:accepted + limit - len(readings_list)]
+            was_empty = len(readings_list) == 0
+            readings_list.extend(chunk)
+            accepted += len(chunk)
+
+            list_size = len(readings_list)
+            if was_empty:
+                cls._readings_list_not_empty[list_index].set()
+
+            if list_size >= cls._readings_insert_batch_size:
+                cls._readings_list_batch_size_reached[list_index].set()
+
+                # When the current list is full, move on to the next list
+                if cls._max_concurrent_readings_inserts > 1:
+                    for list_index in range(cls._max_concurrent_readings_inserts):
+                        if len(cls._readings_lists[list_index]) < cls._readings_insert_batch_size:
+                            cls._current_readings_list_index = list_index
+                            break
+
+        discarded += len(valid) - accepted
+        cls._discarded_readings_stats += discarded
+
+        # Increment the count of received readings to be used for statistics update
+        assets = {}
+        for read in valid[:accepted]:
+            asset = read['asset_code']
+            assets[asset] = assets.get(asset, 0) + 1
+        for asset, count in assets.items():
+            key = asset.upper()
+            cls._sensor_stats[key] = cls._sensor_stats.get(key, 0) + count
+            cls._track_asset(asset)
+
+        return {"accepted": accepted, "discarded": discarded}
@@ -9,6 +9,9 @@
 import json
 import asyncio
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from fledge.services.south import exceptions
 from fledge.common import logger
 from fledge.services.south.ingest import Ingest
@@ -63,8 +66,53 @@ class Server(FledgeMicroservice):
 
     _event_loop = None
 
+    _POLL_CONFIG = {
+        "poll_execution_mode": {
+            "description": "Run the plugin poll calls inline on the event loop, or in a dedicated thread so that "
+                           "a slow poll does not block the service; the plugin must then support being polled "
+                           "from another thread",
+            "displayName": "Poll Execution",
+            "type": "enumeration",
+            "options": ["inline", "thread"],
+            "default": "inline"
+        },
+        "max_concurrent_polls": {
+            "description": "Maximum number of poll calls in flight, including the ones that timed out "
+                           "and are still running",
+            "displayName": "Max Concurrent Polls",
+            "type": "integer",
+            "default": "1"
+        },
+        "poll_timeout_seconds": {
+            "description": "Number of seconds to wait for a poll call before giving up on it, 0 to wait forever",
+            "displayName": "Poll Timeout",
+            "type": "integer",
+            "default": "0"
+        }
+    }
+    """ Poll execution items added to the advanced configuration category of the service """
+
+    _poll_executor = None
+    """ Thread pool running the plugin poll calls, None when they run on the event loop """
+
+    _poll_slots = None
+    """ Semaphore bounding the number of poll calls in flight """
+
+    _max_concurrent_polls = 1
+    """ Number of slots of _poll_slots """
+
+    _plugin_lock = None
+    """ Lock serialising the plugin calls that must not overlap a poll """
+
+    _poll_timeout = None
+    """ Seconds to wait for a poll call, None to wait forever """
+
+    _poll_stats = None
+    """ Per poll latency statistics """
+
     def __init__(self):
         super().__init__()
+        self._poll_stats = {"count": 0, "timeouts": 0, "last": 0.0, "average": 0.0, "max": 0.0}
 
     async def _start(self, loop) -> None:
         error = None
@@ -147,6 +195,9 @@ class Server(FledgeMicroservice):
             self._plugin_handle = self._plugin.plugin_init(self.config)
             await Ingest.start(self)
 
+            if self._plugin_info['mode'] == 'poll':
+                self._read_poll_config()
+
             # Executes the requested plugin type
             if self._plugin_info['mode'] == 'async':
                 self._task_main = asyncio.ensure_future(self._exec_plugin_async())
@@ -168,6 +219,98 @@ class Server(FledgeMicroservice):
         _LOGGER.info('Started South Plugin: {}'.format(self._name))
         self._plugin.plugin_start(self._plugin_handle)
 
+    def _read_poll_config(self):
+        """ Creates the poll execution items in the advanced category and sets up the poll executor """
+        category = "{}Advanced".format(self._name)
+        config_payload = json.dumps({
+            "key": category,
+            "description": '{} South Service Ingest configuration'.format(self._name),
+            "value": self._POLL_CONFIG,
+            "keep_original_items": True
+        })
+        self._core_microservice_management_client.create_configuration_category(config_payload)
+        config = self._core_microservice_management_client.get_configuration_category(category_name=category)
+
+        def value(item):
+            try:
+                return config[item]['value']
+            except (KeyError, TypeError):
+                return self._POLL_CONFIG[item]['default']
+
+        max_concurrent_polls = max(int(value('max_concurrent_polls')), 1)
+        poll_timeout = int(value('poll_timeout_seconds'))
+        self._poll_timeout = poll_timeout if poll_timeout > 0 else None
+        self._max_concurrent_polls = max_concurrent_polls
+        self._poll_slots = asyncio.Semaphore(max_concurrent_polls)
+        if self._poll_executor is not None:
+            self._poll_executor.shutdown(wait=False)
+            self._poll_executor = None
+        if value('poll_execution_mode') == 'thread':
+            self._poll_executor = ThreadPoolExecutor(max_workers=max_concurrent_polls,
+                                                     thread_name_prefix='poll-{}'.format(self._name))
+
+    async def _poll(self):
+        """ Calls plugin_poll, in the poll executor when there is one, and records its latency
+
+        A poll that times out keeps its slot until the plugin returns, so hung polls can not pile up
+        beyond the maximum number of concurrent polls.
+        """
+        start = time.perf_counter()
+        if self._poll_executor is None:
+            data = self._plugin.plugin_poll(self._plugin_handle)
+        else:
+            await self._poll_slots.acquire()
+            try:
+                if self._plugin is None:
+                    raise exceptions.DataRetrievalError('Plugin {} is stopped'.format(self._name))
+                future = self._event_loop.run_in_executor(self._poll_executor, self._plugin.plugin_poll,
+                                                          self._plugin_handle)
+            except Exception:
+                self._poll_slots.release()
+                raise
+            future.add_done_callback(self._poll_done)
+            try:
+                data = await asyncio.wait_for(asyncio.shield(future), self._poll_timeout)
+            except asyncio.TimeoutError:
+                self._poll_stats['timeouts'] += 1
+                raise exceptions.DataRetrievalError('Poll of plugin {} timed out after {} seconds'.format(
+                    self._name, self._poll_timeout))
+        latency = time.perf_counter() - start
+        stats = self._poll_stats
+        stats['count'] += 1
+        stats['last'] = latency
+        stats['average'] += (latency - stats['average']) / stats['count']
+        if latency > stats['max']:
+            stats['max'] = latency
+        return data
+
+    @asynccontextmanager
+    async def _no_poll_in_flight(self):
+        """ Holds all the poll slots, so that the plugin is called while no poll is running in the poll executor
+
+        Polls that timed out keep their slot until the plugin returns, they are waited for as well.
+        """
+        if self._plugin_lock is None:
+            self._plugin_lock = asyncio.Lock()
+        async with self._plugin_lock:
+            slots = self._poll_slots
+            acquired = 0
+            try:
+                if slots is not None:
+                    for _ in range(self._max_concurrent_polls):
+                        await slots.acquire()
+                        acquired += 1
+                yield
+            finally:
+                for _ in range(acquired):
+                    slots.release()
+
+    def _poll_done(self, future):
+        self._poll_slots.release()
+        # Retrieve the outcome of polls nobody is waiting for anymore
+        if not future.cancelled():
+            future.exception()
+
     async def _exec_plugin_poll(self) -> None:
         """Executes poll type plugin
         """
@@ -185,13 +328,10 @@ class Server(FledgeMicroservice):
         while self._plugin and try_count <= _MAX_RETRY_POLL:
             try:
                 t1 = self._event_loop.time()
-                data = self._plugin.plugin_poll(self._plugin_handle)
+                data = await self._poll()
                 if len(data) > 0:
                     if isinstance(data, list):
-                        for reading in data:
-                            asyncio.ensure_future(Ingest.add_readings(asset=reading['asset'],
-                                                                        timestamp=reading['timestamp'],
-                                                                        readings=reading['readings']))
+                        await Ingest.add_readings_batch(data)
                     elif isinstance(data, dict):
                         asyncio.ensure_future(Ingest.add_readings(asset=data['asset'],
                                                                   timestamp=data['timestamp'],
@@ -227,7 +367,8 @@ class Server(FledgeMicroservice):
     async def _stop(self, loop):
         if self._plugin is not None:
             try:
-                self._plugin.plugin_shutdown(self._plugin_handle)
+                async with self._no_poll_in_flight():
+                    self._plugin.plugin_shutdown(self._plugin_handle)
             except Exception as ex:
                 _LOGGER.exception("Unable to stop plugin '%s' | reason: %s", self._name, str(ex))
                 #  must not prevent Fledge shutting down cleanly via the API call.
@@ -235,6 +376,9 @@ class Server(FledgeMicroservice):
             finally:
                 self._plugin = None
                 self._plugin_handle = None
+                if self._poll_executor is not None:
+                    self._poll_executor.shutdown(wait=False)
+                    self._poll_executor = None
 
         try:
             await Ingest.stop()
@@ -245,6 +389,8 @@ class Server(FledgeMicroservice):
             _LOGGER.exception('Unable to stop the Ingest server. %s', str(ex))
             raise ex
 
+        await self.close()
+
         try:
             if self._task_main is not None:
                 self._task_main.cancel()
@@ -264,6 +410,15 @@ class Server(FledgeMicroservice):
         _LOGGER.info('Stopping South service event loop, for plugin {}.'.format(self._name))
         loop.stop()
 
+    async def ping(self, request):
+        """ health check, with the poll latency statistics of poll plugins
+        """
+        since_started = time.time() - self._start_time
+        response = {'uptime': since_started}
+        if self._plugin_info is not None and self._plugin_info['mode'] == 'poll':
+            response['poll'] = dict(self._poll_stats)
+        return web.json_response(response)
+
     async def shutdown(self, request):
         """implementation of abstract method form fledge.common.microservice.
         """
@@ -297,15 +452,17 @@ class Server(FledgeMicroservice):
 
         try:
             # retrieve new configuration
-            new_config = self._core_microservice_management_client.get_configuration_category(category_name=self._name)
+            new_config = await self._core_microservice_management_client_async.get_configuration_category(
+                category_name=self._name)
 
             # Check and warn if pipeline exists in South service
             if 'filter' in new_config:
                 _LOGGER.warning('South Service [%s] does not support the use of a filter pipeline.', self._name)
 
             # plugin_reconfigure and assign new handle
-            new_handle = self._plugin.plugin_reconfigure(self._plugin_handle, new_config)
-            self._plugin_handle = new_handle
+            async with self._no_poll_in_flight():
+                new_handle = self._plugin.plugin_reconfigure(self._plugin_handle, new_config)
+                self._plugin_handle = new_handle
 
             _LOGGER.info('Reconfiguration done for South plugin {}'.format(self._name))
             if new_handle['restart'] == 'yes':
@@ -25,13 +25,15 @@ import logging
 import datetime
 import signal
 import json
+import collections
 
-import fledge.plugins.north.common.common as plugin_common
 from fledge.common.parser import Parser
 from fledge.common.storage_client.storage_client import StorageClientAsync, ReadingsStorageClientAsync
 from fledge.common.storage_client import payload_builder
 from fledge.common import statistics
+from fledge.common.batch_size import AdaptiveBatchSize
 from fledge.common.jqfilter import JQFilter
+from fledge.tasks.north.transform import ReadingsTransform, apply_date_format
 from fledge.common.audit_logger import AuditLogger
 from fledge.common.logger import FLCoreLogger
 from fledge.common.process import FledgeProcess
@@ -114,52 +116,6 @@ class InvalidCommandLineParameters(RuntimeError):
     pass
 
 
-def apply_date_format(in_data):
-    """ This routine adds the UTC Zulu time to the input date time string
-    a) Space in datetime string is replaced with "T"
-    b) If a timezone (strting with + or -) is found, all the following chars
-    are replaced by "Z", otherwise Z is added.
-    Note: if the input zone is +02:00 no date conversion is done,
-          at the time being this routine expects UTC date time values.
-    Examples:
-        2018-05-28 16:56:55              ==> 2018-05-28T16:56:55.000000Z
-        2018-05-28 13:42:28.84           ==> 2018-05-28T13:42:28.840000Z
-        2018-03-22 17:17:17.166347       ==> 2018-03-22T17:17:17.166347Z
-        2020-03-30 05:35:24.066553Z      ==> 2020-03-30T05:35:24.066553Z
-        2018-03-22 17:17:17.166347+00:00 ==> 2018-03-22T17:17:17.166347Z
-        2018-03-22 17:17:17.166347+00    ==> 2018-03-22T17:17:17.166347Z
-        2018-03-22 17:17:17.166347+02:00 ==> 2018-03-22T17:17:17.166347Z
-    Args:
-        the date time string to format
-    Returns:
-        the newly formatted datetime string
-    """
-    # Look for timezone start with '-' a the end of the date (-XY:WZ)
-    zone_index = in_data.rfind("-")
-    # If index is less than 10 we don't have the trailing zone with -
-    if zone_index < 10:
-        #  Look for timezone start with '+' (+XY:ZW)
-        zone_index = in_data.rfind("+")
-    if zone_index == -1:
-        if in_data.rfind(".") == -1:
-            # there are no milliseconds in the date
-            in_data += ".000000"
-        # Pads with 0 if needed
-        in_data = in_data.ljust(26, '0')
-        # Replace space with T (i.e b/w date & time)
-        timestamp = in_data.replace(" ", "T")
-        # Just add UTC Zulu time if Z not present in in_data
-        if 'Z' not in in_data:
-            timestamp = timestamp + "Z"
-    else:
-        # Replace space with T (i.e b/w date & time) and UTC Zulu time
-        timestamp = in_data[:zone_index].replace(" ", "T") + "Z"
-        if in_data[zone_index:] not in ('+00', '+00:00'):
-            _LOGGER.warning("Non-UTC {} timezone is found. Hence no date conversion is done at the time being "
-                            "this routine expects UTC date time values".format(in_data[zone_index:]))
-    return timestamp
-
-
 def _performance_log(func):
     """ Logs information for performance measurement """
 
@@ -203,6 +159,8 @@ class SendingProcess(FledgeProcess):
     _logger = None  # type: logging.Logger
     _stop_execution = False
     """ sets to True when a signal is captured and a termination is needed """
+    _readings_transform = ReadingsTransform()
+    """ Converts the blocks of readings, keeps the asset codes and timestamp formats met across the blocks """
     TASK_FETCH_SLEEP = 0.5
     """ The amount of time the fetch operation will sleep if there are no more data to load or in case of an error """
     TASK_SEND_SLEEP = 0.5
@@ -253,6 +211,43 @@ class SendingProcess(FledgeProcess):
             "default": "10",
             "order": "12",
             "displayName": "Memory Buffer Size"
+        },
+        "maxConcurrentSends": {
+            "description": "Maximum number of blocks being sent at the same time, the plugin must support "
+                           "concurrent sends to use more than 1",
+            "type": "integer",
+            "default": "1",
+            "minimum": "1",
+            "order": "13",
+            "displayName": "Maximum Concurrent Sends"
+        },
+        "blockSizeAdaptive": {
+            "description": "Adapt the number of readings sent in each transmission to the send latency",
+            "type": "boolean",
+            "default": "false",
+            "order": "14",
+            "displayName": "Adaptive Block Size"
+        },
+        "blockSizeMinimum": {
+            "description": "Minimum number of readings in each transmission when the block size is adaptive",
+            "type": "integer",
+            "default": "100",
+            "order": "15",
+            "displayName": "Minimum Adaptive Block Size"
+        },
+        "blockSizeMaximum": {
+            "description": "Maximum number of readings in each transmission when the block size is adaptive",
+            "type": "integer",
+            "default": "50000",
+            "order": "16",
+            "displayName": "Maximum Adaptive Block Size"
+        },
+        "sendLatencyTarget": {
+            "description": "Number of seconds a transmission should take when the block size is adaptive",
+            "type": "float",
+            "default": "1.0",
+            "order": "17",
+            "displayName": "Send Latency Target"
         }
     }
 
@@ -267,8 +262,15 @@ class SendingProcess(FledgeProcess):
             'blockSize': int(self._CONFIG_DEFAULT['blockSize']['default']),
             'sleepInterval': float(self._CONFIG_DEFAULT['sleepInterval']['default']),
             'memory_buffer_size': int(self._CONFIG_DEFAULT['memory_buffer_size']['default']),
+            'maxConcurrentSends': int(self._CONFIG_DEFAULT['maxConcurrentSends']['default']),
+            'blockSizeAdaptive': False,
+            'blockSizeMinimum': int(self._CONFIG_DEFAULT['blockSizeMinimum']['default']),
+            'blockSizeMaximum': int(self._CONFIG_DEFAULT['blockSizeMaximum']['default']),
+            'sendLatencyTarget': float(self._CONFIG_DEFAULT['sendLatencyTarget']['default']),
         }
         self._config_from_manager = ""
+        self._jqfilter = JQFilter()
+        """ Applies the filterRule, keeps its compiled jq program """
         self._module_template = "fledge.plugins.north." + "empty." + "empty"
         self._plugin = importlib.import_module(self._module_template)
         self._plugin_info = {
@@ -294,14 +296,13 @@ class SendingProcess(FledgeProcess):
         self._task_fetch_data_task_id = None
         self._task_send_data_task_id = None
         """" Used to to managed the fetch/send operations """
-        self._task_fetch_data_sem = None
-        self._task_send_data_sem = None
-        """" Semaphores used for the synchronization of the fetch/send operations """
-        self._memory_buffer = [None]
-        """" In memory buffer where the data is loaded from the storage layer before to send it to the plugin """
-        self._memory_buffer_fetch_idx = 0
-        self._memory_buffer_send_idx = 0
-        """" Used to to managed the in memory buffer for the fetch/send operations """
+        self._task_stop = None
+        """" Set when the fetch/send operations should terminate """
+        self._block_size = None
+        """" Adapts blockSize to the send latency, None when the block size is static """
+        self._memory_buffer = None
+        """" In memory buffer where the data is loaded from the storage layer before to send it to the plugin,
+             a queue of at most memory_buffer_size blocks """
         self._event_loop = asyncio.get_event_loop() if loop is None else loop
 
     @staticmethod
@@ -323,8 +324,16 @@ class SendingProcess(FledgeProcess):
         try:
             key = self.statistics_key
             _stats = await statistics.create_statistics(self._storage_async)
-            await _stats.update(key, num_sent)
-            await _stats.update(self.master_statistics_key, num_sent)
+            _stats.add(key, num_sent)
+            _stats.add(self.master_statistics_key, num_sent)
+            if self._block_size is not None:
+                increases, decreases = self._block_size.decisions()
+                name = self._name.upper()
+                for key, decisions, action in (('{}_BATCH_INCREASED'.format(name), increases, 'increased'),
+                                               ('{}_BATCH_DECREASED'.format(name), decreases, 'decreased')):
+                    await _stats.register(key, 'Number of times the block size has been {}'.format(action))
+                    _stats.add(key, decisions)
+            await _stats.flush()
         except Exception:
             _message = _MESSAGES_LIST["e000010"]
             SendingProcess._logger.error(_message)
@@ -348,88 +357,151 @@ class SendingProcess(FledgeProcess):
         await self._update_statistics(tot_num_sent)
         await self._audit.information(self._AUDIT_CODE, {"sentRows": tot_num_sent})
 
+    async def _track_assets(self, block):
+        """ Adds the asset tracker events of the assets sent not tracked yet"""
+        for _reads in block:
+            payload = {"asset": _reads['asset_code'], "event": "Egress", "service": self._name,
+                       "plugin": self._config['plugin']}
+            if payload not in self._tracked_assets:
+                # Tracked before the request, so that the blocks sent concurrently do not add it again
+                self._tracked_assets.append(payload)
+                try:
+                    await self._core_microservice_management_client_async.create_asset_tracker_event(payload)
+                except Exception:
+                    self._tracked_assets.remove(payload)
+                    raise
+
+    async def _wait_or_stop(self, future):
+        """ Waits for the future unless the termination of the tasks is requested first
+
+        Returns:
+            True if the future is done, False if it has been cancelled because of the termination
+        """
+        stop = asyncio.ensure_future(self._task_stop.wait())
+        try:
+            await asyncio.wait([future, stop], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop.cancel()
+        if future.done():
+            return True
+        future.cancel()
+        return False
+
+    async def _send_block(self, block):
+        """ Sends a block of data using the loaded plugin, retrying until it is sent or the sending task terminates
+
+        Returns:
+            (new_last_object_id, num_sent) as returned by the plugin, None if the block has not been sent
+        """
+        sleep_time = self.TASK_SEND_SLEEP
+        sleep_num_increments = 1
+        while True:
+            try:
+                send_start_time = time.time()
+                data_sent, new_last_object_id, num_sent = \
+                    await self._plugin.plugin_send(self._plugin_handle, block, self._stream_id)
+                if data_sent and self._block_size is not None:
+                    # The next blocks are fetched with the adapted size
+                    self._config['blockSize'] = self._block_size.record(len(block), time.time() - send_start_time)
+            except Exception as ex:
+                _message = _MESSAGES_LIST["e000021"].format(ex)
+                SendingProcess._logger.error(_message)
+                await self._audit.failure(self._AUDIT_CODE, {"error - on _task_send_data": _message})
+                data_sent = False
+            if data_sent:
+                await self._track_assets(block)
+                self.performance_track("task _task_send_data")
+                return new_last_object_id, num_sent
+            if not self._task_send_data_run:
+                return None
+            await asyncio.sleep(sleep_time)
+            # Handles the sleep time, it is doubled every time up to a limit
+            sleep_num_increments += 1
+            sleep_time *= 2
+            if sleep_num_increments > self.TASK_SLEEP_MAX_INCREMENTS:
+                sleep_time = self.TASK_SEND_SLEEP
+                sleep_num_increments = 1
+
     async def _task_send_data(self):
-        """ Sends the data from the in memory structure to the destination using the loaded plugin"""
-        data_sent = False
+        """ Sends the data from the in memory structure to the destination using the loaded plugin
+
+        Up to maxConcurrentSends blocks are sent at the same time. The blocks are acknowledged in the order they
+        have been fetched, the position reached moves past a block only when the block and all the blocks fetched
+        before it have been sent.
+        """
         db_update = False
         update_last_object_id = 0
         tot_num_sent = 0
         update_position_idx = 0
+        # Blocks being sent, in the order they have been fetched
+        in_flight = collections.deque()
+        get_block = None
+        acknowledge = True
 
         try:
-            self._memory_buffer_send_idx = 0
-            sleep_time = self.TASK_SEND_SLEEP
-            sleep_num_increments = 1
-
-            while self._task_send_data_run:
-                slept = False
-                if self._memory_buffer_send_idx < self._config['memory_buffer_size']:
-                    new_last_object_id = None
-                    num_sent = 0
-                    if self._memory_buffer[self._memory_buffer_send_idx] is not None:  # if there are data to send
-                        try:
-                            data_sent, new_last_object_id, num_sent = \
-                                await self._plugin.plugin_send(self._plugin_handle,
-                                                               self._memory_buffer[self._memory_buffer_send_idx], self._stream_id)
-                        except Exception as ex:
-                            _message = _MESSAGES_LIST["e000021"].format(ex)
-                            SendingProcess._logger.error(_message)
-                            await self._audit.failure(self._AUDIT_CODE, {"error - on _task_send_data": _message})
-                            data_sent = False
-                            slept = True
-                            await asyncio.sleep(sleep_time)
-
-                        if data_sent:
-                            # asset tracker checking
-                            for _reads in self._memory_buffer[self._memory_buffer_send_idx]:
-                                payload = {"asset": _reads['asset_code'], "event": "Egress", "service": self._name,
-                                           "plugin": self._config['plugin']}
-                                if payload not in self._tracked_assets:
-                                    self._core_microservice_management_client.create_asset_tracker_event(
-                                        payload)
-                                    self._tracked_assets.append(payload)
-
-                            db_update = True
-                            update_last_object_id = new_last_object_id
-                            tot_num_sent = tot_num_sent + num_sent
-                            self._memory_buffer[self._memory_buffer_send_idx] = None
-                            self._memory_buffer_send_idx += 1
-                            self._task_send_data_sem.release()
-                            self.performance_track("task _task_send_data")
-                    else:
-                        # Updates the position before going to wait for the semaphore
-                        if db_update:
-                            await self._update_position_reached(update_last_object_id, tot_num_sent)
-                            update_position_idx = 0
-                            tot_num_sent = 0
-                            db_update = False
-                        await self._task_fetch_data_sem.acquire()
-
+            while True:
+                if db_update and not in_flight and self._memory_buffer.empty():
+                    # Updates the position before going to wait for new data
+                    await self._update_position_reached(update_last_object_id, tot_num_sent)
+                    update_position_idx = 0
+                    tot_num_sent = 0
+                    db_update = False
+                if get_block is None and self._task_send_data_run and \
+                        len(in_flight) < self._config['maxConcurrentSends']:
+                    get_block = asyncio.ensure_future(self._memory_buffer.get())
+                elif get_block is not None and not self._task_send_data_run:
+                    # Termination requested, no new block is sent but the blocks being sent are completed
+                    get_block.cancel()
+                    get_block = None
+
+                waiting = [send for send in in_flight if not send.done()]
+                if get_block is not None:
+                    waiting.append(get_block)
+                if not waiting and not in_flight:
+                    break
+                if waiting:
+                    if get_block is None:
+                        await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                    elif not await self._wait_or_stop(asyncio.ensure_future(
+                            asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED))):
+                        get_block.cancel()
+                        get_block = None
+
+                if get_block is not None and get_block.done():
+                    in_flight.append(asyncio.ensure_future(self._send_block(get_block.result())))
+                    get_block = None
+
+                # Acknowledges the blocks sent, in order
+                while in_flight and in_flight[0].done():
+                    sent = in_flight.popleft().result()
+                    if sent is None:
+                        # Not sent, the blocks fetched after it are not acknowledged either
+                        acknowledge = False
+                    if not acknowledge:
+                        continue
+                    new_last_object_id, num_sent = sent
+                    db_update = True
+                    update_last_object_id = new_last_object_id
+                    tot_num_sent = tot_num_sent + num_sent
                     # Updates the Storage layer every 'self.UPDATE_POSITION_MAX' interactions
-                    if db_update:
-                        if update_position_idx >= self.TASK_SEND_UPDATE_POSITION_MAX:
-                            await self._update_position_reached(update_last_object_id, tot_num_sent)
-                            update_position_idx = 0
-                            tot_num_sent = 0
-                            db_update = False
-                        else:
-                            update_position_idx += 1
-                else:
-                    self._memory_buffer_send_idx = 0
-
-                # Handles the sleep time, it is doubled every time up to a limit
-                if slept:
-                    sleep_num_increments += 1
-                    sleep_time *= 2
-                    if sleep_num_increments > self.TASK_SLEEP_MAX_INCREMENTS:
-                        sleep_time = self.TASK_SEND_SLEEP
-                        sleep_num_increments = 1
+                    if update_position_idx >= self.TASK_SEND_UPDATE_POSITION_MAX:
+                        await self._update_position_reached(update_last_object_id, tot_num_sent)
+                        update_position_idx = 0
+                        tot_num_sent = 0
+                        db_update = False
+                    else:
+                        update_position_idx += 1
 
             # Checks if the information on the Storage layer needs to be updates
             if db_update:
                 await self._update_position_reached(update_last_object_id, tot_num_sent)
         except Exception as ex:
-            SendingProcess._logger.error(_MESSAGES_LIST["e000021"].format(ex))
+            _message = _MESSAGES_LIST["e000021"].format(ex)
+            SendingProcess._logger.error(_message)
+            for send in in_flight:
+                send.cancel()
+            if get_block is not None:
+                get_block.cancel()
             if db_update:
                 await self._update_position_reached(update_last_object_id, tot_num_sent)
             await self._audit.failure(self._AUDIT_CODE, {"error - on _task_send_data": _message})
@@ -487,43 +559,12 @@ class SendingProcess(FledgeProcess):
                 '{"value":02}'
             so these rows will generate an exception and will be skipped.
         """
-
-        def recurse(reading_payload):
-            for k, v in reading_payload.items():
-                if isinstance(v, dict):
-                    for k1, v1 in v.items():
-                        if isinstance(v1, dict):
-                            reading_payload[k][k1] = plugin_common.convert_to_type(v1)
-                            recurse(v1)
-                else:
-                    reading_payload[k] = plugin_common.convert_to_type(v)
-            return reading_payload
-
-        converted_data = []
-        for row in raw_data:
-
-            try:
-
-                asset_code = row['asset_code'].replace(" ", "")
-
-                # Skips row having undefined asset_code
-                if asset_code != "":
-                    # Converts values to the proper types, for example "180.2" to float 180.2
-                    payload = recurse(row['reading'])
-                    timestamp = apply_date_format(row['user_ts'])  # Adds timezone UTC
-                    new_row = {
-                        'id': row['id'],
-                        'asset_code': asset_code,
-                        'reading': payload,
-                        'user_ts': timestamp
-                    }
-                    converted_data.append(new_row)
-                else:
-                    SendingProcess._logger.warning(_MESSAGES_LIST["e000032"].format(row))
-
-            except Exception as e:
-                SendingProcess._logger.warning(_MESSAGES_LIST["e000031"].format(str(e), row))
-
+        converted_data, rejected = SendingProcess._readings_transform.transform(raw_data)
+        for row, error in rejected:
+            if error is None:
+                SendingProcess._logger.warning(_MESSAGES_LIST["e000032"].format(row))
+            else:
+                SendingProcess._logger.warning(_MESSAGES_LIST["e000031"].format(str(error), row))
         return converted_data
 
     async def _load_data_into_memory_readings(self, last_object_id):
@@ -575,63 +616,46 @@ class SendingProcess(FledgeProcess):
         return last_object_id
 
     async def _task_fetch_data(self):
-        """ Read data from the Storage Layer into a memory structure"""
+        """ Read data from the Storage Layer into a memory structure
+
+        A new block is loaded as soon as there is space for it in the in memory buffer, the task sleeps only when
+        there is no more data to load or in case of an error.
+        """
         try:
             last_object_id = await self._last_object_id_read()
-            self._memory_buffer_fetch_idx = 0
             sleep_time = self.TASK_FETCH_SLEEP
             sleep_num_increments = 1
             while self._task_fetch_data_run:
-                slept = False
-                if self._memory_buffer_fetch_idx < self._config['memory_buffer_size']:
-                    # Checks if there is enough space to load a new block of data
-                    if self._memory_buffer[self._memory_buffer_fetch_idx] is None:
-                        try:
-                            data_to_send = await self._load_data_into_memory(last_object_id)
-                        except Exception as ex:
-                            _message = _MESSAGES_LIST["e000028"].format(ex)
-                            SendingProcess._logger.error(_message)
-                            await self._audit.failure(self._AUDIT_CODE, {"error - on _task_fetch_data": _message})
-                            data_to_send = False
-                            slept = True
-                            await asyncio.sleep(sleep_time)
-                        if data_to_send:
-                            if 'applyFilter' in self._config_from_manager:
-                                # Handles the JQFilter functionality
-                                if self._config_from_manager['applyFilter']["value"].upper() == "TRUE":
-                                    jqfilter = JQFilter()
-                                    # Steps needed to proper format the data generated by the JQFilter
-                                    # to the one expected by the SP
-                                    if 'filterRule' in self._config_from_manager:
-                                        data_to_send_2 = jqfilter.transform(data_to_send,
-                                                                            self._config_from_manager['filterRule']["value"])
-                                        data_to_send_3 = json.dumps(data_to_send_2)
-                                        del data_to_send_2
-                                        data_to_send_4 = eval(data_to_send_3)
-                                        del data_to_send_3
-                                        data_to_send = data_to_send_4[0]
-                                        del data_to_send_4
-                                    else:
-                                        _LOGGER.warning("filterRule config item is missing to apply filter expression.")
-
-                            # Loads the block of data into the in memory buffer
-                            self._memory_buffer[self._memory_buffer_fetch_idx] = data_to_send
-                            last_position = len(data_to_send) - 1
-                            last_object_id = data_to_send[last_position]['id']
-                            self._memory_buffer_fetch_idx += 1
-                            self._task_fetch_data_sem.release()
-                            self.performance_track("task _task_fetch_data")
-                        else:
-                            # There is no more data to load
-                            slept = True
-                            await asyncio.sleep(sleep_time)
-                    else:
-                        # There is no more space in the in memory buffer
-                        await self._task_send_data_sem.acquire()
+                try:
+                    data_to_send = await self._load_data_into_memory(last_object_id)
+                except Exception as ex:
+                    _message = _MESSAGES_LIST["e000028"].format(ex)
+                    SendingProcess._logger.error(_message)
+                    await self._audit.failure(self._AUDIT_CODE, {"error - on _task_fetch_data": _message})
+                    data_to_send = False
+                if data_to_send:
+                    if 'applyFilter' in self._config_from_manager:
+                        # Handles the JQFilter functionality
+                        if self._config_from_manager['applyFilter']["value"].upper() == "TRUE":
+                            # The filter is compiled once, by its first block
+                            if 'filterRule' in self._config_from_manager:
+                                data_to_send = self._jqfilter.transform(
+                                    data_to_send, self._config_from_manager['filterRule']["value"])[0]
+                            else:
+                                _LOGGER.warning("filterRule config item is missing to apply filter expression.")
+
+                    last_position = len(data_to_send) - 1
+                    last_object_id = data_to_send[last_position]['id']
+                    # Loads the block of data into the in memory buffer, waits while it is full
+                    if not await self._wait_or_stop(asyncio.ensure_future(self._memory_buffer.put(data_to_send))):
+                        break
+                    self.performance_track("task _task_fetch_data")
+                    sleep_time = self.TASK_FETCH_SLEEP
+                    sleep_num_increments = 1
                 else:
-                    self._memory_buffer_fetch_idx = 0
-                # Handles the sleep time, it is doubled every time up to a limit
-                if slept:
+                    # There is no more data to load, or it failed to load
+                    await self._wait_or_stop(asyncio.ensure_future(asyncio.sleep(sleep_time)))
+                    # Handles the sleep time, it is doubled every time up to a limit
                     sleep_num_increments += 1
                     sleep_time *= 2
                     if sleep_num_increments > self.TASK_SLEEP_MAX_INCREMENTS:
@@ -647,13 +671,21 @@ class SendingProcess(FledgeProcess):
         """ Handles the sending of the data to the destination using the configured plugin for a defined amount of time"""
 
         # Prepares the in memory buffer for the fetch/send operations
-        self._memory_buffer = [None for _ in range(self._config['memory_buffer_size'])]
-        self._task_fetch_data_sem = asyncio.Semaphore(0)
-        self._task_send_data_sem = asyncio.Semaphore(0)
-        self._task_fetch_data_task_id = asyncio.ensure_future(self._task_fetch_data())
-        self._task_send_data_task_id = asyncio.ensure_future(self._task_send_data())
+        self._memory_buffer = asyncio.Queue(maxsize=self._config['memory_buffer_size'])
+        self._block_size = None
+        if self._config['blockSizeAdaptive']:
+            try:
+                self._block_size = AdaptiveBatchSize(self._config['blockSize'], self._config['blockSizeMinimum'],
+                                                     self._config['blockSizeMaximum'],
+                                                     self._config['sendLatencyTarget'])
+                self._config['blockSize'] = self._block_size.size
+            except ValueError as ex:
+                SendingProcess._logger.warning("The block size is not adaptive: {}".format(ex))
+        self._task_stop = asyncio.Event()
         self._task_fetch_data_run = True
         self._task_send_data_run = True
+        self._task_fetch_data_task_id = asyncio.ensure_future(self._task_fetch_data())
+        self._task_send_data_task_id = asyncio.ensure_future(self._task_send_data())
 
         try:
             start_time = time.time()
@@ -678,8 +710,7 @@ class SendingProcess(FledgeProcess):
             self._task_fetch_data_run = False
             self._task_send_data_run = False
             # Unblocks the task if it is waiting
-            self._task_fetch_data_sem.release()
-            self._task_send_data_sem.release()
+            self._task_stop.set()
             await self._task_fetch_data_task_id
             await self._task_send_data_task_id
         except Exception as ex:
@@ -875,6 +906,13 @@ class SendingProcess(FledgeProcess):
                 self._config['plugin'] = _config_from_manager['plugin']['value']
 
             self._config['memory_buffer_size'] = int(_config_from_manager['memory_buffer_size']['value'])
+            if 'maxConcurrentSends' in _config_from_manager:
+                self._config['maxConcurrentSends'] = max(1, int(_config_from_manager['maxConcurrentSends']['value']))
+            if 'blockSizeAdaptive' in _config_from_manager:
+                self._config['blockSizeAdaptive'] = _config_from_manager['blockSizeAdaptive']['value'].upper() == 'TRUE'
+                self._config['blockSizeMinimum'] = int(_config_from_manager['blockSizeMinimum']['value'])
+                self._config['blockSizeMaximum'] = int(_config_from_manager['blockSizeMaximum']['value'])
+                self._config['sendLatencyTarget'] = float(_config_from_manager['sendLatencyTarget']['value'])
             _config_from_manager['_CONFIG_CATEGORY_NAME'] = cat_name
 
             if 'stream_id' in _config_from_manager:
@@ -883,6 +921,9 @@ class SendingProcess(FledgeProcess):
                 # Sets stream_id as not defined
                 self._config["stream_id"] = 0
 
+            if self._config_from_manager and 'filterRule' in self._config_from_manager:
+                # The filter rule may have changed
+                JQFilter.invalidate(self._config_from_manager['filterRule']["value"])
             self._config_from_manager = _config_from_manager
         except Exception:
             SendingProcess._logger.error(_MESSAGES_LIST["e000003"])
@@ -1007,6 +1048,8 @@ class SendingProcess(FledgeProcess):
                 if is_started:
                     await self.send_data()
                 self.stop()
+                await self._readings.close()
+                await self.close()
                 SendingProcess._logger.info("Execution completed.")
                 sys.exit(0)
             except (ValueError, Exception) as ex:
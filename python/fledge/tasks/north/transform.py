@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+"""Conversion of a block of readings to the standard data set sent north
+
+Each value of a reading is converted to the type evaluated from its value, for example "180.2" to float 180.2, and
+each user_ts is formatted as an UTC Zulu timestamp. The block is converted in one pass:
+
+  - the type of an int or float value can be decided from its Python type alone, only out of range or non finite
+    numbers and the other types are evaluated again by plugin_common.convert_to_type
+  - a string value is evaluated once per block, repeated values reuse the conversion
+  - the timestamps of a block share a few formats, the formatting of each format is derived once from
+    apply_date_format and then applied by slicing
+"""
+
+import fledge.plugins.north.common.common as plugin_common
+from fledge.common.logger import FLCoreLogger
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_LOGGER = FLCoreLogger().get_logger(__name__)
+
+_MAX_EXACT_INTEGER = 2 ** 53
+""" Integers beyond this are not exactly represented as a float and are evaluated as a number """
+
+_MAX_CACHED = 10000
+""" Maximum number of asset codes and timestamp formats kept """
+
+
+def apply_date_format(in_data):
+    """ This routine adds the UTC Zulu time to the input date time string
+    a) Space in datetime string is replaced with "T"
+    b) If a timezone (strting with + or -) is found, all the following chars
+    are replaced by "Z", otherwise Z is added.
+    Note: if the input zone is +02:00 no date conversion is done,
+          at the time being this routine expects UTC date time values.
+    Examples:
+        2018-05-28 16:56:55              ==> 2018-05-28T16:56:55.000000Z
+        2018-05-28 13:42:28.84           ==> 2018-05-28T13:42:28.840000Z
+        2018-03-22 17:17:17.166347       ==> 2018-03-22T17:17:17.166347Z
+        2020-03-30 05:35:24.066553Z      ==> 2020-03-30T05:35:24.066553Z
+        2018-03-22 17:17:17.166347+00:00 ==> 2018-03-22T17:17:17.166347Z
+        2018-03-22 17:17:17.166347+00    ==> 2018-03-22T17:17:17.166347Z
+        2018-03-22 17:17:17.166347+02:00 ==> 2018-03-22T17:17:17.166347Z
+    Args:
+        the date time string to format
+    Returns:
+        the newly formatted datetime string
+    """
+    # Look for timezone start with '-' a the end of the date (-XY:WZ)
+    zone_index = in_data.rfind("-")
+    # If index is less than 10 we don't have the trailing zone with -
+    if zone_index < 10:
+        #  Look for timezone start with '+' (+XY:ZW)
+        zone_index = in_data.rfind("+")
+    if zone_index == -1:
+        if in_data.rfind(".") == -1:
+            # there are no milliseconds in the date
+            in_data += ".000000"
+        # Pads with 0 if needed
+        in_data = in_data.ljust(26, '0')
+        # Replace space with T (i.e b/w date & time)
+        timestamp = in_data.replace(" ", "T")
+        # Just add UTC Zulu time if Z not present in in_data
+        if 'Z' not in in_data:
+            timestamp = timestamp + "Z"
+    else:
+        # Replace space with T (i.e b/w date & time) and UTC Zulu time
+        timestamp = in_data[:zone_index].replace(" ", "T") + "Z"
+        if in_data[zone_index:] not in ('+00', '+00:00'):
+            _LOGGER.warning("Non-UTC {} timezone is found. Hence no date conversion is done at the time being "
+                            "this routine expects UTC date time values".format(in_data[zone_index:]))
+    return timestamp
+
+
+def _timestamp_format(in_data):
+    """Returns the format of a 'YYYY-MM-DD HH:MM:SS[.ffffff][zone]' timestamp, None for any other timestamp
+
+    The timestamps of a format differ only by their digits, so apply_date_format formats them alike.
+    """
+    fraction = in_data[20:26]
+    if in_data[10:11] != ' ' or in_data[13:14] != ':' or in_data[16:17] != ':' \
+            or in_data[19:20] not in ('', '.') or not (fraction.isdigit() or fraction == ''):
+        return None
+    zone = in_data[26:]
+    if zone not in ('', 'Z', '+00', '+00:00'):
+        # Not UTC, apply_date_format warns about each of them
+        return None
+    return len(in_data), in_data[19:20], zone
+
+
+def _timestamp_slices(sample):
+    """Derives from a sample how apply_date_format formats the timestamps of its format
+
+    Returns:
+        (end, padding): the timestamp is formatted as date + 'T' + time up to end + padding + 'Z',
+        None if apply_date_format does not format the sample that way
+    """
+    formatted = apply_date_format(sample)
+    body = formatted[:-1]
+    joined = sample[:10] + 'T' + sample[11:]
+    if joined.startswith(body):
+        slices = len(body), ''
+    elif body.startswith(joined):
+        slices = len(joined), body[len(joined):]
+    else:
+        return None
+    end, padding = slices
+    if sample[:10] + 'T' + sample[11:end] + padding + 'Z' != formatted:
+        return None
+    return slices
+
+
+class ReadingsTransform(object):
+    """Converts blocks of readings, keeping the asset codes and the timestamp formats met from a block to the next"""
+
+    def __init__(self):
+        # asset code -> asset code without spaces
+        self._asset_codes = {}
+        # timestamp format -> (end, padding) or None to use apply_date_format
+        self._timestamp_formats = {}
+
+    def asset_code(self, asset_code):
+        try:
+            return self._asset_codes[asset_code]
+        except KeyError:
+            if len(self._asset_codes) >= _MAX_CACHED:
+                self._asset_codes.clear()
+            converted = self._asset_codes[asset_code] = asset_code.replace(" ", "")
+            return converted
+
+    def timestamp(self, in_data):
+        """Same result as apply_date_format(in_data)"""
+        timestamp_format = _timestamp_format(in_data)
+        if timestamp_format is None:
+            return apply_date_format(in_data)
+        try:
+            slices = self._timestamp_formats[timestamp_format]
+        except KeyError:
+            if len(self._timestamp_formats) >= _MAX_CACHED:
+                self._timestamp_formats.clear()
+            slices = self._timestamp_formats[timestamp_format] = _timestamp_slices(in_data)
+        if slices is None:
+            return apply_date_format(in_data)
+        end, padding = slices
+        return in_data[:10] + 'T' + in_data[11:end] + padding + 'Z'
+
+    @classmethod
+    def reading(cls, payload, strings=None):
+        """Converts in place the values of a reading, as plugin_common.convert_to_type does
+
+        Only the values of the top level datapoints and of the dictionaries nested in a dictionary datapoint are
+        converted, the values directly in a dictionary datapoint are kept as they are.
+
+        Args:
+            payload: the reading
+            strings: conversions of the string values already met, value -> converted value
+        Returns:
+            the reading
+        """
+        if strings is None:
+            strings = {}
+        for k, v in payload.items():
+            value_type = type(v)
+            if value_type is str:
+                try:
+                    payload[k] = strings[v]
+                except KeyError:
+                    payload[k] = strings[v] = plugin_common.convert_to_type(v)
+            elif value_type is float:
+                # nan and infinities are left to convert_to_type, to fail alike
+                if v - v != 0.0:
+                    payload[k] = plugin_common.convert_to_type(v)
+            elif value_type is int:
+                if not -_MAX_EXACT_INTEGER <= v <= _MAX_EXACT_INTEGER:
+                    payload[k] = plugin_common.convert_to_type(v)
+            elif isinstance(v, dict):
+                for v1 in v.values():
+                    if isinstance(v1, dict):
+                        cls.reading(v1, strings)
+            else:
+                payload[k] = plugin_common.convert_to_type(v)
+        return payload
+
+    def transform(self, raw_data):
+        """Converts a block of readings rows
+
+        Args:
+            raw_data: rows with id, asset_code, reading and user_ts
+        Returns:
+            (converted_data, rejected): the converted rows and the (row, error) of the rows skipped,
+            error is None for a row having an undefined asset code
+        """
+        converted_data = []
+        rejected = []
+        strings = {}
+        reading = self.reading
+        timestamp = self.timestamp
+        for row in raw_data:
+            try:
+                asset_code = self.asset_code(row['asset_code'])
+
+                # Skips row having undefined asset_code
+                if asset_code != "":
+                    converted_data.append({
+                        'id': row['id'],
+                        'asset_code': asset_code,
+                        'reading': reading(row['reading'], strings),
+                        'user_ts': timestamp(row['user_ts'])
+                    })
+                else:
+                    rejected.append((row, None))
+            except Exception as ex:
+                rejected.append((row, ex))
+        return converted_data, rejected
@@ -88,8 +88,35 @@ class Purge(FledgeProcess):
             "displayName": "Retain Audit Trail Data (In Days)",
             "order": "5",
             "minimum": "1"
+        },
+        "retainStatsHistoryMinute": {
+            "description": "This is the measure of how long to retain the per minute statistics history data for and should be measured in days.",
+            "type": "integer",
+            "default": "30",
+            "displayName": "Retain Per Minute Stats History Data (In Days)",
+            "order": "6",
+            "minimum": "1"
+        },
+        "retainStatsHistoryHour": {
+            "description": "This is the measure of how long to retain the per hour statistics history data for and should be measured in days.",
+            "type": "integer",
+            "default": "365",
+            "displayName": "Retain Per Hour Stats History Data (In Days)",
+            "order": "7",
+            "minimum": "1"
+        },
+        "retainStatsHistoryDay": {
+            "description": "This is the measure of how long to retain the per day statistics history data for and should be measured in days.",
+            "type": "integer",
+            "default": "3650",
+            "displayName": "Retain Per Day Stats History Data (In Days)",
+            "order": "8",
+            "minimum": "1"
         }
     }
+    _STATS_ROLLUP_RETAIN = {60: "retainStatsHistoryMinute", 3600: "retainStatsHistoryHour",
+                            86400: "retainStatsHistoryDay"}
+    """ Config item of the retention of each statistics history rollup resolution """
     _CONFIG_CATEGORY_NAME = 'PURGE_READ'
     _CONFIG_CATEGORY_DESCRIPTION = 'Purge the readings, log, statistics history table'
 
@@ -100,8 +127,9 @@ class Purge(FledgeProcess):
 
     async def write_statistics(self, total_purged, unsent_purged):
         stats = await statistics.create_statistics(self._storage_async)
-        await stats.update('PURGED', total_purged)
-        await stats.update('UNSNPURGED', unsent_purged)
+        stats.add('PURGED', total_purged)
+        stats.add('UNSNPURGED', unsent_purged)
+        await stats.flush()
 
     async def set_configuration(self):
         """" set the default configuration for purge
@@ -258,10 +286,21 @@ class Purge(FledgeProcess):
 
     async def purge_stats_history(self, config):
         """" Purge statistics history table based on the Age which is defined in retainStatsHistory config item
+             and the statistics history rollup of each resolution based on its own retain config item
         """
         ts = datetime.now() - timedelta(days=int(config['retainStatsHistory']['value']))
         payload = PayloadBuilder().WHERE(['history_ts', '<=', str(ts)]).payload()
         await self._storage_async.delete_from_tbl("statistics_history", payload)
+        # Each rollup resolution has its own retention
+        now = time.time()
+        for resolution in statistics.ROLLUP_RESOLUTIONS:
+            item = self._STATS_ROLLUP_RETAIN.get(resolution)
+            if item is None or item not in config:
+                continue
+            oldest = now - int(config[item]['value']) * 24 * 60 * 60
+            payload = PayloadBuilder().WHERE(['resolution', '=', resolution]).AND_WHERE(
+                ['bucket', '<', int(oldest)]).payload()
+            await self._storage_async.delete_from_tbl(statistics.ROLLUP_TABLE, payload)
 
     async def purge_audit_trail_log(self, config):
         """" Purge log table based on the Age which is defined under in config item
@@ -288,3 +327,5 @@ class Purge(FledgeProcess):
             await self.purge_audit_trail_log(config)
         except Exception as ex:
             self._logger.exception(ex)
+        finally:
+            await self.close()
@@ -9,9 +9,12 @@
 
 Fetch information from the statistics table, compute delta and
 stores the delta value (statistics.value - statistics.previous_value) in the statistics_history table
+and adds it to the bucket of each resolution of the statistics_history_rollup table
 """
 import json
+import time
 
+from fledge.common import statistics
 from fledge.common import utils as common_utils
 from fledge.common.logger import FLCoreLogger
 from fledge.common.process import FledgeProcess
@@ -42,31 +45,88 @@ class StatisticsHistory(FledgeProcess):
         await self._storage_async.update_tbl("statistics", json.dumps(payload, sort_keys=False))
 
     async def run(self):
+        """ Records the statistics history, then closes the storage and core management clients """
+        if self.is_dry_run():
+            return
+        try:
+            await self._snapshot()
+        finally:
+            await self.close()
+
+    async def _snapshot(self):
         """ SELECT against the statistics table, to get a snapshot of the data at that moment.
     
         Based on the snapshot:
             1. INSERT the delta between `value` and `previous_value` into  statistics_history
-            2. UPDATE the previous_value in statistics table to be equal to statistics.value at snapshot 
+            2. UPDATE the previous_value in statistics table to be equal to statistics.value at snapshot,
+               only for the keys whose value has changed
+
+        The payloads are built as plain dicts, in a single pass over the snapshot, and the time taken by each
+        step is logged.
         """
-        if self.is_dry_run():
-            return
+        started = time.time()
         current_time = common_utils.local_timestamp()
-        results = await self._storage_async.query_tbl("statistics")
+        snapshot_time = time.time()
+        select = PayloadBuilder().SELECT("key", "value", "previous_value").payload()
+        results = await self._storage_async.query_tbl_with_payload("statistics", select)
+        queried = time.time()
         # Bulk updates payload
-        payload = {"updates": []}
+        updates = []
         # Bulk inserts payload
-        insert_payload = {"inserts": []}
+        inserts = []
+        deltas = {}
         for r in results['rows']:
             key = r['key']
             value = int(r["value"])
-            previous_value = int(r["previous_value"])
-            delta = value - previous_value
-            payload_item = PayloadBuilder().SET(previous_value=value).WHERE(["key", "=", key]).payload()
-            # Add element to bulk updates
-            payload['updates'].append(json.loads(payload_item))
-            # Add element to bulk inserts
-            insert_payload['inserts'].append({'key': key, 'value': delta, 'history_ts': current_time})
+            delta = value - int(r["previous_value"])
+            deltas[key] = delta
+            inserts.append({'key': key, 'value': delta, 'history_ts': current_time})
+            if delta != 0:
+                updates.append({"values": {"previous_value": value},
+                                "where": {"column": "key", "condition": "=", "value": key}})
         # Bulk inserts
-        await self._storage_async.insert_into_tbl("statistics_history", json.dumps(insert_payload))
+        if inserts:
+            await self._storage_async.insert_into_tbl("statistics_history", json.dumps({"inserts": inserts}))
+        inserted = time.time()
         # Bulk updates
-        await self._bulk_update_previous_value(payload)
+        if updates:
+            await self._bulk_update_previous_value({"updates": updates})
+        updated = time.time()
+        if deltas:
+            await self._rollup(deltas, snapshot_time)
+        rolled_up = time.time()
+        self._logger.debug("Statistics history of {} keys, {} changed, in {:.3f}s: query {:.3f}s, insert {:.3f}s, "
+                           "update {:.3f}s, rollup {:.3f}s".format(len(inserts), len(updates), rolled_up - started,
+                                                                   queried - started, inserted - queried,
+                                                                   updated - inserted, rolled_up - updated))
+
+    async def _rollup(self, deltas, snapshot_time):
+        """ Adds the deltas to the current bucket of each rollup resolution
+
+        The first run in a bucket inserts its rows, the next ones add their deltas to them.
+
+        Args:
+            deltas: dict of statistics keys and delta values
+            snapshot_time: seconds since the epoch of the snapshot
+        """
+        for resolution in statistics.ROLLUP_RESOLUTIONS:
+            bucket = statistics.rollup_bucket(snapshot_time, resolution)
+            payload = PayloadBuilder().SELECT("key").WHERE(["resolution", "=", resolution]).AND_WHERE(
+                ["bucket", "=", bucket]).payload()
+            results = await self._storage_async.query_tbl_with_payload(statistics.ROLLUP_TABLE, payload)
+            existing = {r['key'] for r in results['rows']}
+            inserts = []
+            updates = []
+            for key, delta in deltas.items():
+                if key not in existing:
+                    inserts.append({'key': key, 'resolution': resolution, 'bucket': bucket, 'value': delta})
+                elif delta != 0:
+                    updates.append({"expressions": [{"column": "value", "operator": "+", "value": delta}],
+                                    "where": {"column": "key", "condition": "=", "value": key,
+                                              "and": {"column": "resolution", "condition": "=", "value": resolution,
+                                                      "and": {"column": "bucket", "condition": "=",
+                                                              "value": bucket}}}})
+            if inserts:
+                await self._storage_async.insert_into_tbl(statistics.ROLLUP_TABLE, json.dumps({"inserts": inserts}))
+            if updates:
+                await self._storage_async.update_tbl(statistics.ROLLUP_TABLE, json.dumps({"updates": updates}))
@@ -0,0 +1,2 @@
+DROP INDEX IF EXISTS fledge.statistics_history_rollup_ix1;
+DROP TABLE IF EXISTS fledge.statistics_history_rollup;
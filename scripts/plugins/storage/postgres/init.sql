@@ -509,6 +509,17 @@ CREATE TABLE fledge.statistics_history_daily (
 CREATE INDEX statistics_history_daily_ix1
     ON fledge.statistics_history_daily (year);
 
+-- Contains the sums of the statistics_history values by buckets of time, one set of buckets by resolution
+CREATE TABLE fledge.statistics_history_rollup (
+       key         character varying(255)      NOT NULL COLLATE pg_catalog."default",  -- Statistics key
+       resolution  integer                     NOT NULL,                               -- Width of the buckets, in seconds
+       bucket      bigint                      NOT NULL,                               -- Start of the bucket, in seconds since the epoch
+       value       bigint                      NOT NULL DEFAULT 0,                     -- Sum of the statistics history values of the bucket
+       CONSTRAINT statistics_history_rollup_pkey PRIMARY KEY (resolution, key, bucket) );
+
+CREATE INDEX statistics_history_rollup_ix1
+    ON fledge.statistics_history_rollup (resolution, bucket);
+
 -- Resources table
 -- A resource and be anything that is available or can be done in Fledge. Examples:
 -- - Access to assets
@@ -0,0 +1,11 @@
+-- Create statistics history rollup table
+
+CREATE TABLE IF NOT EXISTS fledge.statistics_history_rollup (
+       key         character varying(56)       NOT NULL,                                  -- Statistics key
+       resolution  integer                     NOT NULL,                                  -- Width of the buckets, in seconds
+       bucket      bigint                      NOT NULL,                                  -- Start of the bucket, in seconds since the epoch
+       value       bigint                      NOT NULL DEFAULT 0,                        -- Sum of the statistics history values of the bucket
+       CONSTRAINT  statistics_history_rollup_pkey PRIMARY KEY (resolution, key, bucket) );
+
+CREATE INDEX IF NOT EXISTS fledge.statistics_history_rollup_ix1
+    ON statistics_history_rollup (resolution, bucket);
@@ -3,11 +3,14 @@
 from unittest.mock import MagicMock
 from unittest.mock import patch
 from http.client import HTTPConnection, HTTPResponse
+import asyncio
 import json
 import pytest
+from aiohttp import web
 
 from fledge.common.microservice_management_client import exceptions as client_exceptions
-from fledge.common.microservice_management_client.microservice_management_client import MicroserviceManagementClient, _logger
+from fledge.common.microservice_management_client.microservice_management_client import MicroserviceManagementClient, \
+    AsyncMicroserviceManagementClient, _logger
 
 __author__ = "Ashwin Gopalakrishnan"
 __copyright__ = "Copyright (c) 2017 OSIsoft, LLC"
@@ -781,3 +784,86 @@ class TestMicroserviceManagementClient:
         assert 'POST' == kwargs['method']
         assert '/fledge/track' == kwargs['url']
         assert test_dict == json.loads(kwargs['body'])
+
+
+class TestAsyncMicroserviceManagementClient:
+
+    @staticmethod
+    async def _client(aiohttp_server, handlers, **kwargs):
+        app = web.Application()
+        for method, path, handler in handlers:
+            app.router.add_route(method, path, handler)
+        server = await aiohttp_server(app)
+        return AsyncMicroserviceManagementClient(server.host, server.port, **kwargs)
+
+    async def test_get_coalesced(self, aiohttp_server):
+        calls = []
+
+        async def get_category(request):
+            calls.append(request.match_info['name'])
+            await asyncio.sleep(0.05)
+            return web.json_response({'item': {'value': '1'}})
+
+        client = await self._client(aiohttp_server, [('GET', '/fledge/service/category/{name}', get_category)])
+        try:
+            responses = await asyncio.gather(*[client.get_configuration_category('South') for _ in range(5)])
+            assert ['South'] == calls
+            assert all(r == {'item': {'value': '1'}} for r in responses)
+            # each caller gets its own response
+            assert 5 == len({id(r) for r in responses})
+            await client.get_configuration_category('South')
+            assert 2 == len(calls)
+        finally:
+            await client.close()
+
+    @pytest.mark.parametrize("status_code", [404, 500])
+    async def test_error_status(self, aiohttp_server, status_code):
+        async def track(request):
+            return web.json_response({}, status=status_code, reason='this is the reason')
+
+        client = await self._client(aiohttp_server, [('POST', '/fledge/track', track)])
+        try:
+            with patch.object(_logger, "error") as log_error:
+                with pytest.raises(client_exceptions.MicroserviceManagementClientError) as excinfo:
+                    await client.create_asset_tracker_event({'asset': 'AirIntake'})
+            assert status_code == excinfo.value.status
+            assert 1 == log_error.call_count
+        finally:
+            await client.close()
+
+    async def test_get_retried(self, aiohttp_server):
+        statuses = [503, 200]
+
+        async def ping(request):
+            status = statuses.pop(0)
+            return web.json_response({'uptime': 1}, status=status)
+
+        client = await self._client(aiohttp_server, [('GET', '/fledge/service/ping', ping)])
+        try:
+            with patch('fledge.common.microservice_management_client.microservice_management_client._RETRY_DELAY', 0):
+                assert {'uptime': 1} == await client.ping_service()
+            assert [] == statuses
+        finally:
+            await client.close()
+
+    async def test_register_service_no_id(self, aiohttp_server):
+        async def register(request):
+            return web.json_response({'notid': 'bla'})
+
+        client = await self._client(aiohttp_server, [('POST', '/fledge/service', register)])
+        try:
+            with patch.object(_logger, "exception"):
+                with pytest.raises(KeyError):
+                    await client.register_service({'keys': 'vals'})
+        finally:
+            await client.close()
+
+    async def test_get_alert_by_key_not_found(self, aiohttp_server):
+        async def get_alert(request):
+            return web.json_response({'message': 'not found'}, status=404)
+
+        client = await self._client(aiohttp_server, [('GET', '/fledge/alert/{key}', get_alert)])
+        try:
+            assert {'message': 'not found'} == await client.get_alert_by_key('k')
+        finally:
+            await client.close()
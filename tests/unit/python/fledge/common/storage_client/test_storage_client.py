@@ -237,7 +237,7 @@ class TestStorageClientAsync:
         assert "Data to insert is missing" in str(excinfo.value)
 
         with pytest.raises(Exception) as excinfo:
-            args = "aTable", {"k": "v"}
+            args = "aTable", {"k": {"v"}}
             await sc.insert_into_tbl(*args)
         assert excinfo.type is TypeError
         assert "Provided data to insert must be a valid JSON" in str(excinfo.value)
@@ -246,6 +246,12 @@ class TestStorageClientAsync:
         response = await sc.insert_into_tbl(*args)
         assert {"k": "v"} == response["called"]
 
+        # python objects are serialized by the client and bytes are sent as is
+        response = await sc.insert_into_tbl("aTable", {"k": "v"})
+        assert {"k": "v"} == response["called"]
+        response = await sc.insert_into_tbl("aTable", b'{"k": "v"}')
+        assert {"k": "v"} == response["called"]
+
         with pytest.raises(Exception) as excinfo:
             with patch.object(_LOGGER, "error") as log_e:
                 with patch.object(_LOGGER, "info") as log_i:
@@ -264,6 +270,7 @@ class TestStorageClientAsync:
             log_e.assert_called_once_with('Error code: %d, reason: %s, details: %s', 500, 'something wrong', {'key': 'value'})
         assert excinfo.type is aiohttp.client_exceptions.ContentTypeError
 
+        await sc.close()
         await fake_storage_srvr.stop()
 
     @pytest.mark.asyncio
@@ -295,7 +302,7 @@ class TestStorageClientAsync:
         assert "Data to update is missing" in str(excinfo.value)
 
         with pytest.raises(Exception) as excinfo:
-            args = "aTable", {"k": "v"}
+            args = "aTable", {"k": {"v"}}
             await sc.update_tbl(*args)
         assert excinfo.type is TypeError
         assert "Provided data to update must be a valid JSON" in str(excinfo.value)
@@ -304,6 +311,12 @@ class TestStorageClientAsync:
         response = await sc.update_tbl(*args)
         assert {"k": "v"} == response["called"]
 
+        # python objects are serialized by the client and bytes are sent as is
+        response = await sc.update_tbl("aTable", {"k": "v"})
+        assert {"k": "v"} == response["called"]
+        response = await sc.update_tbl("aTable", b'{"k": "v"}')
+        assert {"k": "v"} == response["called"]
+
         with pytest.raises(Exception) as excinfo:
             with patch.object(_LOGGER, "error") as log_e:
                 with patch.object(_LOGGER, "info") as log_i:
@@ -323,6 +336,7 @@ class TestStorageClientAsync:
             log_e.assert_called_once_with("Error code: %d, reason: %s, details: %s", 500, 'something wrong', {'key': 'value'})
         assert excinfo.type is aiohttp.client_exceptions.ContentTypeError
 
+        await sc.close()
         await fake_storage_srvr.stop()
 
     @pytest.mark.asyncio
@@ -351,7 +365,7 @@ class TestStorageClientAsync:
         assert 1 == response["called"]
 
         with pytest.raises(Exception) as excinfo:
-            args = "aTable", {"condition": "v"}
+            args = "aTable", {"condition": {"v"}}
             await sc.delete_from_tbl(*args)
         assert excinfo.type is TypeError
         assert "condition payload must be a valid JSON" in str(excinfo.value)
@@ -360,6 +374,12 @@ class TestStorageClientAsync:
         response = await sc.delete_from_tbl(*args)
         assert {"condition": "v"} == response["called"]
 
+        # python objects are serialized by the client and bytes are sent as is
+        response = await sc.delete_from_tbl("aTable", {"condition": "v"})
+        assert {"condition": "v"} == response["called"]
+        response = await sc.delete_from_tbl("aTable", b'{"condition": "v"}')
+        assert {"condition": "v"} == response["called"]
+
         with pytest.raises(Exception) as excinfo:
             with patch.object(_LOGGER, "error") as log_e:
                 with patch.object(_LOGGER, "info") as log_i:
@@ -379,6 +399,7 @@ class TestStorageClientAsync:
             log_e.assert_called_once_with("Error code: %d, reason: %s, details: %s", 500, 'something wrong', {'key': 'value'})
         assert excinfo.type is aiohttp.client_exceptions.ContentTypeError
 
+        await sc.close()
         await fake_storage_srvr.stop()
 
     @pytest.mark.asyncio
@@ -428,6 +449,7 @@ class TestStorageClientAsync:
             log_e.assert_called_once_with("Error code: %d, reason: %s, details: %s", 500, 'something wrong', {'key': 'value'})
         assert excinfo.type is aiohttp.client_exceptions.ContentTypeError
 
+        await sc.close()
         await fake_storage_srvr.stop()
 
     @pytest.mark.asyncio
@@ -459,7 +481,7 @@ class TestStorageClientAsync:
         assert "Query payload is missing" in str(excinfo.value)
 
         with pytest.raises(Exception) as excinfo:
-            args = "aTable", {"k": "v"}
+            args = "aTable", {"k": {"v"}}
             await sc.query_tbl_with_payload(*args)
         assert excinfo.type is TypeError
         assert "Query payload must be a valid JSON" in str(excinfo.value)
@@ -468,6 +490,12 @@ class TestStorageClientAsync:
         response = await sc.query_tbl_with_payload(*args)
         assert {"k": "v"} == response["called"]
 
+        # python objects are serialized by the client and bytes are sent as is
+        response = await sc.query_tbl_with_payload("aTable", {"k": "v"})
+        assert {"k": "v"} == response["called"]
+        response = await sc.query_tbl_with_payload("aTable", b'{"k": "v"}')
+        assert {"k": "v"} == response["called"]
+
         with pytest.raises(Exception) as excinfo:
             with patch.object(_LOGGER, "error") as log_e:
                 with patch.object(_LOGGER, "info") as log_i:
@@ -488,6 +516,57 @@ class TestStorageClientAsync:
             log_e.assert_called_once_with("Error code: %d, reason: %s, details: %s", 500, 'something wrong', {'key': 'value'})
         assert excinfo.type is aiohttp.client_exceptions.ContentTypeError
 
+        await sc.close()
+        await fake_storage_srvr.stop()
+
+
+    @pytest.mark.asyncio
+    async def test_connection_pool(self, event_loop):
+        fake_storage_srvr = FakeFledgeStorageSrvr(loop=event_loop)
+        await fake_storage_srvr.start()
+
+        mockServiceRecord = MagicMock(ServiceRecord)
+        mockServiceRecord._address = HOST
+        mockServiceRecord._type = "Storage"
+        mockServiceRecord._port = PORT
+        mockServiceRecord._management_port = 2000
+
+        sc = StorageClientAsync(1, 2, mockServiceRecord, pool_size=2, pool_idle_timeout=5)
+        stats = sc.pool_stats()
+        assert 2 == stats["size"]
+        assert 5.0 == stats["idle_timeout"]
+        assert 0 == stats["requests"]
+        assert 0 == stats["in_flight"]
+
+        for _ in range(3):
+            response = await sc.query_tbl("aTable")
+            assert 1 == response["called"]
+        stats = sc.pool_stats()
+        assert 3 == stats["requests"]
+        assert 1 == stats["created"]
+        assert 2 == stats["reused"]
+        assert 0 == stats["in_flight"]
+        assert 0 == stats["in_use"]
+
+        # concurrent requests beyond the pool size wait for a free connection
+        queries = [asyncio.ensure_future(sc.query_tbl("aTable")) for _ in range(5)]
+        await asyncio.sleep(0)
+        stats = sc.pool_stats()
+        assert 5 == stats["in_flight"]
+        assert 2 == stats["in_use"]
+        await asyncio.gather(*queries)
+        stats = sc.pool_stats()
+        assert 8 == stats["requests"]
+        assert 2 == stats["created"]
+        assert stats["waits"] >= 3
+        assert 0 == stats["in_flight"]
+
+        await sc.close()
+        # a closed client reopens its pool on demand
+        response = await sc.query_tbl("aTable")
+        assert 1 == response["called"]
+        await sc.close()
+
         await fake_storage_srvr.stop()
 
 
@@ -529,6 +608,17 @@ class TestReadingsStorageAsyncClient:
         assert excinfo.type is TypeError
         assert "Readings payload must be a valid JSON" in str(excinfo.value)
 
+        with pytest.raises(Exception) as excinfo:
+            await rsc.append({"readings": [{"reading": {"v"}}]})
+        assert excinfo.type is TypeError
+        assert "Readings payload must be a valid JSON" in str(excinfo.value)
+
+        readings = {"readings": [{"asset_code": "A", "reading": {"rate": 18.4}, "user_ts": "2017-09-21 15:00:09"}]}
+        response = await rsc.append(readings)
+        assert readings == response["appended"]
+        response = await rsc.append(json.dumps(readings).encode())
+        assert readings == response["appended"]
+
         with pytest.raises(Exception) as excinfo:
             with patch.object(_LOGGER, "error") as log_e:
                 readings_bad_payload = json.dumps({"Xreadings": []})
@@ -550,6 +640,7 @@ class TestReadingsStorageAsyncClient:
         response = await rsc.append(readings)
         assert {'readings': []} == response['appended']
 
+        await rsc.close()
         await fake_storage_srvr.stop()
 
     @pytest.mark.asyncio
@@ -605,6 +696,7 @@ class TestReadingsStorageAsyncClient:
         response = await rsc.fetch(*args)
         assert {'readings': [], 'start': '2', 'count': '3'} == response
 
+        await rsc.close()
         await fake_storage_srvr.stop()
 
     @pytest.mark.asyncio
@@ -650,6 +742,7 @@ class TestReadingsStorageAsyncClient:
                                           '/storage/reading/query', '{"internal_server_err": "v"}', 500, 'something wrong', {"key": "value"})
         assert excinfo.type is aiohttp.client_exceptions.ContentTypeError
 
+        await rsc.close()
         await fake_storage_srvr.stop()
 
     @pytest.mark.asyncio
@@ -766,4 +859,5 @@ class TestReadingsStorageAsyncClient:
         response = await rsc.purge(**kwargs)
         assert 1 == response["called"]
 
+        await rsc.close()
         await fake_storage_srvr.stop()
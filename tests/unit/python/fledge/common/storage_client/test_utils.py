@@ -6,6 +6,9 @@
 
 """ Test common/storage_client/utils.py """
 
+import json
+from unittest.mock import patch
+
 import pytest
 from fledge.common.storage_client.utils import Utils
 
@@ -43,3 +46,38 @@ class TestUtils:
     def test_is_json_return_false_with_invalid_json(self, test_input):
         ret_val = Utils.is_json(test_input)
         assert ret_val is False
+
+    @pytest.mark.parametrize("test_input", [{"k": "v"},
+                                            [{"k": {"k1": "v1"}}],
+                                            {"readings": [{"asset_code": "a", "reading": {"r": 1.5}}]}
+                                            ])
+    def test_encode_payload_serializes_python_objects_once(self, test_input):
+        with patch.object(json, 'loads', wraps=json.loads) as patch_loads:
+            ret_val = Utils.encode_payload(test_input)
+        assert isinstance(ret_val, bytes)
+        assert test_input == json.loads(ret_val)
+        patch_loads.assert_not_called()
+
+    def test_encode_payload_sends_bytes_as_is(self):
+        payload = b'{"k": "v"}'
+        with patch.object(json, 'loads') as patch_loads:
+            assert payload is Utils.encode_payload(payload)
+        patch_loads.assert_not_called()
+
+    def test_encode_payload_validates_str(self):
+        assert '{"k": "v"}' == Utils.encode_payload('{"k": "v"}')
+        with pytest.raises(TypeError):
+            Utils.encode_payload("{'k': 'v'}")
+
+    @pytest.mark.parametrize("test_input", [{"k": {"v"}}, {"k", "v"}, 1, None])
+    def test_encode_payload_bad_payload(self, test_input):
+        with pytest.raises(TypeError):
+            Utils.encode_payload(test_input)
+
+    def test_set_json_encoder(self):
+        try:
+            Utils.set_json_encoder(lambda obj: b'{"encoded": true}')
+            assert b'{"encoded": true}' == Utils.encode_payload({"k": "v"})
+        finally:
+            Utils.set_json_encoder(None)
+        assert {"k": "v"} == json.loads(Utils.encode_payload({"k": "v"}))
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+import pytest
+
+from fledge.common.batch_size import AdaptiveBatchSize
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+def _run(batch_size, latency, batches=300, available=None):
+    for _ in range(batches):
+        count = batch_size.size if available is None else min(batch_size.size, available)
+        batch_size.record(count, latency(count))
+    return batch_size.size
+
+
+class TestAdaptiveBatchSize:
+
+    @pytest.mark.parametrize("args", [(100, 0, 10, 1), (100, 10, 5, 1), (100, 1, 10, 0)])
+    def test_bad_bounds(self, args):
+        with pytest.raises(ValueError):
+            AdaptiveBatchSize(*args)
+
+    def test_initial_size_within_bounds(self):
+        assert 50 == AdaptiveBatchSize(10, 50, 100, 1).size
+        assert 100 == AdaptiveBatchSize(1000, 50, 100, 1).size
+
+    def test_grows_to_maximum(self):
+        batch_size = AdaptiveBatchSize(100, 10, 20000, 1.0)
+        assert 20000 == _run(batch_size, lambda count: 0.001 + count * 1e-6)
+        increases, decreases = batch_size.decisions()
+        assert increases > 0
+        assert 0 == decreases
+        assert (0, 0) == batch_size.decisions()
+
+    def test_converges_to_target(self):
+        # 10 ms per batch and 1 ms per item, the target of 1 second is reached at about 990 items
+        batch_size = AdaptiveBatchSize(100, 10, 100000, 1.0)
+        assert 790 <= _run(batch_size, lambda count: 0.01 + count * 0.001) <= 990
+        # Storage slows down
+        assert 79 <= _run(batch_size, lambda count: 0.01 + count * 0.01) <= 99
+        assert batch_size.decisions()[1] > 0
+
+    def test_shrinks_to_minimum(self):
+        batch_size = AdaptiveBatchSize(1000, 50, 1000, 0.1)
+        assert 50 == _run(batch_size, lambda count: 5.0)
+
+    def test_partial_batches_do_not_grow(self):
+        batch_size = AdaptiveBatchSize(100, 10, 10000, 1.0)
+        assert 100 == _run(batch_size, lambda count: 0.001, available=60)
+
+    def test_throughput_peak(self):
+        # The throughput drops past 500 items, well below the latency target
+        batch_size = AdaptiveBatchSize(100, 10, 100000, 10.0)
+        sizes = set()
+        for _ in range(300):
+            count = batch_size.size
+            batch_size.record(count, count * (0.001 if count <= 500 else 0.003))
+            sizes.add(batch_size.size)
+        assert batch_size.size <= 500 * 1.25 + 1
+        assert max(sizes) <= 500 * 1.25 + 1
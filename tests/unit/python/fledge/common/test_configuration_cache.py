@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+import datetime
 import pytest
 from fledge.common.configuration_manager import ConfigurationCache
 
@@ -118,3 +119,63 @@ class TestConfigurationCache:
         assert 'cat1' in cached_manager.cache
         assert 'cat3' in cached_manager.cache
         assert 'cat4' in cached_manager.cache
+
+    def test_least_recently_used_is_evicted(self):
+        cached_manager = ConfigurationCache(3)
+        cached_manager.update("cat1", "desc1", {'value': {}})
+        cached_manager.update("cat2", "desc2", {'value': {}})
+        cached_manager.update("cat3", "desc3", {'value': {}})
+        assert "cat1" in cached_manager
+        cached_manager.update("cat4", "desc4", {'value': {}})
+        assert ['cat3', 'cat1', 'cat4'] == list(cached_manager.cache.keys())
+        assert 1 == cached_manager.hit
+        assert 1 == cached_manager.evictions
+        cached_manager.max_cache_size = 1
+        assert ['cat4'] == list(cached_manager.cache.keys())
+        assert 3 == cached_manager.evictions
+
+    def test_ttl(self):
+        cached_manager = ConfigurationCache(ttl=60)
+        cached_manager.update("cat1", "desc1", {'value': {}})
+        assert "cat1" in cached_manager
+        cached_manager.cache["cat1"]['date_updated'] -= datetime.timedelta(seconds=61)
+        assert "cat1" not in cached_manager
+        assert 0 == cached_manager.size
+        assert 1 == cached_manager.hit
+        assert 1 == cached_manager.miss
+        assert 1 == cached_manager.expirations
+
+    def test_max_bytes(self):
+        cached_manager = ConfigurationCache(max_bytes=100)
+        cached_manager.update("cat1", "desc1", {'item': 'x' * 20})
+        cached_manager.update("cat2", "desc2", {'item': 'x' * 20})
+        assert 2 == cached_manager.size
+        cached_manager.update("cat3", "desc3", {'item': 'x' * 20})
+        assert ['cat2', 'cat3'] == list(cached_manager.cache.keys())
+        assert 1 == cached_manager.evictions
+        assert cached_manager.bytes == sum(e['size'] for e in cached_manager.cache.values())
+        cached_manager.remove("cat2")
+        assert cached_manager.bytes == cached_manager.cache['cat3']['size']
+
+    def test_resize(self):
+        cached_manager = ConfigurationCache(max_bytes=100)
+        cached_manager.update("cat1", "desc1", {'item': 'x' * 20})
+        cached_manager.update("cat2", "desc2", {'item': 'x' * 20})
+        cached_manager.cache['cat2']['value']['item'] = 'x' * 40
+        cached_manager.resize("cat2")
+        assert cached_manager.bytes == sum(e['size'] for e in cached_manager.cache.values())
+        cached_manager.cache['cat2']['value']['item'] = 'x' * 60
+        cached_manager.resize("cat2")
+        # Grown in place, cat2 no longer fits with cat1
+        assert ['cat2'] == list(cached_manager.cache.keys())
+        assert 1 == cached_manager.evictions
+        assert cached_manager.bytes == cached_manager.cache['cat2']['size']
+        cached_manager.resize("unknown")
+
+    def test_stats(self):
+        cached_manager = ConfigurationCache(2, ttl=30)
+        cached_manager.update("cat1", "desc1", {'value': {}})
+        assert "cat1" in cached_manager
+        assert "cat2" not in cached_manager
+        assert {"size": 1, "maxSize": 2, "bytes": 0, "maxBytes": 0, "ttl": 30, "hit": 1, "miss": 1,
+                "evictions": 0, "expirations": 0} == cached_manager.stats()
@@ -2059,6 +2059,26 @@ class TestConfigurationManager:
             updatepatch.assert_called_once_with(category_name, item_name, new_value_entry)
         readpatch.assert_called_once_with(category_name, item_name)
 
+    async def test_set_category_item_value_entry_cache_bytes(self, reset_singleton):
+        storage_client_mock = MagicMock(spec=StorageClientAsync)
+        c_mgr = ConfigurationManager(storage_client_mock)
+        c_mgr._cacheManager.max_cache_bytes = 10000
+        category_name = 'catname'
+        item_name = 'itemname'
+        new_value_entry = 'x' * 100
+        storage_value_entry = {'value': 'test', 'description': 'Test desc', 'type': 'string', 'default': 'test'}
+        c_mgr._cacheManager.update(category_name, "desc", {item_name: dict(storage_value_entry)})
+        size = c_mgr._cacheManager.cache[category_name]['size']
+        updated_value_entry = dict(storage_value_entry, value=new_value_entry)
+        with patch.object(ConfigurationManager, '_read_item_val', return_value=updated_value_entry):
+            with patch.object(ConfigurationManager, '_update_value_val', return_value=None):
+                with patch.object(ConfigurationManager, '_run_callbacks', return_value=None):
+                    await c_mgr.set_category_item_value_entry(category_name, item_name, new_value_entry)
+        # The size of the category changed in place is estimated again
+        assert new_value_entry == c_mgr._cacheManager.cache[category_name]['value'][item_name]['value']
+        assert size + 96 == c_mgr._cacheManager.cache[category_name]['size']
+        assert c_mgr._cacheManager.bytes == c_mgr._cacheManager.cache[category_name]['size']
+
     @pytest.mark.parametrize("new_value_entry, storage_result, exc_name, exc_msg", [
         ('', {'value': 'test', 'description': 'Test desc', 'type': 'string', 'default': 'test',
               'mandatory': 'true'}, ValueError, "A value must be given for itemname"),
@@ -2648,6 +2668,30 @@ class TestConfigurationManager:
         assert {"return": ["key", "description", "value", "display_name", {"column": "ts", "alias": "timestamp", "format": "YYYY-MM-DD HH24:MI:SS.MS"}]} == p
         assert [('key1', 'description1', 'display key1'), ('key2', 'description2', 'display key2')] == ret_val
 
+    async def test_warm_cache(self, reset_singleton):
+        async def mock_coro():
+            return {'rows': [{'key': 'key{}'.format(i), 'description': 'description{}'.format(i),
+                              'display_name': 'display key{}'.format(i),
+                              'value': {'item': {'type': 'string', 'default': 'v', 'value': 'v'}}}
+                             for i in range(1, 5)]}
+
+        # Changed in version 3.8: patch() now returns an AsyncMock if the target is an async function.
+        if sys.version_info.major == 3 and sys.version_info.minor >= 8:
+            _attr = await mock_coro()
+        else:
+            _attr = asyncio.ensure_future(mock_coro())
+
+        attrs = {"query_tbl_with_payload.return_value": _attr}
+        storage_client_mock = MagicMock(spec=StorageClientAsync, **attrs)
+        c_mgr = ConfigurationManager(storage_client_mock)
+        c_mgr._cacheManager.max_cache_size = 3
+        c_mgr._cacheManager.update('key2', 'cached', {})
+        assert 2 == await c_mgr.warm_cache()
+        assert ['key2', 'key1', 'key3'] == list(c_mgr._cacheManager.cache.keys())
+        assert 'cached' == c_mgr._cacheManager.cache['key2']['description']
+        assert 'display key3' == c_mgr._cacheManager.cache['key3']['displayName']
+        assert 0 == c_mgr._cacheManager.evictions
+
     async def test__read_all_category_names_0_row(self, reset_singleton):
         async def mock_coro():
             return {'rows': []}
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+# pyjq is a compiled extension, the tests count the compilations with a fake one
+with patch.dict(sys.modules, {'pyjq': MagicMock()}):
+    from fledge.common import jqfilter
+    from fledge.common.jqfilter import JQFilter
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+class FakePyjq:
+    def __init__(self):
+        self.compiled = []
+
+    def compile(self, filter_string):
+        self.compiled.append(filter_string)
+        if filter_string == 'bad':
+            raise ValueError('jq: error: syntax error')
+        program = MagicMock()
+        program.all.side_effect = lambda value: [value, filter_string]
+        return program
+
+
+@pytest.fixture
+def pyjq():
+    fake = FakePyjq()
+    JQFilter.invalidate()
+    with patch.object(jqfilter, 'pyjq', fake):
+        yield fake
+    JQFilter.invalidate()
+
+
+class TestJQFilter:
+
+    def test_compile_once(self, pyjq):
+        program = JQFilter.compile('.[0]')
+        assert program is JQFilter.compile('.[0]')
+        assert JQFilter.compile('.[1]') is not program
+        assert ['.[0]', '.[1]'] == pyjq.compiled
+
+    def test_transform(self, pyjq):
+        with patch.object(jqfilter, 'FLCoreLogger'):
+            jq_filter = JQFilter()
+        assert [{'a': 1}, '.'] == jq_filter.transform({'a': 1}, '.')
+        assert [{'a': 2}, '.'] == jq_filter.transform({'a': 2}, '.')
+        assert ['.'] == pyjq.compiled
+
+    def test_lru_eviction(self, pyjq):
+        filters = ['.[{}]'.format(i) for i in range(jqfilter._MAX_COMPILED_FILTERS)]
+        for f in filters:
+            JQFilter.compile(f)
+        # Used again, the first filter becomes the most recently used
+        JQFilter.compile(filters[0])
+        JQFilter.compile('.extra')
+        assert jqfilter._MAX_COMPILED_FILTERS == len(JQFilter._compiled)
+        assert filters[1] not in JQFilter._compiled
+        del pyjq.compiled[:]
+        JQFilter.compile(filters[0])
+        JQFilter.compile('.extra')
+        assert [] == pyjq.compiled
+        JQFilter.compile(filters[1])
+        assert [filters[1]] == pyjq.compiled
+
+    def test_invalidate(self, pyjq):
+        JQFilter.compile('.a')
+        JQFilter.compile('.b')
+        JQFilter.invalidate('.a')
+        JQFilter.invalidate('.unknown')
+        JQFilter.compile('.a')
+        JQFilter.compile('.b')
+        assert ['.a', '.b', '.a'] == pyjq.compiled
+        JQFilter.invalidate()
+        assert 0 == len(JQFilter._compiled)
+        JQFilter.compile('.b')
+        assert ['.a', '.b', '.a', '.b'] == pyjq.compiled
+
+    def test_compile_error_not_cached(self, pyjq):
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                JQFilter.compile('bad')
+        assert ['bad', 'bad'] == pyjq.compiled
+        assert 'bad' not in JQFilter._compiled
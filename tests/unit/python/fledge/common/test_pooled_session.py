@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+import asyncio
+
+import aiohttp
+import pytest
+
+from fledge.common.pooled_session import PooledSession
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+class TestPooledSession:
+
+    @pytest.mark.asyncio
+    async def test_session_reused_and_reopened(self):
+        pool = PooledSession(aiohttp.ClientSession)
+        assert pool.closed
+        session = pool.get()
+        assert session is pool.get()
+        await pool.close()
+        assert pool.closed
+        assert session.closed
+        reopened = pool.get()
+        assert reopened is not session
+        await pool.close()
+
+    def test_session_per_event_loop(self):
+        pool = PooledSession(aiohttp.ClientSession)
+
+        async def get():
+            return pool.get()
+
+        sessions = []
+        for _ in range(2):
+            loop = asyncio.new_event_loop()
+            try:
+                sessions.append(loop.run_until_complete(get()))
+                loop.run_until_complete(sessions[-1].close())
+            finally:
+                loop.close()
+        assert sessions[0] is not sessions[1]
+
+    @pytest.mark.asyncio
+    async def test_in_flight(self):
+        pool = PooledSession(aiohttp.ClientSession)
+        async with pool.acquire():
+            async with pool.acquire():
+                assert 2 == pool.in_flight
+            assert 1 == pool.in_flight
+        with pytest.raises(ValueError):
+            async with pool.acquire():
+                raise ValueError
+        assert 0 == pool.in_flight
+        await pool.close()
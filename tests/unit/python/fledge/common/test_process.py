@@ -3,12 +3,13 @@
 import pytest
 import sys
 
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 from fledge.common import process
 from fledge.common.storage_client.storage_client import ReadingsStorageClientAsync, StorageClientAsync
 from fledge.common.process import FledgeProcess, ArgumentParserError
-from fledge.common.microservice_management_client.microservice_management_client import MicroserviceManagementClient
+from fledge.common.microservice_management_client.microservice_management_client import \
+    MicroserviceManagementClient, AsyncMicroserviceManagementClient
 
 
 __author__ = "Ashwin Gopalakrishnan"
@@ -60,10 +61,26 @@ class TestFledgeProcess:
         assert fp._core_management_port == 32333
         assert fp._name is 'sname'
         assert hasattr(fp, '_core_microservice_management_client')
+        assert hasattr(fp, '_core_microservice_management_client_async')
         assert hasattr(fp, '_readings_storage_async')
         assert hasattr(fp, '_storage_async')
         assert hasattr(fp, '_start_time')
 
+    @pytest.mark.asyncio
+    async def test_close(self):
+        class FledgeProcessImp(FledgeProcess):
+            def run(self):
+                pass
+        with patch.object(FledgeProcess, '__init__', return_value=None):
+            fp = FledgeProcessImp()
+        fp._storage_async = MagicMock(StorageClientAsync)
+        fp._readings_storage_async = MagicMock(ReadingsStorageClientAsync)
+        fp._core_microservice_management_client_async = MagicMock(AsyncMicroserviceManagementClient)
+        await fp.close()
+        fp._storage_async.close.assert_awaited_once_with()
+        fp._readings_storage_async.close.assert_awaited_once_with()
+        fp._core_microservice_management_client_async.close.assert_awaited_once_with()
+
     def test_get_services_from_core(self):
         class FledgeProcessImp(FledgeProcess):
             def run(self):
@@ -5,8 +5,10 @@
 # FLEDGE_END
 
 import asyncio
+import datetime
 import json
 import sys
+import time
 
 from unittest.mock import MagicMock, patch
 import pytest
@@ -21,6 +23,21 @@ __license__ = "Apache 2.0"
 __version__ = "${VERSION}"
 
 
+async def mock_value(result):
+    return result
+
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    """Sets the local timezone, given as a POSIX TZ string"""
+    def set_timezone(tz):
+        monkeypatch.setenv('TZ', tz)
+        time.tzset()
+    yield set_timezone
+    monkeypatch.undo()
+    time.tzset()
+
+
 class TestStatistics:
 
     async def test_init_with_no_storage(self):
@@ -72,7 +89,7 @@ class TestStatistics:
         """ Test that register results in a database insert """
         storageMock = MagicMock(spec=StorageClientAsync)
         stats = statistics.Statistics(storageMock)
-        stats._registered_keys = []
+        stats._registered_keys = set()
 
         async def mock_coro():
             await asyncio.sleep(0)
@@ -100,7 +117,7 @@ class TestStatistics:
         """ Test that register results in a database insert only once for same key"""
         storageMock = MagicMock(spec=StorageClientAsync)
         stats = statistics.Statistics(storageMock)
-        stats._registered_keys = []
+        stats._registered_keys = set()
 
         async def mock_coro():
             return {"response": "updated", "rows_affected": 1}
@@ -134,7 +151,7 @@ class TestStatistics:
         """Test the load key"""
         storage_client_mock = MagicMock(spec=StorageClientAsync)
         s = statistics.Statistics(storage_client_mock)
-        s._registered_keys = []
+        s._registered_keys = set()
 
         async def mock_coro():
             return {'rows': [{"previous_value": 0, "value": 1,
@@ -154,7 +171,7 @@ class TestStatistics:
         """Test the load key exception"""
         storage_client_mock = MagicMock(spec=StorageClientAsync)
         s = statistics.Statistics(storage_client_mock)
-        s._registered_keys = []
+        s._registered_keys = set()
 
         async def mock_coro():
             return Exception
@@ -272,3 +289,114 @@ class TestStatistics:
                 with patch.object(statistics._logger, 'exception') as logger_exception:
                     await s.add_update(stat_dict)
                 logger_exception.assert_called_once_with(*msg)
+
+    async def test_add_update_registered_keys(self):
+        stat_dict = {'FOGBENCH/TEMPERATURE': 1, 'FOGBENCH/HUMIDITY': 2}
+        storage_client_mock = MagicMock(spec=StorageClientAsync)
+        s = statistics.Statistics(storage_client_mock)
+        s._registered_keys = {'FOGBENCH/TEMPERATURE', 'FOGBENCH/HUMIDITY'}
+        with patch.object(s._storage, 'update_tbl', return_value=await mock_value({"response": "updated"})
+                          ) as stat_update:
+            await s.add_update(stat_dict)
+        assert 1 == stat_update.call_count
+        args, kwargs = stat_update.call_args
+        assert 'statistics' == args[0]
+        assert 2 == len(json.loads(args[1])['updates'])
+
+    async def test_add_and_flush(self):
+        storage_client_mock = MagicMock(spec=StorageClientAsync)
+        s = statistics.Statistics(storage_client_mock)
+        s._pending = {}
+        s._pending_count = 0
+        s.add('READINGS', 2)
+        s.add('DISCARDED', 1)
+        s.add('READINGS', 3)
+        with patch.object(s, 'update_bulk', return_value=await mock_value(None)) as patch_update_bulk:
+            await s.flush()
+            # Nothing accumulated since
+            await s.flush()
+        patch_update_bulk.assert_called_once_with({'READINGS': 5, 'DISCARDED': 1})
+
+    async def test_flush_exception(self):
+        storage_client_mock = MagicMock(spec=StorageClientAsync)
+        s = statistics.Statistics(storage_client_mock)
+        s._pending = {}
+        s._pending_count = 0
+        s.add('READINGS', 2)
+        with patch.object(s, 'update_bulk', side_effect=Exception()):
+            with pytest.raises(Exception):
+                await s.flush()
+        s.add('READINGS', 3)
+        # Kept for the next flush
+        assert {'READINGS': 5} == s._pending
+        s._pending = {}
+        s._pending_count = 0
+
+    @pytest.mark.parametrize("key, value_increment, exception_name, exception_message", [
+        (123456, 120, TypeError, "key must be a string"),
+        ('READINGS', '120', ValueError, "value must be an integer")
+    ])
+    async def test_add_with_invalid_params(self, key, value_increment, exception_name, exception_message):
+        storage_client_mock = MagicMock(spec=StorageClientAsync)
+        s = statistics.Statistics(storage_client_mock)
+        with pytest.raises(exception_name) as excinfo:
+            s.add(key, value_increment)
+        assert exception_message == str(excinfo.value)
+
+    async def test_start_stop(self):
+        storage_client_mock = MagicMock(spec=StorageClientAsync)
+        s = statistics.Statistics(storage_client_mock)
+        s._pending = {}
+        s._pending_count = 0
+        flushed = []
+
+        async def update_bulk(stat_list):
+            flushed.append(stat_list)
+
+        with patch.object(s, 'update_bulk', side_effect=update_bulk):
+            s.start(interval=60, threshold=3)
+            try:
+                s.add('READINGS', 1)
+                s.add('READINGS', 1)
+                await asyncio.sleep(0.01)
+                assert [] == flushed
+                # The threshold is reached before the interval
+                s.add('DISCARDED', 1)
+                await asyncio.sleep(0.01)
+                assert [{'READINGS': 2, 'DISCARDED': 1}] == flushed
+                s.add('READINGS', 4)
+            finally:
+                s.flush_interval = statistics._FLUSH_INTERVAL
+                s.flush_threshold = statistics._FLUSH_THRESHOLD
+                # Written on stop
+                await s.stop()
+        assert [{'READINGS': 2, 'DISCARDED': 1}, {'READINGS': 4}] == flushed
+        assert s._flush_task is None
+
+
+class TestRollupBucket:
+
+    @pytest.mark.parametrize("tz, timestamp, resolution, start", [
+        ('UTC0', '2024-01-01 01:02:03.5', 60, '2024-01-01 01:02:00'),
+        ('UTC0', '2024-01-01 01:02:03.5', 86400, '2024-01-01 00:00:00'),
+        # Half hour offset, the hour buckets start on the local hour
+        ('IST-5:30', '2024-01-01 00:10:00', 3600, '2024-01-01 00:00:00'),
+        ('IST-5:30', '2024-01-01 00:10:00', 86400, '2024-01-01 00:00:00'),
+        ('EST5EDT,M3.2.0,M11.1.0', '2024-07-01 23:59:59', 86400, '2024-07-01 00:00:00'),
+        # The day the clocks go forward is 23 hours long
+        ('EST5EDT,M3.2.0,M11.1.0', '2024-03-10 23:30:00', 86400, '2024-03-10 00:00:00'),
+        ('EST5EDT,M3.2.0,M11.1.0', '2024-03-10 03:30:00', 3600, '2024-03-10 03:00:00')
+    ])
+    def test_rollup_bucket(self, local_timezone, tz, timestamp, resolution, start):
+        local_timezone(tz)
+        bucket = statistics.rollup_bucket(datetime.datetime.fromisoformat(timestamp).timestamp(), resolution)
+        assert datetime.datetime.fromisoformat(start).timestamp() == bucket
+        assert start + '.000' == statistics.rollup_history_ts(bucket)
+
+    def test_rollup_bucket_repeated_hour(self, local_timezone):
+        local_timezone('EST5EDT,M3.2.0,M11.1.0')
+        # 01:30 EDT then 01:30 EST, on the day the clocks go back
+        first, second = 1730611800, 1730615400
+        assert first - 1800 == statistics.rollup_bucket(first, 3600)
+        assert second - 1800 == statistics.rollup_bucket(second, 3600)
+        assert statistics.rollup_bucket(first, 86400) == statistics.rollup_bucket(second, 86400)
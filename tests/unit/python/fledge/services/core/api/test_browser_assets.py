@@ -16,6 +16,8 @@ import pytest
 
 from fledge.services.core.api import browser
 from fledge.services.core import connect
+from fledge.services.core.asset_counts import AssetReadingCounts
+from fledge.services.core.asset_structure import AssetStructureCatalog
 from fledge.common.storage_client.storage_client import ReadingsStorageClientAsync
 
 __author__ = "Ashish Jabble"
@@ -24,18 +26,15 @@ __license__ = "Apache 2.0"
 __version__ = "${VERSION}"
 
 
-URLS = ['fledge/asset',
-        '/fledge/asset/fogbench%2fhumidity',
+URLS = ['/fledge/asset/fogbench%2fhumidity',
         '/fledge/asset/fogbench%2fhumidity/temperature',
         '/fledge/asset/fogbench%2fhumidity/temperature/series']
 
-PAYLOADS = ['{"aggregate": {"column": "*", "alias": "count", "operation": "count"}, "group": "asset_code"}',
-            '{"return": ["reading", {"column": "user_ts", "alias": "timestamp", "timezone": "utc"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 20, "sort": {"column": "user_ts", "direction": "desc"}}',
+PAYLOADS = ['{"return": ["reading", {"column": "user_ts", "alias": "timestamp", "timezone": "utc"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 20, "sort": {"column": "user_ts", "direction": "desc"}}',
             '{"return": [{"column": "user_ts", "alias": "timestamp", "timezone": "utc"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 20, "sort": {"column": "user_ts", "direction": "desc"}}',
             '{"aggregate": [{"operation": "min", "alias": "min", "json": {"properties": "temperature", "column": "reading"}}, {"operation": "max", "alias": "max", "json": {"properties": "temperature", "column": "reading"}}, {"operation": "avg", "alias": "average", "json": {"properties": "temperature", "column": "reading"}}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "group": {"format": "YYYY-MM-DD HH24:MI:SS", "column": "user_ts", "alias": "timestamp"}, "limit": 20, "sort": {"column": "user_ts", "direction": "desc"}}'
             ]
-RESULTS = [{'rows': [{'count': 10, 'asset_code': 'TI sensorTag/luxometer'}], 'count': 1},
-           {'rows': [{'reading': {'temperature': 26, 'humidity': 93}, 'timestamp': '2018-02-16 15:08:51.026'}], 'count': 1},
+RESULTS = [{'rows': [{'reading': {'temperature': 26, 'humidity': 93}, 'timestamp': '2018-02-16 15:08:51.026'}], 'count': 1},
            {'rows': [{'temperature': 26, 'timestamp': '2018-02-16 15:08:51.026'}], 'count': 1},
            {'rows': [{'average': '26', 'timestamp': '2018-02-16 15:08:51', 'max': '26', 'min': '26'}], 'count': 1}
            ]
@@ -90,7 +89,7 @@ class TestBrowserAssets:
         return loop.run_until_complete(test_client(app))
 
     def test_routes_count(self, app):
-        assert 14 == len(app.router.resources())
+        assert 15 == len(app.router.resources())
 
     def test_routes_info(self, app):
         for index, route in enumerate(app.router.routes()):
@@ -169,9 +168,6 @@ class TestBrowserAssets:
                 json_response = json.loads(r)
                 if str(request_url).endswith("summary"):
                     assert {'temperature': result['rows'][0]} == json_response
-                elif str(request_url) == 'fledge/asset':
-                    result['rows'][0]['assetCode'] = result['rows'][0].pop('asset_code')
-                    assert result['rows'] == json_response
                 else:
                     assert result['rows'] == json_response
             args, kwargs = query_patch.call_args
@@ -415,6 +411,45 @@ class TestBrowserAssets:
             # FIXME: ordering issue and add tests for datetimeunits request param
             # assert '{"aggregate": [{"operation": "min", "json": {"column": "reading", "properties": "humidity"}, "alias": "min"}, {"operation": "max", "json": {"column": "reading", "properties": "humidity"}, "alias": "max"}, {"operation": "avg", "json": {"column": "reading", "properties": "humidity"}, "alias": "average"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench_humidity"}, "limit": 20}' in args1
 
+    @pytest.mark.parametrize("max_datapoints, queries", [(50, 1), (1, 3)])
+    async def test_asset_all_readings_summary_datapoints(self, client, max_datapoints, queries):
+        payloads = []
+
+        async def q_result(payload):
+            payload = json.loads(payload)
+            payloads.append(payload)
+            if 'return' in payload:
+                return {'rows': [{'reading': {'humidity': 20, 'temperature': 21.5, 'pressure': 1000}}], 'count': 1}
+            if len(payload['aggregate']) == 3:
+                return {'count': 1, 'rows': [{'min': 1, 'max': 2, 'average': 1.5}]}
+            return {'count': 1, 'rows': [{'min_0': 1, 'max_0': 2, 'average_0': 1.5, 'min_1': 3, 'max_1': 4,
+                                          'average_1': 3.5, 'min_2': 5, 'max_2': 6, 'average_2': 5.5}]}
+
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        readings_storage_client_mock.query.side_effect = q_result
+        with patch.object(browser, '_MAX_SUMMARY_DATAPOINTS', max_datapoints):
+            with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+                resp = await client.get('fledge/asset/fogbench_humidity/summary')
+                assert 200 == resp.status
+                r = await resp.text()
+                json_response = json.loads(r)
+        if max_datapoints == 1:
+            summary = [{'min': 1, 'max': 2, 'average': 1.5}] * 3
+        else:
+            summary = [{'min': 1, 'max': 2, 'average': 1.5}, {'min': 3, 'max': 4, 'average': 3.5},
+                       {'min': 5, 'max': 6, 'average': 5.5}]
+        assert [{'humidity': summary[0]}, {'temperature': summary[1]}, {'pressure': summary[2]}] == json_response
+        # the latest reading and the aggregates of its datapoints
+        assert 1 + queries == len(payloads)
+        aggregates = [a for p in payloads[1:] for a in p['aggregate']]
+        assert ['humidity'] * 3 + ['temperature'] * 3 + ['pressure'] * 3 == [a['json']['properties'] for a in aggregates]
+        if max_datapoints == 50:
+            assert ['min_0', 'max_0', 'average_0', 'min_1', 'max_1', 'average_1', 'min_2', 'max_2', 'average_2'] == \
+                   [a['alias'] for a in aggregates]
+        for payload in payloads[1:]:
+            assert {"column": "asset_code", "condition": "=", "value": "fogbench_humidity"} == payload['where']
+            assert 20 == payload['limit']
+
     @pytest.mark.skip(reason='TODO: FOGL-3541 rewrite tests')
     @pytest.mark.parametrize("asset_code", [
         "fogbench%2fhumidity",
@@ -648,3 +683,213 @@ class TestBrowserAssets:
             args, _ = query_patch.call_args
             assert json.loads(payload) == json.loads(args[0])
             query_patch.assert_called_once_with(args[0])
+
+    async def test_asset_structure(self, client, tmpdir):
+        catalog = AssetStructureCatalog(str(tmpdir.join('asset_structure.json')))
+        catalog.add_reading('AX8', {'internal': 21.5, 'units': 'Kelvin'})
+        catalog.add_reading('sinusoid', {'sinusoid': 1})
+        reading_counts = MagicMock(AssetReadingCounts)
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(browser, '_asset_structure_catalog', catalog), \
+                patch.object(browser, '_asset_reading_counts', reading_counts):
+            with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+                with patch.object(catalog, 'start') as start_patch:
+                    resp = await client.get('/fledge/structure/asset')
+                    assert 200 == resp.status
+                    r = await resp.text()
+                    assert {'AX8': {'datapoint': {'internal': 'float'}, 'metadata': {'units': 'Kelvin'}},
+                            'sinusoid': {'datapoint': {'sinusoid': 'integer'}}} == json.loads(r)
+                # The catalog is kept up to date in the background, the request reads it from memory only
+                start_patch.assert_called_once_with(readings_storage_client_mock, reading_counts)
+                readings_storage_client_mock.query.assert_not_called()
+
+    @pytest.mark.parametrize("method, bucket_size, limit", [('minmax', '0.333333', 4), ('lttb', '0.0625', 17)])
+    async def test_asset_reading_downsample(self, client, method, bucket_size, limit):
+        # Time buckets as aggregated by storage, newest first
+        rows = [{'timestamp': '2024-01-01 00:00:00.666666', 'min': 3, 'max': 3},
+                {'timestamp': '2024-01-01 00:00:00.333333', 'min': 1, 'max': 5},
+                {'timestamp': '2024-01-01 00:00:00.000000', 'min': 0, 'max': 2}]
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        readings_storage_client_mock.query.return_value = {'rows': rows, 'count': 3}
+        with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+            resp = await client.get('/fledge/asset/fogbench_humidity/temperature/downsample'
+                                    '?start=1704067200&length=1&points=8&method={}'.format(method))
+            assert 200 == resp.status
+            r = await resp.text()
+            json_response = json.loads(r)
+        assert [{'timestamp': '2024-01-01 00:00:00.000000', 'temperature': 0},
+                {'timestamp': '2024-01-01 00:00:00.000000', 'temperature': 2},
+                {'timestamp': '2024-01-01 00:00:00.333333', 'temperature': 1},
+                {'timestamp': '2024-01-01 00:00:00.333333', 'temperature': 5},
+                {'timestamp': '2024-01-01 00:00:00.666666', 'temperature': 3}] == json_response
+        # A single query, bounded by the number of points
+        readings_storage_client_mock.query.assert_called_once()
+        payload = json.loads(readings_storage_client_mock.query.call_args[0][0])
+        assert {"aggregate": [{"operation": "min", "json": {"column": "reading", "properties": "temperature"},
+                               "alias": "min"},
+                              {"operation": "max", "json": {"column": "reading", "properties": "temperature"},
+                               "alias": "max"}],
+                "where": {"column": "asset_code", "condition": "=", "value": "fogbench_humidity",
+                          "and": {"column": "user_ts", "condition": ">=", "value": "2024-01-01 00:00:00.000000",
+                                  "and": {"column": "user_ts", "condition": "<=",
+                                          "value": "2024-01-01 00:00:01.000000"}}},
+                "timebucket": {"timestamp": "user_ts", "size": bucket_size, "format": "YYYY-MM-DD HH24:MI:SS",
+                               "alias": "timestamp"},
+                "limit": limit} == payload
+
+    @pytest.mark.parametrize("request_params, message", [
+        ('?points=2', 'points must be an integer between 4 and 10000'),
+        ('?points=abc', "invalid literal for int() with base 10: 'abc'"),
+        ('?method=avg', 'method must be one of lttb, minmax'),
+        ('?length=0', 'length must be a positive integer'),
+    ])
+    async def test_bad_asset_reading_downsample(self, client, request_params, message):
+        resp = await client.get('/fledge/asset/fogbench_humidity/temperature/downsample{}'.format(request_params))
+        assert 400 == resp.status
+        assert message == resp.reason
+
+    @pytest.mark.parametrize("request_url, response", [
+        ('/fledge/asset', [{'count': 2, 'assetCode': 'TI sensorTag/luxometer'}, {'count': 1, 'assetCode': 'sinusoid'}]),
+        ('/fledge/asset/timespan', [{'asset_code': 'TI sensorTag/luxometer', 'oldest': '2024-01-01 00:00:00.000000',
+                                     'newest': '2024-01-01 00:00:02.000000'},
+                                    {'asset_code': 'sinusoid', 'oldest': '2024-01-01 00:00:01.000000',
+                                     'newest': '2024-01-01 00:00:01.000000'}]),
+        ('/fledge/asset/sinusoid/timespan', {'oldest': '2024-01-01 00:00:01.000000',
+                                             'newest': '2024-01-01 00:00:01.000000'})
+    ])
+    async def test_asset_counts_and_timespan(self, client, tmpdir, request_url, response):
+        async def q_result(payload):
+            payload = json.loads(payload)
+            if 'group' not in payload:
+                return {'rows': [{'min_id': 1, 'max_id': 3}], 'count': 1}
+            assert {"column": "id", "condition": ">", "value": 0,
+                    "and": {"column": "id", "condition": "<=", "value": 3}} == payload['where']
+            return {'rows': [{'asset_code': 'TI sensorTag/luxometer', 'count': 2, 'oldest': '2024-01-01 00:00:00.000000',
+                              'newest': '2024-01-01 00:00:02.000000'},
+                             {'asset_code': 'sinusoid', 'count': 1, 'oldest': '2024-01-01 00:00:01.000000',
+                              'newest': '2024-01-01 00:00:01.000000'}], 'count': 2}
+
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        readings_storage_client_mock.query.side_effect = q_result
+        reading_counts = AssetReadingCounts(str(tmpdir.join('asset_counts.json')))
+        with patch.object(browser, '_asset_reading_counts', reading_counts):
+            with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+                resp = await client.get(request_url)
+                assert 200 == resp.status
+                r = await resp.text()
+                assert response == json.loads(r)
+                # Nothing new, only the id range is queried
+                resp = await client.get(request_url)
+                assert 200 == resp.status
+        assert 3 == readings_storage_client_mock.query.call_count
+
+    @pytest.mark.parametrize("request_url, status, message", [
+        ('/fledge/asset', 400, 'ERROR: something went wrong'),
+        ('/fledge/asset/timespan', 404, 'ERROR: something went wrong'),
+        ('/fledge/asset/unknown/timespan', 404, 'unknown asset code not found')
+    ])
+    async def test_bad_asset_counts_and_timespan(self, client, tmpdir, request_url, status, message):
+        async def q_result(payload):
+            if request_url.startswith('/fledge/asset/unknown'):
+                return {'rows': [{'min_id': None, 'max_id': None}], 'count': 1}
+            return {'message': 'ERROR: something went wrong', 'retryable': False, 'entryPoint': 'retrieve'}
+
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        readings_storage_client_mock.query.side_effect = q_result
+        reading_counts = AssetReadingCounts(str(tmpdir.join('asset_counts.json')))
+        with patch.object(browser, '_asset_reading_counts', reading_counts):
+            with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+                resp = await client.get(request_url)
+                assert status == resp.status
+                assert message == resp.reason
+
+    @pytest.mark.parametrize("request_url, limit", [
+        ('/fledge/asset/fogbench_humidity?limit=5&stream=true', 5),
+        ('/fledge/asset/fogbench_humidity/temperature?limit=3', 3),
+        ('/fledge/asset/fogbench_humidity?seconds=60&stream=true', None)
+    ])
+    async def test_stream_readings(self, client, request_url, limit):
+        timestamps = ['2024-01-01 00:00:05.000000', '2024-01-01 00:00:04.000000', '2024-01-01 00:00:04.000000',
+                      '2024-01-01 00:00:04.000000', '2024-01-01 00:00:03.000000']
+        rows = [{'timestamp': ts, 'reading': {'temperature': i}} for i, ts in enumerate(timestamps)]
+        payloads = []
+
+        async def q_result(payload):
+            payload = json.loads(payload)
+            payloads.append(payload)
+            where = payload['where']
+            selected = rows
+            while 'and' in where:
+                where = where['and']
+                if where['condition'] == '<=':
+                    selected = [r for r in selected if r['timestamp'] <= where['value']]
+            selected = selected[payload.get('skip', 0):][:payload['limit']]
+            return {'rows': selected, 'count': len(selected)}
+
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        readings_storage_client_mock.query.side_effect = q_result
+        with patch.object(browser, '_STREAM_PAGE_SIZE', 2):
+            with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+                resp = await client.get(request_url)
+                assert 200 == resp.status
+                assert 'chunked' == resp.headers['Transfer-Encoding']
+                assert 'application/json' == resp.content_type
+                r = await resp.text()
+                assert rows[:limit] == json.loads(r)
+        # pages start at the timestamp of the last reading of the previous page, skipping those already read
+        expected = [(None, 0, 2), ('2024-01-01 00:00:04.000000', 1, 2), ('2024-01-01 00:00:04.000000', 3, 1)] \
+            if limit == 5 else [(None, 0, 2), ('2024-01-01 00:00:04.000000', 1, 1)] if limit == 3 else \
+            [(None, 0, 2), ('2024-01-01 00:00:04.000000', 1, 2), ('2024-01-01 00:00:04.000000', 3, 2)]
+
+        def page_start(where):
+            while 'and' in where:
+                where = where['and']
+                if where['column'] == 'user_ts' and where['condition'] == '<=':
+                    return where['value']
+            return None
+        assert expected == [(page_start(p['where']), p.get('skip', 0), p['limit']) for p in payloads]
+        assert all({"column": "user_ts", "direction": "desc"} == p['sort'] for p in payloads)
+
+    async def test_stream_readings_bad_request(self, client):
+        result = {'message': 'ERROR: something went wrong', 'retryable': False, 'entryPoint': 'retrieve'}
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        _rv = await mock_coro(result) if sys.version_info.major == 3 and sys.version_info.minor >= 8 \
+            else asyncio.ensure_future(mock_coro(result))
+        with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+            with patch.object(readings_storage_client_mock, 'query', return_value=_rv):
+                resp = await client.get('/fledge/asset/fogbench_humidity?stream=true')
+                assert 400 == resp.status
+                assert result['message'] == resp.reason
+
+    async def test_stream_datapoints_with_bucket_size(self, client):
+        payloads = []
+
+        async def q_result(payload):
+            payload = json.loads(payload)
+            payloads.append(payload)
+            return {'rows': [{'timestamp': str(len(payloads)), 'fogbench/humidity': {'min': 1}}] * 2, 'count': 2}
+
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        readings_storage_client_mock.query.side_effect = q_result
+        with patch.object(browser, '_STREAM_PAGE_SIZE', 2):
+            with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+                resp = await client.get('/fledge/asset/fogbench_humidity/bucket/60?start=1704067200&length=300'
+                                        '&stream=true')
+                assert 200 == resp.status
+                r = await resp.text()
+        # 5 buckets, newest first, in pages of 2 buckets split on multiples of 120 seconds
+        assert ['1', '1', '2', '2', '3'] == [row['timestamp'] for row in json.loads(r)]
+
+        def user_ts(where):
+            conditions = []
+            while 'and' in where:
+                where = where['and']
+                conditions.append((where['condition'], where['value']))
+            return conditions
+        assert [[('>=', '2024-01-01 00:04:00.000000'), ('<=', '2024-01-01 00:05:00')],
+                [('>=', '2024-01-01 00:02:00.000000'), ('<', '2024-01-01 00:04:00.000000')],
+                [('>=', '2024-01-01 00:00:00'), ('<', '2024-01-01 00:02:00.000000')]] == \
+               [user_ts(p['where']) for p in payloads]
+        assert [2, 2, 1] == [p['limit'] for p in payloads]
+        assert all({"timestamp": "user_ts", "size": "60", "format": "YYYY-MM-DD HH24:MI:SS", "alias": "timestamp"} ==
+                   p['timebucket'] for p in payloads)
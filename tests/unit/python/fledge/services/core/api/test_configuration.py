@@ -66,6 +66,20 @@ class TestConfiguration:
                 assert result == json_response
             patch_get_all_items.assert_called_once_with()
 
+    async def test_get_cache_statistics(self, client, reset_singleton):
+        storage_client_mock = MagicMock(StorageClientAsync)
+        c_mgr = ConfigurationManager(storage_client_mock)
+        c_mgr._cacheManager.update('rest_api', 'User REST API', {})
+        assert 'rest_api' in c_mgr._cacheManager
+        with patch.object(connect, 'get_storage_async', return_value=storage_client_mock):
+            resp = await client.get('/fledge/configuration/cache')
+            assert 200 == resp.status
+            json_response = json.loads(await resp.text())
+            assert 1 == json_response['size']
+            assert 1 == json_response['hit']
+            assert 0 == json_response['miss']
+            assert 0 == json_response['evictions']
+
     @pytest.mark.parametrize("value", [
         "True", "true", "trUe", "TRUE"
     ])
@@ -156,6 +156,22 @@ class TestService:
             }
         assert 10 == log_patch_info.call_count
 
+    async def test_get_monitor_statistics(self, client):
+        stats = {"maxConcurrentPings": 10, "lastRound": {"round": 1, "services": 1, "unresponsive": 0,
+                                                         "duration": 1.5}, "maxRoundDuration": 1.5, "services": {}}
+        monitor = MagicMock()
+        monitor.get_statistics.return_value = stats
+        with patch.object(server.Server, 'service_monitor', monitor):
+            resp = await client.get('/fledge/service/monitor')
+            assert 200 == resp.status
+            assert stats == json.loads(await resp.text())
+
+    async def test_get_monitor_statistics_not_running(self, client):
+        with patch.object(server.Server, 'service_monitor', None):
+            resp = await client.get('/fledge/service/monitor')
+            assert 503 == resp.status
+            assert "Service monitor is not running" == resp.reason
+
     @pytest.mark.parametrize("_type", ["blah", 1, "storage"])
     async def test_bad_get_service_with_type(self, client, _type):
         svc_type_members = ServiceRecord.Type._member_names_
@@ -9,6 +9,7 @@
 import asyncio
 import json
 import sys
+import time
 
 from unittest.mock import MagicMock, patch
 from aiohttp import web
@@ -16,6 +17,7 @@ import pytest
 
 from fledge.services.core import routes
 from fledge.services.core import connect
+from fledge.services.core.api import statistics as stats_api
 from fledge.common.storage_client.storage_client import StorageClientAsync
 
 __copyright__ = "Copyright (c) 2017 OSIsoft, LLC"
@@ -32,6 +34,16 @@ class TestStatistics:
         routes.setup(app)
         return loop.run_until_complete(test_client(app))
 
+    @pytest.fixture
+    def local_timezone(self, monkeypatch):
+        """Sets the local timezone, given as a POSIX TZ string"""
+        def set_timezone(tz):
+            monkeypatch.setenv('TZ', tz)
+            time.tzset()
+        yield set_timezone
+        monkeypatch.undo()
+        time.tzset()
+
     async def test_get_stats(self, client):
         payload = {"return": ["key", "description", "value"], "sort": {"column": "key", "direction": "asc"}}
         result = {"rows": [{"value": 0, "key": "BUFFERED", "description": "blah1"},
@@ -222,6 +234,102 @@ class TestStatistics:
         assert query_patch.called
         assert 1 == query_patch.call_count
 
+    @pytest.mark.parametrize("param, resolution, where", [
+        ("?resolution=3600&key=READINGS,BUFFERED&limit=2", 3600,
+         {"column": "resolution", "condition": "=", "value": 3600,
+          "and": {"column": "key", "condition": "in", "value": ["READINGS", "BUFFERED"]}}),
+        ("?resolution=7200&key=READINGS,BUFFERED&limit=2", 3600,
+         {"column": "resolution", "condition": "=", "value": 3600,
+          "and": {"column": "key", "condition": "in", "value": ["READINGS", "BUFFERED"]}}),
+        ("?resolution=100000&limit=2", 86400, {"column": "resolution", "condition": "=", "value": 86400})
+    ])
+    async def test_get_statistics_history_rollup(self, client, local_timezone, param, resolution, where):
+        local_timezone('UTC0')
+        output = {"interval": resolution, 'statistics': [
+            {"READINGS": 60, "BUFFERED": 5, "history_ts": "2024-01-01 01:00:00.000"},
+            {"READINGS": 40, "BUFFERED": 0, "history_ts": "2024-01-01 00:00:00.000"}]}
+        p1 = {"return": ["bucket", "key", "value"], "where": where, "sort": {"column": "bucket", "direction": "desc"},
+              "limit": 4}
+
+        async def q_result(*args):
+            table = args[0]
+            payload = args[1]
+            if table == 'schedules':
+                return {"rows": [{"schedule_interval": "00:00:15"}]}
+            if table == 'statistics':
+                return {"rows": [{"count_*": 2}]}
+            assert 'statistics_history_rollup' == table
+            assert p1 == json.loads(payload)
+            return {"rows": [{"bucket": 1704070800, "key": "READINGS", "value": 60},
+                             {"bucket": 1704070800, "key": "BUFFERED", "value": 5},
+                             {"bucket": 1704067200, "key": "READINGS", "value": 40},
+                             {"bucket": 1704067200, "key": "BUFFERED", "value": 0}]}
+
+        mock_async_storage_client = MagicMock(StorageClientAsync)
+        with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result):
+                resp = await client.get("/fledge/statistics/history{}".format(param))
+            assert 200 == resp.status
+            r = await resp.text()
+            assert output == json.loads(r)
+
+    async def test_get_statistics_history_rollup_local_time(self, client, local_timezone):
+        local_timezone('IST-5:30')
+
+        async def q_result(*args):
+            if args[0] == 'schedules':
+                return {"rows": [{"schedule_interval": "00:00:15"}]}
+            return {"rows": [{"bucket": 1704047400, "key": "READINGS", "value": 60}]}
+
+        mock_async_storage_client = MagicMock(StorageClientAsync)
+        with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result):
+                resp = await client.get("/fledge/statistics/history?resolution=86400")
+            assert 200 == resp.status
+            # Local midnight, as the timestamps of the statistics history
+            assert {"interval": 86400, "statistics": [{"READINGS": 60, "history_ts": "2024-01-01 00:00:00.000"}]} \
+                == json.loads(await resp.text())
+
+    async def test_get_statistics_history_rollup_range(self, client):
+        async def q_result(*args):
+            if args[0] == 'schedules':
+                return {"rows": [{"schedule_interval": "00:00:15"}]}
+            payload = json.loads(args[1])
+            since = payload['where']['and']['value']
+            # The bucket of the start of the range
+            assert 0 == since % 60
+            assert 24 * 60 * 60 + 60 >= time.time() - since >= 24 * 60 * 60
+            return {"rows": []}
+
+        mock_async_storage_client = MagicMock(StorageClientAsync)
+        with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result) as query_patch:
+                resp = await client.get("/fledge/statistics/history?resolution=60&days=1")
+            assert 200 == resp.status
+            assert {"interval": 60, "statistics": []} == json.loads(await resp.text())
+        assert 2 == query_patch.call_count
+
+    @pytest.mark.parametrize("param, status", [
+        ("?resolution=0", 400),
+        ("?resolution=blah", 400),
+        # Finer than the smallest rollup, the statistics history is used
+        ("?resolution=30", 200)
+    ])
+    async def test_get_statistics_history_resolution(self, client, param, status):
+        async def q_result(*args):
+            if args[0] == 'schedules':
+                return {"rows": [{"schedule_interval": "00:00:15"}]}
+            assert 'statistics_history' == args[0]
+            return {"rows": []}
+
+        mock_async_storage_client = MagicMock(StorageClientAsync)
+        with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result):
+                resp = await client.get("/fledge/statistics/history{}".format(param))
+            assert status == resp.status
+            if status == 400:
+                assert 'Resolution must be a positive integer' == resp.reason
+
     async def test_get_statistics_history_limit(self, client):
         output = {"interval": 60, 'statistics': [{"READINGS": 1, "BUFFERED": 10, "history_ts": "2018-02-20 13:16:24.321589"},
                                                  {"READINGS": 0, "BUFFERED": 10, "history_ts": "2018-02-20 13:16:09.321589"}]}
@@ -490,19 +598,22 @@ class TestStatistics:
         assert 400 == resp.status
         assert msg == resp.reason
 
-    async def test_get_statistics_rate(self, client, params='?periods=1,5&statistics=READINGS'):
-        output = {'rates': {'READINGS': {'1': 45.0, '5': 9.0}}}
+    async def test_get_statistics_rate(self, client, params='?periods=1,5&statistics=READINGS,PURGED'):
+        output = {'rates': {'READINGS': {'1': 45.0, '5': 9.0}, 'PURGED': {'1': 6.0, '5': 1.4}}}
         p1 = ({"where": {"value": "stats collector", "condition": "=", "column": "process_name"},
                "return": ["schedule_interval"]})
-        p2 = {"return": ["value"], "where": {"column": "key", "condition": "=", "value": "READINGS"},
-              "sort": {"column": "history_ts", "direction": "desc"}, "limit": 4}
-        p3 = {"return": ["value"], "where": {"column": "key", "condition": "=", "value": "READINGS"},
-              "sort": {"column": "history_ts", "direction": "desc"}, "limit": 20}
+        # The latest 20 rows of each key, as the 5 minutes period at a 15 seconds interval
+        p2 = {"return": ["key", "value"], "where": {"column": "key", "condition": "in", "value": ["READINGS", "PURGED"]},
+              "sort": {"column": "history_ts", "direction": "desc"}, "limit": 40}
 
         async def async_mock(return_value):
             return return_value
 
-        storage_rows = {"rows": [{"value": 15}, {"value": 10}, {"value": 5}, {"value": 15}], "count": 4}
+        storage_rows = {"rows": [{"key": "READINGS", "value": 15}, {"key": "PURGED", "value": 1},
+                                 {"key": "READINGS", "value": 10}, {"key": "PURGED", "value": 2},
+                                 {"key": "READINGS", "value": 5}, {"key": "PURGED", "value": 3},
+                                 {"key": "READINGS", "value": 15}, {"key": "PURGED", "value": 0},
+                                 {"key": "PURGED", "value": 1}], "count": 9}
         if sys.version_info.major == 3 and sys.version_info.minor >= 8:
             _rv1 = await async_mock({"rows": [{"schedule_interval": "00:00:15"}]})
             _rv2 = await async_mock(storage_rows)
@@ -511,21 +622,24 @@ class TestStatistics:
             _rv2 = asyncio.ensure_future(async_mock(storage_rows))
 
         mock_async_storage_client = MagicMock(StorageClientAsync)
-        with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
-            with patch.object(mock_async_storage_client, 'query_tbl_with_payload',
-                              side_effect=[_rv1, _rv2, _rv2]) as query_patch:
-                resp = await client.get("/fledge/statistics/rate{}".format(params))
-                assert 200 == resp.status
-                r = await resp.text()
-                assert output == json.loads(r)
-            assert query_patch.called
-            assert 3 == query_patch.call_count
-            args, _ = query_patch.call_args_list[0]
-            assert 'schedules' == args[0]
-            assert p1 == json.loads(args[1])
-            args, _ = query_patch.call_args_list[1]
-            assert 'statistics_history' == args[0]
-            assert p2 == json.loads(args[1])
-            args, _ = query_patch.call_args_list[2]
-            assert 'statistics_history' == args[0]
-            assert p3 == json.loads(args[1])
+        with patch.object(stats_api, '_rates_cache', {}):
+            with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
+                with patch.object(mock_async_storage_client, 'query_tbl_with_payload',
+                                  side_effect=[_rv1, _rv2]) as query_patch:
+                    resp = await client.get("/fledge/statistics/rate{}".format(params))
+                    assert 200 == resp.status
+                    r = await resp.text()
+                    assert output == json.loads(r)
+                    # Cached for the stats collector interval
+                    resp = await client.get("/fledge/statistics/rate{}".format(params))
+                    assert 200 == resp.status
+                    r = await resp.text()
+                    assert output == json.loads(r)
+                assert query_patch.called
+                assert 2 == query_patch.call_count
+                args, _ = query_patch.call_args_list[0]
+                assert 'schedules' == args[0]
+                assert p1 == json.loads(args[1])
+                args, _ = query_patch.call_args_list[1]
+                assert 'statistics_history' == args[0]
+                assert p2 == json.loads(args[1])
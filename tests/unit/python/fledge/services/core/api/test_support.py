@@ -142,102 +142,69 @@ class TestBundleSupport:
                 args = patch_logger.call_args
                 assert msg == args[0][1]
 
-    async def test_get_syslog_entries_all_ok(self, client):
-        def mock_syslog():
-            return """
-        echo "Mar 19 14:00:53 nerd51-ThinkPad Fledge[18809] INFO: server: fledge.services.core.server: start core
-        Mar 19 14:00:53 nerd51-ThinkPad Fledge[18809] INFO: server: fledge.services.core.server: Management API started on http://0.0.0.0:38311
-        Mar 19 14:00:53 nerd51-ThinkPad Fledge[18809] INFO: server: fledge.services.core.server: start storage, from directory /home/asinha/Development/Fledge/scripts
-        Mar 19 14:00:54 nerd51-ThinkPad Fledge[18809] INFO: service_registry: fledge.services.core.service_registry.service_registry: Registered service instance id=479a90ec-0d1d-4845-b2c5-f1d9ce72ac8e: <Fledge Storage, type=Storage, protocol=http, address=localhost, service port=33395, management port=45952, status=1>
-        Mar 19 14:00:58 nerd51-ThinkPad Fledge[18809] INFO: server: fledge.services.core.server: start scheduler
-        Mar 19 14:00:58 nerd51-ThinkPad Fledge Storage[18809]: Registered configuration category STORAGE, registration id 3db674a7-9569-4950-a328-1204834fba7e
-        Mar 19 14:00:58 nerd51-ThinkPad Fledge[18809] INFO: scheduler: fledge.services.core.scheduler.scheduler: Starting Scheduler: Management port received is 38311
-        Mar 19 14:00:58 nerd51-ThinkPad Fledge[18809] INFO: scheduler: fledge.services.core.scheduler.scheduler: Scheduled task for schedule 'purge' to start at 2018-03-19 15:00:58.912532
-        Mar 19 14:00:58 nerd51-ThinkPad Fledge[18809] INFO: scheduler: fledge.services.core.scheduler.scheduler: Scheduled task for schedule 'stats collection' to start at 2018-03-19 14:01:13.912532
-        Mar 19 14:00:58 nerd51-ThinkPad Fledge[18809] INFO: scheduler: fledge.services.core.scheduler.scheduler: Scheduled task for schedule 'certificate checker' to start at 2018-03-19 15:05:00
-        Apr 22 13:59:39 aj Fledge S1[28584] INFO: sinusoid: module.name: Sinusoid plugin_init called
-        Apr 22 13:57:08 aj Fledge S2[26398] INFO: sinusoid: module.name: Sinusoid plugin_reconfigure called
-        Apr 22 14:04:59 aj Fledge HT[7080] INFO: sending_process: sending_process_HT: Started"
-        """
-
-        with patch.object(support, "__GET_SYSLOG_CMD_TEMPLATE", mock_syslog()):
-            with patch.object(support, "__GET_SYSLOG_TOTAL_MATCHED_LINES", """echo "13" """):
-                resp = await client.get('/fledge/syslog')
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert 200 == resp.status
-                assert 13 == jdict['count']
-                assert 'INFO' in jdict['logs'][0]
-                assert 'Fledge' in jdict['logs'][0]
-                assert 'Fledge Storage' in jdict['logs'][5]
-
-    async def test_get_syslog_entries_all_with_level_error(self, client):
-        def mock_syslog():
-            return """
-            echo "Sep 12 13:31:41 nerd-034 Fledge PI[9241] ERROR: sending_process: sending_process_PI: cannot complete the sending operation
-            Dec 18 15:15:10 aj-ub1804 Fledge OMF[12145]: FATAL: Signal 11 (Segmentation fault) trapped:
-            Dec 18 15:15:10 aj-ub1804 Fledge OMF[12145]: INFO: Signal 11 (Segmentation fault) trapped:"
-            """
-
-        with patch.object(support, "__GET_SYSLOG_CMD_WITH_ERROR_TEMPLATE", mock_syslog()):
-            with patch.object(support, "__GET_SYSLOG_ERROR_MATCHED_LINES", """echo "2" """):
-                resp = await client.get('/fledge/syslog?level=error')
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert 200 == resp.status
-                assert 2 == jdict['count']
-                assert 'ERROR' in jdict['logs'][0]
-
-    async def test_get_syslog_entries_all_with_level_warning(self, client):
-        def mock_syslog():
-            return """
-            echo "Sep 12 14:31:36 nerd-034 Fledge Storage[8683]: SQLite3 storage plugin raising error: UNIQUE constraint failed: readings.read_key
-            Sep 12 17:42:23 nerd-034 Fledge[16637] WARNING: server: fledge.services.core.server: A Fledge PID file has been found: [/home/fledge/Development/Fledge/data/var/run/fledge.core.pid] found, ignoring it."
-            """
-        with patch.object(support, "__GET_SYSLOG_CMD_WITH_WARNING_TEMPLATE", mock_syslog()):
-            with patch.object(support, "__GET_SYSLOG_WARNING_MATCHED_LINES", """echo "2" """):
-                resp = await client.get('/fledge/syslog?level=warning')
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert 200 == resp.status
-                assert 2 == jdict['count']
-                assert 'error' in jdict['logs'][0]
-                assert 'WARNING' in jdict['logs'][1]
-
-    async def test_get_syslog_entries_from_storage(self, client):
-        def mock_syslog():
-            return """
-            echo "Sep 12 14:31:41 nerd-034 Fledge Storage[8874]: Starting service...
-            Sep 12 14:46:36 nerd-034 Fledge Storage[8683]: SQLite3 storage plugin raising error: UNIQUE constraint failed: readings.read_key
-            Sep 12 14:56:41 nerd-034 Fledge Storage[8979]: warning No directory found"
-            """
-        with patch.object(support, "__GET_SYSLOG_CMD_TEMPLATE", mock_syslog()):
-            with patch.object(support, "__GET_SYSLOG_TOTAL_MATCHED_LINES", """echo "3" """):
-                resp = await client.get('/fledge/syslog?source=Storage')
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert 200 == resp.status
-                assert 3 == jdict['count']
-                assert 'Fledge Storage' in jdict['logs'][0]
-                assert 'error' in jdict['logs'][1]
-                assert 'warning' in jdict['logs'][2]
-
-    async def test_get_syslog_entries_from_storage_with_level_warning(self, client):
-        def mock_syslog():
-            return """
-            echo "Sep 12 14:31:36 nerd-034 Fledge Storage[8683]: SQLite3 storage plugin raising error: UNIQUE constraint failed: readings.read_key
-            Sep 12 14:46:41 nerd-034 Fledge Storage[8979]: warning No directory found"
-            """
-        with patch.object(support, "__GET_SYSLOG_CMD_WITH_WARNING_TEMPLATE", mock_syslog()):
-            with patch.object(support, "__GET_SYSLOG_WARNING_MATCHED_LINES", """echo "3" """):
-                resp = await client.get('/fledge/syslog?source=storage&level=warning')
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert 200 == resp.status
-                assert 3 == jdict['count']
-                assert 'Fledge Storage' in jdict['logs'][0]
-                assert 'error' in jdict['logs'][0]
-                assert 'warning' in jdict['logs'][1]
+    @pytest.fixture
+    def syslog_file(self, tmpdir):
+        path = tmpdir.join('syslog')
+        path.write_binary("""Mar 19 14:00:53 nerd51-ThinkPad Fledge[18809] INFO: server: fledge.services.core.server: start core
+Mar 19 14:00:53 nerd51-ThinkPad systemd[1]: Started Session 2 of user fledge.
+Mar 19 14:00:54 nerd51-ThinkPad Fledge[18809] INFO: service_registry: fledge.services.core.service_registry.service_registry: Registered service instance
+Mar 19 14:00:58 nerd51-ThinkPad Fledge Storage[18810]: Registered configuration category STORAGE
+Sep 12 14:31:36 nerd-034 Fledge Storage[8683]: SQLite3 storage plugin raising error: UNIQUE constraint failed: readings.read_key
+Dec 21 10:20:03 aj-ub1804 Fledge[14623] WARNING: server: fledge.services.core.server: A Fledge PID file has been found.
+Dec 21 12:20:03 aj-ub1804 Fledge[14623] ERROR: change_callback: fledge.services.core.interest_registry.change_callback: Unable to notify microservice
+Dec 12 13:31:41 aj-ub1804 Fledge PI[9241] ERROR: sending_process: sending_process_PI: cannot complete the sending operation
+Dec 21 15:15:10 aj-ub1804 Fledge OMF[12145]: FATAL: Signal 11 (Segmentation fault) trapped:
+Apr 23 18:30:21 aj Fledge Sine 1[21288] ERROR: sinusoid: module.name: Sinusoid plugin_init
+Apr 23 18:30:21 aj Fledge HT[31901] INFO: sending_process: sending_process_HT: Started
+Apr 23 18:48:52 aj Fledge HT[31901] INFO: sending_process: sending_process_HT: Stopped
+Dec 21 25:15:10 aj-ub1804 Fledge sin[11011]: DEBUG: 'sinusoid' plugin reconfigure called
+""".encode())
+        with patch.object(support, '_SYSLOG_FILE', str(path)):
+            yield path
+
+    @pytest.mark.parametrize("param, count, first, last", [
+        ('', 12, 'start core', 'plugin reconfigure called'),
+        ('limit=2', 12, 'sending_process_HT: Stopped', 'plugin reconfigure called'),
+        ('limit=2&offset=10', 12, 'start core', 'Registered service instance'),
+        ('level=info', 9, 'start core', 'sending_process_HT: Stopped'),
+        ('level=warning', 5, 'A Fledge PID file', 'Sinusoid plugin_init'),
+        ('level=error', 4, 'Unable to notify microservice', 'Sinusoid plugin_init'),
+        ('source=storage', 2, 'category STORAGE', 'raising error'),
+        ('source=Storage&level=warning', 0, None, None),
+        ('source=Sine 1', 1, 'Sinusoid plugin_init', 'Sinusoid plugin_init'),
+        ('source=HT&level=error', 0, None, None),
+        ('source=HT&level=info&limit=1', 2, 'sending_process_HT: Stopped', 'sending_process_HT: Stopped'),
+        ('source=PI|OMF', 2, 'sending_process_PI', 'Segmentation fault'),
+        ('keyword=sending_process&limit=2&offset=1', 3, 'sending_process_PI', 'sending_process_HT: Started'),
+    ])
+    async def test_get_syslog_entries(self, client, syslog_file, param, count, first, last):
+        resp = await client.get('/fledge/syslog?{}'.format(param))
+        assert 200 == resp.status
+        jdict = json.loads(await resp.text())
+        assert count == jdict['count']
+        if first is None:
+            assert [] == jdict['logs']
+        else:
+            assert first in jdict['logs'][0]
+            assert last in jdict['logs'][-1]
+        assert all(' Fledge' in line for line in jdict['logs'])
+
+    async def test_get_syslog_entries_non_totals(self, client, syslog_file):
+        resp = await client.get('/fledge/syslog?nontotals=true&limit=1&offset=1&keyword=sinusoid')
+        assert 200 == resp.status
+        jdict = json.loads(await resp.text())
+        assert 'count' not in jdict
+        assert 1 == len(jdict['logs'])
+        assert 'Sinusoid plugin_init' in jdict['logs'][0]
+
+    async def test_get_syslog_entries_appended(self, client, syslog_file):
+        resp = await client.get('/fledge/syslog?source=storage')
+        assert 2 == json.loads(await resp.text())['count']
+        syslog_file.write("Dec 22 10:00:00 aj Fledge Storage[18810]: Storage shutdown\n", mode="a")
+        resp = await client.get('/fledge/syslog?source=storage&limit=1')
+        jdict = json.loads(await resp.text())
+        assert 3 == jdict['count']
+        assert 'Storage shutdown' in jdict['logs'][0]
 
     @pytest.mark.parametrize("param, message", [
         ('limit=-1', "Limit must be a positive integer."),
@@ -255,7 +222,7 @@ class TestBundleSupport:
 
     async def test_get_syslog_entries_cmd_exception(self, client):
         msg = 'Internal Server Error'
-        with patch.object(subprocess, "Popen", side_effect=Exception(msg)):
+        with patch.object(support.SyslogIndex, "query", side_effect=Exception(msg)):
             with patch.object(support._logger, "error") as patch_logger:
                 resp = await client.get('/fledge/syslog')
                 assert 500 == resp.status
@@ -265,40 +232,6 @@ class TestBundleSupport:
                 assert {"message": msg} == jdict
             assert 1 == patch_logger.call_count
 
-    async def test_get_syslog_entries_from_name(self, client):
-        def mock_syslog():
-            return """echo "Apr 23 18:30:21 aj Fledge Sine 1[21288] ERROR: sinusoid: module.name: Sinusoid plugin_init" 
-            """
-        with patch.object(support, "__GET_SYSLOG_CMD_TEMPLATE", mock_syslog()):
-            with patch.object(support, "__GET_SYSLOG_TOTAL_MATCHED_LINES", """echo "1" """):
-                resp = await client.get('/fledge/syslog?source=Sine 1')
-                assert 200 == resp.status
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert 1 == jdict['count']
-                assert 'Fledge Sine 1' in jdict['logs'][0]
-
-    @pytest.mark.parametrize("template_name, matched_lines, level, actual_count", [
-        ('__GET_SYSLOG_CMD_WITH_ERROR_TEMPLATE', '__GET_SYSLOG_ERROR_MATCHED_LINES', 'error', 0),
-        ('__GET_SYSLOG_CMD_WITH_INFO_TEMPLATE', '__GET_SYSLOG_INFO_MATCHED_LINES', 'info', 3)
-    ])
-    async def test_get_syslog_entries_from_name_with_level(self, client, template_name, matched_lines, level,
-                                                           actual_count):
-        def mock_syslog(_level):
-            if _level == 'info':
-                return """echo "Apr 23 18:30:21 aj Fledge HT[31901] INFO: sending_process: sending_process_HT: Started
-                 Apr 23 18:48:52 aj Fledge HT[31901] INFO: sending_process: sending_process_HT: Stopped
-                 Apr 23 18:48:52 aj Fledge HT[31901] INFO: sending_process: sending_process_HT: Execution completed" """
-            else:
-                return """echo "" """
-        with patch.object(support, template_name, mock_syslog(level)):
-            with patch.object(support, matched_lines, """echo "{}" """.format(actual_count)):
-                resp = await client.get('/fledge/syslog?source=HT&level={}'.format(level))
-                assert 200 == resp.status
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert actual_count == jdict['count']
-
     @pytest.mark.parametrize("level", [
         1,
         "blah",
@@ -316,49 +249,3 @@ class TestBundleSupport:
         res = await resp.text()
         jdict = json.loads(res)
         assert msg == jdict['message']
-
-    @pytest.mark.parametrize("template_name, matched_lines, level, actual_count", [
-        ('__GET_SYSLOG_CMD_WITH_INFO_TEMPLATE', '__GET_SYSLOG_INFO_MATCHED_LINES', 'info', 7),
-        ('__GET_SYSLOG_CMD_WITH_ERROR_TEMPLATE', '__GET_SYSLOG_ERROR_MATCHED_LINES', 'error', 4),
-        ('__GET_SYSLOG_CMD_WITH_WARNING_TEMPLATE', '__GET_SYSLOG_WARNING_MATCHED_LINES', 'warning', 5),
-        ('__GET_SYSLOG_CMD_TEMPLATE', '__GET_SYSLOG_TOTAL_MATCHED_LINES', 'debug', 8)
-    ])
-    async def test_get_syslog_entries_with_level(self, client, template_name, matched_lines, level, actual_count):
-        def mock_syslog(_level):
-            if _level == 'info':
-                return """echo "Dec 21 10:20:03 aj-ub1804 Fledge[14623] WARNING: server: fledge.services.core.server: A Fledge PID file has been found.
-                Dec 21 12:20:03 aj-ub1804 Fledge[14623] ERROR: change_callback: fledge.services.core.interest_registry.change_callback: Unable to notify microservice with uuid dc2b2f3a-0310-426f-8d1c-8bd3853fcf2f due to exception
-                Dec 12 13:31:41 aj-ub1804 Fledge PI[9241] ERROR: sending_process: sending_process_PI: cannot complete the sending operation
-                Dec 21 15:15:10 aj-ub1804 Fledge OMF[12145]: FATAL: Signal 11 (Segmentation fault) trapped:
-                Dec 21 16:52:48 aj-ub1804 Fledge[24953] INFO: scheduler: fledge.services.core.scheduler.scheduler: Service HTC records successfully removed
-                Dec 21 16:52:54 aj-ub1804 Fledge[24953] INFO: service_registry: fledge.services.core.service_registry.service_registry
-                Dec 21 25:15:10 aj-ub1804 Fledge OMF[12145]: FATAL: (0) 00x55ac77b9d1b9 handler(int) + 73---------"
-                """
-            elif _level == 'warning':
-                return """echo "Dec 21 10:20:03 aj-ub1804 Fledge[14623] WARNING: server: fledge.services.core.server: A Fledge PID file has been found.
-                Dec 21 12:20:03 aj-ub1804 Fledge[14623] ERROR: change_callback: fledge.services.core.interest_registry.change_callback: Unable to notify microservice with uuid dc2b2f3a-0310-426f-8d1c-8bd3853fcf2f due to exception
-                Dec 12 13:31:41 aj-ub1804 Fledge PI[9241] ERROR: sending_process: sending_process_PI: cannot complete the sending operation
-                Dec 21 15:15:10 aj-ub1804 Fledge OMF[12145]: FATAL: Signal 11 (Segmentation fault) trapped:
-                Dec 21 25:15:10 aj-ub1804 Fledge OMF[12145]: FATAL: (0) 00x55ac77b9d1b9 handler(int) + 73---------" """
-            elif _level == 'error':
-                return """echo "Dec 21 12:20:03 aj-ub1804 Fledge[14623] ERROR: change_callback: fledge.services.core.interest_registry.change_callback: Unable to notify microservice with uuid dc2b2f3a-0310-426f-8d1c-8bd3853fcf2f due to exception
-                Dec 12 13:31:41 aj-ub1804 Fledge PI[9241] ERROR: sending_process: sending_process_PI: cannot complete the sending operation
-                Dec 21 15:15:10 aj-ub1804 Fledge OMF[12145]: FATAL: Signal 11 (Segmentation fault) trapped:
-                Dec 21 25:15:10 aj-ub1804 Fledge OMF[12145]: FATAL: (0) 00x55ac77b9d1b9 handler(int) + 73---------" """
-            else:
-                return """echo "Dec 21 10:20:03 aj-ub1804 Fledge[14623] WARNING: server: fledge.services.core.server: A Fledge PID file has been found.
-                Dec 21 12:20:03 aj-ub1804 Fledge[14623] ERROR: change_callback: fledge.services.core.interest_registry.change_callback: Unable to notify microservice with uuid dc2b2f3a-0310-426f-8d1c-8bd3853fcf2f due to exception
-                Dec 12 13:31:41 aj-ub1804 Fledge PI[9241] ERROR: sending_process: sending_process_PI: cannot complete the sending operation
-                Dec 21 15:15:10 aj-ub1804 Fledge OMF[12145]: FATAL: Signal 11 (Segmentation fault) trapped:
-                Dec 21 16:52:48 aj-ub1804 Fledge[24953] INFO: scheduler: fledge.services.core.scheduler.scheduler: Service HTC records successfully removed
-                Dec 21 16:52:54 aj-ub1804 Fledge[24953] INFO: service_registry: fledge.services.core.service_registry.service_registry
-                Dec 21 25:15:10 aj-ub1804 Fledge OMF[12145]: FATAL: (0) 00x55ac77b9d1b9 handler(int) + 73---------
-                Dec 21 25:15:10 aj-ub1804 Fledge sin[11011]: DEBUG: 'sinusoid' plugin reconfigure called" """
-
-        with patch.object(support, template_name, mock_syslog(level)):
-            with patch.object(support, matched_lines, """echo "{}" """.format(actual_count)):
-                resp = await client.get('/fledge/syslog?level={}'.format(level))
-                assert 200 == resp.status
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert actual_count == jdict['count']
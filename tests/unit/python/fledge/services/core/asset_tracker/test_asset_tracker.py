@@ -12,6 +12,7 @@ import asyncio
 
 from fledge.services.core.asset_tracker.asset_tracker import AssetTracker
 from fledge.common.storage_client.storage_client import StorageClientAsync
+from fledge.common.storage_client.exceptions import StorageServerError
 from fledge.common.configuration_manager import ConfigurationManager
 
 __author__ = "Ashish Jabble"
@@ -81,4 +82,109 @@ class TestAssetTracker:
             assert payload == json.loads(args[1])
         patch_get_cat_item.assert_called_once_with(category_name='service', item_name='name')
 
+    async def test_add_asset_records_batched(self):
+        storage_client_mock = MagicMock(spec=StorageClientAsync)
+        asset_tracker = AssetTracker(storage_client_mock)
+        asset_tracker._registered_asset_records = [{'event': 'Ingest', 'service': 'sine', 'plugin': 'sinusoid',
+                                                    'asset': 'sinusoid', 'data': '{}'}]
+        asset_tracker._registered_asset_keys = None
+        asset_tracker.fledge_svc_name = 'Fledge'
+        inserts = []
+
+        async def insert_into_tbl(table, payload):
+            inserts.append(json.loads(payload))
+            await asyncio.sleep(0.01)
+            return {"response": "inserted", "rows_affected": 1}
+
+        with patch.object(asset_tracker._storage, 'insert_into_tbl', side_effect=insert_into_tbl):
+            results = await asyncio.gather(*[asset_tracker.add_asset_record(
+                asset='asset{}'.format(i % 3), event='Ingest', service='sine', plugin='sinusoid') for i in range(6)])
+            # Already registered, the data being compared as JSON
+            assert {} == await asset_tracker.add_asset_record(asset='sinusoid', event='Ingest', service='sine',
+                                                              plugin='sinusoid', jsondata={})
+        # Registered once by a single bulk insert
+        assert 1 == len(inserts)
+        assert ['asset0', 'asset1', 'asset2'] == [r['asset'] for r in inserts[0]['inserts']]
+        assert [{'asset': 'asset0', 'event': 'Ingest', 'service': 'sine', 'plugin': 'sinusoid', 'data': {},
+                 'fledge': 'Fledge'}, {}] == results[0:4:3]
+        assert 4 == len(asset_tracker._registered_asset_records)
+
+    async def test_add_asset_records_batch_error(self):
+        storage_client_mock = MagicMock(spec=StorageClientAsync)
+        asset_tracker = AssetTracker(storage_client_mock)
+        asset_tracker._registered_asset_records = []
+        asset_tracker._registered_asset_keys = None
+        asset_tracker.fledge_svc_name = 'Fledge'
+        inserts = []
+
+        async def insert_into_tbl(table, payload):
+            payload = json.loads(payload)
+            inserts.append(payload)
+            if 'inserts' in payload:
+                raise StorageServerError(code=400, reason='bad data', error={"message": "insert failed"})
+            if payload['asset'] == 'bad':
+                return {"message": "insert failed", "retryable": False}
+            return {"response": "inserted", "rows_affected": 1}
+
+        with patch.object(asset_tracker._storage, 'insert_into_tbl', side_effect=insert_into_tbl):
+            results = await asyncio.gather(
+                asset_tracker.add_asset_record(asset='good', event='Ingest', service='sine', plugin='sinusoid'),
+                asset_tracker.add_asset_record(asset='bad', event='Ingest', service='sine', plugin='sinusoid'),
+                return_exceptions=True)
+        # The bulk insert rejected by the storage is done again one record at a time
+        assert 3 == len(inserts)
+        assert 'good' == results[0]['asset']
+        assert isinstance(results[1], ValueError)
+        assert 'insert failed' == str(results[1])
+        assert [{'asset': 'good', 'event': 'Ingest', 'service': 'sine', 'plugin': 'sinusoid', 'data': {}}] == \
+               asset_tracker._registered_asset_records
+
+    async def test_add_asset_records_batch_no_response(self):
+        storage_client_mock = MagicMock(spec=StorageClientAsync)
+        asset_tracker = AssetTracker(storage_client_mock)
+        asset_tracker._registered_asset_records = []
+        asset_tracker._registered_asset_keys = None
+        asset_tracker.fledge_svc_name = 'Fledge'
+        inserts = []
+
+        async def insert_into_tbl(table, payload):
+            inserts.append(json.loads(payload))
+            return {"message": "insert failed", "retryable": False}
+
+        with patch.object(asset_tracker._storage, 'insert_into_tbl', side_effect=insert_into_tbl):
+            results = await asyncio.gather(
+                asset_tracker.add_asset_record(asset='a1', event='Ingest', service='sine', plugin='sinusoid'),
+                asset_tracker.add_asset_record(asset='a2', event='Ingest', service='sine', plugin='sinusoid'),
+                return_exceptions=True)
+        # May have been applied in part, so not done again
+        assert 1 == len(inserts)
+        assert all(isinstance(r, ValueError) and 'insert failed' == str(r) for r in results)
+        assert [] == asset_tracker._registered_asset_records
+
+    async def test_add_asset_records_insert_cancelled(self):
+        storage_client_mock = MagicMock(spec=StorageClientAsync)
+        asset_tracker = AssetTracker(storage_client_mock)
+        asset_tracker._registered_asset_records = []
+        asset_tracker._registered_asset_keys = None
+        asset_tracker.fledge_svc_name = 'Fledge'
+        inserting = asyncio.Event()
+
+        async def insert_into_tbl(table, payload):
+            inserting.set()
+            await asyncio.sleep(10)
+
+        with patch.object(asset_tracker._storage, 'insert_into_tbl', side_effect=insert_into_tbl):
+            records = [asyncio.ensure_future(asset_tracker.add_asset_record(
+                asset='a{}'.format(i), event='Ingest', service='sine', plugin='sinusoid')) for i in range(2)]
+            await inserting.wait()
+            # Queued while the first insert is in progress
+            records.append(asyncio.ensure_future(asset_tracker.add_asset_record(
+                asset='a2', event='Ingest', service='sine', plugin='sinusoid')))
+            await asyncio.sleep(0)
+            asset_tracker._insert_task.cancel()
+            results = await asyncio.wait_for(asyncio.gather(*records, return_exceptions=True), 1)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert asset_tracker._insert_task is None
+        assert {} == asset_tracker._pending
+
     # TODO: will add -ve tests later
@@ -279,6 +279,52 @@ class TestScheduler:
         assert 'COAP listener south' in args1
         assert 'OMF to PI north' in args2
 
+    @pytest.mark.asyncio
+    async def test__check_schedules_only_due(self, mocker):
+        # GIVEN
+        scheduler = Scheduler()
+        current_time = time.time()
+        mocker.patch.multiple(scheduler, _max_running_tasks=10, _start_time=current_time, _ready=True)
+        mocker.patch.object(scheduler._logger, "info")
+        scheduler.current_time = current_time
+        schedules = []
+        for i in range(10000):
+            schedule = scheduler._ScheduleRow(id=uuid.uuid4(), name='sch{}'.format(i), type=Schedule.Type.INTERVAL,
+                                              time=None, day=None, repeat=datetime.timedelta(seconds=60 + i),
+                                              repeat_seconds=60 + i, exclusive=True, enabled=True,
+                                              process_name='purge')
+            scheduler._schedules[schedule.id] = schedule
+            scheduler._schedule_first_task(schedule, current_time)
+            schedules.append(schedule)
+        started = []
+
+        async def start_task(schedule):
+            started.append(schedule.id)
+        mocker.patch.object(scheduler, '_start_task', side_effect=start_task)
+
+        # WHEN
+        earliest_start_time = await scheduler._check_schedules()
+
+        # THEN
+        assert current_time + 60 == earliest_start_time
+        assert 10000 == len(scheduler._queued_start_times)
+        assert not scheduler._schedules_to_check
+        assert [] == started
+
+        # WHEN
+        # Schedules 0 and 1 become due, 2 is queued
+        scheduler.current_time = current_time + 61
+        await scheduler.queue_task(schedules[2].id)
+        pop = mocker.spy(scheduler, '_pop_due_schedule')
+        earliest_start_time = await scheduler._check_schedules()
+
+        # THEN
+        assert 3 == len(started)
+        assert {schedules[0].id, schedules[1].id, schedules[2].id} == set(started)
+        # Two due schedules and the final miss
+        assert 3 == pop.call_count
+        assert current_time + 62 == earliest_start_time
+
     @pytest.mark.asyncio
     @pytest.mark.skip("_scheduler_loop() not suitable for unit testing. Will be tested during System tests.")
     async def test__scheduler_loop(self, mocker):
@@ -78,6 +78,7 @@ class TestMonitor:
                     with pytest.raises(Exception) as excinfo:
                         await monitor._monitor_loop()
                     assert excinfo.type is TestMonitorException
+                await monitor._session.close()
         # service is good, so it should remain in the service registry
         assert len(ServiceRegistry.get(idx=s_id_1)) is 1
         
@@ -139,5 +140,61 @@ class TestMonitor:
                 with pytest.raises(Exception) as excinfo:
                     await monitor._monitor_loop()
                 assert excinfo.type in [TestMonitorException, TypeError]
+            await monitor._session.close()
 
         assert ServiceRegistry.get(idx=s_id_1)[0]._status is ServiceRecord.Status.Failed
+
+    @pytest.mark.asyncio
+    async def test__monitor_concurrent_pings(self):
+        class TestMonitorException(Exception):
+            pass
+
+        with patch.object(ServiceRegistry._logger, 'info'):
+            s_ids = [ServiceRegistry.register('sname{}'.format(i), 'Southbound', 'saddress', i + 1, i + 1,
+                                              'protocol') for i in range(4)]
+        monitor = Monitor()
+        monitor._sleep_interval = Monitor._DEFAULT_SLEEP_INTERVAL
+        monitor._max_attempts = Monitor._DEFAULT_MAX_ATTEMPTS
+        monitor._max_concurrent_pings = 2
+        in_progress = []
+        max_in_progress = []
+
+        async def ping_service(service_record):
+            in_progress.append(service_record)
+            max_in_progress.append(len(in_progress))
+            await asyncio.sleep(0.01)
+            in_progress.remove(service_record)
+            return service_record._name != 'sname3'
+
+        with patch.object(Monitor, '_sleep', side_effect=TestMonitorException()):
+            with patch.object(monitor, '_ping_service', side_effect=ping_service):
+                with patch.object(monitor, '_acl_handler') as acl_handler:
+                    acl_handler.resolve_pending_notification_for_acl_change.side_effect = \
+                        lambda name: asyncio.sleep(0)
+                    with pytest.raises(TestMonitorException):
+                        await monitor._monitor_loop()
+
+        # pings overlap but never more than max_concurrent_pings of them
+        assert 2 == max(max_in_progress)
+        assert [ServiceRecord.Status.Running] * 3 + [ServiceRecord.Status.Unresponsive] == \
+               [ServiceRegistry.get(idx=s_id)[0]._status for s_id in s_ids]
+        stats = monitor.get_statistics()
+        assert {"round": 1, "services": 4, "unresponsive": 1} == {k: stats["lastRound"][k] for k in
+                                                                  ("round", "services", "unresponsive")}
+        assert 4 == len(stats["services"])
+        for name, rtt in stats["services"].items():
+            assert 1 == rtt["count"]
+            assert 1 == sum(rtt["histogram"].values())
+            assert "+Inf" in rtt["histogram"]
+
+    def test_ping_histograms_dropped_with_services(self):
+        with patch.object(ServiceRegistry._logger, 'info'):
+            s_ids = [ServiceRegistry.register('sname{}'.format(i), 'Southbound', 'saddress', i + 1, i + 1,
+                                              'protocol') for i in range(3)]
+        monitor = Monitor()
+        for name in ('sname0', 'sname1', 'sname2', 'renamed'):
+            monitor._record_ping(name, 0.001)
+        ServiceRegistry.get(idx=s_ids[1])[0]._status = ServiceRecord.Status.Shutdown
+        ServiceRegistry.remove_from_registry(s_ids[2])
+        monitor._drop_ping_histograms()
+        assert ['sname0'] == list(monitor.get_statistics()["services"])
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+import json
+from unittest.mock import MagicMock
+
+from fledge.common.storage_client.storage_client import ReadingsStorageClientAsync
+from fledge.services.core.asset_counts import AssetReadingCounts
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+class ReadingsBuffer:
+    """Readings client answering the id range and grouped count queries from a list of readings"""
+
+    def __init__(self):
+        self.rows = []
+        self.next_id = 1
+        self.counted = 0
+        self.client = MagicMock(ReadingsStorageClientAsync)
+        self.client.query.side_effect = self.query
+
+    def append(self, asset_code, count):
+        for _ in range(count):
+            self.rows.append({'id': self.next_id, 'asset_code': asset_code,
+                              'user_ts': '2024-01-01 00:00:{:02d}.000000'.format(self.next_id % 60)})
+            self.next_id += 1
+
+    def purge(self, below_id):
+        self.rows = [r for r in self.rows if r['id'] >= below_id]
+
+    def counts(self):
+        expected = {}
+        for r in self.rows:
+            entry = expected.setdefault(r['asset_code'], [0, r['user_ts'], r['user_ts']])
+            entry[0] += 1
+            entry[1] = min(entry[1], r['user_ts'])
+            entry[2] = max(entry[2], r['user_ts'])
+        return expected
+
+    async def query(self, payload):
+        payload = json.loads(payload)
+        if 'group' not in payload:
+            ids = [r['id'] for r in self.rows]
+            return {'rows': [{'min_id': min(ids, default=None), 'max_id': max(ids, default=None)}], 'count': 1}
+        after, upper = payload['where']['value'], payload['where']['and']['value']
+        selected = [r for r in self.rows if after < r['id'] <= upper]
+        self.counted += len(selected)
+        groups = {}
+        for r in selected:
+            entry = groups.setdefault(r['asset_code'], {'asset_code': r['asset_code'], 'count': 0,
+                                                         'oldest': r['user_ts'], 'newest': r['user_ts']})
+            entry['count'] += 1
+            entry['oldest'] = min(entry['oldest'], r['user_ts'])
+            entry['newest'] = max(entry['newest'], r['user_ts'])
+        return {'rows': list(groups.values()), 'count': len(groups)}
+
+
+class TestAssetReadingCounts:
+
+    async def test_append_and_purge(self, tmpdir):
+        buffer = ReadingsBuffer()
+        counts = AssetReadingCounts(str(tmpdir.join('counts.json')), segment_size=10)
+        buffer.append('A', 25)
+        buffer.append('B', 12)
+        await counts.refresh(buffer.client)
+        assert buffer.counts() == counts.assets()
+        assert 37 == buffer.counted
+
+        # Only the appended readings are counted
+        buffer.append('A', 3)
+        await counts.refresh(buffer.client)
+        assert buffer.counts() == counts.assets()
+        assert 40 == buffer.counted
+
+        # Purged up to id 24, segments 0 and 1 are dropped, segment 2 is counted again from id 24
+        buffer.purge(24)
+        await counts.refresh(buffer.client)
+        assert buffer.counts() == counts.assets()
+        assert 40 + 7 == buffer.counted
+
+        buffer.purge(buffer.next_id)
+        await counts.refresh(buffer.client)
+        assert {} == counts.assets()
+        buffer.append('C', 2)
+        await counts.refresh(buffer.client)
+        assert {'C': [2, '2024-01-01 00:00:41.000000', '2024-01-01 00:00:42.000000']} == counts.assets()
+
+    async def test_saved(self, tmpdir):
+        path = str(tmpdir.join('counts.json'))
+        buffer = ReadingsBuffer()
+        buffer.append('A', 15)
+        await AssetReadingCounts(path, segment_size=10).refresh(buffer.client)
+        buffer.append('B', 5)
+        reloaded = AssetReadingCounts(path, segment_size=10)
+        await reloaded.refresh(buffer.client)
+        assert buffer.counts() == reloaded.assets()
+        assert 15 + 5 == buffer.counted
+
+    async def test_storage_reset(self, tmpdir):
+        buffer = ReadingsBuffer()
+        buffer.append('A', 15)
+        counts = AssetReadingCounts(str(tmpdir.join('counts.json')), segment_size=10)
+        await counts.refresh(buffer.client)
+        buffer.rows = []
+        buffer.next_id = 1
+        buffer.append('B', 3)
+        await counts.refresh(buffer.client)
+        assert buffer.counts() == counts.assets()
+
+    async def test_remove(self, tmpdir):
+        buffer = ReadingsBuffer()
+        buffer.append('A', 5)
+        buffer.append('B', 5)
+        counts = AssetReadingCounts(str(tmpdir.join('counts.json')), segment_size=10)
+        await counts.refresh(buffer.client)
+        counts.remove('A')
+        assert ['B'] == list(counts.assets())
+        counts.remove()
+        assert {} == counts.assets()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from fledge.common.storage_client.storage_client import ReadingsStorageClientAsync
+from fledge.services.core.asset_counts import AssetReadingCounts
+from fledge.services.core.asset_structure import AssetStructureCatalog
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+def _readings_client(rows):
+    """Readings client answering the id range queries of the catalog from rows"""
+    queries = []
+
+    async def query(payload):
+        query = json.loads(payload)
+        queries.append(query)
+        if 'aggregate' in query:
+            return {'rows': [{'max_id': max([r['id'] for r in rows], default=None)}], 'count': 1}
+        after = query['where']['value']
+        selected = [r for r in rows if r['id'] > after][:query['limit']]
+        return {'rows': selected, 'count': len(selected)}
+
+    client = MagicMock(ReadingsStorageClientAsync)
+    client.query.side_effect = query
+    return client, queries
+
+
+class TestAssetStructureCatalog:
+
+    def test_add_reading(self, tmpdir):
+        catalog = AssetStructureCatalog(str(tmpdir.join('catalog.json')))
+        assert catalog.add_reading('AX8', {'spot1': 1.5, 'count': 2, 'alarm': 'False', 'units': 'Kelvin'}) is True
+        assert {'AX8': {'datapoint': {'spot1': 'float', 'count': 'integer', 'alarm': 'boolean'},
+                        'metadata': {'units': 'Kelvin'}}} == catalog.structure()
+        assert catalog.add_reading('AX8', {'spot1': 1.7, 'count': 3, 'alarm': 'True', 'units': 'Kelvin'}) is False
+        # The structure is the one of the latest reading
+        assert catalog.add_reading('AX8', {'spot2': 4, 'units': 'Celsius'}) is True
+        assert catalog.add_reading('sinusoid', {'sinusoid': 0.5}) is True
+        assert {'AX8': {'datapoint': {'spot2': 'integer'}, 'metadata': {'units': 'Celsius'}},
+                'sinusoid': {'datapoint': {'sinusoid': 'float'}}} == catalog.structure()
+        # A new metadata value is served, but is not worth saving the catalog
+        assert catalog.add_reading('AX8', {'spot2': 5, 'units': 'Kelvin'}) is False
+        assert {'datapoint': {'spot2': 'integer'}, 'metadata': {'units': 'Kelvin'}} == catalog.structure()['AX8']
+
+    async def test_refresh_incremental(self, tmpdir):
+        path = str(tmpdir.join('catalog.json'))
+        rows = [{'id': i, 'asset_code': 'A{}'.format(i % 3), 'reading': {'x': i}} for i in range(1, 8)]
+        client, queries = _readings_client(rows)
+        catalog = AssetStructureCatalog(path, batch_size=3)
+        await catalog.refresh(client)
+        assert ['A0', 'A1', 'A2'] == list(catalog.structure())
+        # 3 full batches and the last partial one
+        assert [0, 3, 6] == [q['where']['value'] for q in queries]
+        assert {'column': 'id', 'direction': 'asc'} == queries[0]['sort']
+
+        rows.append({'id': 8, 'asset_code': 'A3', 'reading': {'y': 'text'}})
+        del queries[:]
+        await catalog.refresh(client)
+        assert [7] == [q['where']['value'] for q in queries]
+        assert {'datapoint': {}, 'metadata': {'y': 'text'}} == catalog.structure()['A3']
+
+        # Saved with the id reached, a new catalog only reads what follows
+        del queries[:]
+        reloaded = AssetStructureCatalog(path, batch_size=3)
+        await reloaded.refresh(client)
+        assert catalog.structure() == reloaded.structure()
+        assert 8 == queries[0]['where']['value']
+
+    async def test_refresh_after_reset(self, tmpdir):
+        rows = [{'id': i, 'asset_code': 'A', 'reading': {'x': i}} for i in range(1, 5)]
+        client, queries = _readings_client(rows)
+        catalog = AssetStructureCatalog(str(tmpdir.join('catalog.json')))
+        await catalog.refresh(client)
+        # Storage is reset and ids start again
+        rows[:] = [{'id': 1, 'asset_code': 'B', 'reading': {'x': 1.0}}]
+        await catalog.refresh(client)
+        assert {'A': {'datapoint': {'x': 'integer'}}, 'B': {'datapoint': {'x': 'float'}}} == catalog.structure()
+
+    async def test_retain(self, tmpdir):
+        path = str(tmpdir.join('catalog.json'))
+        catalog = AssetStructureCatalog(path)
+        client, _ = _readings_client([{'id': 1, 'asset_code': 'A', 'reading': {'x': 1}},
+                                      {'id': 2, 'asset_code': 'B', 'reading': {'x': 1}}])
+        await catalog.refresh(client)
+        catalog.retain({'B': [1, None, None]})
+        assert ['B'] == list(catalog.structure())
+        # Saved, the purged asset does not come back on reload
+        reloaded = AssetStructureCatalog(path)
+        reloaded.load()
+        assert ['B'] == list(reloaded.structure())
+
+    async def test_background_refresh(self, tmpdir):
+        rows = [{'id': 1, 'asset_code': 'A', 'reading': {'x': 1}},
+                {'id': 2, 'asset_code': 'B', 'reading': {'x': 1.0}}]
+        client, _ = _readings_client(rows)
+        reading_counts = MagicMock(AssetReadingCounts)
+        reading_counts.assets.return_value = {'A': [1, None, None], 'B': [1, None, None]}
+        catalog = AssetStructureCatalog(str(tmpdir.join('catalog.json')))
+        catalog.start(client, reading_counts, interval=0.01)
+        try:
+            await asyncio.sleep(0.05)
+            assert {'A': {'datapoint': {'x': 'integer'}}, 'B': {'datapoint': {'x': 'float'}}} == catalog.structure()
+            # The readings of A are purged, a new asset arrives
+            rows[:] = [rows[1], {'id': 3, 'asset_code': 'C', 'reading': {'y': 2}}]
+            reading_counts.assets.return_value = {'B': [1, None, None], 'C': [1, None, None]}
+            await asyncio.sleep(0.05)
+            assert ['B', 'C'] == list(catalog.structure())
+            reading_counts.refresh.assert_called_with(client)
+        finally:
+            await catalog.stop()
+        assert catalog._task is None
+
+    async def test_background_refresh_error(self, tmpdir):
+        client = MagicMock(ReadingsStorageClientAsync)
+        client.query.return_value = {'message': 'failed'}
+        catalog = AssetStructureCatalog(str(tmpdir.join('catalog.json')))
+        with patch('fledge.services.core.asset_structure._logger') as logger_patch:
+            catalog.start(client, MagicMock(AssetReadingCounts), interval=0.01)
+            await asyncio.sleep(0.05)
+            # Still running, the refresh is tried again
+            assert not catalog._task.done()
+            await catalog.stop()
+        assert client.query.call_count > 1
+        logger_patch.warning.assert_called_with('Failed to refresh the asset structure catalog: \'failed\'')
+
+    async def test_remove(self, tmpdir):
+        path = str(tmpdir.join('catalog.json'))
+        catalog = AssetStructureCatalog(path)
+        client, _ = _readings_client([{'id': 1, 'asset_code': 'A', 'reading': {'x': 1}},
+                                      {'id': 2, 'asset_code': 'B', 'reading': {'x': 1}}])
+        await catalog.refresh(client)
+        reloaded = AssetStructureCatalog(path)
+        reloaded.remove('A')
+        assert ['B'] == list(reloaded.structure())
+        reloaded.remove()
+        assert {} == reloaded.structure()
+
+    async def test_storage_error(self, tmpdir):
+        client = MagicMock(ReadingsStorageClientAsync)
+
+        async def query(payload):
+            return {'message': 'failed'}
+        client.query.side_effect = query
+        with pytest.raises(KeyError) as exc_info:
+            await AssetStructureCatalog(str(tmpdir.join('catalog.json'))).refresh(client)
+        assert 'failed' == exc_info.value.args[0]
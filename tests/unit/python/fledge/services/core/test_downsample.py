@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+import datetime
+
+import pytest
+
+from fledge.services.core.downsample import LTTBDownsampler, MinMaxDownsampler
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def _buckets(values, interval=1.0):
+    """Bucket rows as returned by storage, newest first, values is a list of (min, max)"""
+    rows = []
+    for i, (low, high) in enumerate(values):
+        ts = START + datetime.timedelta(seconds=i * interval)
+        rows.append({'timestamp': ts.strftime('%Y-%m-%d %H:%M:%S.%f'), 'min': low, 'max': high})
+    return list(reversed(rows))
+
+
+class TestDownsample:
+
+    @pytest.mark.parametrize("cls, buckets", [(LTTBDownsampler, 1000), (MinMaxDownsampler, 249)])
+    def test_bounded(self, cls, buckets):
+        downsampler = cls(500)
+        assert buckets == downsampler.buckets
+        # Storage may return one more bucket than asked for
+        values = [(-(i % 100), i % 100) for i in range(buckets + 1)]
+        result = downsampler.result(_buckets(values))
+        assert len(result) <= 500
+        times = [p[0] for p in result]
+        assert times == sorted(times)
+        # first and last buckets are kept
+        assert '2024-01-01 00:00:00.000000' == result[0][2]
+        last = START + datetime.timedelta(seconds=buckets)
+        assert last.strftime('%Y-%m-%d %H:%M:%S.%f') == result[-1][2]
+
+    def test_minmax_keeps_peaks(self):
+        values = [(0.0, 0.0)] * 19
+        values[3] = (0.0, 50.0)
+        values[15] = (-50.0, 0.0)
+        result = MinMaxDownsampler(40).result(_buckets(values))
+        # a point for each flat bucket, two for the others
+        assert 21 == len(result)
+        assert 50.0 in [p[1] for p in result]
+        assert -50.0 in [p[1] for p in result]
+
+    def test_lttb(self):
+        # A single spike is kept, flat groups give one point each
+        values = [(1, 1)] * 50 + [(1, 100)] + [(1, 1)] * 49
+        result = LTTBDownsampler(12).result(_buckets(values))
+        assert 12 == len(result)
+        assert 100 in [p[1] for p in result]
+        assert (1, '2024-01-01 00:00:00.000000') == result[0][1:]
+        assert START.timestamp() == result[0][0]
+
+    def test_second_timestamps(self):
+        rows = [{'timestamp': '2024-01-01 00:00:01', 'min': 1, 'max': 1},
+                {'timestamp': '2024-01-01 00:00:00', 'min': 0, 'max': 2}]
+        result = LTTBDownsampler(10).result(rows)
+        assert [(START.timestamp(), 0, '2024-01-01 00:00:00'), (START.timestamp(), 2, '2024-01-01 00:00:00'),
+                (START.timestamp() + 1, 1, '2024-01-01 00:00:01')] == result
+
+    def test_ignored_values(self):
+        rows = _buckets([(1, 1), ('a', 'b'), (2.5, 2.5), (None, None), (True, True), (3, 3)])
+        assert [3, 2.5, 1] == sorted([p[1] for p in LTTBDownsampler(10).result(rows)], reverse=True)
+        assert [] == MinMaxDownsampler(10).result([])
@@ -109,16 +109,32 @@ class TestServer:
         Server._configuration_manager = ConfigurationManager(storage_client_mock)
         value = {'cacheSize': {'description': 'To control the caching size of Core Configuration Manager',
                                'type': 'integer', 'displayName': 'Cache Size', 'default': '30', 'value': '30',
-                               'order': '1', 'minimum': '1', 'maximum': '1000'}}
+                               'order': '1', 'minimum': '1', 'maximum': '1000'},
+                 'cacheMaxBytes': {'description': 'Upper bound of the size in bytes of the cached categories, '
+                                                  '0 for no bound', 'type': 'integer',
+                                   'displayName': 'Cache Max Bytes', 'default': '0', 'value': '1048576',
+                                   'order': '2', 'minimum': '0'},
+                 'cacheTTL': {'description': 'Time in seconds after which a cached category is read again, '
+                                             '0 to never expire', 'type': 'integer',
+                              'displayName': 'Cache TTL (In seconds)', 'default': '0', 'value': '60', 'order': '3',
+                              'minimum': '0'}}
 
         rv = await async_mock(value) if sys.version_info.major == 3 and sys.version_info.minor >= 8 else (
             asyncio.ensure_future(async_mock(value)))
+        warm_rv = await async_mock(0) if sys.version_info.major == 3 and sys.version_info.minor >= 8 else (
+            asyncio.ensure_future(async_mock(0)))
         with patch.object(Server._configuration_manager, 'create_category',
                           return_value=rv) as patch_create_cat:
             with patch.object(Server._configuration_manager, 'get_category_all_items',
                               return_value=rv) as patch_get_all_cat:
-                await Server.setup_config_manager()
+                with patch.object(Server._configuration_manager, 'warm_cache',
+                                  return_value=warm_rv) as patch_warm_cache:
+                    await Server.setup_config_manager()
+                patch_warm_cache.assert_called_once_with()
             patch_get_all_cat.assert_called_once_with('CONFIGURATION')
+        assert 30 == Server._configuration_manager._cacheManager.max_cache_size
+        assert 1048576 == Server._configuration_manager._cacheManager.max_cache_bytes
+        assert 60 == Server._configuration_manager._cacheManager.ttl
         patch_create_cat.assert_called_once_with('CONFIGURATION', Server._CONFIGURATION_DEFAULT_CONFIG,
                                                  'Core Configuration Manager', True,
                                                  display_name='Configuration Manager')
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+import os
+import threading
+from unittest.mock import patch
+
+from fledge.services.core import syslog_index
+from fledge.services.core.syslog_index import SyslogIndex
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+def _line(i, source='Fledge S1', level='INFO'):
+    return "Jan  1 00:00:{:02d} host {}[100] {}: message {}\n".format(i % 60, source, level, i)
+
+
+class TestSyslogIndex:
+
+    def test_query(self, tmpdir):
+        path = tmpdir.join('syslog')
+        path.write(''.join([_line(0), _line(1, 'Fledge'), "Jan  1 00:00:02 host kernel: noise\n",
+                            _line(3, level='ERROR'), _line(4, 'Fledge Storage', 'WARNING')]))
+        index = SyslogIndex(str(path))
+        assert (["Jan  1 00:00:03 host Fledge S1[100] ERROR: message 3\n"], 3) == index.query(
+            sources=['Fledge S1', 'Fledge Storage'], level='info', offset=1, limit=1)
+        assert ([_line(3, level='ERROR')], 1) == index.query(level='error')
+        assert ([_line(0), _line(1, 'Fledge')], None) == index.query(offset=2, limit=2, count=False)
+        assert ([], 0) == index.query(sources=['Fledge S2'])
+        assert ([_line(4, 'Fledge Storage', 'WARNING')], 1) == index.query(keyword='message 4')
+        assert ['Fledge', 'Fledge S1', 'Fledge Storage'] == index.sources()
+
+    def test_incremental_refresh(self, tmpdir):
+        path = tmpdir.join('syslog')
+        path.write(''.join(_line(i) for i in range(100)))
+        with patch.object(syslog_index, '_READ_CHUNK_SIZE', 64):
+            index = SyslogIndex(str(path))
+            assert 100 == index.query()[1]
+            # A partly written line is not indexed until complete
+            with open(str(path), 'a') as f:
+                f.write(_line(100)[:10])
+            lines, total = index.query(limit=1)
+            assert 100 == total
+            assert [_line(99)] == lines
+            with open(str(path), 'a') as f:
+                f.write(_line(100)[10:])
+            lines, total = index.query(limit=1)
+            assert 101 == total
+            assert [_line(100)] == lines
+
+    def test_rotation(self, tmpdir):
+        path = tmpdir.join('syslog')
+        path.write(''.join(_line(i) for i in range(10)))
+        index = SyslogIndex(str(path))
+        assert 10 == index.query()[1]
+        os.rename(str(path), str(tmpdir.join('syslog.1')))
+        path.write(''.join(_line(i) for i in range(20, 23)))
+        assert ([_line(20), _line(21), _line(22)], 3) == index.query()
+        # truncated in place
+        path.write(_line(30))
+        assert ([_line(30)], 1) == index.query()
+
+    def test_max_lines(self, tmpdir):
+        path = tmpdir.join('syslog')
+        path.write(''.join(_line(i) for i in range(100)) + ''.join(_line(i, level='ERROR') for i in range(100, 105)))
+        with patch.object(syslog_index, '_READ_CHUNK_SIZE', 256):
+            index = SyslogIndex(str(path), max_lines=10)
+            lines, total = index.query(limit=100)
+        # Only the most recent lines of each source and level are kept, at most twice max_lines
+        assert 10 <= total - 5 <= 20
+        assert [_line(i) for i in range(105 - total, 100)] + [_line(i, level='ERROR') for i in range(100, 105)] \
+            == lines
+        assert max(len(o) for o in index._offsets['Fledge S1']) <= 20
+
+    def test_query_while_indexing(self, tmpdir):
+        path = tmpdir.join('syslog')
+        path.write(_line(0))
+        index = SyslogIndex(str(path))
+        assert 1 == index.query()[1]
+        path.write(_line(1), mode='a')
+        indexing = threading.Event()
+        resume = threading.Event()
+        index_lines = index._index_lines
+        resumed = []
+
+        def slow_index_lines(data, end):
+            indexing.set()
+            resumed.append(resume.wait(2))
+            return index_lines(data, end)
+
+        with patch.object(index, '_index_lines', side_effect=slow_index_lines):
+            refresh = threading.Thread(target=index.refresh)
+            refresh.start()
+            assert indexing.wait(5)
+            # The index is read while the appended lines are being indexed
+            assert ['Fledge S1'] == index.sources()
+            resume.set()
+            refresh.join(5)
+        assert [True] == resumed
+        assert 2 == index.query()[1]
@@ -32,6 +32,12 @@ def mock_coro(*args, **kwargs):
 
 class TestUserModel:
 
+    def setup_method(self):
+        User.Objects.clear_cache()
+
+    def teardown_method(self):
+        User.Objects.clear_cache()
+
     async def test_initial_value(self):
         obj = User(1, 'admin', 'fledge')
         assert obj.uid == 1
@@ -791,6 +797,64 @@ class TestUserModel:
     async def test_token_expiration(self):
         pass
 
+    async def test_validate_token_cached(self):
+        token = ("eyJ0eXAiOiJKV1QiLCJhbGciOiJIUzUxMiJ9.eyJ1aWQiOjIsImV4cCI6MTcxNzQxNzAwMH0."
+                 "J9y-y_ssMTQJm5vzZiBIj8OjcoreIPRDUskl3_X0HRibX5ck5f_J8Ii-_WXngeIFdOdEWGz6KG5mB6QQiPQYcg")
+        valid_token_result = {'rows': [{"token_expiration": "2117-03-14 15:09:19.800648"}], 'count': 1}
+        storage_client_mock = MagicMock(StorageClientAsync)
+        _rv = await mock_coro(valid_token_result) if sys.version_info.major == 3 and sys.version_info.minor >= 8 \
+            else asyncio.ensure_future(mock_coro(valid_token_result))
+        _rv2 = await mock_coro({'rows_affected': 1}) if sys.version_info.major == 3 and sys.version_info.minor >= 8 \
+            else asyncio.ensure_future(mock_coro({'rows_affected': 1}))
+        with patch.object(connect, 'get_storage_async', return_value=storage_client_mock):
+            with patch.object(storage_client_mock, 'query_tbl_with_payload', return_value=_rv) as query_tbl_patch:
+                assert 2 == await User.Objects.validate_token(token)
+                assert 2 == await User.Objects.validate_token(token)
+            query_tbl_patch.assert_called_once()
+            # a revoked token is checked against storage again
+            with patch.object(storage_client_mock, 'delete_from_tbl', return_value=_rv2):
+                with patch.object(User.Sessions, 'remove', return_value=_rv2):
+                    await User.Objects.delete_token(token)
+            assert token not in User.Objects._tokens
+
+    async def test_refresh_token_expiry_coalesced(self):
+        tokens = ["token1", "token2"]
+        for token in tokens:
+            User.Objects._tokens[token] = {"uid": 2, "expiry": datetime(2117, 3, 14)}
+        storage_client_mock = MagicMock(StorageClientAsync)
+        _rv = await mock_coro({'rows_affected': 2}) if sys.version_info.major == 3 and sys.version_info.minor >= 8 \
+            else asyncio.ensure_future(mock_coro({'rows_affected': 2}))
+        with patch.object(connect, 'get_storage_async', return_value=storage_client_mock):
+            with patch.object(storage_client_mock, 'update_tbl', return_value=_rv) as update_tbl_patch:
+                with patch.object(asyncio, 'ensure_future') as ensure_future_patch:
+                    for token in tokens * 3:
+                        await User.Objects.refresh_token_expiry(token)
+                ensure_future_patch.assert_called_once()
+                ensure_future_patch.call_args[0][0].close()
+                update_tbl_patch.assert_not_called()
+                User.Objects._expiry_flush_task = None
+                await User.Objects.flush_token_expiry()
+            update_tbl_patch.assert_called_once()
+            args, kwargs = update_tbl_patch.call_args
+            assert 'user_logins' == args[0]
+            p = json.loads(args[1])
+            assert {"column": "token", "condition": "in", "value": sorted(tokens)} == \
+                   dict(p["where"], value=sorted(p["where"]["value"]))
+        assert not User.Objects._expiry_refresh_pending
+
+    async def test_get_cached(self):
+        storage_client_mock = MagicMock(StorageClientAsync)
+        user = {'id': 2, 'uname': 'user', 'role_id': 2}
+        _rv = await mock_coro({'rows': [user], 'count': 1}) if sys.version_info.major == 3 and \
+            sys.version_info.minor >= 8 else asyncio.ensure_future(mock_coro({'rows': [user], 'count': 1}))
+        with patch.object(connect, 'get_storage_async', return_value=storage_client_mock):
+            with patch.object(storage_client_mock, 'query_tbl_with_payload', return_value=_rv) as query_tbl_patch:
+                assert user == await User.Objects.get(uid=2)
+                assert user == await User.Objects.get(uid=2)
+            query_tbl_patch.assert_called_once()
+        User.Objects.invalidate_user(2)
+        assert 2 not in User.Objects._users
+
     async def test_delete_token(self):
         expected = {'response': 'deleted', 'rows_affected': 1}
         payload = '{"where": {"column": "token", "condition": "=", "value": "eyz"}}'
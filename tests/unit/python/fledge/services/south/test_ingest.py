@@ -11,11 +11,11 @@ import copy
 import pytest
 import sys
 import asyncio
-from unittest.mock import MagicMock, call
+from unittest.mock import AsyncMock, MagicMock, call
 from fledge.services.south.ingest import *
 from fledge.services.south import ingest
 from fledge.common.storage_client.storage_client import StorageClientAsync, ReadingsStorageClientAsync
-from fledge.common.microservice_management_client.microservice_management_client import MicroserviceManagementClient
+from fledge.common.microservice_management_client.microservice_management_client import AsyncMicroserviceManagementClient
 
 __author__ = "Amarendra K Sinha"
 __copyright__ = "Copyright (c) 2017 OSIsoft, LLC"
@@ -65,6 +65,8 @@ class TestIngest:
         Ingest._readings_insert_batch_timeout_seconds = 1
         Ingest._max_readings_insert_batch_connection_idle_seconds = 60
         Ingest._max_readings_insert_batch_reconnect_wait_seconds = 10
+        Ingest._readings_insert_batch_size_adaptive = False
+        Ingest._batch_size = None
         Ingest.category = 'South'
         Ingest.default_config = {
             "readings_buffer_size": {
@@ -108,11 +110,11 @@ class TestIngest:
         # GIVEN
         Ingest.storage_async = MagicMock(spec=StorageClientAsync)
         Ingest.readings_storage_async = MagicMock(spec=ReadingsStorageClientAsync)
-        mocker.patch.object(MicroserviceManagementClient, "__init__", return_value=None)
-        create_cfg = mocker.patch.object(MicroserviceManagementClient, "create_configuration_category", return_value=None)
-        get_cfg = mocker.patch.object(MicroserviceManagementClient, "get_configuration_category", return_value=get_cat(Ingest.default_config))
-        mocker.patch.object(MicroserviceManagementClient, "create_child_category", return_value=None)
-        Ingest._parent_service = MagicMock(_core_microservice_management_client=MicroserviceManagementClient())
+        mocker.patch.object(AsyncMicroserviceManagementClient, "__init__", return_value=None)
+        create_cfg = mocker.patch.object(AsyncMicroserviceManagementClient, "create_configuration_category", return_value=None)
+        get_cfg = mocker.patch.object(AsyncMicroserviceManagementClient, "get_configuration_category", return_value=get_cat(Ingest.default_config))
+        mocker.patch.object(AsyncMicroserviceManagementClient, "create_child_category", return_value=None)
+        Ingest._parent_service = MagicMock(_core_microservice_management_client_async=AsyncMicroserviceManagementClient())
 
         # WHEN
         await Ingest._read_config()
@@ -168,13 +170,13 @@ class TestIngest:
         }
         Ingest.storage_async = MagicMock(spec=StorageClientAsync)
         Ingest.readings_storage_async = MagicMock(spec=ReadingsStorageClientAsync)
-        mocker.patch.object(MicroserviceManagementClient, "__init__", return_value=None)
-        create_cfg = mocker.patch.object(MicroserviceManagementClient, "create_configuration_category",
+        mocker.patch.object(AsyncMicroserviceManagementClient, "__init__", return_value=None)
+        create_cfg = mocker.patch.object(AsyncMicroserviceManagementClient, "create_configuration_category",
                                          return_value=None)
-        get_cfg = mocker.patch.object(MicroserviceManagementClient, "get_configuration_category",
+        get_cfg = mocker.patch.object(AsyncMicroserviceManagementClient, "get_configuration_category",
                                       return_value=get_cat(Ingest.default_config))
-        mocker.patch.object(MicroserviceManagementClient, "create_child_category", return_value=None)
-        Ingest._parent_service = MagicMock(_core_microservice_management_client=MicroserviceManagementClient(), _name="test")
+        mocker.patch.object(AsyncMicroserviceManagementClient, "create_child_category", return_value=None)
+        Ingest._parent_service = MagicMock(_core_microservice_management_client_async=AsyncMicroserviceManagementClient(), _name="test")
         Ingest._parent_service.config = mock_config
         log_warning = mocker.patch.object(ingest._LOGGER, "warning")
 
@@ -196,6 +198,12 @@ class TestIngest:
             async def register(self, key, desc):
                 return None
 
+            def start(self):
+                pass
+
+            async def stop(self):
+                return None
+
         async def mock_create(storage):
             return mock_stat()
 
@@ -211,15 +219,16 @@ class TestIngest:
         mocker.patch.object(StorageClientAsync, "__init__", return_value=None)
         mocker.patch.object(ReadingsStorageClientAsync, "__init__", return_value=None)
         log_warning = mocker.patch.object(ingest._LOGGER, "warning")
-        mocker.patch.object(MicroserviceManagementClient, "__init__", return_value=None)
-        create_cfg = mocker.patch.object(MicroserviceManagementClient, "create_configuration_category", return_value=None)
-        get_cfg = mocker.patch.object(MicroserviceManagementClient, "get_configuration_category", return_value=get_cat(Ingest.default_config))
-        mocker.patch.object(MicroserviceManagementClient, "get_asset_tracker_events", return_value={'track':[]})
-        mocker.patch.object(MicroserviceManagementClient, "create_child_category", return_value=None)
+        mocker.patch.object(AsyncMicroserviceManagementClient, "__init__", return_value=None)
+        create_cfg = mocker.patch.object(AsyncMicroserviceManagementClient, "create_configuration_category", return_value=None)
+        get_cfg = mocker.patch.object(AsyncMicroserviceManagementClient, "get_configuration_category", return_value=get_cat(Ingest.default_config))
+        mocker.patch.object(AsyncMicroserviceManagementClient, "get_asset_tracker_events", return_value={'track':[]})
+        mocker.patch.object(AsyncMicroserviceManagementClient, "create_child_category", return_value=None)
         mocker.patch.object(statistics, "create_statistics", return_value=_rv2)
-        parent_service = MagicMock(_core_microservice_management_client=MicroserviceManagementClient())
+        parent_service = MagicMock(_core_microservice_management_client_async=AsyncMicroserviceManagementClient())
         mocker.patch.object(Ingest, "_write_statistics", return_value=_rv1)
         mocker.patch.object(Ingest, "_insert_readings", return_value=_rv1)
+        mocker.patch.object(Ingest, "_register_asset_tracker_events", return_value=_rv1)
 
         # WHEN
         await Ingest.start(parent=parent_service)
@@ -238,6 +247,55 @@ class TestIngest:
         assert Ingest._max_concurrent_readings_inserts == len(Ingest._readings_lists)
         assert 0 == log_warning.call_count
 
+    @pytest.mark.asyncio
+    async def test_start_adaptive_batch_size(self, mocker):
+        registered = []
+
+        class mock_stat:
+            async def register(self, key, desc):
+                registered.append(key)
+
+            def start(self):
+                pass
+
+        async def mock_create(storage):
+            return mock_stat()
+
+        config = get_cat(Ingest.default_config)
+        config.update({
+            "readings_insert_batch_size_adaptive": {"value": "true"},
+            "readings_insert_batch_size_min": {"value": "10"},
+            "readings_insert_batch_size_max": {"value": "1000"},
+            "readings_insert_latency_target_seconds": {"value": "0.2"}
+        })
+        mocker.patch.object(AsyncMicroserviceManagementClient, "__init__", return_value=None)
+        mocker.patch.object(AsyncMicroserviceManagementClient, "create_configuration_category", return_value=None)
+        mocker.patch.object(AsyncMicroserviceManagementClient, "get_configuration_category", return_value=config)
+        mocker.patch.object(AsyncMicroserviceManagementClient, "get_asset_tracker_events", return_value={'track': []})
+        mocker.patch.object(AsyncMicroserviceManagementClient, "create_child_category", return_value=None)
+        mocker.patch.object(statistics, "create_statistics", return_value=await mock_create(None))
+        parent_service = MagicMock(_core_microservice_management_client_async=AsyncMicroserviceManagementClient(),
+                                   _name="Sine")
+        mocker.patch.object(Ingest, "_insert_readings", return_value=await mock_coro())
+        mocker.patch.object(Ingest, "_register_asset_tracker_events", return_value=await mock_coro())
+
+        await Ingest.start(parent=parent_service)
+
+        # The maximum batch size is bounded by the size of a readings list, 500 / 5
+        assert 10 == Ingest._batch_size.minimum
+        assert 100 == Ingest._batch_size.maximum
+        assert 0.2 == Ingest._batch_size.target_latency
+        assert 100 == Ingest._readings_insert_batch_size
+        assert ['SINE_BATCH_INCREASED', 'SINE_BATCH_DECREASED'] == registered[2:]
+
+        # A slow insert shrinks the batch size and the decision is counted
+        Ingest.stats = MagicMock()
+        Ingest._batch_size.record(100, 0.4)
+        assert 50 == Ingest._batch_size.size
+        await Ingest._write_statistics()
+        Ingest.stats.add.assert_has_calls([call('SINE_BATCH_INCREASED', 0), call('SINE_BATCH_DECREASED', 1)])
+        Ingest._started = False
+
     @pytest.mark.asyncio
     async def test_stop(self, mocker):
 
@@ -248,6 +306,12 @@ class TestIngest:
             async def register(self, key, desc):
                 return None
 
+            def start(self):
+                pass
+
+            async def stop(self):
+                return None
+
         async def mock_create(storage):
             return mock_stat()
 
@@ -263,15 +327,16 @@ class TestIngest:
         mocker.patch.object(StorageClientAsync, "__init__", return_value=None)
         mocker.patch.object(ReadingsStorageClientAsync, "__init__", return_value=None)
         log_exception = mocker.patch.object(ingest._LOGGER, "exception")
-        mocker.patch.object(MicroserviceManagementClient, "__init__", return_value=None)
-        create_cfg = mocker.patch.object(MicroserviceManagementClient, "create_configuration_category", return_value=None)
-        get_cfg = mocker.patch.object(MicroserviceManagementClient, "get_configuration_category", return_value=get_cat(Ingest.default_config))
-        mocker.patch.object(MicroserviceManagementClient, "get_asset_tracker_events", return_value={'track':[]})
-        mocker.patch.object(MicroserviceManagementClient, "create_child_category", return_value=None)
+        mocker.patch.object(AsyncMicroserviceManagementClient, "__init__", return_value=None)
+        create_cfg = mocker.patch.object(AsyncMicroserviceManagementClient, "create_configuration_category", return_value=None)
+        get_cfg = mocker.patch.object(AsyncMicroserviceManagementClient, "get_configuration_category", return_value=get_cat(Ingest.default_config))
+        mocker.patch.object(AsyncMicroserviceManagementClient, "get_asset_tracker_events", return_value={'track':[]})
+        mocker.patch.object(AsyncMicroserviceManagementClient, "create_child_category", return_value=None)
         mocker.patch.object(statistics, "create_statistics", return_value=_rv2)
-        parent_service = MagicMock(_core_microservice_management_client=MicroserviceManagementClient())
+        parent_service = MagicMock(_core_microservice_management_client_async=AsyncMicroserviceManagementClient())
         mocker.patch.object(Ingest, "_write_statistics", return_value=_rv1)
         mocker.patch.object(Ingest, "_insert_readings", return_value=_rv1)
+        mocker.patch.object(Ingest, "_register_asset_tracker_events", return_value=_rv1)
 
         # WHEN
         await Ingest.start(parent=parent_service)
@@ -399,8 +464,8 @@ class TestIngest:
         Ingest._started = True
         mocker.patch.object(Ingest, "_write_statistics", return_value=(await mock_coro()))
         mocker.patch.object(Ingest, "_insert_readings", return_value=(await mock_coro()))
-        mocker.patch.object(MicroserviceManagementClient, "__init__", return_value=None)
-        mocker.patch.object(MicroserviceManagementClient, "create_asset_tracker_event", return_value=None)
+        mocker.patch.object(AsyncMicroserviceManagementClient, "__init__", return_value=None)
+        mocker.patch.object(AsyncMicroserviceManagementClient, "create_asset_tracker_event", return_value=None)
         assert 0 == len(Ingest._readings_lists[0])
         assert 'PUMP1' not in list(Ingest._sensor_stats.keys())
 
@@ -567,8 +632,8 @@ class TestIngest:
         Ingest._started = True
         mocker.patch.object(Ingest, "_write_statistics", return_value=(await mock_coro()))
         mocker.patch.object(Ingest, "_insert_readings", return_value=(await mock_coro()))
-        mocker.patch.object(MicroserviceManagementClient, "__init__", return_value=None)
-        mocker.patch.object(MicroserviceManagementClient, "create_asset_tracker_event", return_value=None)
+        mocker.patch.object(AsyncMicroserviceManagementClient, "__init__", return_value=None)
+        mocker.patch.object(AsyncMicroserviceManagementClient, "create_asset_tracker_event", return_value=None)
 
         assert 0 == len(Ingest._readings_lists[0])
         assert 'PUMP1' not in list(Ingest._sensor_stats.keys())
@@ -585,3 +650,101 @@ class TestIngest:
         # THEN
         assert 1 == len(Ingest._readings_lists[0])
         assert 1 == len(Ingest._readings_lists[1])
+
+    @pytest.mark.asyncio
+    async def test_add_readings_queues_new_assets_for_asset_tracker(self, mocker):
+        # GIVEN
+        Ingest._max_concurrent_readings_inserts = 1
+        Ingest._readings_list_size = 10
+        Ingest._current_readings_list_index = 0
+        Ingest._readings_lists = [[]]
+        Ingest._readings_list_not_empty = [asyncio.Event()]
+        Ingest._readings_list_batch_size_reached = [asyncio.Event()]
+        Ingest._started = True
+        Ingest._parent_service = MagicMock(_name="Sine", _plugin_info={'config': {'plugin': {'default': 'sinusoid'}}})
+        Ingest._asset_tracker_keys = {("pump1", "Ingest", "Sine", "sinusoid")}
+        Ingest._asset_tracker_queue = []
+        Ingest._asset_tracker_queue_not_empty = asyncio.Event()
+        create_event = AsyncMock()
+        Ingest._parent_service._core_microservice_management_client_async.create_asset_tracker_event = create_event
+
+        # WHEN
+        for asset in ("pump1", "pump2", "pump2", "pump3", "pump1"):
+            await Ingest.add_readings(asset=asset, timestamp="2017-01-02T01:02:03.23232Z-05:00",
+                                      readings={"velocity": 500})
+
+        # THEN
+        assert 5 == len(Ingest._readings_lists[0])
+        assert [("pump2", "Ingest", "Sine", "sinusoid"), ("pump3", "Ingest", "Sine", "sinusoid")] == \
+            Ingest._asset_tracker_queue
+        assert Ingest._asset_tracker_queue_not_empty.is_set()
+        assert 0 == create_event.call_count
+
+        # WHEN the queue is drained while stopping
+        create_event.side_effect = [None, Exception("core unavailable")]
+        Ingest._stop = True
+        await Ingest._register_asset_tracker_events()
+
+        # THEN
+        assert [] == Ingest._asset_tracker_queue
+        create_event.assert_has_calls([
+            call({"asset": "pump2", "event": "Ingest", "service": "Sine", "plugin": "sinusoid"}),
+            call({"asset": "pump3", "event": "Ingest", "service": "Sine", "plugin": "sinusoid"})])
+        # a failed registration is retried on the next reading of that asset
+        assert {("pump1", "Ingest", "Sine", "sinusoid"), ("pump2", "Ingest", "Sine", "sinusoid")} == \
+            Ingest._asset_tracker_keys
+
+    @pytest.mark.asyncio
+    async def test_add_readings_batch(self, mocker):
+        # GIVEN
+        Ingest._max_concurrent_readings_inserts = 2
+        Ingest._readings_list_size = 4
+        Ingest._readings_insert_batch_size = 3
+        Ingest._current_readings_list_index = 0
+        Ingest._readings_lists = [[], []]
+        Ingest._readings_list_not_empty = [asyncio.Event(), asyncio.Event()]
+        Ingest._readings_list_batch_size_reached = [asyncio.Event(), asyncio.Event()]
+        Ingest._started = True
+        Ingest._parent_service = MagicMock(_name="Sine", _plugin_info={'config': {'plugin': {'default': 'sinusoid'}}})
+        Ingest._asset_tracker_keys = set()
+        Ingest._asset_tracker_queue = []
+        Ingest._asset_tracker_queue_not_empty = None
+        log_warning = mocker.patch.object(ingest._LOGGER, "warning")
+        ts = "2017-01-02T01:02:03.23232Z-05:00"
+        readings = [{"asset": "pump1", "timestamp": ts, "readings": {"velocity": i}} for i in range(5)]
+        readings.insert(2, {"asset": None, "timestamp": ts, "readings": {}})
+        readings.insert(3, {"asset": "pump2", "timestamp": ts, "readings": 5})
+        readings.append({"asset": "pump2", "timestamp": ts})
+
+        # WHEN
+        result = await Ingest.add_readings_batch(readings)
+
+        # THEN
+        assert {"accepted": 6, "discarded": 2} == result
+        assert 3 == len(Ingest._readings_lists[0])
+        assert 3 == len(Ingest._readings_lists[1])
+        assert {'asset_code': 'pump1', 'reading': {'velocity': 0}, 'user_ts': ts} == Ingest._readings_lists[0][0]
+        assert {'asset_code': 'pump2', 'reading': {}, 'user_ts': ts} == Ingest._readings_lists[1][2]
+        assert all(e.is_set() for e in Ingest._readings_list_not_empty)
+        assert all(e.is_set() for e in Ingest._readings_list_batch_size_reached)
+        assert {'PUMP1': 5, 'PUMP2': 1} == Ingest._sensor_stats
+        assert 2 == Ingest._discarded_readings_stats
+        assert [("pump1", "Ingest", "Sine", "sinusoid"), ("pump2", "Ingest", "Sine", "sinusoid")] == \
+            Ingest._asset_tracker_queue
+        log_warning.assert_called_once_with('Discarded %s invalid readings, last error: %s', 2,
+                                            'readings must be a dictionary')
+
+        # WHEN the buffer is full
+        result = await Ingest.add_readings_batch([r for r in readings if r["asset"] == "pump1"][:3])
+
+        # THEN only the room left in the lists is used and the rest is discarded
+        assert {"accepted": 2, "discarded": 1} == result
+        assert 4 == len(Ingest._readings_lists[0])
+        assert 4 == len(Ingest._readings_lists[1])
+        assert 3 == Ingest._discarded_readings_stats
+
+    @pytest.mark.asyncio
+    async def test_add_readings_batch_not_started(self):
+        Ingest._started = False
+        with pytest.raises(RuntimeError):
+            await Ingest.add_readings_batch([])
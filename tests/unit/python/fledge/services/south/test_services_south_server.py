@@ -7,7 +7,7 @@
 import asyncio
 import copy
 import sys
-from unittest.mock import MagicMock, Mock, call, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, call, patch
 import pytest
 
 from fledge.services.south import server as South
@@ -115,6 +115,8 @@ class TestServicesSouthServer:
         }
         south_server._core_microservice_management_client = Mock()
         south_server._core_microservice_management_client.configure_mock(**attrs)
+        south_server._core_microservice_management_client_async = AsyncMock()
+        south_server._core_microservice_management_client_async.configure_mock(**attrs)
 
         mocker.patch.object(south_server, '_name', 'test')
 
@@ -491,6 +493,8 @@ class TestServicesSouthServer:
         }
         south_server._core_microservice_management_client = Mock()
         south_server._core_microservice_management_client.configure_mock(**attrs)
+        south_server._core_microservice_management_client_async = AsyncMock()
+        south_server._core_microservice_management_client_async.configure_mock(**attrs)
 
         mocker.patch.object(south_server, '_name', 'test')
 
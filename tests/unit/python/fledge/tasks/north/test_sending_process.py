@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+import asyncio
+import sys
+from unittest.mock import AsyncMock, MagicMock, call, patch
+
+import pytest
+
+try:
+    import pyjq
+except ImportError:
+    # pyjq is a compiled extension, the pipeline tests do not apply jq filters
+    sys.modules['pyjq'] = MagicMock()
+
+from fledge.common.process import FledgeProcess
+from fledge.tasks.north.sending_process import SendingProcess
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+def _block(object_id):
+    return [{'id': object_id, 'asset_code': 'sinusoid', 'reading': {'sinusoid': 0.5}}]
+
+
+async def _settle():
+    """Lets the fetch and send tasks run until they are all waiting"""
+    await asyncio.sleep(0.05)
+
+
+class FakePlugin:
+    """plugin_send of a north plugin, each block waits for its gate before being sent"""
+
+    def __init__(self, failures=None):
+        self.gates = {}
+        self.failures = dict(failures or {})
+        self.active = 0
+        self.peak = 0
+        self.sent = []
+
+    def gate(self, object_id):
+        return self.gates.setdefault(object_id, asyncio.Event())
+
+    async def plugin_send(self, handle, block, stream_id):
+        object_id = block[-1]['id']
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await self.gate(object_id).wait()
+        finally:
+            self.active -= 1
+        if self.failures.get(object_id):
+            if self.failures[object_id] > 0:
+                self.failures[object_id] -= 1
+            return False, None, 0
+        self.sent.append(object_id)
+        return True, object_id, len(block)
+
+
+@pytest.fixture
+def sending_process():
+    with patch.object(FledgeProcess, '__init__', return_value=None):
+        sp = SendingProcess()
+    sp._name = 'north'
+    sp._stream_id = 1
+    sp._config.update({'plugin': 'fake', 'source': 'readings'})
+    sp._config_from_manager = {}
+    sp._tracked_assets = []
+    sp._core_microservice_management_client_async = AsyncMock()
+    sp._audit = AsyncMock()
+    sp._update_position_reached = AsyncMock()
+    sp.TASK_SEND_SLEEP = 0.001
+    sp._memory_buffer = None
+    sp._task_stop = None
+    return sp
+
+
+def _start(sp, blocks=()):
+    sp._memory_buffer = asyncio.Queue(maxsize=sp._config['memory_buffer_size'])
+    for block in blocks:
+        sp._memory_buffer.put_nowait(block)
+    sp._task_stop = asyncio.Event()
+    sp._task_fetch_data_run = True
+    sp._task_send_data_run = True
+
+
+def _request_stop(sp):
+    sp._task_fetch_data_run = False
+    sp._task_send_data_run = False
+    sp._task_stop.set()
+
+
+@pytest.mark.asyncio
+class TestSendingProcessPipeline:
+
+    @pytest.mark.parametrize("max_concurrent_sends", [1, 3])
+    async def test_max_concurrent_sends(self, sending_process, max_concurrent_sends):
+        sp = sending_process
+        sp._config.update({'memory_buffer_size': 10, 'maxConcurrentSends': max_concurrent_sends})
+        sp._plugin = FakePlugin()
+        _start(sp, [_block(i) for i in range(1, 7)])
+        task = asyncio.ensure_future(sp._task_send_data())
+        await _settle()
+        assert max_concurrent_sends == sp._plugin.active
+        # No block is taken from the buffer while the sends in flight are at the limit
+        assert 6 - max_concurrent_sends == sp._memory_buffer.qsize()
+        for i in range(1, 7):
+            sp._plugin.gate(i).set()
+        await _settle()
+        assert max_concurrent_sends == sp._plugin.peak
+        assert [1, 2, 3, 4, 5, 6] == sorted(sp._plugin.sent)
+        sp._update_position_reached.assert_called_once_with(6, 6)
+        _request_stop(sp)
+        await asyncio.wait_for(task, 1)
+
+    async def test_position_waits_for_earlier_blocks(self, sending_process):
+        sp = sending_process
+        sp._config.update({'memory_buffer_size': 10, 'maxConcurrentSends': 3})
+        # Each acknowledged block updates the position
+        sp.TASK_SEND_UPDATE_POSITION_MAX = 0
+        # Block 1 fails once, then it is retried and sent
+        sp._plugin = FakePlugin(failures={1: 1})
+        _start(sp, [_block(i) for i in range(1, 4)])
+        task = asyncio.ensure_future(sp._task_send_data())
+        await _settle()
+        sp._plugin.gate(3).set()
+        sp._plugin.gate(2).set()
+        await _settle()
+        assert [3, 2] == sp._plugin.sent
+        # Blocks 2 and 3 are sent, but block 1 is not
+        sp._update_position_reached.assert_not_called()
+        sp._plugin.gate(1).set()
+        await _settle()
+        assert [3, 2, 1] == sp._plugin.sent
+        assert [call(1, 1), call(2, 1), call(3, 1)] == sp._update_position_reached.call_args_list
+        _request_stop(sp)
+        await asyncio.wait_for(task, 1)
+
+    async def test_termination_drains_sends(self, sending_process):
+        sp = sending_process
+        sp._config.update({'memory_buffer_size': 10, 'maxConcurrentSends': 3})
+        sp.TASK_SEND_UPDATE_POSITION_MAX = 0
+        # Block 2 always fails, blocks 3 and 4 wait for their gate
+        sp._plugin = FakePlugin(failures={2: -1})
+        sp._plugin.gate(1).set()
+        sp._plugin.gate(2).set()
+        _start(sp, [_block(i) for i in range(1, 6)])
+        task = asyncio.ensure_future(sp._task_send_data())
+        await _settle()
+        sp._update_position_reached.assert_called_once_with(1, 1)
+        _request_stop(sp)
+        await _settle()
+        # Blocks 3 and 4 are still being sent, the task waits for them
+        assert not task.done()
+        sp._plugin.gate(3).set()
+        sp._plugin.gate(4).set()
+        await asyncio.wait_for(task, 1)
+        assert [1, 3, 4] == sp._plugin.sent
+        # Blocks 3 and 4 have been sent after block 2 that has not, the position stays at block 1
+        sp._update_position_reached.assert_called_once_with(1, 1)
+        # No new block is sent after the termination request
+        assert 1 == sp._memory_buffer.qsize()
+
+    async def test_fetch_waits_while_buffer_full(self, sending_process):
+        sp = sending_process
+        sp._config.update({'memory_buffer_size': 2})
+        sp._last_object_id_read = AsyncMock(return_value=0)
+        loaded = []
+
+        async def load(last_object_id):
+            loaded.append(last_object_id)
+            return _block(last_object_id + 1)
+        sp._load_data_into_memory = load
+        _start(sp)
+        task = asyncio.ensure_future(sp._task_fetch_data())
+        await _settle()
+        # The third block waits for room in the buffer
+        assert [0, 1, 2] == loaded
+        assert 2 == sp._memory_buffer.qsize()
+        assert not task.done()
+        _request_stop(sp)
+        await asyncio.wait_for(task, 1)
+        assert [0, 1, 2] == loaded
+        assert [_block(1), _block(2)] == [sp._memory_buffer.get_nowait() for _ in range(2)]
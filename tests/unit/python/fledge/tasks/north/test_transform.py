@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+# FLEDGE_BEGIN
+# See: http://fledge-iot.readthedocs.io/
+# FLEDGE_END
+
+import copy
+
+import pytest
+
+import fledge.plugins.north.common.common as plugin_common
+from fledge.tasks.north.transform import ReadingsTransform, apply_date_format
+
+__author__ = "agent"
+__copyright__ = "Copyright (c) 2026 Dianomic Systems Inc."
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+def _convert_row(row):
+    """Row by row conversion the block conversion must match"""
+    def recurse(reading_payload):
+        for k, v in reading_payload.items():
+            if isinstance(v, dict):
+                for k1, v1 in v.items():
+                    if isinstance(v1, dict):
+                        reading_payload[k][k1] = plugin_common.convert_to_type(v1)
+                        recurse(v1)
+            else:
+                reading_payload[k] = plugin_common.convert_to_type(v)
+        return reading_payload
+
+    return {'id': row['id'], 'asset_code': row['asset_code'].replace(" ", ""), 'reading': recurse(row['reading']),
+            'user_ts': apply_date_format(row['user_ts'])}
+
+
+class TestReadingsTransform:
+
+    @pytest.mark.parametrize("value", [
+        "xxx", "180.2", "180.", "-10", "0", "1e3", "nan", "", " 12 ", "26/04/2018 11:14",
+        -180.2, 0.0, 180.0, 1e300, float('nan'), -10, 0, 10, 2 ** 53, 2 ** 53 + 1, -2 ** 60,
+        True, False, [1, "2"], {"a": "1", "b": {"c": "2.5", "d": {"e": "3"}}}
+    ])
+    def test_reading(self, value):
+        expected = _convert_row({'id': 1, 'asset_code': 'a', 'reading': {'v': copy.deepcopy(value)},
+                                 'user_ts': '2018-03-22 17:17:17.166347'})['reading']
+        converted = ReadingsTransform.reading({'v': copy.deepcopy(value)})
+        assert repr(expected) == repr(converted)
+
+    @pytest.mark.parametrize("value", [None, float('inf'), "inf"])
+    def test_reading_error(self, value):
+        with pytest.raises(Exception) as expected:
+            plugin_common.convert_to_type(value)
+        with pytest.raises(expected.type):
+            ReadingsTransform.reading({'v': value})
+
+    @pytest.mark.parametrize("timestamps", [
+        ['2018-05-28 16:56:55', '2018-05-28 16:56:56'],
+        ['2018-05-28 13:42:28.84', '2018-05-28 13:42:28.85'],
+        ['2018-03-22 17:17:17.166347', '2018-03-22 17:17:18.000001'],
+        ['2020-03-30 05:35:24.066553Z', '2020-03-30 05:35:25.066553Z'],
+        ['2018-03-22 17:17:17.166347+00:00', '2018-03-22 17:17:17.166348+00:00'],
+        ['2018-03-22 17:17:17.166347+00', '2018-03-22 17:17:17.166348+00'],
+        ['2018-03-22 17:17:17.166347+02:00', '2018-03-22 17:17:17.166347-05:00'],
+        ['2018-05-28 16:56:55+00:00', '2018-05-28 13:42:28.84+00:00'],
+        ['2018-05-28T16:56:55', '18-05-28 16:56:55']
+    ])
+    def test_timestamp(self, timestamps):
+        transform = ReadingsTransform()
+        for _ in range(2):
+            for timestamp in timestamps:
+                assert apply_date_format(timestamp) == transform.timestamp(timestamp)
+
+    def test_transform(self):
+        rows = []
+        for i in range(1, 301):
+            rows.append({'id': i, 'asset_code': 'sensor {}'.format(i % 3),
+                         'reading': {'temperature': str(20 + i % 7), 'humidity': 40.5 + i, 'count': i,
+                                     'status': ['ok', '1', '2.5'][i % 3], 'nested': {'x': {'y': str(i)}}},
+                         'user_ts': '2024-01-01 00:00:{:02d}.{:06d}'.format(i % 60, i)})
+        rows.append({'id': 301, 'asset_code': ' ', 'reading': {'v': 1}, 'user_ts': '2024-01-01 00:00:00'})
+        rows.append({'id': 302, 'asset_code': 'bad', 'reading': {'v': None}, 'user_ts': '2024-01-01 00:00:00'})
+        expected = [_convert_row(copy.deepcopy(row)) for row in rows[:300]]
+
+        converted, rejected = ReadingsTransform().transform(copy.deepcopy(rows))
+        assert repr(expected) == repr(converted)
+        assert [301, 302] == [row['id'] for row, _ in rejected]
+        assert rejected[0][1] is None
+        assert isinstance(rejected[1][1], TypeError)
@@ -8,7 +8,8 @@ import json
 import pytest
 import asyncio
 import sys
-from unittest.mock import patch, call, MagicMock
+import time
+from unittest.mock import patch, MagicMock
 from fledge.common.audit_logger import AuditLogger
 from fledge.common.configuration_manager import ConfigurationManager
 from fledge.common.logger import FLCoreLogger
@@ -55,7 +56,7 @@ class TestPurge:
         mock_process.assert_called_once_with()
 
     async def test_write_statistics(self):
-        """Test that write_statistics calls update statistics with defined keys and value increments"""
+        """Test that write_statistics writes the defined keys and value increments by a single bulk update"""
 
         mock_storage_client_async = MagicMock(spec=StorageClientAsync)
         mock_audit_logger = AuditLogger(mock_storage_client_async)
@@ -66,12 +67,12 @@ class TestPurge:
 
         with patch.object(FledgeProcess, '__init__'):
             with patch.object(Statistics, '_load_keys', return_value=_rv):
-                with patch.object(Statistics, 'update', return_value=_rv) as mock_stats_update:
+                with patch.object(Statistics, 'update_bulk', return_value=_rv) as mock_stats_update:
                     with patch.object(mock_audit_logger, "__init__", return_value=None):
                         p = Purge()
                         p._storage_async = mock_storage_client_async
                         await p.write_statistics(1, 2)
-                mock_stats_update.assert_has_calls([call('PURGED', 1), call('UNSNPURGED', 2)])
+                mock_stats_update.assert_called_once_with({'PURGED': 1, 'UNSNPURGED': 2})
 
     async def test_set_configuration(self):
         """Test that purge's set_configuration returns configuration item with key 'PURGE_READ' """
@@ -94,7 +95,7 @@ class TestPurge:
                     mock_create_child_cat.assert_called_once_with('Utilities', ['PURGE_READ'])
                 args, _ = mock_create_cat.call_args
                 assert 4 == len(args)
-                assert 5 == len(args[1].keys())
+                assert 8 == len(args[1].keys())
                 assert 'PURGE_READ' == args[0]
                 assert 'Purge the readings, log, statistics history table' == args[2]
                 assert args[3] is True
@@ -331,6 +332,31 @@ class TestPurge:
                 assert patch_storage.called
                 assert 2 == patch_storage.call_count
 
+    async def test_purge_stats_history(self):
+        """Test that the statistics history and each rollup resolution are purged by their own retention"""
+        mock_storage_client_async = MagicMock(spec=StorageClientAsync)
+        mock_audit_logger = AuditLogger(mock_storage_client_async)
+        config = {"retainStatsHistory": {"value": "7"}, "retainStatsHistoryMinute": {"value": "30"},
+                  "retainStatsHistoryHour": {"value": "365"}, "retainStatsHistoryDay": {"value": "3650"}}
+        deleted = []
+
+        async def delete(table, payload):
+            deleted.append((table, json.loads(payload)))
+
+        with patch.object(FledgeProcess, '__init__'):
+            with patch.object(mock_audit_logger, "__init__", return_value=None):
+                p = Purge()
+                p._storage_async = mock_storage_client_async
+                with patch.object(p._storage_async, 'delete_from_tbl', side_effect=delete):
+                    await p.purge_stats_history(config)
+        assert 4 == len(deleted)
+        assert 'statistics_history' == deleted[0][0]
+        for (table, payload), resolution, days in zip(deleted[1:], (60, 3600, 86400), (30, 365, 3650)):
+            assert 'statistics_history_rollup' == table
+            assert resolution == payload['where']['value']
+            assert '<' == payload['where']['and']['condition']
+            assert abs(time.time() - days * 86400 - payload['where']['and']['value']) < 60
+
     async def test_run(self):
         """Test that run calls all units of purge process"""
         mock_storage_client_async = MagicMock(spec=StorageClientAsync)
@@ -355,8 +381,10 @@ class TestPurge:
                         with patch.object(p, 'write_statistics', return_value=_rv3) as mock_write_stats:
                             with patch.object(p, 'purge_stats_history', return_value=_rv3) as mock_purge_stats_history:
                                 with patch.object(p, 'purge_audit_trail_log', return_value=_rv3) as mock_purge_audit:
-                                    await p.run()
-                                    # Test the positive case when no error in try block
+                                    with patch.object(p, 'close') as mock_close:
+                                        await p.run()
+                                        # Test the positive case when no error in try block
+                                    mock_close.assert_awaited_once_with()
                                 mock_purge_audit.assert_called_once_with("Some config")
                             mock_purge_stats_history.assert_called_once_with("Some config")
                         mock_write_stats.assert_called_once_with(1, 2)
@@ -384,7 +412,10 @@ class TestPurge:
                 with patch.object(p, 'set_configuration', return_value=_rv):
                     with patch.object(p, 'purge_data', side_effect=mock_purge):
                         with patch.object(p, 'write_statistics'):
-                            await p.run()
+                            with patch.object(p, 'close') as mock_close:
+                                await p.run()
                 # Test the negative case when function purge_data raise some exception
                 assert 1 == p._logger.exception.call_count
+                # The clients are closed all the same
+                mock_close.assert_awaited_once_with()
 
@@ -7,6 +7,8 @@
 """Test tasks/statistics/statistics_history.py"""
 
 import asyncio
+import json
+import time
 from unittest.mock import patch, MagicMock
 import pytest
 import sys
@@ -76,7 +78,7 @@ class TestStatisticsHistory:
                                     'value': 0, 'key': 'PURGED', 'previous_value': 0,
                                     'ts': '2018-08-31 17:03:17.597055+05:30'},
                                    {'description': 'Readings received by Fledge',
-                                    'value': 0, 'key': 'READINGS', 'previous_value': 0,
+                                    'value': 10, 'key': 'READINGS', 'previous_value': 4,
                                     'ts': '2018-08-31 17:03:17.597055+05:30'
                                     }]
                           }
@@ -88,10 +90,93 @@ class TestStatisticsHistory:
                     _rv1 = asyncio.ensure_future(mock_coro(retval))
                     _rv2 = asyncio.ensure_future(mock_coro(None))
 
-                with patch.object(sh._storage_async, "query_tbl", return_value=_rv1) as mock_keys:
+                with patch.object(sh._storage_async, "query_tbl_with_payload", return_value=_rv1) as mock_keys:
                     with patch.object(sh, "_bulk_update_previous_value", return_value=_rv2) as mock_update:
                         with patch.object(sh._storage_async, "insert_into_tbl", return_value=_rv2) as mock_bulk_insert:
-                            await sh.run()
+                            with patch.object(sh, "_rollup", return_value=_rv2) as mock_rollup:
+                                with patch.object(sh, "close") as mock_close:
+                                    await sh.run()
+                                mock_close.assert_awaited_once_with()
+                            args, kwargs = mock_rollup.call_args
+                            assert {'PURGED': 0, 'READINGS': 6} == args[0]
                     assert 1 == mock_bulk_insert.call_count
-                    assert 1 == mock_update.call_count
-                mock_keys.assert_called_once_with('statistics')
+                    args, kwargs = mock_bulk_insert.call_args
+                    assert "statistics_history" == args[0]
+                    assert [('PURGED', 0), ('READINGS', 6)] == [(i['key'], i['value']) for i in
+                                                                 json.loads(args[1])['inserts']]
+                    # Only the changed key
+                    mock_update.assert_called_once_with({'updates': [
+                        {'values': {'previous_value': 10},
+                         'where': {'column': 'key', 'condition': '=', 'value': 'READINGS'}}]})
+                mock_keys.assert_called_once_with('statistics', '{"return": ["key", "value", "previous_value"]}')
+
+    @pytest.fixture
+    def local_timezone(self, monkeypatch):
+        """Sets the local timezone, given as a POSIX TZ string"""
+        def set_timezone(tz):
+            monkeypatch.setenv('TZ', tz)
+            time.tzset()
+        yield set_timezone
+        monkeypatch.undo()
+        time.tzset()
+
+    async def test_rollup(self, local_timezone):
+        local_timezone('UTC0')
+        with patch.object(FledgeProcess, '__init__'):
+            with patch.object(FLCoreLogger, "get_logger"):
+                sh = StatisticsHistory()
+        sh._storage_async = MagicMock(spec=StorageClientAsync)
+        calls = []
+
+        async def query(table, payload):
+            payload = json.loads(payload)
+            resolution = payload['where']['value']
+            calls.append(('query', table, resolution, payload['where']['and']['value']))
+            # The minute bucket has already been written by a previous run
+            return {'rows': [{'key': 'READINGS'}, {'key': 'PURGED'}] if resolution == 60 else []}
+
+        async def insert(table, payload):
+            calls.append(('insert', table, json.loads(payload)))
+
+        async def update(table, payload):
+            calls.append(('update', table, json.loads(payload)))
+
+        sh._storage_async.query_tbl_with_payload.side_effect = query
+        sh._storage_async.insert_into_tbl.side_effect = insert
+        sh._storage_async.update_tbl.side_effect = update
+        # 2024-01-01 01:02:03
+        await sh._rollup({'READINGS': 6, 'PURGED': 0}, 1704070923.5)
+        assert ('query', 'statistics_history_rollup', 60, 1704070920) == calls[0]
+        # Only the changed key of the existing bucket is updated
+        assert ('update', 'statistics_history_rollup', {'updates': [
+            {'expressions': [{'column': 'value', 'operator': '+', 'value': 6}],
+             'where': {'column': 'key', 'condition': '=', 'value': 'READINGS',
+                       'and': {'column': 'resolution', 'condition': '=', 'value': 60,
+                               'and': {'column': 'bucket', 'condition': '=', 'value': 1704070920}}}}]}) == calls[1]
+        assert ('query', 'statistics_history_rollup', 3600, 1704070800) == calls[2]
+        assert ('insert', 'statistics_history_rollup', {'inserts': [
+            {'key': 'READINGS', 'resolution': 3600, 'bucket': 1704070800, 'value': 6},
+            {'key': 'PURGED', 'resolution': 3600, 'bucket': 1704070800, 'value': 0}]}) == calls[3]
+        assert ('query', 'statistics_history_rollup', 86400, 1704067200) == calls[4]
+        assert 'insert' == calls[5][0]
+        assert 6 == len(calls)
+
+    async def test_rollup_local_time(self, local_timezone):
+        local_timezone('IST-5:30')
+        with patch.object(FledgeProcess, '__init__'):
+            with patch.object(FLCoreLogger, "get_logger"):
+                sh = StatisticsHistory()
+        sh._storage_async = MagicMock(spec=StorageClientAsync)
+        buckets = []
+
+        async def query(table, payload):
+            where = json.loads(payload)['where']
+            buckets.append((where['value'], where['and']['value']))
+            return {'rows': []}
+
+        sh._storage_async.query_tbl_with_payload.side_effect = query
+        sh._storage_async.insert_into_tbl.side_effect = mock_coro
+        # 2024-01-01 06:32:03 IST
+        await sh._rollup({'READINGS': 6}, 1704070923.5)
+        # The hour and the day buckets start on the local hour and the local midnight
+        assert [(60, 1704070920), (3600, 1704069000), (86400, 1704047400)] == buckets